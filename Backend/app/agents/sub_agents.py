@@ -13,17 +13,17 @@ Each sub-agent:
 import asyncio
 import json
 import os
-import subprocess
 import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
 from app.core.logging import log
+from app.core.process_runner import run_process
 from app.core.constants import TEST_FILE_MIN_TOKENS
 from app.llm.prompts.derek import DEREK_PROMPT
 from app.llm.prompts.luna import LUNA_PROMPT
-from app.llm import call_llm, call_llm_with_usage  # ✅ Use unified LLM interface with V3 usage tracking
+from app.llm import call_llm, call_llm_with_usage, call_llm_streaming  # ✅ Use unified LLM interface with V3 usage tracking
 
 # NOTE: Cost tracking now handled by BudgetManager in orchestrator
 
@@ -182,19 +182,11 @@ async def _run_pytest(project_path: str, test_paths: Optional[List[str]] = None,
     if test_paths:
         cmd.extend(test_paths)
     try:
-        # FIX ASYNC-001: Use asyncio.to_thread for Windows compatibility
-        def run_pytest_sync():
-            return subprocess.run(
-                cmd,
-                cwd=project_path,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-        
-        proc = await asyncio.to_thread(run_pytest_sync)
-        stdout = proc.stdout or ""
-        stderr = proc.stderr or ""
+        proc = await run_process(cmd, cwd=project_path, timeout=timeout)
+        if proc.timed_out:
+            return {"passed": False, "failures": [{"description": "pytest timeout"}], "output": proc.stdout, "returncode": None}
+        stdout = proc.stdout
+        stderr = proc.stderr
         
         output = stdout + ("\nSTDERR:\n" + stderr if stderr else "")
         passed = proc.returncode == 0
@@ -208,8 +200,6 @@ async def _run_pytest(project_path: str, test_paths: Optional[List[str]] = None,
                 if "FAILED" in line or "ERROR" in line:
                     failures.append({"line": i + 1, "text": line})
         return {"passed": passed, "failures": failures, "output": output, "returncode": proc.returncode}
-    except subprocess.TimeoutExpired:
-        return {"passed": False, "failures": [{"description": "pytest timeout"}], "output": "", "returncode": None}
     except FileNotFoundError:
         return {"passed": False, "failures": [{"description": "pytest not installed"}], "output": "pytest not found on PATH", "returncode": None}
     except Exception as e:
@@ -225,19 +215,11 @@ async def _run_playwright(project_path: str, test_paths: Optional[List[str]] = N
     if test_paths:
         cmd.extend(test_paths)
     try:
-        # FIX ASYNC-001: Use asyncio.to_thread for Windows compatibility
-        def run_playwright_sync():
-            return subprocess.run(
-                cmd,
-                cwd=project_path,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-        
-        proc = await asyncio.to_thread(run_playwright_sync)
-        stdout = proc.stdout or ""
-        stderr = proc.stderr or ""
+        proc = await run_process(cmd, cwd=project_path, timeout=timeout)
+        if proc.timed_out:
+            return {"passed": False, "failures": [{"description": "playwright timeout"}], "output": proc.stdout, "returncode": None}
+        stdout = proc.stdout
+        stderr = proc.stderr
         
         output = stdout + ("\nSTDERR:\n" + stderr if stderr else "")
         passed = proc.returncode == 0
@@ -248,8 +230,6 @@ async def _run_playwright(project_path: str, test_paths: Optional[List[str]] = N
                 if "FAILED" in line or "✖" in line:
                     failures.append({"line": i + 1, "text": line})
         return {"passed": passed, "failures": failures, "output": output, "returncode": proc.returncode}
-    except subprocess.TimeoutExpired:
-        return {"passed": False, "failures": [{"description": "playwright timeout"}], "output": "", "returncode": None}
     except FileNotFoundError:
         return {"passed": False, "failures": [{"description": "playwright not installed"}], "output": "playwright not found on PATH", "returncode": None}
     except Exception as e:
@@ -387,17 +367,11 @@ async def marcus_call_sub_agent(
         else:
             base_prompt = global_persona
         
-        # File Selection - limit to manageable size
+        # File Selection - the context packer fits them into the step's input
+        # token budget (signatures before bodies, see app/llm/context_packer.py)
         selected_files = files
         file_mode_decision_id = ""
         
-        if files:
-            # Limit files to prevent context overflow
-            if isinstance(files, list) and len(files) > 5:
-                selected_files = files[:5]
-            elif isinstance(files, dict) and len(files) > 5:
-                selected_files = dict(list(files.items())[:5])
-        
         # ════════════════════════════════════════════════════════
         # DYNAMIC TOOL SELECTION (V!=K)
         # ════════════════════════════════════════════════════════
@@ -434,7 +408,9 @@ async def marcus_call_sub_agent(
                 user_task=user_request,
                 step_name=step_name,
                 files=selected_files,
-                contracts=contracts
+                contracts=contracts,
+                errors=errors if is_retry else None,
+                provider=provider,
             )
             
             core_prompt = prompts["system_prompt"]  # HDAP rules + agent identity
@@ -454,7 +430,8 @@ async def marcus_call_sub_agent(
                 files=selected_files,
                 contracts=contracts,
                 errors=errors if is_retry else None,
-                tools=selected_tools
+                tools=selected_tools,
+                provider=provider,
             )
 
 
@@ -477,17 +454,54 @@ async def marcus_call_sub_agent(
 
         log("MARCUS", f"Calling {agent_name} (max_tokens={max_tokens})")
         
+        # Protocol rules + persona lead core_prompt and never change between
+        # calls; only the step instructions after them do. The provider caches
+        # that prefix (see app/llm/prefix_cache.py).
+        cache_prefix = core_prompt[:len(core_prompt) - len(base_prompt) + len(global_persona)]
+        
         # ============================================================
         # LLM CALL with OPTIMIZED PROMPTS + V3 USAGE TRACKING
         # ============================================================
-        llm_result = await call_llm_with_usage(
-            prompt=dynamic_context,  # MINIMAL dynamic context
-            provider=provider,
-            model=model,
-            system_prompt=core_prompt,  # CORE static rules (cacheable!)
-            temperature=temperature,  # Use override or default
-            max_tokens=max_tokens,
-        )
+        if is_artifact_mode and settings.llm.streaming:
+            # V5: Stream the generation - as each <<<END_FILE>>> arrives the file
+            # is reported to the UI and its pre-flight validation starts, so
+            # Marcus's pre-flight mostly collects finished results. Writing
+            # still waits for supervision (a rejected reply must not hit disk).
+            from app.validation import get_validation_service
+            validation = get_validation_service()
+            
+            async def _on_file_ready(file: Dict[str, str]) -> None:
+                validation.prevalidate(file)
+                if project_id:
+                    await _broadcast_agent_thinking(
+                        project_id,
+                        agent_name,
+                        "file_ready",
+                        f"📄 {file.get('path', '?')} ready ({len(file.get('content', ''))} bytes)",
+                    )
+            
+            llm_result = await call_llm_streaming(
+                prompt=dynamic_context,  # MINIMAL dynamic context
+                provider=provider,
+                model=model,
+                system_prompt=core_prompt,  # CORE static rules (cacheable!)
+                temperature=temperature,  # Use override or default
+                max_tokens=max_tokens,
+                on_file=_on_file_ready,
+                use_cache=not is_retry,  # Retries need a fresh generation
+                cache_prefix=cache_prefix,
+            )
+        else:
+            llm_result = await call_llm_with_usage(
+                prompt=dynamic_context,  # MINIMAL dynamic context
+                provider=provider,
+                model=model,
+                system_prompt=core_prompt,  # CORE static rules (cacheable!)
+                temperature=temperature,  # Use override or default
+                max_tokens=max_tokens,
+                use_cache=not is_retry,  # Retries need a fresh generation
+                cache_prefix=cache_prefix,
+            )
         
         # V3: Extract text and usage from result
         raw = llm_result.get("text", "")
@@ -502,7 +516,8 @@ async def marcus_call_sub_agent(
         from app.utils.parser import parse_hdap
         import json as json_lib  # For Marcus review parsing
         
-        hdap_result = parse_hdap(raw)
+        # Streamed calls were already parsed incrementally
+        hdap_result = llm_result.get("hdap") or parse_hdap(raw)
         
         # Check if this is a Marcus supervision response (JSON with "approved" field)
         # Marcus reviews use JSON for structured metadata, not HDAP for files
@@ -673,6 +688,8 @@ async def marcus_call_sub_agent(
                     "file_context": file_mode_decision_id,
                     "tool_selection": tool_decision_id
                 }
+                # V6: Lets supervision evict the cached response if it rejects it
+                normalized["cache_key"] = llm_result.get("cache_key")
 
             return {
                 "passed": True,
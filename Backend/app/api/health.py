@@ -3,7 +3,7 @@
 Health check endpoints.
 """
 from datetime import datetime, timezone
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 router = APIRouter(tags=["Health"])
 
@@ -18,3 +18,9 @@ async def healthz():
 async def api_health():
     """API health check."""
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/api/health/websockets")
+async def websocket_health(request: Request):
+    """WebSocket send-queue depths, dropped messages and slow-consumer disconnects."""
+    return request.app.state.manager.stats()
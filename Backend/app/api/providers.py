@@ -103,6 +103,22 @@ async def get_current_provider():
     }
 
 
+@router.get("/stats")
+async def get_provider_stats():
+    """Runtime stats for the shared LLM transport, caches, request scheduler and hedging."""
+    from app.llm import get_adapter
+    adapter = get_adapter()
+    return {
+        "transport": adapter.transport.stats(),
+        "cache": adapter.cache.stats() if adapter.cache is not None else {"enabled": False},
+        "scheduler": adapter.scheduler.stats() if adapter.scheduler is not None else {"enabled": False},
+        "prompt_cache": adapter.prefix_cache.stats() if adapter.prefix_cache is not None else {"enabled": False},
+        "singleflight": adapter.flights.stats() if adapter.flights is not None else {"enabled": False},
+        "hedging": adapter.hedger.stats() if adapter.hedger is not None else {"enabled": False},
+        "token_estimator": adapter.token_estimator.stats(),
+    }
+
+
 class SetProviderRequest(BaseModel):
     provider: str
     model: str
@@ -35,6 +35,63 @@ async def sandbox_exec(data: ExecRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/pool/stats")
+async def get_pool_stats():
+    """Pre-warmed sandbox pool statistics."""
+    from app.core.config import settings
+    from app.sandbox.pool import get_sandbox_pool
+    
+    return {"enabled": settings.sandbox.pool_enabled, **get_sandbox_pool().stats()}
+
+
+@router.get("/containers/state")
+async def get_container_state_stats():
+    """Container state cache (docker events subscriber) statistics."""
+    from app.core.config import settings
+    from app.sandbox.container_state import get_container_states
+    
+    return {"enabled": settings.sandbox.docker_events_enabled, **get_container_states().stats()}
+
+
+@router.get("/docker-api")
+async def get_docker_api_stats():
+    """Docker Engine API client (unix socket) status; unavailable means the docker CLI is used."""
+    from app.core.config import settings
+    from app.sandbox.docker_api import get_docker_api
+    
+    api = get_docker_api()
+    if api is None:
+        return {"enabled": settings.sandbox.docker_api_enabled, "available": False}
+    return {"enabled": True, "available": await api.ping(), **api.stats_summary()}
+
+
+@router.get("/test-workers")
+async def get_test_worker_stats():
+    """Persistent test worker containers and reuse statistics."""
+    from app.core.config import settings
+    from app.sandbox.test_worker import get_test_workers
+    
+    return {"enabled": settings.sandbox.test_worker_enabled, **get_test_workers().stats()}
+
+
+@router.get("/images")
+async def get_image_cache_stats():
+    """Dependency base image cache report (tags, usage, build time)."""
+    from app.core.config import settings
+    from app.sandbox.image_cache import get_image_cache
+    
+    return {"enabled": settings.sandbox.image_cache_enabled, **get_image_cache().stats()}
+
+
+@router.post("/images/prune")
+async def prune_base_images(max_idle_days: Optional[float] = None):
+    """Remove base images unused for max_idle_days (default SANDBOX_IMAGE_MAX_IDLE_DAYS)."""
+    from app.sandbox.image_cache import get_image_cache
+    
+    removed = await get_image_cache().prune(max_idle_days)
+    return {"removed": removed, "count": len(removed)}
+
+
 @router.get("/{project_id}/status")
 async def get_sandbox_status(project_id: str):
     """Get sandbox status for a project."""
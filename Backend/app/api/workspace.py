@@ -472,10 +472,14 @@ async def force_stop_workflow(project_id: str):
     
     log("WORKSPACE", f"🔧 Force stopping stuck workflow for {project_id}")
     await WorkflowStateManager.stop_workflow(project_id)
+    # Kill commands the workflow is still waiting on (tests, builds, docker CLI)
+    from app.core.process_runner import kill_processes
+    killed = kill_processes(project_id)
     
     return {
         "success": True,
         "message": f"Force stopped workflow for {project_id}",
         "project_id": project_id,
         "was_running": True,
+        "killed_processes": killed,
     }
@@ -29,7 +29,7 @@ from app.core.logging import log
 # ═══════════════════════════════════════════════════════════════════════════════
 
 LOCKFILE_NAME = "arbormind.lock.json"
-LOCKFILE_VERSION = "1.0"
+LOCKFILE_VERSION = "1.1"
 
 
 def _get_lockfile_path(project_path: str) -> Path:
@@ -53,11 +53,15 @@ def _compute_input_hash(
     """
     hash_input = {
         "step": step_name,
-        "request": user_request[:500],  # First 500 chars (prevent massive hashing)
+        # Full request digest - a 500-char prefix gave false hits on long prompts
+        "request": hashlib.sha256((user_request or "").encode()).hexdigest(),
         "contracts_hash": hashlib.sha256(
             json.dumps(contracts or {}, sort_keys=True).encode()
         ).hexdigest()[:16] if contracts else "",
-        "files_count": len(files) if files else 0,
+        # Hash file paths AND contents, not just how many there are
+        "files_hash": hashlib.sha256(
+            json.dumps(files, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16] if files else "",
     }
     
     serialized = json.dumps(hash_input, sort_keys=True)
@@ -13,15 +13,29 @@ INVARIANTS:
 4. NO Semantics (raw signals, not classifications)
 
 This module is the "Disk Writer" for the RunSlice.
+
+WRITE PATH:
+    record_* calls only enqueue (sql, params). A dedicated writer thread drains
+    the queue and commits each batch in ONE transaction (executemany per run of
+    identical statements, FIFO order preserved). SQLite runs in WAL mode with
+    synchronous=NORMAL, so recording never stalls the event loop on fsync.
 """
 
+import atexit
+import queue
 import sqlite3
 import json
 import threading
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
 from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import log
+from app.core.profiling import NO_STEP, phase, record as record_phase
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SCHEMA DEFINITION (Pure Event Stream)
@@ -133,6 +147,175 @@ CREATE TABLE IF NOT EXISTS step_state_snapshots (
 class EpistemicViolation(RuntimeError):
     pass
 
+
+Statement = Tuple[str, tuple]
+
+_STOP = object()
+
+
+def _configure(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+
+class LedgerWriter:
+    """
+    Background batch writer for the ledger.
+
+    Bounded queue; when full, `overflow="drop"` (default) discards the event
+    (counted in stats()) and `overflow="block"` waits for room. Blocking
+    stalls the caller's thread - on the event loop that is every coroutine -
+    so "block" is only for callers off the loop (scripts, benchmarks).
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        overflow: Optional[str] = None,
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size or settings.am.ledger_batch_size
+        self.overflow = overflow or settings.am.ledger_overflow
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue or settings.am.ledger_queue_size)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._submit_lock = threading.Lock()  # closed check + enqueue vs. close()
+        self._closed = False
+        self.counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: tuple) -> bool:
+        """Queue one statement. Returns False if it was dropped."""
+        with phase("ledger"):
+            return self._submit(sql, params)
+
+    def _submit(self, sql: str, params: tuple) -> bool:
+        with self._submit_lock:
+            if not self._closed:
+                return self._enqueue(sql, params)
+        self._write_batch_now([(sql, params)])
+        return True
+
+    def _enqueue(self, sql: str, params: tuple) -> bool:
+        with self._idle:
+            self._pending += 1
+        try:
+            if self.overflow == "block":
+                self._queue.put((sql, params))
+            else:
+                self._queue.put_nowait((sql, params))
+        except queue.Full:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+            self.counters["dropped"] += 1
+            return False
+        self.counters["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is committed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush, then stop the writer thread. Later submits write synchronously."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._submit_lock:
+            # Nothing can be enqueued behind _STOP: submits see _closed first
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "queue_depth": self._queue.qsize(), "overflow": self.overflow}
+
+    # ───────────────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        _configure(conn)
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # Batch whatever has accumulated while the last commit ran
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                statements = [entry for entry in batch if entry is not _STOP]
+                if statements:
+                    try:
+                        self._write_batch(conn, statements)
+                    finally:
+                        with self._idle:
+                            self._pending -= len(statements)
+                            self._idle.notify_all()
+                if any(entry is _STOP for entry in batch):
+                    break
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, statements: List[Statement]) -> None:
+        start = time.perf_counter()
+        try:
+            self._commit_batch(conn, statements)
+        finally:
+            # Writer-thread cost, not attributable to a step
+            record_phase("ledger_flush", time.perf_counter() - start, step=NO_STEP)
+
+    def _commit_batch(self, conn: sqlite3.Connection, statements: List[Statement]) -> None:
+        try:
+            with conn:  # One transaction per batch
+                for sql, rows in _group_runs(statements):
+                    conn.executemany(sql, rows)
+            self.counters["written"] += len(statements)
+            self.counters["batches"] += 1
+        except sqlite3.Error:
+            # Isolate the bad statement - never lose the whole batch for one row
+            for sql, params in statements:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    self.counters["written"] += 1
+                except sqlite3.Error as e:
+                    self.counters["failed"] += 1
+                    log("LEDGER", f"⚠️ Dropped ledger event: {e}")
+
+    def _write_batch_now(self, statements: List[Statement]) -> None:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        try:
+            _configure(conn)
+            self._write_batch(conn, statements)
+        finally:
+            conn.close()
+
+
+def _group_runs(statements: List[Statement]) -> List[Tuple[str, List[tuple]]]:
+    """Group CONSECUTIVE identical SQL so executemany keeps FIFO order."""
+    groups: List[Tuple[str, List[tuple]]] = []
+    for sql, params in statements:
+        if groups and groups[-1][0] == sql:
+            groups[-1][1].append(params)
+        else:
+            groups.append((sql, [params]))
+    return groups
+
+
 class ExecutionLedger:
     """
     Append-only event recorder.
@@ -146,6 +329,7 @@ class ExecutionLedger:
         self.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
         self._local = threading.local()
         self._init_db()
+        self.writer = LedgerWriter(self.DB_PATH)
 
     @classmethod
     def get_instance(cls):
@@ -162,6 +346,7 @@ class ExecutionLedger:
                 check_same_thread=False
             )
             self._local.conn.row_factory = sqlite3.Row
+            _configure(self._local.conn)
         return self._local.conn
 
     @contextmanager
@@ -180,75 +365,78 @@ class ExecutionLedger:
     def _init_db(self):
         with self._cursor() as cursor:
             cursor.executescript(SCHEMA_SQL)
+
+    def _submit(self, sql: str, params: tuple) -> None:
+        """Hand a write to the background writer (never blocks on disk)."""
+        self.writer.submit(sql, params)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event is committed."""
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        """Flush and stop the background writer (shutdown)."""
+        self.writer.close()
     
     # ═══════════════════════════════════════════════════════════════════════════
     # WRITE API (Record Events)
     # ═══════════════════════════════════════════════════════════════════════════
 
     def record_run_start(self, run_id: str, project_id: str):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO runs (run_id, project_id, timestamp, status_event) VALUES (?, ?, ?, ?)",
-                (run_id, project_id, datetime.now().isoformat(), "STARTED")
-            )
+        self._submit(
+            "INSERT INTO runs (run_id, project_id, timestamp, status_event) VALUES (?, ?, ?, ?)",
+            (run_id, project_id, datetime.now().isoformat(), "STARTED")
+        )
 
     def record_step_entry(self, run_id: str, step: str):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO step_events (event_id, run_id, step_name, event_type, timestamp) VALUES (?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, "ENTRY", datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO step_events (event_id, run_id, step_name, event_type, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, "ENTRY", datetime.now().isoformat())
+        )
 
     def record_step_exit(self, run_id: str, step: str, status: str):
         payload = json.dumps({"status": status})
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO step_events (event_id, run_id, step_name, event_type, payload, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, "EXIT", payload, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO step_events (event_id, run_id, step_name, event_type, payload, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, "EXIT", payload, datetime.now().isoformat())
+        )
 
     def record_decision_event(self, run_id: str, step: str, agent: str, event_type: str, payload_json: str):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO decision_events (event_id, run_id, step, source_agent, event_type, raw_payload, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, agent, event_type, payload_json, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO decision_events (event_id, run_id, step, source_agent, event_type, raw_payload, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, agent, event_type, payload_json, datetime.now().isoformat())
+        )
 
     def record_failure_event(self, run_id: str, step: str, origin: str, signal: str, message: str):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO failure_events (event_id, run_id, step, origin, raw_signal, message, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, origin, signal, message, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO failure_events (event_id, run_id, step, origin, raw_signal, message, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, origin, signal, message, datetime.now().isoformat())
+        )
 
     def record_supervisor_event(self, run_id: str, step: str, agent: str, payload_json: str):
-         with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO supervisor_events (event_id, run_id, step, agent, event_type, raw_payload, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, agent, "REVIEW_COMPLETED", payload_json, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO supervisor_events (event_id, run_id, step, agent, event_type, raw_payload, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, agent, "REVIEW_COMPLETED", payload_json, datetime.now().isoformat())
+        )
 
     def record_tool_trace(self, run_id: str, step: str, tool_name: str, input_hash: str, exit_code: int, duration_ms: int):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO tool_invocations (trace_id, run_id, step, tool_name, input_hash, exit_code, duration_ms, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, tool_name, input_hash, exit_code, duration_ms, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO tool_invocations (trace_id, run_id, step, tool_name, input_hash, exit_code, duration_ms, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, tool_name, input_hash, exit_code, duration_ms, datetime.now().isoformat())
+        )
 
     def record_artifact_event(self, run_id: str, step: str, file_path: str, event_type: str, size_bytes: int):
         """Record artifact birth/modification event at the file materialization boundary."""
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO artifact_events (event_id, run_id, step, file_path, event_type, size_bytes, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, file_path, event_type, size_bytes, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO artifact_events (event_id, run_id, step, file_path, event_type, size_bytes, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, file_path, event_type, size_bytes, datetime.now().isoformat())
+        )
 
     def record_snapshot(self, run_id: str, step: str, stage: str, workspace_hash: str, artifacts_hash: str):
-        with self._cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO step_state_snapshots (snapshot_id, run_id, step, stage, workspace_hash, artifacts_hash, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (str(uuid.uuid4()), run_id, step, stage, workspace_hash, artifacts_hash, datetime.now().isoformat())
-            )
+        self._submit(
+            "INSERT INTO step_state_snapshots (snapshot_id, run_id, step, stage, workspace_hash, artifacts_hash, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), run_id, step, stage, workspace_hash, artifacts_hash, datetime.now().isoformat())
+        )
 
     # ═══════════════════════════════════════════════════════════════════════════
     # READ API (Reconstruction Builder Access ONLY)
@@ -256,6 +444,7 @@ class ExecutionLedger:
     
     def _dump_table(self, table_name: str, run_id: str):
         """Raw table dump for builder. No logic."""
+        self.flush()  # Read-your-writes: drain queued events first
         with self._cursor() as cursor:
             # Safe parameterized query for known table names
             cursor.execute(f"SELECT * FROM {table_name} WHERE run_id = ? ORDER BY timestamp", (run_id,))
@@ -278,6 +467,19 @@ def get_current_run_id() -> str:
 def get_store() -> ExecutionLedger:
     return ExecutionLedger.get_instance()
 
+def flush_ledger(timeout: Optional[float] = None) -> bool:
+    """Wait for queued ledger events to hit disk (no-op if never used)."""
+    if ExecutionLedger._instance is None:
+        return True
+    return ExecutionLedger._instance.flush(timeout)
+
+def close_ledger() -> None:
+    """Flush and stop the ledger writer. Safe to call more than once."""
+    if ExecutionLedger._instance is not None:
+        ExecutionLedger._instance.close()
+
+atexit.register(close_ledger)
+
 # WRITE WRAPPERS
 def record_run_start(run_id: str, project_id: str):
     get_store().record_run_start(run_id, project_id)
@@ -326,12 +528,10 @@ def record_failure(run_id: str, step: str, failure_type: str, message: str, stac
 def record_run_end(run_id: str, status: str, total_steps: int, completed_steps: int, failed_steps: int):
     """Record run completion event."""
     try:
-        store = get_store()
-        with store._cursor() as cursor:
-            cursor.execute(
-                "UPDATE runs SET status_event = ? WHERE run_id = ?",
-                (f"COMPLETED_{status.upper()}", run_id)
-            )
+        get_store()._submit(
+            "UPDATE runs SET status_event = ? WHERE run_id = ?",
+            (f"COMPLETED_{status.upper()}", run_id)
+        )
     except Exception:
         pass  # Non-fatal
 
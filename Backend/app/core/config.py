@@ -5,12 +5,22 @@ Application configuration - single source of truth for all settings.
 import os
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, Dict
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def _env_int_map(name: str, default: str = "") -> Dict[str, int]:
+    """Parse a "key=int,key=int" environment variable into a dict."""
+    result: Dict[str, int] = {}
+    for item in os.getenv(name, default).split(","):
+        key, _, value = item.partition("=")
+        if key.strip() and value.strip().isdigit():
+            result[key.strip()] = int(value.strip())
+    return result
+
+
 @dataclass
 class LLMSettings:
     """LLM provider configuration."""
@@ -22,6 +32,48 @@ class LLMSettings:
     ollama_base_url: str = field(default_factory=lambda: os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))
     temperature: float = 0.7
     max_retries: int = 3
+    # HTTP transport (shared keep-alive pools, see app/llm/transport.py)
+    request_timeout: int = field(default_factory=lambda: int(os.getenv("LLM_REQUEST_TIMEOUT", "120")))
+    http_max_connections: int = field(default_factory=lambda: int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "16")))
+    http_keepalive_timeout: float = field(default_factory=lambda: float(os.getenv("LLM_HTTP_KEEPALIVE", "30")))
+    http_dns_cache_ttl: int = field(default_factory=lambda: int(os.getenv("LLM_HTTP_DNS_TTL", "300")))
+    # Per-provider connection limits, e.g. "ollama=2,gemini=32"
+    http_provider_limits: Dict[str, int] = field(default_factory=lambda: _env_int_map("LLM_HTTP_PROVIDER_LIMITS", "ollama=2"))
+    # Stream artifact-mode generations and parse HDAP incrementally
+    streaming: bool = field(default_factory=lambda: os.getenv("LLM_STREAMING", "true").lower() == "true")
+    # Content-addressed response cache (see app/llm/response_cache.py)
+    cache_enabled: bool = field(default_factory=lambda: os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true")
+    cache_path: Path = field(default_factory=lambda: Path(os.getenv(
+        "LLM_CACHE_PATH",
+        str(Path(__file__).parent.parent.parent / "data" / "llm_cache.sqlite")
+    )))
+    cache_max_mb: int = field(default_factory=lambda: int(os.getenv("LLM_CACHE_MAX_MB", "256")))
+    cache_ttl_hours: float = field(default_factory=lambda: float(os.getenv("LLM_CACHE_TTL_HOURS", "168")))
+    # Request scheduler (see app/llm/scheduler.py): per-provider limits, e.g. "gemini=15,openai=500"
+    scheduler_enabled: bool = field(default_factory=lambda: os.getenv("LLM_SCHEDULER", "true").lower() == "true")
+    provider_rpm: Dict[str, int] = field(default_factory=lambda: _env_int_map("LLM_PROVIDER_RPM"))
+    provider_tpm: Dict[str, int] = field(default_factory=lambda: _env_int_map("LLM_PROVIDER_TPM"))
+    rate_limit_max_wait: float = field(default_factory=lambda: float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "300")))
+    # Provider-side caching of static prompt prefixes (see app/llm/prefix_cache.py)
+    prompt_cache_enabled: bool = field(default_factory=lambda: os.getenv("PROMPT_CACHE", "true").lower() == "true")
+    prompt_cache_ttl: int = field(default_factory=lambda: int(os.getenv("PROMPT_CACHE_TTL", "3600")))
+    prompt_cache_min_chars: int = field(default_factory=lambda: int(os.getenv("PROMPT_CACHE_MIN_CHARS", "4096")))
+    # Share one provider request between identical concurrent calls (app/llm/singleflight.py)
+    coalesce_enabled: bool = field(default_factory=lambda: os.getenv("LLM_COALESCE", "true").lower() == "true")
+    # Hedged / failover requests and per-provider circuit breakers (app/llm/hedging.py)
+    hedging_enabled: bool = field(default_factory=lambda: os.getenv("LLM_HEDGING", "false").lower() == "true")
+    hedge_provider: Optional[str] = field(default_factory=lambda: os.getenv("LLM_HEDGE_PROVIDER") or None)
+    hedge_model: Optional[str] = field(default_factory=lambda: os.getenv("LLM_HEDGE_MODEL") or None)
+    hedge_percentile: float = field(default_factory=lambda: float(os.getenv("LLM_HEDGE_PERCENTILE", "95")))
+    hedge_min_delay: float = field(default_factory=lambda: float(os.getenv("LLM_HEDGE_MIN_DELAY", "5")))
+    hedge_max_delay: float = field(default_factory=lambda: float(os.getenv("LLM_HEDGE_MAX_DELAY", "60")))
+    breaker_error_rate: float = field(default_factory=lambda: float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5")))
+    breaker_min_calls: int = field(default_factory=lambda: int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")))
+    breaker_cooldown: float = field(default_factory=lambda: float(os.getenv("LLM_BREAKER_COOLDOWN", "30")))
+    # Deterministic "replay" provider (benchmarks): recorded outputs + synthetic latency
+    replay_path: Optional[str] = field(default_factory=lambda: os.getenv("LLM_REPLAY_PATH"))
+    replay_latency_ms: float = field(default_factory=lambda: float(os.getenv("LLM_REPLAY_LATENCY_MS", "0")))
+    replay_ms_per_token: float = field(default_factory=lambda: float(os.getenv("LLM_REPLAY_MS_PER_TOKEN", "0")))
 
 
 @dataclass
@@ -35,6 +87,29 @@ class WorkflowSettings:
     default_max_tokens: int = 16000
     # FIX #15: Centralize magic number from engine.py
     max_chat_history: int = 10
+    # Track step file changes with inotify (Linux) instead of rescans
+    workspace_inotify: bool = field(default_factory=lambda: os.getenv("WORKSPACE_INOTIFY", "true").lower() == "true")
+    # Run independent steps (e.g. frontend_mock + backend_models) concurrently
+    parallel_steps: bool = field(default_factory=lambda: os.getenv("FAST_PARALLEL_STEPS", "false").lower() == "true")
+    max_parallel_steps: int = field(default_factory=lambda: int(os.getenv("FAST_MAX_PARALLEL_STEPS", "2")))
+    # Max entity routers generated + reviewed concurrently in backend_routers
+    router_concurrency: int = field(default_factory=lambda: int(os.getenv("BACKEND_ROUTER_CONCURRENCY", "4")))
+    # Checkpoint manifests kept per step (0 = keep all); unreferenced blobs are GC'd
+    checkpoint_keep_per_step: int = field(default_factory=lambda: int(os.getenv("CHECKPOINT_KEEP_PER_STEP", "10")))
+    # Parsed-Python analyses memoized by content hash (app/validation/ast_cache.py)
+    ast_cache_entries: int = field(default_factory=lambda: int(os.getenv("VALIDATION_AST_CACHE_SIZE", "1024")))
+    # Pre-flight validation offloaded to worker processes (app/validation/pool.py)
+    validation_process_pool: bool = field(default_factory=lambda: os.getenv("VALIDATION_PROCESS_POOL", "true").lower() == "true")
+    validation_workers: int = field(default_factory=lambda: int(os.getenv("VALIDATION_WORKERS", "0")))  # 0 = cores - 1 (max 4)
+    validation_max_pending: int = field(default_factory=lambda: int(os.getenv("VALIDATION_MAX_PENDING", "64")))
+    validation_file_timeout: float = field(default_factory=lambda: float(os.getenv("VALIDATION_FILE_TIMEOUT", "10")))
+    validation_inline_max_bytes: int = field(default_factory=lambda: int(os.getenv("VALIDATION_INLINE_MAX_BYTES", "16384")))
+    # Per-connection WebSocket send queues (app/lib/websocket.py)
+    ws_queue_size: int = field(default_factory=lambda: int(os.getenv("WS_SEND_QUEUE_SIZE", "256")))
+    ws_send_timeout: float = field(default_factory=lambda: float(os.getenv("WS_SEND_TIMEOUT", "10")))
+    # Cross-worker broadcast bus (app/lib/broadcast_bus.py): memory, socket or mongo
+    broadcast_bus: str = field(default_factory=lambda: os.getenv("BROADCAST_BUS", "memory"))
+    broadcast_bus_address: str = field(default_factory=lambda: os.getenv("BROADCAST_BUS_ADDRESS", "127.0.0.1:8790"))
 
 
 @dataclass
@@ -43,6 +118,31 @@ class SandboxSettings:
     health_check_timeout: int = 60
     command_timeout: int = 300
     test_timeout: int = 600
+    # Async process runner (app/core/process_runner.py)
+    docker_cli_concurrency: int = field(default_factory=lambda: int(os.getenv("DOCKER_CLI_CONCURRENCY", "16")))
+    process_output_limit: int = field(default_factory=lambda: int(os.getenv("PROCESS_OUTPUT_LIMIT", str(1024 * 1024))))
+    # Docker Engine API over the unix socket (app/sandbox/docker_api.py); CLI is the fallback
+    docker_api_enabled: bool = field(default_factory=lambda: os.getenv("DOCKER_API", "true").lower() == "true")
+    docker_socket: str = field(default_factory=lambda: os.getenv("DOCKER_SOCKET", ""))
+    # Container state cache fed by `docker events` (app/sandbox/container_state.py)
+    docker_events_enabled: bool = field(default_factory=lambda: os.getenv("SANDBOX_DOCKER_EVENTS", "true").lower() == "true")
+    # Dependency base images keyed by lockfiles (app/sandbox/image_cache.py)
+    image_cache_enabled: bool = field(default_factory=lambda: os.getenv("SANDBOX_IMAGE_CACHE", "true").lower() == "true")
+    image_max_idle_days: float = field(default_factory=lambda: float(os.getenv("SANDBOX_IMAGE_MAX_IDLE_DAYS", "14")))
+    # Pre-warmed container pool (app/sandbox/pool.py)
+    pool_enabled: bool = field(default_factory=lambda: os.getenv("SANDBOX_POOL_ENABLED", "false").lower() == "true")
+    pool_min_size: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_MIN", "1")))
+    pool_max_size: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_MAX", "4")))
+    pool_max_uses: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_MAX_USES", "20")))
+    pool_max_age: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_MAX_AGE", "3600")))
+    pool_idle_ttl: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_IDLE_TTL", "900")))
+    pool_scale_window: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_SCALE_WINDOW", "600")))
+    pool_check_interval: int = field(default_factory=lambda: int(os.getenv("SANDBOX_POOL_CHECK_INTERVAL", "30")))
+    pool_acquire_wait: float = field(default_factory=lambda: float(os.getenv("SANDBOX_POOL_ACQUIRE_WAIT", "20")))
+    # Persistent test worker containers (app/sandbox/test_worker.py)
+    test_worker_enabled: bool = field(default_factory=lambda: os.getenv("SANDBOX_TEST_WORKER", "true").lower() == "true")
+    test_worker_idle_ttl: int = field(default_factory=lambda: int(os.getenv("SANDBOX_TEST_WORKER_IDLE", "600")))
+    test_shards: int = field(default_factory=lambda: int(os.getenv("SANDBOX_TEST_SHARDS", "1")))
 
 
 @dataclass 
@@ -94,6 +194,13 @@ class AMSettings:
     # Entropy Thresholds
     entropy_high: float = 1.5   # Above this = multi-domain query
     entropy_low: float = 0.5    # Below this = confident single option
+    
+    # Execution Ledger background writer
+    ledger_queue_size: int = field(default_factory=lambda: int(os.getenv("LEDGER_QUEUE_SIZE", "10000")))
+    ledger_batch_size: int = field(default_factory=lambda: int(os.getenv("LEDGER_BATCH_SIZE", "500")))
+    # "drop" = discard the event when the queue is full, "block" = wait for room
+    # (stalls the event loop - only for callers off the loop)
+    ledger_overflow: str = field(default_factory=lambda: os.getenv("LEDGER_OVERFLOW", "drop").lower())
 
 
 
@@ -81,6 +81,10 @@ PROTECTED_FILES = {
     "frontend/Dockerfile",
     "docker-compose.yml",
     ".dockerignore",
+    # Generated by the sandbox image cache (app/sandbox/image_cache.py)
+    "backend/Dockerfile.cached",
+    "frontend/Dockerfile.cached",
+    "docker-compose.cache.yml",
 }
 
 # Alias for backwards compatibility - both refer to the same set
@@ -6,6 +6,8 @@ from pathlib import Path
 from typing import Any, Dict, List
 from app.core.logging import log
 from app.core.llm_output_integrity import validate_llm_files, LLMOutputIntegrityError
+from app.core.profiling import phase
+from app.core.project_files import invalidate_project_files
 
 
 def convert_files_list_to_dict(files: List[Dict[str, str]]) -> Dict[str, str]:
@@ -41,9 +43,21 @@ async def write_validated_files(
     files_dict = convert_files_list_to_dict(files)
     
     # Validate (raises on error)
-    validate_llm_files(files_dict, step)
+    with phase("validation"):
+        validate_llm_files(files_dict, step)
     
     # Write files
+    with phase("file_io"):
+        written = _write_files(project_path, files_dict, step)
+    
+    # Drop stale cached contents of anything we just (tried to) write
+    invalidate_project_files(project_path, files_dict.keys())
+    
+    return written
+
+
+def _write_files(project_path: Path, files_dict: Dict[str, str], step: str) -> int:
+    """Write validated files to disk, recording an artifact event per file."""
     written = 0
     for path, content in files_dict.items():
         try:
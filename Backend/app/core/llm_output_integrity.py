@@ -1,10 +1,11 @@
 # app/core/llm_output_integrity.py
 
 from typing import Dict, List
-import ast
 import json
 import re
 
+from app.validation.ast_cache import analyze_python
+
 
 class LLMOutputIntegrityError(Exception):
     pass
@@ -23,7 +24,8 @@ def _is_truncated(content: str) -> bool:
 
 def _validate_python(content: str, path: str):
     try:
-        ast.parse(content)
+        # Shared parse: pre-flight already analyzed this exact content
+        analyze_python(content).raise_parse_error()
     except SyntaxError as e:
         raise LLMOutputIntegrityError(
             f"Invalid Python syntax in {path}: {e}"
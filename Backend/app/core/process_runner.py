@@ -0,0 +1,309 @@
+# app/core/process_runner.py
+"""
+Async subprocess runner shared by the sandbox, sub-agents and tools.
+
+Command helpers used to wrap `subprocess.run` in `asyncio.to_thread`
+(FIX ASYNC-001): each call held a default-executor thread for up to the
+command timeout, buffered all output in memory and could not be stopped.
+run_process() uses asyncio.create_subprocess_exec/_shell instead:
+
+- stdout/stderr are read concurrently; complete lines go to optional
+  callbacks (sync or async) as they arrive
+- each stream keeps only its last `max_output` bytes (ring buffer); the
+  result says how much was dropped
+- the child runs in its own process group (POSIX), so a timeout or a
+  cancelled caller kills the whole tree (shell, docker CLI, npm, ...)
+- `limit="docker"` runs under a per-loop semaphore capping concurrent
+  docker CLI invocations (DOCKER_CLI_CONCURRENCY)
+- processes are registered under an owner (the workflow's project id,
+  taken from a ContextVar) so force-stopping a workflow kills them
+
+Event loops without subprocess support (Windows SelectorEventLoop) fall
+back to the previous subprocess.run-in-a-thread path; callbacks are then
+called once the command has finished.
+
+Usage:
+    result = await run_process(["pytest", "-q"], cwd=path, timeout=60,
+                               on_stdout=lambda line: log("TESTING", line))
+    if result.timed_out: ...
+"""
+import asyncio
+import inspect
+import os
+import signal
+import subprocess
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from app.core.logging import log
+
+
+LineCallback = Callable[[str], Any]
+Command = Union[str, Sequence[str]]
+
+_READ_CHUNK = 64 * 1024
+_DRAIN_TIMEOUT = 5.0  # After exit/kill - a detached grandchild may hold the pipe open
+
+_owner: ContextVar[Optional[str]] = ContextVar("process_owner", default=None)
+_owned: Dict[str, Set[asyncio.subprocess.Process]] = {}
+_limiters: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of run_process()."""
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    stdout_dropped: int = 0  # Bytes discarded by the output cap
+    stderr_dropped: int = 0
+    duration: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+class OutputBuffer:
+    """Keeps the last `max_bytes` of a stream and splits it into lines for a callback."""
+
+    def __init__(self, max_bytes: int, on_line: Optional[LineCallback] = None):
+        self.max_bytes = max_bytes
+        self.on_line = on_line
+        self.dropped = 0
+        self._chunks: Deque[bytes] = deque()
+        self._size = 0
+        self._partial = b""
+
+    async def feed(self, data: bytes) -> None:
+        self._append(data)
+        if self.on_line is None:
+            return
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        for line in lines:
+            await self._emit(line)
+
+    async def close(self) -> None:
+        if self.on_line is not None and self._partial:
+            await self._emit(self._partial)
+        self._partial = b""
+
+    def text(self) -> str:
+        body = b"".join(self._chunks).decode("utf-8", errors="replace")
+        return f"[... {self.dropped} bytes truncated ...]\n{body}" if self.dropped else body
+
+    def _append(self, data: bytes) -> None:
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            excess = self._size - self.max_bytes
+            head = self._chunks[0]
+            if len(head) <= excess:
+                self._chunks.popleft()
+                cut = len(head)
+            else:
+                self._chunks[0] = head[excess:]
+                cut = excess
+            self._size -= cut
+            self.dropped += cut
+
+    async def _emit(self, line: bytes) -> None:
+        try:
+            result = self.on_line(line.decode("utf-8", errors="replace").rstrip("\r"))
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            log("PROCESS", f"⚠️ Output callback failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Ownership (force-stop)
+# ---------------------------------------------------------------------------
+
+def set_process_owner(owner: Optional[str]):
+    """Register processes started in this context under `owner`. Returns a reset token."""
+    return _owner.set(owner)
+
+
+def reset_process_owner(token) -> None:
+    _owner.reset(token)
+
+
+def kill_processes(owner: str) -> int:
+    """Kill every running process started under `owner`. Returns how many."""
+    procs = [p for p in _owned.pop(owner, set()) if p.returncode is None]
+    for proc in procs:
+        _kill(proc)
+    if procs:
+        log("PROCESS", f"🛑 Killed {len(procs)} process(es) for {owner}")
+    return len(procs)
+
+
+def running_processes() -> Dict[str, int]:
+    """Owner -> number of running processes."""
+    return {
+        owner: n for owner, procs in _owned.items()
+        if (n := sum(1 for p in procs if p.returncode is None))
+    }
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+def concurrency_limiter(name: str) -> asyncio.Semaphore:
+    """Per-loop semaphore for a named concurrency limit (currently "docker")."""
+    from app.core.config import settings
+
+    key = (id(asyncio.get_running_loop()), name)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        if name != "docker":
+            raise ValueError(f"Unknown concurrency limit {name!r}")
+        limiter = _limiters[key] = asyncio.Semaphore(max(1, settings.sandbox.docker_cli_concurrency))
+    return limiter
+
+
+async def run_process(
+    cmd: Command,
+    *,
+    cwd: Optional[str] = None,
+    env: Optional[Mapping[str, str]] = None,
+    timeout: Optional[float] = 60,
+    shell: bool = False,
+    on_stdout: Optional[LineCallback] = None,
+    on_stderr: Optional[LineCallback] = None,
+    max_output: Optional[int] = None,
+    limit: Optional[str] = None,
+) -> ProcessResult:
+    """
+    Run a command without blocking the event loop.
+
+    `cmd` is an argv list, or a string when shell=True. A timeout kills the
+    process group and returns timed_out=True (returncode -1); cancelling the
+    caller kills it and re-raises. OSError (e.g. executable not found)
+    propagates.
+    """
+    from app.core.config import settings
+
+    max_output = settings.sandbox.process_output_limit if max_output is None else max_output
+    out = OutputBuffer(max_output, on_stdout)
+    err = OutputBuffer(max_output, on_stderr)
+    if limit is None:
+        return await _run(cmd, cwd, env, timeout, shell, out, err)
+    async with concurrency_limiter(limit):
+        return await _run(cmd, cwd, env, timeout, shell, out, err)
+
+
+async def _run(cmd, cwd, env, timeout, shell, out: OutputBuffer, err: OutputBuffer) -> ProcessResult:
+    start = time.monotonic()
+    if env is not None:
+        env = {**os.environ, **env}
+    spawn = dict(cwd=cwd, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                 stdin=asyncio.subprocess.DEVNULL)
+    if os.name == "posix":
+        spawn["start_new_session"] = True  # Own process group -> killpg takes the whole tree
+    try:
+        if shell:
+            proc = await asyncio.create_subprocess_shell(cmd, **spawn)
+        else:
+            proc = await asyncio.create_subprocess_exec(*cmd, **spawn)
+    except NotImplementedError:
+        return await _run_in_thread(cmd, cwd, env, timeout, shell, out, err, start)
+
+    owner = _owner.get()
+    if owner is not None:
+        _owned.setdefault(owner, set()).add(proc)
+    readers = [asyncio.create_task(_pump(proc.stdout, out)), asyncio.create_task(_pump(proc.stderr, err))]
+    timed_out = False
+    try:
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            _kill(proc)
+            await proc.wait()
+        _, pending = await asyncio.wait(readers, timeout=_DRAIN_TIMEOUT)
+        for reader in pending:
+            reader.cancel()
+    except asyncio.CancelledError:
+        _kill(proc)
+        for reader in readers:
+            reader.cancel()
+        raise
+    finally:
+        if owner is not None:
+            procs = _owned.get(owner)
+            if procs is not None:
+                procs.discard(proc)
+                if not procs:
+                    _owned.pop(owner, None)
+
+    await out.close()
+    await err.close()
+    stderr = err.text()
+    if timed_out:
+        stderr += f"\nCommand timed out after {timeout}s"
+    return ProcessResult(
+        returncode=-1 if timed_out else proc.returncode,
+        stdout=out.text(),
+        stderr=stderr,
+        timed_out=timed_out,
+        stdout_dropped=out.dropped,
+        stderr_dropped=err.dropped,
+        duration=round(time.monotonic() - start, 3),
+    )
+
+
+async def _pump(stream: asyncio.StreamReader, buffer: OutputBuffer) -> None:
+    while True:
+        data = await stream.read(_READ_CHUNK)
+        if not data:
+            return
+        await buffer.feed(data)
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _run_in_thread(cmd, cwd, env, timeout, shell, out: OutputBuffer, err: OutputBuffer, start: float) -> ProcessResult:
+    """Loops without subprocess support: blocking subprocess.run in a thread (no streaming/cancel)."""
+    def run_sync():
+        return subprocess.run(
+            cmd, shell=shell, cwd=cwd, env=env, capture_output=True, stdin=subprocess.DEVNULL, timeout=timeout
+        )
+
+    timed_out = False
+    try:
+        proc = await asyncio.to_thread(run_sync)
+        returncode, stdout, stderr = proc.returncode, proc.stdout or b"", proc.stderr or b""
+    except subprocess.TimeoutExpired as e:
+        timed_out = True
+        returncode, stdout, stderr = -1, e.stdout or b"", e.stderr or b""
+    await out.feed(stdout)
+    await err.feed(stderr)
+    await out.close()
+    await err.close()
+    stderr_text = err.text() + (f"\nCommand timed out after {timeout}s" if timed_out else "")
+    return ProcessResult(
+        returncode=returncode,
+        stdout=out.text(),
+        stderr=stderr_text,
+        timed_out=timed_out,
+        stdout_dropped=out.dropped,
+        stderr_dropped=err.dropped,
+        duration=round(time.monotonic() - start, 3),
+    )
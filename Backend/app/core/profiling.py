@@ -0,0 +1,90 @@
+# app/core/profiling.py
+"""
+Lightweight phase timers for pipeline benchmarks.
+
+Disabled by default: `phase()` is then a single flag check. When enabled
+(benchmarks/pipeline_bench.py), wall time is accumulated per (step, phase):
+
+    with phase("snapshot"):
+        ...
+
+The current step is a ContextVar, so asyncio tasks and asyncio.to_thread
+calls started inside a step are attributed to it (parallel steps included).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+NO_STEP = "-"
+
+_enabled = False
+_lock = threading.Lock()
+# (step, phase) -> {"seconds": float, "count": int}
+_totals: Dict[tuple, Dict[str, float]] = {}
+_current_step: ContextVar[str] = ContextVar("profiling_step", default=NO_STEP)
+
+
+def enable_profiling(enabled: bool = True) -> None:
+    """Turn phase timing on/off (process-wide)."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset_profile() -> None:
+    """Drop all accumulated timings."""
+    with _lock:
+        _totals.clear()
+
+
+def set_current_step(step: str):
+    """Attribute subsequent phases in this context to a step. Returns a reset token."""
+    return _current_step.set(step)
+
+
+def reset_current_step(token) -> None:
+    _current_step.reset(token)
+
+
+def record(phase_name: str, seconds: float, step: Optional[str] = None) -> None:
+    """Add a measured duration (for code that times itself, e.g. background threads)."""
+    if not _enabled:
+        return
+    key = (step or _current_step.get(), phase_name)
+    with _lock:
+        bucket = _totals.setdefault(key, {"seconds": 0.0, "count": 0})
+        bucket["seconds"] += seconds
+        bucket["count"] += 1
+
+
+@contextmanager
+def phase(phase_name: str) -> Iterator[None]:
+    """Time a block under phase_name for the current step."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase_name, time.perf_counter() - start)
+
+
+def profile_snapshot() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Accumulated timings as {step: {phase: {"seconds", "count"}}}.
+    """
+    result: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with _lock:
+        for (step, phase_name), bucket in _totals.items():
+            result.setdefault(step, {})[phase_name] = {
+                "seconds": round(bucket["seconds"], 6),
+                "count": int(bucket["count"]),
+            }
+    return result
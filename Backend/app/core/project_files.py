@@ -0,0 +1,153 @@
+# app/core/project_files.py
+"""
+Cached, step-scoped project file reader.
+
+supervised_agent_call used to walk and read the WHOLE workspace on every
+agent call, only for filter_files_for_step to throw away everything except
+a handful of architecture/*.md files. This module reads only what a step can
+use (via get_step_allowlist) and keeps the contents in a per-project cache:
+
+- Entries are keyed by relative path and validated by (mtime_ns, size)
+- The file writer and the workspace change index invalidate entries explicitly
+  (covers same-size rewrites inside one mtime tick)
+- Repeated calls cost a few stat() calls and zero reads
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+READ_EXTENSIONS = ('.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md')
+SKIP_PARTS = ('node_modules', 'dist', '__pycache__', '.git')
+MAX_CONTENT_CHARS = 50000
+
+_Stamp = Tuple[int, int]
+
+
+class ProjectFileCache:
+    """Per-project file content cache keyed by relative path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # project root -> {rel_path: (stamp, content or None if unreadable/too large)}
+        self._entries: Dict[str, Dict[str, Tuple[_Stamp, Optional[str]]]] = {}
+        self.stats = {"hits": 0, "reads": 0, "invalidations": 0}
+
+    @staticmethod
+    def _key(project_path: Union[str, Path]) -> str:
+        return os.path.abspath(str(project_path))
+
+    def read_for_step(self, project_path: Union[str, Path], step: str) -> List[Dict[str, str]]:
+        """
+        Read the files a step may see, as [{"path", "content"}].
+
+        Output matches the legacy full-workspace reader after
+        filter_files_for_step, but only the step's allowlist is touched.
+        """
+        from app.llm.prompt_management import get_step_allowlist
+
+        root = self._key(project_path)
+        allowlist = get_step_allowlist(step)
+        candidates = self._list_candidates(root, allowlist)
+
+        files: List[Dict[str, str]] = []
+        with self._lock:
+            project_entries = self._entries.setdefault(root, {})
+
+        for rel_path, stamp in candidates:
+            with self._lock:
+                cached = project_entries.get(rel_path)
+            if cached is not None and cached[0] == stamp:
+                self.stats["hits"] += 1
+                content = cached[1]
+            else:
+                content = self._read(os.path.join(root, rel_path))
+                self.stats["reads"] += 1
+                with self._lock:
+                    project_entries[rel_path] = (stamp, content)
+            if content is not None:
+                files.append({"path": rel_path, "content": content})
+        return files
+
+    def invalidate(self, project_path: Union[str, Path], paths: Optional[Iterable[str]] = None) -> None:
+        """Drop cached entries for the given relative paths (all entries if None)."""
+        root = self._key(project_path)
+        with self._lock:
+            project_entries = self._entries.get(root)
+            if not project_entries:
+                return
+            if paths is None:
+                self.stats["invalidations"] += len(project_entries)
+                project_entries.clear()
+                return
+            for path in paths:
+                if project_entries.pop(str(path).replace("\\", "/"), None) is not None:
+                    self.stats["invalidations"] += 1
+
+    def forget(self, project_path: Union[str, Path]) -> None:
+        """Release everything cached for a project."""
+        with self._lock:
+            self._entries.pop(self._key(project_path), None)
+
+    @staticmethod
+    def _list_candidates(root: str, allowlist: str) -> List[Tuple[str, _Stamp]]:
+        """Stat the files under the allowlist (a directory prefix or one file)."""
+        found: List[Tuple[str, _Stamp]] = []
+        if not allowlist.endswith("/"):
+            try:
+                st = os.stat(os.path.join(root, allowlist))
+                found.append((allowlist, (st.st_mtime_ns, st.st_size)))
+            except OSError:
+                pass
+            return found
+
+        stack = [allowlist.rstrip("/")]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                it = os.scandir(os.path.join(root, rel_dir))
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if any(skip in rel_path for skip in SKIP_PARTS):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(rel_path)
+                        elif entry.name.endswith(READ_EXTENSIONS):
+                            st = entry.stat()
+                            found.append((rel_path, (st.st_mtime_ns, st.st_size)))
+                    except OSError:
+                        continue
+        found.sort()
+        return found
+
+    @staticmethod
+    def _read(full_path: str) -> Optional[str]:
+        try:
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as fh:
+                content = fh.read()
+        except OSError:
+            return None
+        return content if len(content) < MAX_CONTENT_CHARS else None
+
+
+_cache = ProjectFileCache()
+
+
+def get_project_file_cache() -> ProjectFileCache:
+    """Get the process-wide project file cache."""
+    return _cache
+
+
+def read_project_files(project_path: Union[str, Path], step: str) -> List[Dict[str, str]]:
+    """Read the files a step may see through the shared cache."""
+    return _cache.read_for_step(project_path, step)
+
+
+def invalidate_project_files(project_path: Union[str, Path], paths: Optional[Iterable[str]] = None) -> None:
+    """Invalidate cached contents after files were written or changed on disk."""
+    _cache.invalidate(project_path, paths)
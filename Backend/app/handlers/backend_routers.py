@@ -5,10 +5,12 @@ Step 4: Derek generates FastAPI routers for all aggregate entities.
 This step depends on Step 3 (Backend Models) being successful.
 Derek reads architecture.md for contracts and models.py for schema details.
 """
+import asyncio
 import re
 from pathlib import Path
 from typing import Any, List, Dict
 
+from app.core.config import settings
 from app.core.types import StepResult
 from app.core.constants import WorkflowStep
 from app.handlers.base import broadcast_status, broadcast_agent_log
@@ -151,74 +153,44 @@ async def step_backend_routers(branch) -> StepResult:
     temperature_override = branch.intent.get("temperature_override")
     is_retry = branch.intent.get("is_retry", False)
 
-    for entity in domain_entities:
-        # log("BACKEND_ROUTERS", f"🔧 Generating router for {entity.name}...")
-        
-        await broadcast_agent_log(
-            manager,
-            project_id,
-            "AGENT:Derek",
-            f"Generating {entity.name} router..."
-        )
-        
-        entity_instruction = _build_single_router_prompt(entity, architecture_backend)
-        
-        try:
-            result = await supervised_agent_call(
+    # ═════════════════════════════════════════════════════════════════
+    # CONCURRENT FAN-OUT: Routers are independent (one entity, one file),
+    # so generate + review them in parallel, bounded by a semaphore.
+    # ═════════════════════════════════════════════════════════════════
+    semaphore = asyncio.Semaphore(max(1, settings.workflow.router_concurrency))
+
+    async def _generate(entity) -> Dict[str, Any]:
+        async with semaphore:
+            return await _generate_entity_router(
+                entity=entity,
+                architecture_backend=architecture_backend,
                 project_id=project_id,
                 manager=manager,
-                agent_name="Derek",
-                step_name="Backend Routers",
-                base_instructions=entity_instruction,
                 project_path=project_path,
                 user_request=user_request,
-                contracts=architecture_backend,
                 temperature_override=temperature_override,
                 is_retry=is_retry,
             )
 
-            if not result.get("approved"):
-                log("BACKEND_ROUTERS", f"❌ Rejection for {entity.name}")
-                raise RuntimeError(f"Backend router for {entity.name} rejected by supervisor: {result.get('error', 'Low quality output')}")
-            
-            if result.get("token_usage"):
-                usage = result.get("token_usage")
-                step_token_usage["input"] += usage.get("input", 0)
-                step_token_usage["output"] += usage.get("output", 0)
-            
-            parsed = result.get("output", {})
-            
-            if "files" in parsed and parsed["files"]:
-                # Sanitize router files and auto-correct paths
-                for file_obj in parsed["files"]:
-                    path_str = str(file_obj.get("path", ""))
-                    normalized_path = path_str.replace("\\", "/")
-                    
-                    # Auto-correct: tasks.py or routers/tasks.py -> backend/app/routers/tasks.py
-                    if not normalized_path.startswith("backend/"):
-                        # If it just says "tasks.py" or "routers/tasks.py"
-                        filename = normalized_path.split("/")[-1]
-                        new_path = f"backend/app/routers/{filename}"
-                        file_obj["path"] = new_path
-                        log("BACKEND_ROUTERS", f"⚠️ Auto-corrected path from {path_str} to {new_path}")
-                    
-                    content = file_obj.get("content", "")
-                    if "routers" in file_obj["path"]:
-                        content = re.sub(r'prefix\s*=\s*[\'"][^\'"]+[\'\"]\s*,?', '', content)
-                        content = re.sub(r'tags\s*=\s*\[[^\]]+\]\s*,?', '', content)
-                        file_obj["content"] = content
-                
-                validated = validate_file_output(parsed, WorkflowStep.BACKEND_ROUTERS, max_files=5)
-                files_written = await persist_agent_output(manager, project_id, project_path, validated, WorkflowStep.BACKEND_ROUTERS)
-                
-                log("BACKEND_ROUTERS", f"✅ Generated {entity.plural}.py router ({files_written} files)")
-                routers_generated.append(entity.plural)
-        
+    outcomes = await asyncio.gather(*(_generate(entity) for entity in domain_entities))
+
+    # Deterministic merge: persist and account in generation_order, not completion order
+    for entity, outcome in zip(domain_entities, outcomes):
+        usage = outcome.get("token_usage") or {}
+        step_token_usage["input"] += usage.get("input", 0)
+        step_token_usage["output"] += usage.get("output", 0)
+
+        validated = outcome.get("validated")
+        if not validated:
+            continue
+
+        try:
+            files_written = await persist_agent_output(manager, project_id, project_path, validated, WorkflowStep.BACKEND_ROUTERS)
+            log("BACKEND_ROUTERS", f"✅ Generated {entity.plural}.py router ({files_written} files)")
+            routers_generated.append(entity.plural)
         except Exception as e:
             log("BACKEND_ROUTERS", f"❌ Failed to generate router for {entity.name}: {e}")
-            # Non-fatal: add to missed list but continue for other entities
-            if entity.plural not in routers_generated:
-                log("BACKEND_ROUTERS", f"⚠️ Skipping {entity.name} implementation due to error.")
+            log("BACKEND_ROUTERS", f"⚠️ Skipping {entity.name} implementation due to error.")
     
     # ATOMIC CHECK
     expected_routers = set(e.plural for e in domain_entities)  # ✅ Use domain_entities (after auth filtering)
@@ -239,6 +211,90 @@ async def step_backend_routers(branch) -> StepResult:
         token_usage=step_token_usage,
     )
 
+async def _generate_entity_router(
+    entity,
+    architecture_backend: str,
+    project_id: str,
+    manager: Any,
+    project_path: Path,
+    user_request: str,
+    temperature_override=None,
+    is_retry: bool = False,
+) -> Dict[str, Any]:
+    """
+    Generate and supervise ONE entity's router (no disk writes).
+    
+    Returns:
+        {"validated": files ready for persist_agent_output or None,
+         "token_usage": {...}} - failures are logged, never raised,
+        so one entity cannot sink its siblings.
+    """
+    await broadcast_agent_log(
+        manager,
+        project_id,
+        "AGENT:Derek",
+        f"Generating {entity.name} router..."
+    )
+    
+    entity_instruction = _build_single_router_prompt(entity, architecture_backend)
+    token_usage = {"input": 0, "output": 0}
+    
+    try:
+        result = await supervised_agent_call(
+            project_id=project_id,
+            manager=manager,
+            agent_name="Derek",
+            step_name="Backend Routers",
+            base_instructions=entity_instruction,
+            project_path=project_path,
+            user_request=user_request,
+            contracts=architecture_backend,
+            temperature_override=temperature_override,
+            is_retry=is_retry,
+        )
+
+        if result.get("token_usage"):
+            usage = result.get("token_usage")
+            token_usage["input"] += usage.get("input", 0)
+            token_usage["output"] += usage.get("output", 0)
+
+        if not result.get("approved"):
+            log("BACKEND_ROUTERS", f"❌ Rejection for {entity.name}")
+            raise RuntimeError(f"Backend router for {entity.name} rejected by supervisor: {result.get('error', 'Low quality output')}")
+        
+        parsed = result.get("output", {})
+        
+        if "files" not in parsed or not parsed["files"]:
+            return {"validated": None, "token_usage": token_usage}
+
+        # Sanitize router files and auto-correct paths
+        for file_obj in parsed["files"]:
+            path_str = str(file_obj.get("path", ""))
+            normalized_path = path_str.replace("\\", "/")
+            
+            # Auto-correct: tasks.py or routers/tasks.py -> backend/app/routers/tasks.py
+            if not normalized_path.startswith("backend/"):
+                # If it just says "tasks.py" or "routers/tasks.py"
+                filename = normalized_path.split("/")[-1]
+                new_path = f"backend/app/routers/{filename}"
+                file_obj["path"] = new_path
+                log("BACKEND_ROUTERS", f"⚠️ Auto-corrected path from {path_str} to {new_path}")
+            
+            content = file_obj.get("content", "")
+            if "routers" in file_obj["path"]:
+                content = re.sub(r'prefix\s*=\s*[\'"][^\'"]+[\'\"]\s*,?', '', content)
+                content = re.sub(r'tags\s*=\s*\[[^\]]+\]\s*,?', '', content)
+                file_obj["content"] = content
+        
+        validated = validate_file_output(parsed, WorkflowStep.BACKEND_ROUTERS, max_files=5)
+        return {"validated": validated, "token_usage": token_usage}
+    
+    except Exception as e:
+        log("BACKEND_ROUTERS", f"❌ Failed to generate router for {entity.name}: {e}")
+        # Non-fatal: reported as missing, other entities continue
+        log("BACKEND_ROUTERS", f"⚠️ Skipping {entity.name} implementation due to error.")
+        return {"validated": None, "token_usage": token_usage}
+
 def _build_single_router_prompt(entity, architecture_backend: str) -> str:
     """Build prompt for generating a single entity's router."""
     from app.orchestration.utils import pluralize
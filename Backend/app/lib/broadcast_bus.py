@@ -0,0 +1,375 @@
+# app/lib/broadcast_bus.py
+"""
+Cross-process broadcast bus for WebSocket fan-out.
+
+ConnectionManager.active_connections, the `manager` in main.py and
+CURRENT_MANAGERS are per-process: with several uvicorn workers (or API
+nodes) a client connected to worker A never saw events from a workflow
+running in worker B. The ConnectionManager now delivers every broadcast to
+its own sockets and publishes it on a bus; each worker delivers what it
+receives to its local sockets.
+
+Backends (BROADCAST_BUS):
+- memory (default): single process, publish is a no-op
+- socket: newline-delimited JSON over a local broker socket
+  (BROADCAST_BUS_ADDRESS, "host:port" or a unix socket path). The first
+  worker that can bind it hosts the broker; the others connect to it. If the
+  host worker exits, the rest reconnect and one of them takes over.
+- mongo: inserts into a capped collection and tails it with a change stream
+  (requires a replica set); reaches workers on other machines
+
+Delivery is best-effort, like the WebSocket queues behind it: while a worker
+is reconnecting, or its outbound buffer is full, remote publishes are
+dropped and counted.
+
+Usage:
+    bus = create_broadcast_bus()
+    await manager.attach_bus(bus)   # manager.broadcast(...) now reaches every worker
+    ...
+    await manager.detach_bus()
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.logging import log
+
+
+# (project_id or None for every project, encoded message, lossy)
+Deliver = Callable[[Optional[str], str, bool], None]
+
+_LINE_LIMIT = 16 * 1024 * 1024      # Largest message line accepted from the broker
+_MAX_WRITE_BUFFER = 8 * 1024 * 1024  # Pending bytes per connection before publishes are dropped
+
+
+def parse_address(address: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """ "host:port" -> (host, port, None); a path -> (None, None, path)."""
+    if "/" in address or "\\" in address:
+        return None, None, address
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port), None
+
+
+class BroadcastBus:
+    """In-process bus: publish is a no-op (the manager has already delivered locally)."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._deliver: Optional[Deliver] = None
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    def publish(self, project_id: Optional[str], text: str, lossy: bool) -> None:
+        """Send a message to the other workers. Never waits."""
+
+    def _envelope(self, project_id: Optional[str], text: str, lossy: bool) -> Dict[str, Any]:
+        return {"o": self.worker_id, "p": project_id, "m": text, "l": lossy}
+
+    def _receive(self, envelope: Dict[str, Any]) -> None:
+        if envelope.get("o") == self.worker_id or self._deliver is None:
+            return  # Our own message (already delivered locally)
+        self.received += 1
+        try:
+            self._deliver(envelope.get("p"), envelope["m"], bool(envelope.get("l")))
+        except Exception as e:
+            log("BROADCAST", f"⚠️ Remote delivery failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+class SocketBus(BroadcastBus):
+    """Workers exchange messages through a broker socket hosted by one of them."""
+
+    name = "socket"
+
+    def __init__(self, address: str, reconnect_delay: float = 0.5) -> None:
+        super().__init__()
+        self.address = address
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self.hosting = False
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._broker_clients: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: set = set()
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._stop_broker()
+        await super().stop()
+
+    def publish(self, project_id: Optional[str], text: str, lossy: bool) -> None:
+        writer = self._writer
+        if writer is None or writer.is_closing() or writer.transport.get_write_buffer_size() > _MAX_WRITE_BUFFER:
+            self.dropped += 1
+            return
+        writer.write(json.dumps(self._envelope(project_id, text, lossy)).encode() + b"\n")
+        self.published += 1
+
+    # ------------------------------------------------------------------
+    # Client side
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._connect_or_host()
+                self._writer = writer
+                self.connected = True
+                log("BROADCAST", f"🔗 Connected to broadcast broker at {self.address}" + (" (hosting)" if self.hosting else ""))
+                while line := await reader.readline():
+                    try:
+                        self._receive(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue
+                log("BROADCAST", "⚠️ Broadcast broker closed the connection - reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                log("BROADCAST", f"⚠️ Broadcast broker unavailable ({e}) - retrying")
+            finally:
+                self.connected = False
+                self._writer = None
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        host, port, path = parse_address(self.address)
+        if path:
+            return await asyncio.open_unix_connection(path, limit=_LINE_LIMIT)
+        return await asyncio.open_connection(host, port, limit=_LINE_LIMIT)
+
+    async def _connect_or_host(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await self._open()
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+        # Nobody is hosting: try to become the broker (losing the race is fine)
+        try:
+            await self._start_broker()
+        except OSError:
+            pass
+        return await self._open()
+
+    # ------------------------------------------------------------------
+    # Broker side
+    # ------------------------------------------------------------------
+
+    async def _start_broker(self) -> None:
+        host, port, path = parse_address(self.address)
+        if path:
+            self._server = await self._bind_unix(path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=_LINE_LIMIT)
+        self.hosting = True
+        log("BROADCAST", f"📡 Hosting broadcast broker at {self.address}")
+
+    async def _bind_unix(self, path: str) -> asyncio.AbstractServer:
+        import fcntl
+
+        # Serialize "remove stale socket + bind" between workers racing to host
+        with open(f"{path}.lock", "w") as lock:
+            while True:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.05)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.close()
+                raise OSError("broker already running")
+            except (ConnectionRefusedError, FileNotFoundError):
+                pass
+            if os.path.exists(path):
+                os.unlink(path)  # Left behind by a worker that died
+            return await asyncio.start_unix_server(self._handle, path, limit=_LINE_LIMIT)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers.add(asyncio.current_task())
+        self._broker_clients.add(writer)
+        try:
+            while line := await reader.readline():
+                for client in list(self._broker_clients):
+                    if client is writer or client.is_closing():
+                        continue
+                    if client.transport.get_write_buffer_size() > _MAX_WRITE_BUFFER:
+                        self.dropped += 1  # That worker is not reading; do not buffer unbounded
+                        continue
+                    client.write(line)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._broker_clients.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _stop_broker(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._broker_clients):
+            writer.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        self.hosting = False
+        _, _, path = parse_address(self.address)
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "address": self.address,
+            "connected": self.connected,
+            "hosting": self.hosting,
+            "broker_clients": len(self._broker_clients),
+        }
+
+
+class MongoBus(BroadcastBus):
+    """Publishes into a capped collection and tails it with a change stream."""
+
+    name = "mongo"
+    COLLECTION = "broadcast_events"
+
+    def __init__(
+        self,
+        db: Any = None,
+        capped_bytes: int = 64 * 1024 * 1024,
+        max_pending: int = 10000,
+        max_backoff: float = 30.0,
+    ) -> None:
+        super().__init__()
+        self._db = db
+        self.capped_bytes = capped_bytes
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.watching = False
+        self._collection = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, deliver: Deliver) -> None:
+        from pymongo.errors import CollectionInvalid
+
+        from app.db import get_db
+
+        db = self._db if self._db is not None else get_db()
+        if db is None:
+            raise RuntimeError("MongoDB is not connected")
+        try:
+            await db.create_collection(self.COLLECTION, capped=True, size=self.capped_bytes)
+        except CollectionInvalid:
+            pass  # Already exists
+        self._collection = db[self.COLLECTION]
+        self._queue = asyncio.Queue(self.max_pending)
+        await super().start(deliver)
+        self._tasks = [asyncio.create_task(self._watch()), asyncio.create_task(self._publisher())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await super().stop()
+
+    def publish(self, project_id: Optional[str], text: str, lossy: bool) -> None:
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(self._envelope(project_id, text, lossy))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _publisher(self) -> None:
+        from pymongo.errors import PyMongoError
+
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < 500:
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._collection.insert_many(batch, ordered=False)
+                self.published += len(batch)
+            except PyMongoError as e:
+                self.dropped += len(batch)
+                log("BROADCAST", f"⚠️ Publishing {len(batch)} broadcast(s) failed: {e}")
+
+    async def _watch(self) -> None:
+        from pymongo.errors import PyMongoError
+
+        resume_token = None
+        backoff = initial = min(1.0, self.max_backoff)
+        while True:
+            try:
+                async with self._collection.watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_token
+                ) as stream:
+                    self.watching = True
+                    backoff = initial
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self._receive(change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                log("BROADCAST", f"⚠️ Broadcast change stream failed (needs a replica set): {e}")
+            self.watching = False
+            await asyncio.sleep(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "watching": self.watching,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+def create_broadcast_bus(kind: Optional[str] = None) -> BroadcastBus:
+    """Bus for BROADCAST_BUS (memory, socket or mongo); unknown or unusable -> memory."""
+    from app.core.config import settings
+    from app.db import is_connected
+
+    kind = (kind or settings.workflow.broadcast_bus).lower()
+    if kind == "socket":
+        return SocketBus(settings.workflow.broadcast_bus_address)
+    if kind == "mongo":
+        if is_connected():
+            return MongoBus()
+        log("BROADCAST", "⚠️ BROADCAST_BUS=mongo but MongoDB is not connected - broadcasts stay in-process")
+    elif kind != "memory":
+        log("BROADCAST", f"⚠️ Unknown BROADCAST_BUS={kind!r} - broadcasts stay in-process")
+    return BroadcastBus()
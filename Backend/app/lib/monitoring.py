@@ -19,6 +19,21 @@ def set_active_preview_servers(n: int):
     """Sets the value of the active preview servers gauge."""
     active_preview_servers.set(n)
 
+# WebSocket fan-out (app/lib/websocket.py)
+ws_connections = Gauge('gencode_ws_connections', 'Open WebSocket connections', registry=registry)
+ws_queue_depth = Gauge('gencode_ws_queue_depth', 'Messages waiting in WebSocket send queues', registry=registry)
+ws_max_queue_depth = Gauge('gencode_ws_max_queue_depth', 'Deepest WebSocket send queue', registry=registry)
+ws_dropped = Gauge('gencode_ws_dropped_messages', 'AGENT_LOG messages dropped under backpressure', registry=registry)
+ws_slow_disconnects = Gauge('gencode_ws_slow_disconnects', 'Clients disconnected as slow consumers', registry=registry)
+
+def register_websocket_metrics(manager):
+    """Expose a ConnectionManager's queue metrics (read at scrape time)."""
+    ws_connections.set_function(lambda: manager.stats()["connections"])
+    ws_queue_depth.set_function(lambda: manager.stats()["queue_depth"])
+    ws_max_queue_depth.set_function(lambda: manager.stats()["max_queue_depth"])
+    ws_dropped.set_function(lambda: manager.dropped)
+    ws_slow_disconnects.set_function(lambda: manager.slow_disconnects)
+
 def register_monitoring(app: FastAPI):
     """
     Registers Prometheus monitoring on the FastAPI app.
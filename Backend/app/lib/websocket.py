@@ -1,8 +1,178 @@
-from typing import Dict, List
+"""
+Per-project WebSocket connection manager with backpressure-aware fan-out.
+
+send_to_project used to await `ws.send_json` for each socket in turn, and
+broadcast_to_project is awaited inline by handlers - one slow browser tab
+delayed every other client and the workflow itself. Now each connection has
+a bounded outbound queue drained by its own writer task:
+
+- send_to_project / broadcast_json serialize the message once and enqueue it
+  on every connection without awaiting any socket, so broadcasting never
+  blocks workflow execution
+- when a queue is full, the oldest queued AGENT_LOG is dropped to make room
+  (or the incoming AGENT_LOG, if none is queued); the client is told how
+  many log lines it missed
+- a client whose queue is full of messages that cannot be dropped, or whose
+  socket blocks a single send for WS_SEND_TIMEOUT seconds, is disconnected
+  as a slow consumer (close code 1013 "try again later")
+- stats() reports queue depths, sent/dropped counts and slow-consumer
+  disconnects (also exported as Prometheus gauges, see app/lib/monitoring.py)
+
+With an attached broadcast bus (app/lib/broadcast_bus.py), every broadcast is
+also published to the other API workers, and messages they publish are
+delivered to this worker's sockets.
+
+Usage:
+    manager = ConnectionManager()
+    await manager.connect(websocket, project_id)
+    await manager.broadcast(project_id, {"type": "AGENT_LOG", ...})  # returns immediately
+"""
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
 import asyncio
+import json
 
 from fastapi import WebSocket
 
+from app.core.logging import log
+from app.lib.broadcast_bus import BroadcastBus
+
+
+# Message types that may be dropped under backpressure (high-volume, informational)
+LOSSY_TYPES = frozenset({"AGENT_LOG"})
+
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "Try again later"
+
+
+def _encode(message: dict) -> str:
+    # Same encoding as Starlette's WebSocket.send_json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """One WebSocket with its bounded outbound queue and writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        project_id: str,
+        max_queue: int,
+        send_timeout: float,
+        manager: "ConnectionManager",
+    ) -> None:
+        self.websocket = websocket
+        self.project_id = project_id
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._manager = manager
+        self._queue: Deque[Tuple[bool, str]] = deque()  # (lossy, encoded message)
+        self._ready = asyncio.Event()
+        self._unreported_drops = 0
+        self._sending = False
+        self._task = asyncio.create_task(self._writer())
+
+    @property
+    def depth(self) -> int:
+        """Messages queued or being sent."""
+        return len(self._queue) + self._sending
+
+    def enqueue(self, text: str, lossy: bool) -> bool:
+        """Queue an encoded message without waiting. False if it was dropped."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue and not self._make_room(lossy):
+            return False
+        self._queue.append((lossy, text))
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+        return True
+
+    def _make_room(self, incoming_lossy: bool) -> bool:
+        for index, (lossy, _) in enumerate(self._queue):
+            if lossy:
+                del self._queue[index]
+                self._count_drop()
+                return True
+        if incoming_lossy:
+            self._count_drop()
+            return False
+        self.close_slow(f"send queue full ({self.max_queue} messages)")
+        return False
+
+    def _count_drop(self) -> None:
+        self.dropped += 1
+        self._unreported_drops += 1
+        self._manager.dropped += 1
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                _, text = self._queue.popleft()
+                self._sending = True
+                if self._unreported_drops:
+                    await self._send(self._drop_notice())
+                    self._unreported_drops = 0
+                await self._send(text)
+                self._sending = False
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.close_slow(f"send blocked for more than {self.send_timeout}s")
+        except Exception:
+            # Client went away
+            self._close()
+
+    async def _send(self, text: str) -> None:
+        await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+
+    def _drop_notice(self) -> str:
+        return _encode({
+            "type": "AGENT_LOG",
+            "projectId": self.project_id,
+            "scope": "WebSocket",
+            "message": f"⚠️ {self._unreported_drops} log message(s) skipped - connection is falling behind",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def close_slow(self, reason: str) -> None:
+        """Disconnect a client that cannot keep up."""
+        if self.closed:
+            return
+        log("WebSocket", f"🐢 Disconnecting slow client for {self.project_id}: {reason}")
+        self._manager.slow_disconnects += 1
+        self._close()
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), timeout=self.send_timeout
+            )
+        except Exception:
+            pass
+
+    def _close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._sending = False
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._manager._forget(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": self.depth, "max_depth": self.max_depth, "sent": self.sent, "dropped": self.dropped}
+
 
 class ConnectionManager:
     """
@@ -10,11 +180,21 @@ class ConnectionManager:
 
     - Each project_id has its own list of WebSocket connections.
     - You can send to one socket, all sockets for a project, or broadcast to everyone.
+    - Sends are queued per connection (see module docstring); none of the send
+      methods wait for a client.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, max_queue: Optional[int] = None, send_timeout: Optional[float] = None) -> None:
+        from app.core.config import settings
+
+        self.max_queue = max_queue if max_queue is not None else settings.workflow.ws_queue_size
+        self.send_timeout = send_timeout if send_timeout is not None else settings.workflow.ws_send_timeout
         # project_id -> list[WebSocket]
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.bus: Optional[BroadcastBus] = None
         # FIX #9: Lock to prevent race conditions during disconnect
         self._lock = asyncio.Lock()
 
@@ -24,48 +204,85 @@ class ConnectionManager:
             if project_id not in self.active_connections:
                 self.active_connections[project_id] = []
             self.active_connections[project_id].append(websocket)
+            self._clients[websocket] = ClientConnection(
+                websocket, project_id, self.max_queue, self.send_timeout, self
+            )
 
     async def disconnect(self, websocket: WebSocket, project_id: str) -> None:
         """Thread-safe disconnect."""
         async with self._lock:
-            connections = self.active_connections.get(project_id, [])
-            if websocket in connections:
-                connections.remove(websocket)
-            if not connections and project_id in self.active_connections:
-                del self.active_connections[project_id]
+            client = self._clients.get(websocket)
+            if client is not None:
+                client._close()
+            self._remove(websocket, project_id)
+
+    def _forget(self, client: ClientConnection) -> None:
+        """Drop a closed client from the maps (called by the client itself)."""
+        if self._clients.get(client.websocket) is client:
+            del self._clients[client.websocket]
+        self._remove(client.websocket, client.project_id)
+
+    def _remove(self, websocket: WebSocket, project_id: str) -> None:
+        connections = self.active_connections.get(project_id, [])
+        if websocket in connections:
+            connections.remove(websocket)
+        if not connections and project_id in self.active_connections:
+            del self.active_connections[project_id]
+
+    async def attach_bus(self, bus: BroadcastBus) -> None:
+        """Publish broadcasts to other workers and deliver theirs locally."""
+        await self.detach_bus()
+        await bus.start(self._deliver_local)
+        self.bus = bus
+
+    async def detach_bus(self) -> None:
+        if self.bus is not None:
+            bus, self.bus = self.bus, None
+            await bus.stop()
+
+    def _deliver_local(self, project_id: Optional[str], text: str, lossy: bool) -> None:
+        """Enqueue an encoded message on this worker's sockets (project_id None = all)."""
+        if project_id is None:
+            clients = list(self._clients.values())
+        else:
+            clients = [self._clients[ws] for ws in self.active_connections.get(project_id, []) if ws in self._clients]
+        for client in clients:
+            client.enqueue(text, lossy)
+
+    def _publish(self, project_id: Optional[str], message: dict) -> None:
+        try:
+            text = _encode(message)
+        except (TypeError, ValueError) as e:
+            log("WebSocket", f"⚠️ Dropping unserializable {message.get('type')} message: {e}")
+            return
+        lossy = message.get("type") in LOSSY_TYPES
+        self._deliver_local(project_id, text, lossy)
+        if self.bus is not None:
+            self.bus.publish(project_id, text, lossy)
 
     async def send_json(self, websocket: WebSocket, data: dict) -> None:
-        await websocket.send_json(data)
+        client = self._clients.get(websocket)
+        if client is None:
+            await websocket.send_json(data)
+            return
+        client.enqueue(_encode(data), data.get("type") in LOSSY_TYPES)
 
     async def send_to_project(self, project_id: str, message: dict) -> None:
         """
-        Send a JSON message to all clients connected for a given project_id.
-        Thread-safe: takes a snapshot of connections under lock.
+        Queue a JSON message for all clients connected for a given project_id
+        (on every worker when a broadcast bus is attached).
+        Returns without waiting for any client; slow clients are handled by
+        their writer task.
         """
-        # Take a snapshot under lock to avoid iteration issues
-        async with self._lock:
-            connections = list(self.active_connections.get(project_id, []))
-        
-        disconnected: List[WebSocket] = []
-
-        for ws in connections:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                # mark for removal
-                disconnected.append(ws)
-
-        # Clean up dead connections (uses the async disconnect now)
-        for ws in disconnected:
-            await self.disconnect(ws, project_id)
+        if self.bus is None and not self.active_connections.get(project_id):
+            return
+        self._publish(project_id, message)
 
     async def broadcast_json(self, message: dict) -> None:
         """
         Broadcast a JSON message to all connected websockets across all projects.
         """
-        projects = list(self.active_connections.keys())
-        for project_id in projects:
-            await self.send_to_project(project_id, message)
+        self._publish(None, message)
 
     async def broadcast(self, project_id: str, message: dict) -> None:
         """
@@ -73,5 +290,39 @@ class ConnectionManager:
         """
         await self.send_to_project(project_id, message)
 
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until every queue is empty (tests, shutdown). False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while any(client.depth for client in self._clients.values()):
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def close_all(self) -> None:
+        """Stop every writer task (shutdown); queued messages are discarded."""
+        clients = list(self._clients.values())
+        for client in clients:
+            client._close()
+        await asyncio.gather(*(client._task for client in clients), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-depth and drop metrics per project and in total."""
+        projects: Dict[str, List[Dict[str, Any]]] = {}
+        for client in self._clients.values():
+            projects.setdefault(client.project_id, []).append(client.stats())
+        depths = [client.depth for client in self._clients.values()]
+        return {
+            "connections": len(self._clients),
+            "queue_depth": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_limit": self.max_queue,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "projects": projects,
+            "bus": self.bus.stats() if self.bus is not None else None,
+        }
+
 
 manager = ConnectionManager()
@@ -2,6 +2,24 @@
 """
 LLM module - Unified interface for all LLM providers.
 """
-from .adapter import LLMAdapter, call_llm, call_llm_with_usage, LLMResponse
+from .adapter import (
+    LLMAdapter,
+    call_llm,
+    call_llm_with_usage,
+    call_llm_streaming,
+    LLMResponse,
+    get_adapter,
+    close_llm,
+    evict_cached_response,
+)
 
-__all__ = ["LLMAdapter", "call_llm", "call_llm_with_usage", "LLMResponse"]
+__all__ = [
+    "LLMAdapter",
+    "call_llm",
+    "call_llm_with_usage",
+    "call_llm_streaming",
+    "LLMResponse",
+    "get_adapter",
+    "close_llm",
+    "evict_cached_response",
+]
@@ -2,16 +2,36 @@
 """
 Unified LLM adapter - single interface for all providers.
 
-NOTE: No fallback logic - if rate limited after 3 attempts, raises RateLimitError to stop workflow.
+NOTE: No fallback logic by default - a failed call raises to stop the workflow. The
+opt-in V11 hedging (LLM_HEDGING) is the one exception.
 
 V2 Enhancement: Stop sequences to prevent truncation.
 V3 Enhancement: Token usage tracking for accurate cost reporting.
+V4 Enhancement: Shared keep-alive connection pools (see transport.py).
+V5 Enhancement: Streaming mode with incremental HDAP parsing.
+V6 Enhancement: Content-addressed response cache (see response_cache.py).
+V7 Enhancement: "replay" provider + phase timings for pipeline benchmarks.
+V8 Enhancement: Priority-aware request scheduler with adaptive rate limits (see scheduler.py).
+V9 Enhancement: Provider-side caching of static system-prompt prefixes (see prefix_cache.py).
+V10 Enhancement: Identical concurrent calls share one provider request (see singleflight.py).
+V11 Enhancement: Opt-in hedged/failover requests with circuit breakers (see hedging.py).
+V12 Enhancement: Local token estimates calibrated from provider usage (see token_estimator.py).
 """
 import asyncio
-from typing import Optional, List, Dict, Any, Union
+import inspect
+from typing import Optional, List, Dict, Any, Union, AsyncIterator, Callable, Tuple
 from app.core.config import settings
 from app.core.exceptions import LLMError, RateLimitError
 from app.core.logging import log
+from app.core.profiling import phase
+from app.llm.hedging import Hedger, valid_response
+from app.llm.prefix_cache import CachedPrefix, PrefixCache
+from app.llm.response_cache import ResponseCache, fingerprint
+from app.llm.singleflight import SingleFlight
+from app.llm.scheduler import LLMScheduler, estimate_request_tokens, get_scheduler, usage_tokens
+from app.llm.token_estimator import TokenEstimator, get_token_estimator
+from app.llm.transport import LLMTransport, PrefixCacheExpired, ProviderRateLimited
+from app.utils.parser import HDAPStreamParser
 
 
 # Type for LLM response with usage data
@@ -76,15 +96,88 @@ class LLMAdapter:
     Handles:
     - Provider selection
     - SINGLE EXECUTION (ArborMind handles retry via branch continuation)
-    - Rate limit handling (raises LLMError)
+    - Rate limit handling (429s wait in the scheduler; RateLimitError once they outlast
+      LLM_RATE_LIMIT_MAX_WAIT)
+    - Pooled HTTP transport (one keep-alive pool per provider)
+    - Response cache (identical fully-specified requests cost zero tokens)
+    - Prompt prefix cache (static personas are cached by the provider)
+    - Singleflight (identical concurrent calls share one request)
+    - Hedging (opt-in: a slow or failing primary is raced against a backup)
+    - Token estimator calibration (real input counts tune the local estimates)
     
-    NO FALLBACK: If the primary provider fails, the request fails.
+    NO FALLBACK: If the primary provider fails, the request fails - unless
+    LLM_HEDGING is on, in which case the backup provider answers instead.
     NO RETRIES: ArborMind decides if/when to retry via branch continuation.
     """
     
     def __init__(self):
         self.default_provider = settings.llm.default_provider
         self.default_model = settings.llm.default_model
+        self.transport = LLMTransport()
+        self.cache: Optional[ResponseCache] = ResponseCache() if settings.llm.cache_enabled else None
+        self.scheduler: Optional[LLMScheduler] = get_scheduler() if settings.llm.scheduler_enabled else None
+        self.prefix_cache: Optional[PrefixCache] = PrefixCache() if settings.llm.prompt_cache_enabled else None
+        self.flights: Optional[SingleFlight] = SingleFlight() if settings.llm.coalesce_enabled else None
+        self.hedger: Optional[Hedger] = Hedger() if settings.llm.hedging_enabled else None
+        self.token_estimator: TokenEstimator = get_token_estimator()
+    
+    async def aclose(self) -> None:
+        """Release pooled provider connections (FastAPI lifespan shutdown)."""
+        if self.prefix_cache is not None:
+            await self.prefix_cache.aclose(self.transport.session)
+        await self.transport.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    async def _cache_get(self, key: Optional[str]) -> Optional[LLMResponse]:
+        """V6: Look up a cached response off the event loop. Never raises."""
+        if self.cache is None or key is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.cache.get, key)
+        except Exception as e:
+            log("LLM", f"⚠️ Response cache lookup failed: {e}")
+            return None
+    
+    async def _cache_put(self, key: Optional[str], text: str, usage: Dict[str, Any], provider: str, model: str) -> None:
+        """V6: Store a usable response off the event loop. Never raises."""
+        if self.cache is None or key is None or not valid_response(text):
+            return  # Truncated / file-less HDAP must not be replayed
+        try:
+            await asyncio.to_thread(
+                self.cache.put, key, {"text": text, "usage": usage}, provider, model
+            )
+        except Exception as e:
+            log("LLM", f"⚠️ Response cache store failed: {e}")
+    
+    async def evict(self, key: Optional[str]) -> bool:
+        """V6: Drop a cached response whose output was rejected. Never raises."""
+        if self.cache is None or not key:
+            return False
+        try:
+            return await asyncio.to_thread(self.cache.delete, key)
+        except Exception as e:
+            log("LLM", f"⚠️ Response cache eviction failed: {e}")
+            return False
+    
+    @staticmethod
+    def _cache_hit_usage(cached: LLMResponse) -> Dict[str, Any]:
+        """A cache hit costs nothing; keep the original counts for reporting."""
+        return {"input": 0, "output": 0, "cache_hit": True, "cached_usage": cached.get("usage", {})}
+    
+    @staticmethod
+    def _coalesced_usage(usage: Dict[str, Any]) -> Dict[str, Any]:
+        """V10: The caller whose request was shared is billed; the ones that joined it are not."""
+        return {"input": 0, "output": 0, "coalesced": True, "shared_usage": usage}
+    
+    async def _coalesce(self, key: str, coalesce: bool, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """V10: (result, shared) - join an identical in-flight call unless coalesce=False."""
+        if not coalesce or self.flights is None:
+            return await fn(), False
+        result, shared = await self.flights.do(key, fn)
+        if shared:
+            log("LLM", f"🔗 Joined identical in-flight call (key={key[:8]})")
+        return result, shared
     
     async def call(
         self,
@@ -97,6 +190,10 @@ class LLMAdapter:
         stop_sequences: Optional[List[str]] = None,
         step_name: str = "",  # V2: For step-specific stop sequences
         return_usage: bool = False,  # V3: Return usage metadata for cost tracking
+        use_cache: bool = True,  # V6: False forces a fresh generation (retries)
+        cache_prefix: Optional[str] = None,  # V9: Static leading part of system_prompt
+        coalesce: bool = True,  # V10: False = never share an identical in-flight call
+        hedge: bool = True,  # V11: False = never race a backup provider
     ) -> Union[str, LLMResponse]:
         """
         Call an LLM provider with automatic retry.
@@ -111,41 +208,335 @@ class LLMAdapter:
             stop_sequences: V2 - sequences that signal completion (prevents truncation)
             step_name: V2 - workflow step name for auto-selecting appropriate stop sequences
             return_usage: V3 - if True, return dict with text AND usage metadata
+            use_cache: V6 - read from the response cache (usable results are still stored)
+            cache_prefix: V9 - leading part of system_prompt that never changes
+                (persona + protocol rules); the provider is asked to cache it
+            coalesce: V10 - share the result of an identical call already in flight;
+                pass False when concurrent identical calls must be sampled independently
+            hedge: V11 - with LLM_HEDGING on, race a backup provider if this call is slow
+                or fails; pass False for calls that must come from the given provider
             
         Returns:
             If return_usage=False: The LLM response text (str)
-            If return_usage=True: Dict with {"text": str, "usage": {"input": int, "output": int}}
+            If return_usage=True: Dict with {"text": str, "usage": {"input": int, "output": int},
+                "cache_key": str | None} - pass cache_key to evict_cached_response()
+                if the output is later rejected
             
         Raises:
             LLMError: If provider fails after all retries
         """
         provider = provider or self.default_provider
         model = model or self.default_model
+        stop_sequences = self._resolve_stop_sequences(stop_sequences, step_name)
         
-        # V2: Get step-specific stop sequences if step_name provided
-        if stop_sequences is None:
-            if step_name:
-                stop_sequences = get_stop_sequences_for_step(step_name)
-                log("LLM", f"Using stop sequences for {step_name}: {stop_sequences[:2]}...")
-            else:
-                stop_sequences = get_stop_sequences()
-        
-        # Call provider directly - no fallback
-        result = await self._call_provider(
-            provider, model, prompt, system_prompt, temperature, max_tokens, stop_sequences
-        )
+        # V6: Content-addressed cache - key covers every input that shapes the output
+        key = fingerprint(provider, model, system_prompt, prompt, temperature, max_tokens, stop_sequences)
+        cache_key = key if self.cache is not None else None
+        cached = await self._cache_get(cache_key) if use_cache else None
+        if cached is not None:
+            log("LLM", f"✅ Response cache hit ({provider}/{model}, key={cache_key[:8]})")
+            if return_usage:
+                return {"text": cached.get("text", ""), "usage": self._cache_hit_usage(cached), "cache_key": cache_key}
+            return cached.get("text", "")
+        
+        # Call provider directly - no fallback (V10: unless the same call is already in flight,
+        # V11: raced against a backup when hedging is on)
+        (result, served), shared = await self._coalesce(key, coalesce, lambda: self._call_hedged(
+            hedge, provider, model, prompt, system_prompt, temperature, max_tokens, stop_sequences, cache_prefix
+        ))
         
         # V3: Handle new dict response format from providers
         if isinstance(result, dict):
-            if return_usage:
-                return result  # Return full dict with text and usage
-            else:
-                return result.get("text", "")  # Backward compatible: return just text
+            text = result.get("text", "")
+            usage = result.get("usage", {"input": 0, "output": 0})
         else:
             # Legacy string response (from other providers)
-            if return_usage:
-                return {"text": result, "usage": {"input": 0, "output": 0}}
-            return result
+            text = result
+            usage = {"input": 0, "output": 0}
+        usage = self._attribute_usage(usage, (provider, model), served)
+        
+        if shared:
+            # The caller that made the request stores and pays for it
+            return {"text": text, "usage": self._coalesced_usage(usage), "cache_key": cache_key} if return_usage else text
+        
+        if served == (provider, model):
+            await self._cache_put(cache_key, text, usage, provider, model)
+        
+        if return_usage:
+            return {**result, "usage": usage, "cache_key": cache_key} if isinstance(result, dict) else {"text": text, "usage": usage, "cache_key": cache_key}
+        return text  # Backward compatible: return just text
+    
+    def _resolve_stop_sequences(self, stop_sequences: Optional[List[str]], step_name: str) -> List[str]:
+        """V2: Get step-specific stop sequences if step_name provided."""
+        if stop_sequences is not None:
+            return stop_sequences
+        if step_name:
+            stop_sequences = get_stop_sequences_for_step(step_name)
+            log("LLM", f"Using stop sequences for {step_name}: {stop_sequences[:2]}...")
+            return stop_sequences
+        return get_stop_sequences()
+    
+    def _provider_module(self, provider: str):
+        """Resolve a provider name to its implementation module."""
+        # Import here to avoid circular imports
+        from .providers import gemini, openai, anthropic, ollama, replay
+        
+        provider_map = {
+            "gemini": gemini,
+            "openai": openai,
+            "anthropic": anthropic,
+            "ollama": ollama,
+            "replay": replay,  # V7: Deterministic recorded outputs (benchmarks)
+        }
+        
+        if provider not in provider_map:
+            raise LLMError(provider, f"Unknown provider: {provider}")
+        
+        return provider_map[provider]
+    
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        stop_sequences: Optional[List[str]] = None,
+        step_name: str = "",
+        cache_prefix: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        V5: Stream a completion from a provider - SINGLE ATTEMPT ONLY.
+        
+        Yields:
+            {"text": delta} events as the model generates, then one
+            {"usage": {"input": int, "output": int}, "route": (provider, model)}
+            event at the end.
+            
+        Raises:
+            LLMError: If the provider fails (before or during the stream)
+        """
+        provider = provider or self.default_provider
+        model = model or self.default_model
+        stop_sequences = self._resolve_stop_sequences(stop_sequences, step_name)
+        module = self._provider_module(provider)
+        stream_func = module.stream
+        session = self._session_for(provider, module)
+        prefix = await self._prepare_prefix(provider, module, model, system_prompt, cache_prefix, session)
+        
+        # V8: Wait for the scheduler; a 429 before the first event is re-queued
+        ticket = None
+        if self.scheduler is not None:
+            ticket = await self.scheduler.acquire(
+                provider, estimate_request_tokens(prompt, system_prompt, max_tokens, provider)
+            )
+        usage = None
+        while True:
+            started = False
+            kwargs = {"cache_prefix": prefix} if prefix is not None else {}
+            try:
+                async for event in stream_func(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stop_sequences=stop_sequences,
+                    session=session,
+                    **kwargs,
+                ):
+                    started = True
+                    if "usage" in event:
+                        usage = event["usage"]
+                        event = {**event, "route": (provider, model)}  # V11: who answered
+                    yield event
+            except ProviderRateLimited as e:
+                if ticket is None or started:
+                    raise LLMError(provider, f"Provider stream error: {e}")
+                if not self.scheduler.rate_limited(ticket, e):
+                    raise RateLimitError(provider, retries=ticket.attempts)
+                await self.scheduler.retry(ticket)
+                continue
+            except PrefixCacheExpired as e:
+                # V9: The provider dropped the cache early - repeat uncached
+                self.prefix_cache.invalidate(prefix)
+                if started:
+                    # Text already reached the caller; a restart would duplicate it
+                    raise LLMError(provider, f"Provider stream error: {e}")
+                prefix = None
+                continue
+            except LLMError:
+                raise
+            except Exception as e:
+                raise LLMError(provider, f"Provider stream error: {e}")
+            break
+        if ticket is not None:
+            self.scheduler.complete(ticket, usage_tokens({"usage": usage}))
+        self._record_prefix_usage(provider, usage, prefix)
+        self._calibrate(provider, prompt, system_prompt, usage)
+    
+    async def call_streaming(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        stop_sequences: Optional[List[str]] = None,
+        step_name: str = "",
+        on_file: Optional[Callable[[Dict[str, str]], Any]] = None,
+        use_cache: bool = True,
+        cache_prefix: Optional[str] = None,
+        coalesce: bool = True,
+        hedge: bool = True,
+    ) -> LLMResponse:
+        """
+        V5: Stream a completion through the incremental HDAP parser.
+        
+        on_file(file) is called (and awaited if it is a coroutine function)
+        with {"path", "content"} as soon as each <<<END_FILE>>> arrives, so
+        progress reporting / validation overlap with generation.
+        
+        V6: A response-cache hit is replayed through the same parser and
+        callbacks, so callers cannot tell it apart from a (very fast) stream.
+        
+        V10: A caller that joins an identical in-flight call has the shared
+        result replayed the same way once it completes.
+        
+        V11: With hedging on, a stream that is slow to start (or fails before
+        its first event) is raced against one from the backup provider; only
+        the stream that starts first reaches the parser.
+        
+        Returns:
+            Dict with {"text": str, "usage": {...}, "hdap": parse_hdap() result}
+        """
+        provider = provider or self.default_provider
+        model = model or self.default_model
+        stop_sequences = self._resolve_stop_sequences(stop_sequences, step_name)
+        parser = HDAPStreamParser()
+        
+        key = fingerprint(provider, model, system_prompt, prompt, temperature, max_tokens, stop_sequences)
+        cache_key = key if self.cache is not None else None
+        cached = await self._cache_get(cache_key) if use_cache else None
+        if cached is not None:
+            log("LLM", f"✅ Response cache hit ({provider}/{model}, key={cache_key[:8]})")
+            for file in parser.feed(cached.get("text", "")):
+                await self._notify_file(on_file, file)
+            return {"text": parser.text, "usage": self._cache_hit_usage(cached), "hdap": parser.close(), "cache_key": cache_key}
+        
+        async def generate() -> LLMResponse:
+            usage = {"input": 0, "output": 0}
+            served = (provider, model)
+            with phase("llm"):
+                async for event in self._stream_hedged(
+                    hedge,
+                    provider,
+                    model,
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stop_sequences=stop_sequences,
+                    step_name=step_name,
+                    cache_prefix=cache_prefix,
+                ):
+                    if "usage" in event:
+                        usage = event["usage"]
+                        served = event.get("route", served)
+                        continue
+                    
+                    for file in parser.feed(event.get("text", "")):
+                        await self._notify_file(on_file, file)
+            usage = self._attribute_usage(usage, (provider, model), served)
+            return {"text": parser.text, "usage": usage, "hdap": parser.close(), "served_by": served}
+        
+        result, shared = await self._coalesce(key, coalesce, generate)
+        if shared:
+            for file in parser.feed(result.get("text", "")):
+                await self._notify_file(on_file, file)
+            return {"text": parser.text, "usage": self._coalesced_usage(result.get("usage", {})), "hdap": parser.close(), "cache_key": cache_key}
+        
+        served = result.pop("served_by")
+        if served == (provider, model):
+            await self._cache_put(cache_key, result["text"], result["usage"], provider, model)
+        return {**result, "cache_key": cache_key}
+    
+    def _stream_hedged(
+        self, hedge: bool, provider: str, model: Optional[str], **kwargs: Any
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """V11: stream(), raced against the backup provider when hedging is on."""
+        if not hedge or self.hedger is None:
+            return self.stream(provider=provider, model=model, **kwargs)
+        return self.hedger.stream(
+            (provider, model), lambda p, m: self.stream(provider=p, model=m, **kwargs)
+        )
+    
+    @staticmethod
+    async def _notify_file(on_file: Optional[Callable[[Dict[str, str]], Any]], file: Dict[str, str]) -> None:
+        if on_file is None:
+            return
+        try:
+            callback_result = on_file(file)
+            if inspect.isawaitable(callback_result):
+                await callback_result
+        except Exception as e:
+            # Callbacks are observers - never abort generation for them
+            log("LLM", f"⚠️ on_file callback failed for {file.get('path')}: {e}")
+    
+    async def _prepare_prefix(
+        self,
+        provider: str,
+        module: Any,
+        model: Optional[str],
+        system_prompt: str,
+        cache_prefix: Optional[str],
+        session: Any,
+    ) -> Optional[CachedPrefix]:
+        """V9: Provider cache for the static part of the system prompt, or None."""
+        if self.prefix_cache is None or not cache_prefix:
+            return None
+        return await self.prefix_cache.prepare(provider, module, model, system_prompt, cache_prefix, session)
+    
+    def _record_prefix_usage(self, provider: str, usage: Optional[Dict[str, Any]], prefix: Optional[CachedPrefix]) -> None:
+        if self.prefix_cache is not None:
+            self.prefix_cache.record(provider, usage, prefix is not None)
+    
+    def _calibrate(self, provider: str, prompt: str, system_prompt: str, usage: Optional[Dict[str, Any]]) -> None:
+        """V12: Teach the token estimator what the provider billed for this input."""
+        if usage and usage.get("input"):
+            self.token_estimator.observe(provider, system_prompt + prompt, int(usage["input"]))
+    
+    def _session_for(self, provider: str, module: Any):
+        """Pooled HTTP session, or None for local providers (USES_HTTP = False)."""
+        if not getattr(module, "USES_HTTP", True):
+            return None
+        return self.transport.session(provider)
+    
+    async def _call_hedged(
+        self, hedge: bool, provider: str, model: Optional[str], *args: Any
+    ) -> Tuple[Any, Tuple[str, Optional[str]]]:
+        """V11: (_call_provider() result, route that served it), raced against the backup when hedging is on."""
+        if not hedge or self.hedger is None:
+            return await self._call_provider(provider, model, *args), (provider, model)
+        return await self.hedger.call(
+            (provider, model), lambda p, m: self._call_provider(p, m, *args), valid_response
+        )
+    
+    @staticmethod
+    def _attribute_usage(
+        usage: Dict[str, Any], primary: Tuple[str, Optional[str]], served: Tuple[str, Optional[str]]
+    ) -> Dict[str, Any]:
+        """
+        V11: Name the backup route in usage when it answered instead of the primary.
+        
+        Budget accounting bills usage["model"]; the response is not cached
+        (its key fingerprints the primary provider/model).
+        """
+        if served == primary:
+            return usage
+        return {**usage, "provider": served[0], "model": served[1]}
     
     async def _call_provider(
         self,
@@ -156,6 +547,7 @@ class LLMAdapter:
         temperature: float,
         max_tokens: int,
         stop_sequences: Optional[List[str]] = None,
+        cache_prefix: Optional[str] = None,
     ) -> str:
         """
         Call a specific provider - SINGLE ATTEMPT ONLY.
@@ -163,33 +555,48 @@ class LLMAdapter:
         ArborMind handles retry decisions via branch continuation.
         This adapter is pure execution muscle.
         """
-        # Import here to avoid circular imports
-        from .providers import gemini, openai, anthropic, ollama
-        
-        provider_map = {
-            "gemini": gemini.call,
-            "openai": openai.call,
-            "anthropic": anthropic.call,
-            "ollama": ollama.call,
-        }
-        
-        if provider not in provider_map:
-            raise LLMError(provider, f"Unknown provider: {provider}")
-        
-        call_func = provider_map[provider]
+        module = self._provider_module(provider)
+        call_func = module.call
+        session = self._session_for(provider, module)
+        prefix = await self._prepare_prefix(provider, module, model, system_prompt, cache_prefix, session)
 
-        # SINGLE EXECUTION - No retry loop
-        # ArborMind decides if/when to retry via branch continuation
-        try:
-            response = await call_func(
+        async def attempt():
+            nonlocal prefix
+            kwargs = dict(
                 prompt=prompt,
                 system_prompt=system_prompt,
                 model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stop_sequences=stop_sequences,
+                session=session,
             )
+            if prefix is not None:
+                try:
+                    return await call_func(**kwargs, cache_prefix=prefix)
+                except PrefixCacheExpired:
+                    # V9: The provider dropped the cache early - repeat uncached
+                    self.prefix_cache.invalidate(prefix)
+                    prefix = None
+            return await call_func(**kwargs)
+
+        # SINGLE EXECUTION - No retry loop
+        # ArborMind decides if/when to retry via branch continuation; the only
+        # repeats are 429s the scheduler waits out (V8)
+        try:
+            with phase("llm"):
+                if self.scheduler is None:
+                    response = await attempt()
+                else:
+                    response = await self.scheduler.run(
+                        provider, attempt, estimate_request_tokens(prompt, system_prompt, max_tokens, provider)
+                    )
+            if isinstance(response, dict):
+                self._record_prefix_usage(provider, response.get("usage"), prefix)
+                self._calibrate(provider, prompt, system_prompt, response.get("usage"))
             return response
+        except RateLimitError:
+            raise
         except Exception as e:
             # Report the failure - ArborMind decides what to do next
             raise LLMError(provider, f"Provider error: {e}")
@@ -201,6 +608,21 @@ class LLMAdapter:
 _adapter = LLMAdapter()
 
 
+def get_adapter() -> LLMAdapter:
+    """Get the process-wide LLMAdapter singleton."""
+    return _adapter
+
+
+async def close_llm() -> None:
+    """Close the shared LLM transport. Safe to call more than once."""
+    await _adapter.aclose()
+
+
+async def evict_cached_response(key: Optional[str]) -> bool:
+    """V6: Forget a cached response whose output supervision rejected."""
+    return await _adapter.evict(key)
+
+
 async def call_llm(
     prompt: str,
     system_prompt: str = "",
@@ -210,6 +632,10 @@ async def call_llm(
     max_tokens: int = 8000,
     stop_sequences: Optional[List[str]] = None,
     step_name: str = "",  # V2: For step-specific stop sequences
+    use_cache: bool = True,
+    cache_prefix: Optional[str] = None,
+    coalesce: bool = True,
+    hedge: bool = True,
 ) -> str:
     """Convenience function for calling LLM with V2 stop sequences support."""
     return await _adapter.call(
@@ -222,6 +648,10 @@ async def call_llm(
         stop_sequences=stop_sequences,
         step_name=step_name,
         return_usage=False,
+        use_cache=use_cache,
+        cache_prefix=cache_prefix,
+        coalesce=coalesce,
+        hedge=hedge,
     )
 
 
@@ -234,6 +664,10 @@ async def call_llm_with_usage(
     max_tokens: int = 8000,
     stop_sequences: Optional[List[str]] = None,
     step_name: str = "",
+    use_cache: bool = True,
+    cache_prefix: Optional[str] = None,
+    coalesce: bool = True,
+    hedge: bool = True,
 ) -> LLMResponse:
     """
     V3: Call LLM and return BOTH text and usage metadata.
@@ -251,4 +685,46 @@ async def call_llm_with_usage(
         stop_sequences=stop_sequences,
         step_name=step_name,
         return_usage=True,
+        use_cache=use_cache,
+        cache_prefix=cache_prefix,
+        coalesce=coalesce,
+        hedge=hedge,
+    )
+
+
+async def call_llm_streaming(
+    prompt: str,
+    system_prompt: str = "",
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[List[str]] = None,
+    step_name: str = "",
+    on_file: Optional[Callable[[Dict[str, str]], Any]] = None,
+    use_cache: bool = True,
+    cache_prefix: Optional[str] = None,
+    coalesce: bool = True,
+    hedge: bool = True,
+) -> LLMResponse:
+    """
+    V5: Stream an LLM call and parse HDAP incrementally.
+    
+    Returns:
+        Dict with {"text": str, "usage": {...}, "hdap": {...}}
+    """
+    return await _adapter.call_streaming(
+        prompt=prompt,
+        system_prompt=system_prompt,
+        provider=provider,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stop_sequences=stop_sequences,
+        step_name=step_name,
+        on_file=on_file,
+        use_cache=use_cache,
+        cache_prefix=cache_prefix,
+        coalesce=coalesce,
+        hedge=hedge,
     )
@@ -9,8 +9,9 @@ When ExecutionMode == ARTIFACT:
 
 Phase-1 Critical: This eliminates prompt-order sensitivity.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from app.core.logging import log
+from app.llm.context_packer import pack_context
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -66,11 +67,16 @@ def enforce_artifact_mode(
     step_name: str,
     files: Optional[Any] = None,
     contracts: Optional[str] = None,
+    errors: Optional[List[str]] = None,
+    provider: Optional[str] = None,
     **kwargs
 ) -> Dict[str, str]:
     """
     Enforce ARTIFACT mode by building prompts correctly.
     
+    Files, contracts and errors are packed into the step's input token
+    budget (see app/llm/context_packer.py) instead of fixed character cuts.
+    
     Returns:
         {
             "system_prompt": "...",  # Protocol rules + agent identity
@@ -91,32 +97,30 @@ def enforce_artifact_mode(
     # Task description
     user_parts.append(f"TASK:\n{user_task}")
     
+    packed = pack_context(
+        step_name,
+        fixed=system_prompt + user_parts[0],
+        files=files,
+        contracts=contracts,
+        errors=errors,
+        provider=provider,
+    )
+    
     # Existing files (if any) - data only, no format instructions
-    if files:
-        if isinstance(files, dict) and files:
-            file_context = []
-            for path, content in list(files.items())[:5]:  # Limit to 5 files
-                # Truncate file content to prevent context explosion
-                truncated_content = content[:2000] if len(content) > 2000 else content
-                suffix = "... (truncated)" if len(content) > 2000 else ""
-                file_context.append(f"--- {path} ---\n{truncated_content}{suffix}\n")
-            if file_context:
-                user_parts.append("EXISTING PROJECT FILES:\n" + "\n".join(file_context))
-        elif isinstance(files, list) and files:
-            file_context = []
-            for f in files[:5]:
-                path = f.get("path", "unknown")
-                content = f.get("content", "")
-                # Truncate file content to prevent context explosion
-                truncated_content = content[:2000] if len(content) > 2000 else content
-                suffix = "... (truncated)" if len(content) > 2000 else ""
-                file_context.append(f"--- {path} ---\n{truncated_content}{suffix}\n")
-            if file_context:
-                user_parts.append("EXISTING PROJECT FILES:\n" + "\n".join(file_context))
+    file_context = []
+    for f in packed.files:
+        suffix = {"signatures": "\n... (signatures only)", "truncated": ""}.get(f.trimmed, "")
+        file_context.append(f"--- {f.path} ---\n{f.content}{suffix}\n")
+    if file_context:
+        user_parts.append("EXISTING PROJECT FILES:\n" + "\n".join(file_context))
     
     # Architecture/contracts (reference only)
-    if contracts:
-        user_parts.append(f"ARCHITECTURE REFERENCE:\n{contracts[:15000]}")
+    if packed.contracts:
+        user_parts.append(f"ARCHITECTURE REFERENCE:\n{packed.contracts}")
+    
+    # Previous errors (retries) - what must change this time
+    if packed.errors:
+        user_parts.append("PREVIOUS ERRORS — MUST FIX:\n" + "\n".join(f"- {e}" for e in packed.errors))
     
     user_prompt = "\n\n".join(user_parts)
     
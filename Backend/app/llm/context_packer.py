@@ -0,0 +1,232 @@
+# app/llm/context_packer.py
+"""
+Token-aware packing of prompt context into a per-step input budget.
+
+enforce_artifact_mode() and build_context() concatenated whatever they were
+given: the first 5 files cut at 2000 characters each, and contracts cut at
+15000 characters by supervised_agent_call. How many tokens that came to was
+never measured. Large projects sent oversized prompts, and the cut often
+landed in the middle of the one function the agent needed. Context is now
+packed into the step's input_tokens budget from orchestration/token_policy.py:
+
+- the parts that are always sent (system prompt, task) are counted first;
+  the context gets what is left
+- errors come first (they are what a retry must fix), then contracts (at
+  most half of what is left while files are waiting), then files
+- signatures before bodies: every file is first included as an outline
+  (imports, class/def/function lines, model fields) and then upgraded to its
+  full content, in order, while the budget allows. Non-code files are
+  outlined by their first lines. Files that do not fit even as an outline
+  are dropped and logged
+- text that has to be cut is cut at a line boundary and marked
+- any budget left at the end goes back to truncated contracts
+
+Token counts come from the calibrated TokenEstimator (token_estimator.py).
+
+Usage:
+    packed = pack_context(step_name, fixed=system_prompt + task,
+                          files=files, contracts=contracts, errors=errors, provider="gemini")
+    for f in packed.files:
+        ...  # f.path, f.content, f.trimmed ("", "signatures" or "truncated")
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logging import log
+from app.llm.token_estimator import get_token_estimator
+
+
+# Share of the remaining budget contracts may take while files still need room
+CONTRACT_SHARE = 0.5
+# Largest share of the budget a single error message may take
+ERROR_SHARE = 0.25
+# Lines kept from files that have no signature outline (markdown, JSON, CSS)
+HEAD_LINES = 20
+
+TRUNCATED_MARK = "... (truncated)"
+
+_PY_SIGNATURE = re.compile(
+    r"^\s*(?:@|def |async def |class |import |from \S+ import )"  # decorators, defs, imports
+    r"|^[A-Za-z_]\w*\s*(?::[^=]+)?=(?!=)"                          # module-level assignments
+    r"|^\s+[A-Za-z_]\w*\s*:\s*\S"                                  # annotated fields (models)
+)
+_JS_SIGNATURE = re.compile(
+    r"^\s*(?:import |export |(?:async\s+)?function[\s*]|class |router\.|app\."
+    r"|(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:\(|function|\w+\s*=>))"
+)
+_OUTLINE_PATTERNS = {
+    ".py": (_PY_SIGNATURE, "..."),
+    ".js": (_JS_SIGNATURE, "// ..."),
+    ".jsx": (_JS_SIGNATURE, "// ..."),
+    ".ts": (_JS_SIGNATURE, "// ..."),
+    ".tsx": (_JS_SIGNATURE, "// ..."),
+}
+
+
+@dataclass
+class PackedFile:
+    path: str
+    content: str
+    trimmed: str = ""  # "", "signatures" (code outline) or "truncated" (first lines)
+
+
+@dataclass
+class PackedContext:
+    """Context that fits the step's input budget."""
+    files: List[PackedFile] = field(default_factory=list)
+    contracts: str = ""
+    errors: List[str] = field(default_factory=list)
+    budget: int = 0
+    tokens: int = 0  # Estimated tokens of fixed text + packed context
+    dropped: List[str] = field(default_factory=list)  # Paths left out entirely
+
+    def files_dict(self) -> Dict[str, str]:
+        return {f.path: f.content for f in self.files}
+
+
+def _suffix(path: str) -> str:
+    return path[path.rfind("."):].lower() if "." in path else ""
+
+
+def _has_outline(path: str) -> bool:
+    return _suffix(path) in _OUTLINE_PATTERNS
+
+
+def outline(path: str, content: str) -> str:
+    """Signatures of a code file with bodies elided; the first lines of anything else."""
+    pattern = _OUTLINE_PATTERNS.get(_suffix(path))
+    lines = content.splitlines()
+    if pattern is None:
+        head = lines[:HEAD_LINES]
+        return "\n".join(head) + (f"\n{TRUNCATED_MARK}" if len(lines) > HEAD_LINES else "")
+    signature, elided = pattern
+    kept: List[str] = []
+    skipping = False
+    for line in lines:
+        if signature.match(line):
+            kept.append(line)
+            skipping = False
+        elif line.strip() and not skipping:
+            indent = line[:len(line) - len(line.lstrip())]
+            kept.append(f"{indent}{elided}")
+            skipping = True
+    return "\n".join(kept)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None) -> str:
+    """text cut at a line boundary so it fits max_tokens, marked as truncated."""
+    estimator = get_token_estimator()
+    tokens = estimator.estimate(text, provider)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep = int(len(text) * max_tokens / tokens)
+    while keep > 0:
+        cut = text[:keep]
+        newline = cut.rfind("\n")
+        if newline > keep // 2:
+            cut = cut[:newline]
+        cut = f"{cut}\n{TRUNCATED_MARK}"
+        if estimator.estimate(cut, provider) <= max_tokens:
+            return cut
+        keep = int(keep * 0.9)
+    return ""
+
+
+def _file_items(files: Any) -> List[PackedFile]:
+    if isinstance(files, dict):
+        return [PackedFile(str(path), content or "") for path, content in files.items()]
+    if isinstance(files, list):
+        return [PackedFile(f.get("path", "unknown"), f.get("content", "") or "") for f in files if isinstance(f, dict)]
+    return []
+
+
+def pack_context(
+    step_name: str,
+    *,
+    fixed: str = "",
+    files: Any = None,
+    contracts: Optional[str] = None,
+    errors: Optional[List[str]] = None,
+    provider: Optional[str] = None,
+    budget: Optional[int] = None,
+) -> PackedContext:
+    """
+    Fit errors, contracts and files into the step's input budget.
+
+    Args:
+        step_name: Workflow step (selects the budget from token_policy)
+        fixed: Text that is sent regardless (system prompt + task)
+        files: Dict[path, content] or List[{"path", "content"}], most relevant first
+        contracts: Architecture / API contracts
+        errors: Previous errors (retries)
+        provider: Provider whose calibration to use
+        budget: Override the step's input budget
+    """
+    from app.orchestration.token_policy import get_input_budget
+    estimator = get_token_estimator()
+
+    def cost(text: str) -> int:
+        return estimator.estimate(text, provider)
+
+    budget = budget if budget is not None else get_input_budget(step_name)
+    packed = PackedContext(budget=budget)
+    remaining = budget - cost(fixed)
+    items = _file_items(files)
+
+    # 1. Errors - what a retry must fix
+    for error in dict.fromkeys(str(e) for e in errors or [] if e):
+        text = truncate_to_tokens(error, min(remaining, int(budget * ERROR_SHARE)), provider)
+        if not text:
+            break
+        packed.errors.append(text)
+        remaining -= cost(text) + 1
+
+    # 2. Contracts - capped while files still need room
+    full_contracts = (contracts or "").strip()
+    contract_cost = 0
+    if full_contracts:
+        share = int(remaining * CONTRACT_SHARE) if items else remaining
+        packed.contracts = truncate_to_tokens(full_contracts, share, provider)
+        contract_cost = cost(packed.contracts)
+        remaining -= contract_cost
+
+    # 3. Files - signatures of as many as fit, then bodies in order
+    outlined: List[Tuple[PackedFile, int, int, str]] = []  # (file, cost now, cost in full, content)
+    for item in items:
+        header = cost(item.path) + 4  # "--- path ---" line
+        full_cost = cost(item.content) + header
+        short = outline(item.path, item.content)
+        if len(short) >= len(item.content):
+            if full_cost <= remaining:  # Nothing to elide - take it whole
+                remaining -= full_cost
+                packed.files.append(item)
+            else:
+                packed.dropped.append(item.path)
+            continue
+        short_cost = cost(short) + header
+        if short and short_cost <= remaining:
+            remaining -= short_cost
+            packed.files.append(PackedFile(item.path, short, "signatures" if _has_outline(item.path) else "truncated"))
+            outlined.append((packed.files[-1], short_cost, full_cost, item.content))
+        else:
+            packed.dropped.append(item.path)
+    for packed_file, short_cost, full_cost, content in outlined:
+        if full_cost - short_cost <= remaining:
+            remaining -= full_cost - short_cost
+            packed_file.content, packed_file.trimmed = content, ""
+
+    # 4. Leftover budget goes back to truncated contracts
+    if full_contracts and packed.contracts != full_contracts and remaining > 0:
+        packed.contracts = truncate_to_tokens(full_contracts, contract_cost + remaining, provider)
+        remaining -= cost(packed.contracts) - contract_cost
+
+    packed.tokens = budget - remaining
+    trimmed = sum(1 for f in packed.files if f.trimmed)
+    if trimmed or packed.dropped or packed.contracts != full_contracts:
+        log("CONTEXT", f"✂️ {step_name}: packed to ~{packed.tokens}/{budget} tokens "
+                       f"({len(packed.files)} files, {trimmed} outlined, {len(packed.dropped)} dropped"
+                       f"{', contracts truncated' if packed.contracts != full_contracts else ''})")
+    return packed
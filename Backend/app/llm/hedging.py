@@ -0,0 +1,437 @@
+# app/llm/hedging.py
+"""
+Hedged and failover LLM requests across providers.
+
+The adapter sent every call to exactly one provider, so one slow response
+(a Gemini call sitting near the 120s request timeout) set the p99 of the
+whole step, and a provider in the middle of an outage failed every call
+sent to it. With LLM_HEDGING=true the adapter races a backup instead:
+
+- the primary request starts as before; if it has not answered within a
+  deadline taken from that provider's recent latencies
+  (LLM_HEDGE_PERCENTILE, kept within LLM_HEDGE_MIN_DELAY..LLM_HEDGE_MAX_DELAY)
+  a second request goes to LLM_HEDGE_PROVIDER / LLM_HEDGE_MODEL
+- the first valid response wins (non-empty, and complete with at least one
+  file when it is HDAP); the other request is cancelled
+- a primary that fails or answers invalidly starts the backup immediately
+- streams are hedged on their first event: the stream that starts first is
+  the only one the caller reads, so on_file callbacks never see two
+  generations
+- each provider has a circuit breaker: once LLM_BREAKER_ERROR_RATE of its
+  recent calls failed it is skipped for LLM_BREAKER_COOLDOWN seconds, then a
+  single trial call decides whether it is healthy again
+- per-provider latency histograms drive the deadlines and are in stats()
+
+Only calls slower than the percentile pay for a second request. A request
+cancelled as the loser is recorded with the time it ran so far, so the
+histograms keep seeing the slow tail the hedge cut short.
+
+Usage:
+    hedger = Hedger(secondary=("openai", "gpt-4o-mini"))
+    result, served_by = await hedger.call(("gemini", model), lambda p, m: call(p, m), valid_response)
+    async for event in hedger.stream(("gemini", model), lambda p, m: stream(p, m)):
+        ...
+"""
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.logging import log
+from app.utils.parser import parse_hdap
+
+
+T = TypeVar("T")
+Route = Tuple[str, Optional[str]]  # (provider, model)
+
+# Percentile deadlines need this many samples; until then LLM_HEDGE_MAX_DELAY applies
+MIN_SAMPLES = 20
+# Latencies kept per provider for percentiles
+LATENCY_WINDOW = 200
+# Histogram bucket upper bounds in seconds (for stats)
+BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120)
+# Breaker outcomes older than this no longer count
+BREAKER_WINDOW_SECONDS = 120.0
+BREAKER_WINDOW_CALLS = 20
+
+_END = object()  # Stream finished
+
+
+def valid_response(result: Any) -> bool:
+    """True for a non-empty response whose HDAP output (if any) is complete and has files."""
+    text = result.get("text", "") if isinstance(result, dict) else result
+    if not isinstance(text, str) or not text.strip():
+        return False
+    parsed = parse_hdap(text)
+    if parsed.get("no_hdap_markers"):
+        return True  # Plain text / JSON answer
+    return bool(parsed["files"]) and parsed["complete"]
+
+
+class LatencyHistogram:
+    """Recent latencies of one provider: percentiles plus per-bucket counts."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self._recent.append(seconds)
+        self._buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile of recent latencies, or None with too few samples."""
+        if len(self._recent) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self._recent)
+
+        def at(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))], 3)
+
+        buckets = {f"<={bound}s": n for bound, n in zip(BUCKETS, self._buckets)}
+        buckets["+Inf"] = self._buckets[-1]
+        return {"count": self.count, "p50": at(50), "p95": at(95), "p99": at(99), "buckets": buckets}
+
+
+class CircuitBreaker:
+    """Closed -> open on a high recent error rate -> half-open trial after a cooldown."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        provider: str,
+        error_rate: float,
+        min_calls: int,
+        cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.provider = provider
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque(maxlen=BREAKER_WINDOW_CALLS)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the trial slot when half-open)."""
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial = False
+        if self.state == self.HALF_OPEN:
+            if self._trial:
+                return False
+            self._trial = True
+        return True
+
+    def record(self, ok: bool) -> None:
+        if self.state == self.OPEN:
+            return  # Calls started before the breaker opened
+        if self.state == self.HALF_OPEN:
+            if ok:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                log("LLM", f"✅ {self.provider} circuit closed - trial call succeeded")
+            else:
+                self._open()
+            return
+        now = self.clock()
+        self._outcomes.append((now, ok))
+        recent = [outcome for at, outcome in self._outcomes if now - at <= BREAKER_WINDOW_SECONDS]
+        failures = recent.count(False)
+        if len(recent) >= self.min_calls and failures / len(recent) >= self.error_rate:
+            self._open()
+
+    def release(self) -> None:
+        """A request was cancelled before it had an outcome; free the trial slot."""
+        if self.state == self.HALF_OPEN:
+            self._trial = False
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.trips += 1
+        self._trial = False
+        log("LLM", f"🔌 {self.provider} circuit open - skipping it for {self.cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        recent = [outcome for at, outcome in self._outcomes if now - at <= BREAKER_WINDOW_SECONDS]
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "recent_calls": len(recent),
+            "recent_errors": recent.count(False),
+        }
+
+
+class _StreamAttempt:
+    """Pumps one provider stream into a queue; `first` resolves with its first item."""
+
+    def __init__(self, hedger: "Hedger", route: Route, events: AsyncIterator[Dict[str, Any]]) -> None:
+        self.route = route
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.first: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task = asyncio.create_task(self._pump(hedger, events))
+
+    async def _pump(self, hedger: "Hedger", events: AsyncIterator[Dict[str, Any]]) -> None:
+        provider = self.route[0]
+        breaker = hedger.breaker(provider)
+        started = hedger.clock()
+        item: Any = _END
+        try:
+            async for event in events:
+                if not self.first.done():
+                    hedger.histogram(f"{provider}:stream").observe(hedger.clock() - started)
+                    self.first.set_result(event)
+                self.queue.put_nowait(event)
+        except asyncio.CancelledError:
+            if not self.first.done():
+                hedger.histogram(f"{provider}:stream").observe(hedger.clock() - started)
+            breaker.release()
+            raise
+        except Exception as e:
+            item = e
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        breaker.record(item is _END)
+        if not self.first.done():
+            self.first.set_result(item)
+        self.queue.put_nowait(item)
+
+
+class Hedger:
+    """Races a backup provider against slow or failing primaries."""
+
+    def __init__(
+        self,
+        secondary: Optional[Route] = None,
+        percentile: Optional[float] = None,
+        min_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        llm = settings.llm
+        self.secondary: Route = secondary if secondary is not None else (llm.hedge_provider, llm.hedge_model)
+        self.percentile = percentile if percentile is not None else llm.hedge_percentile
+        self.min_delay = min_delay if min_delay is not None else llm.hedge_min_delay
+        self.max_delay = max_delay if max_delay is not None else llm.hedge_max_delay
+        self.error_rate = error_rate if error_rate is not None else llm.breaker_error_rate
+        self.min_calls = min_calls if min_calls is not None else llm.breaker_min_calls
+        self.cooldown = cooldown if cooldown is not None else llm.breaker_cooldown
+        self.clock = clock
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._counters = {"calls": 0, "hedged": 0, "backup_wins": 0, "failovers": 0, "skipped_open": 0}
+
+    def histogram(self, key: str) -> LatencyHistogram:
+        return self._latency.setdefault(key, LatencyHistogram())
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, self.error_rate, self.min_calls, self.cooldown, self.clock)
+            self._breakers[provider] = breaker
+        return breaker
+
+    def backup_for(self, primary: Route) -> Route:
+        """The secondary route; unset parts fall back to the primary's (same-provider hedge)."""
+        provider, model = self.secondary
+        return (provider or primary[0], model or primary[1])
+
+    def deadline(self, key: str) -> float:
+        """Seconds to wait for `key` before hedging."""
+        histogram = self._latency.get(key)
+        value = histogram.percentile(self.percentile) if histogram is not None else None
+        if value is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, value))
+
+    def _routes(self, primary: Route) -> Tuple[Route, Optional[Route]]:
+        """(first route to send, backup still available) after consulting the breakers."""
+        self._counters["calls"] += 1
+        backup = self.backup_for(primary)
+        if self.breaker(primary[0]).allow():
+            return primary, backup
+        if backup[0] != primary[0] and self.breaker(backup[0]).allow():
+            self._counters["skipped_open"] += 1
+            log("LLM", f"🔀 {primary[0]} circuit open - sending to {backup[0]}/{backup[1]}")
+            return backup, None
+        # Nothing healthier to send to - a request that might work beats failing fast
+        return primary, None
+
+    def _launch_backup(self, backup: Route, reason: str) -> bool:
+        if not self.breaker(backup[0]).allow():
+            return False
+        self._counters[reason] += 1
+        log("LLM", f"🪂 {'Hedging' if reason == 'hedged' else 'Failing over'} to {backup[0]}/{backup[1]}")
+        return True
+
+    async def _timed(self, route: Route, fn: Callable[[str, Optional[str]], Awaitable[T]]) -> T:
+        provider = route[0]
+        breaker = self.breaker(provider)
+        started = self.clock()
+        try:
+            result = await fn(*route)
+        except asyncio.CancelledError:
+            self.histogram(provider).observe(self.clock() - started)
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(False)
+            raise
+        breaker.record(True)
+        self.histogram(provider).observe(self.clock() - started)
+        return result
+
+    async def call(
+        self,
+        primary: Route,
+        fn: Callable[[str, Optional[str]], Awaitable[T]],
+        valid: Callable[[T], bool] = valid_response,
+    ) -> Tuple[T, Route]:
+        """
+        Run fn(provider, model) on the primary, hedged with the backup.
+
+        Returns:
+            (result, route that produced it). If no response is valid the
+            first invalid one is returned; if every request failed, the
+            first error is raised.
+        """
+        first, backup = self._routes(primary)
+        tasks: Dict[asyncio.Task, Route] = {asyncio.create_task(self._timed(first, fn)): first}
+        invalid: Optional[Tuple[T, Route]] = None
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                timeout = self.deadline(first[0]) if backup is not None else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._launch_backup(backup, "hedged"):
+                        tasks[asyncio.create_task(self._timed(backup, fn))] = backup
+                    backup = None
+                    continue
+                for task in done:
+                    route = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    if valid(result):
+                        if route != first:
+                            self._counters["backup_wins"] += 1
+                        return result, route
+                    invalid = invalid or (result, route)
+                if backup is not None:
+                    if self._launch_backup(backup, "failovers"):
+                        tasks[asyncio.create_task(self._timed(backup, fn))] = backup
+                    backup = None
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()  # Finished as we gave up on it - nobody awaits its error
+                task.cancel()
+        if invalid is not None:
+            return invalid
+        raise error
+
+    async def stream(
+        self,
+        primary: Route,
+        open_stream: Callable[[str, Optional[str]], AsyncIterator[Dict[str, Any]]],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the events of whichever stream produces its first event first.
+
+        A stream that fails before its first event starts the backup
+        immediately; once a stream has been chosen its errors are raised.
+        """
+        first, backup = self._routes(primary)
+        attempts: List[_StreamAttempt] = [_StreamAttempt(self, first, open_stream(*first))]
+        live = list(attempts)
+        winner: Optional[_StreamAttempt] = None
+        error: Optional[BaseException] = None
+        try:
+            while winner is None:
+                waiting = {attempt.first: attempt for attempt in live}
+                timeout = self.deadline(f"{first[0]}:stream") if backup is not None else None
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._launch_backup(backup, "hedged"):
+                        attempts.append(_StreamAttempt(self, backup, open_stream(*backup)))
+                        live.append(attempts[-1])
+                    backup = None
+                    continue
+                for attempt in live:
+                    if attempt.first not in done:
+                        continue
+                    if isinstance(attempt.first.result(), Exception):
+                        error = error or attempt.first.result()
+                        continue
+                    winner = attempt
+                    break
+                if winner is not None:
+                    break
+                live = [attempt for attempt in live if attempt.first not in done]
+                if backup is not None:
+                    if self._launch_backup(backup, "failovers"):
+                        attempts.append(_StreamAttempt(self, backup, open_stream(*backup)))
+                        live.append(attempts[-1])
+                    backup = None
+                if not live:
+                    raise error
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.task.cancel()
+            if winner.route != first:
+                self._counters["backup_wins"] += 1
+            while True:
+                item = await winner.queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for attempt in attempts:
+                attempt.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        providers: Dict[str, Any] = {}
+        for key, histogram in self._latency.items():
+            provider, _, kind = key.partition(":")
+            entry = providers.setdefault(provider, {})
+            entry["first_event_latency" if kind == "stream" else "latency"] = histogram.to_dict()
+            entry["deadline"] = round(self.deadline(provider), 3)
+        for provider, breaker in self._breakers.items():
+            providers.setdefault(provider, {})["breaker"] = breaker.stats()
+        return {
+            "secondary": "/".join(part or "(same)" for part in self.secondary),
+            "percentile": self.percentile,
+            **self._counters,
+            "providers": providers,
+        }
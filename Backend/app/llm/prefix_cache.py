@@ -0,0 +1,200 @@
+# app/llm/prefix_cache.py
+"""
+Provider-side caching of static prompt prefixes.
+
+marcus_call_sub_agent sends the same HDAP protocol rules + agent persona
+(thousands of tokens) as the system prompt on every call, and every provider
+re-processed and billed them as fresh input each time. Callers now mark the
+stable leading part of the system prompt (cache_prefix=...) and the adapter
+asks the provider to cache it:
+
+- Anthropic: the prefix becomes its own system block with
+  cache_control {"type": "ephemeral"}; Anthropic keeps it warm for five
+  minutes after each use, so there is nothing to manage here
+- OpenAI: prompts are cached automatically by prefix; the prefix already
+  leads the request unchanged, and a prompt_cache_key derived from it routes
+  calls that share it to the same cache
+- Gemini: an explicit cachedContents resource holds the prefix as its system
+  instruction. PrefixCache creates it on first use (once, even for
+  concurrent callers), reuses it until PROMPT_CACHE_TTL is nearly over and
+  then creates a fresh one; the rest of the system prompt travels with the
+  request. A resource that disappears early is dropped and the call is
+  repeated uncached
+
+Prefixes shorter than PROMPT_CACHE_MIN_CHARS are sent as before (providers
+only cache prompts of ~1024+ tokens), and a failed Gemini cache creation is
+not retried for a while. Providers report cached input tokens as
+usage["cached"]; BudgetManager prices them at the cached-input rate.
+
+Usage:
+    cache = PrefixCache()
+    prefix = await cache.prepare("gemini", module, model, system_prompt, cache_prefix, session)
+    response = await module.call(..., cache_prefix=prefix)   # prefix may be None
+    cache.record("gemini", response["usage"], cached_request=prefix is not None)
+"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import log
+
+
+# Stop using a Gemini cache this many seconds before it expires
+REFRESH_MARGIN = 60.0
+# After a failed cache creation, send that prefix uncached for this long
+FAILURE_BACKOFF = 600.0
+
+
+@dataclass(frozen=True)
+class CachedPrefix:
+    """A stable system-prompt prefix the provider should cache."""
+    text: str
+    key: str  # Stable id for the prefix (OpenAI prompt_cache_key)
+    handle: Optional[str] = None  # Provider cache resource (Gemini cachedContents name)
+
+    def rest(self, system_prompt: str) -> str:
+        """The dynamic part of system_prompt after the prefix."""
+        return system_prompt[len(self.text):]
+
+
+@dataclass
+class _Resource:
+    provider: str
+    handle: Optional[str]
+    expires: float
+    delete: Optional[Callable[[str, Any], Awaitable[None]]] = None
+
+
+class PrefixCache:
+    """Decides which prefixes to cache and manages explicit (Gemini) cache lifetimes."""
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        min_chars: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl if ttl is not None else settings.llm.prompt_cache_ttl
+        self.min_chars = min_chars if min_chars is not None else settings.llm.prompt_cache_min_chars
+        self.clock = clock
+        self._resources: Dict[str, _Resource] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key_for(provider: str, model: Optional[str], prefix: str) -> str:
+        digest = hashlib.sha256(f"{provider}\0{model or ''}\0{prefix}".encode("utf-8"))
+        return f"gencode-{digest.hexdigest()[:32]}"
+
+    async def prepare(
+        self,
+        provider: str,
+        module: Any,
+        model: Optional[str],
+        system_prompt: str,
+        cache_prefix: Optional[str],
+        session: Any = None,
+    ) -> Optional[CachedPrefix]:
+        """The CachedPrefix to send with this request, or None to send it uncached. Never raises."""
+        if (
+            not cache_prefix
+            or not getattr(module, "PREFIX_CACHE", False)
+            or not system_prompt.startswith(cache_prefix)
+            or len(cache_prefix) < self.min_chars
+        ):
+            return None
+        key = self.key_for(provider, model, cache_prefix)
+        create = getattr(module, "create_cached_content", None)
+        if create is None:
+            return CachedPrefix(cache_prefix, key)
+        handle = await self._resource(key, provider, module, model, cache_prefix, session)
+        return CachedPrefix(cache_prefix, key, handle) if handle else None
+
+    async def _resource(
+        self, key: str, provider: str, module: Any, model: Optional[str], prefix: str, session: Any
+    ) -> Optional[str]:
+        current = self._usable(key)
+        if current is not False:
+            return current
+        async with self._lock(key):
+            current = self._usable(key)  # Another caller may have created it meanwhile
+            if current is not False:
+                return current
+            refreshing = key in self._resources
+            try:
+                handle = await module.create_cached_content(model, prefix, self.ttl, session)
+            except Exception as e:
+                log("LLM", f"⚠️ {provider} prompt cache creation failed (sending uncached): {e}")
+                self._count(provider, "cache_failures")
+                self._resources[key] = _Resource(provider, None, self.clock() + FAILURE_BACKOFF)
+                return None
+            self._resources[key] = _Resource(
+                provider, handle, self.clock() + self.ttl, getattr(module, "delete_cached_content", None)
+            )
+            self._count(provider, "caches_refreshed" if refreshing else "caches_created")
+            log("LLM", f"🗄️ {provider} prompt prefix cached ({len(prefix)} chars, ttl {self.ttl}s)")
+            return handle
+
+    def _usable(self, key: str):
+        """Handle to use, None while backing off after a failure, False if one must be created."""
+        resource = self._resources.get(key)
+        if resource is None:
+            return False
+        if resource.handle is None:
+            return None if resource.expires > self.clock() else False
+        return resource.handle if resource.expires - self.clock() > REFRESH_MARGIN else False
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        # Locks belong to one event loop; start clean on a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._locks.clear()
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def invalidate(self, prefix: CachedPrefix) -> None:
+        """Forget a cache resource the provider reported as gone."""
+        resource = self._resources.pop(prefix.key, None)
+        if resource is not None:
+            self._count(resource.provider, "caches_expired")
+
+    def record(self, provider: str, usage: Optional[Dict[str, Any]], cached_request: bool) -> None:
+        """Count input and cached tokens of a completed call."""
+        if not usage:
+            return
+        counters = self._counters.setdefault(provider, {})
+        counters["input_tokens"] = counters.get("input_tokens", 0) + int(usage.get("input", 0) or 0)
+        counters["cached_tokens"] = counters.get("cached_tokens", 0) + int(usage.get("cached", 0) or 0)
+        if cached_request:
+            self._count(provider, "prefix_requests")
+
+    def _count(self, provider: str, name: str) -> None:
+        counters = self._counters.setdefault(provider, {})
+        counters[name] = counters.get(name, 0) + 1
+
+    async def aclose(self, session_for: Callable[[str], Any]) -> None:
+        """Delete live provider cache resources so they stop accruing storage. Best effort."""
+        resources, self._resources = self._resources, {}
+        for resource in resources.values():
+            if resource.handle is None or resource.delete is None or resource.expires <= self.clock():
+                continue
+            try:
+                await resource.delete(resource.handle, session_for(resource.provider))
+            except Exception as e:
+                log("LLM", f"⚠️ Could not delete {resource.provider} prompt cache {resource.handle}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        providers = {}
+        for provider, counters in self._counters.items():
+            entry = dict(counters)
+            entry["cached_ratio"] = (
+                round(counters.get("cached_tokens", 0) / counters["input_tokens"], 3)
+                if counters.get("input_tokens") else 0.0
+            )
+            providers[provider] = entry
+        live = sum(1 for r in self._resources.values() if r.handle and r.expires > self.clock())
+        return {"min_chars": self.min_chars, "ttl": self.ttl, "live_resources": live, "providers": providers}
@@ -16,6 +16,8 @@ CORE PRINCIPLES (NON‑NEGOTIABLE):
 
 from typing import Any, Dict, List, Optional, Union
 
+from app.llm.context_packer import pack_context
+
 print("🔥 LOADED HDAP‑SAFE prompt_management.py FROM:", __file__)
 
 
@@ -23,6 +25,22 @@ print("🔥 LOADED HDAP‑SAFE prompt_management.py FROM:", __file__)
 # FILE FILTERING (INTERNAL ONLY — NEVER SHOWN AS STRUCTURE TO LLM)
 # ------------------------------------------------------------------
 
+def get_step_allowlist(step: str) -> str:
+    """
+    Architecture path a step may see (directory prefix ending in "/" or an exact file).
+
+    Shared by filter_files_for_step and the project file reader so that only
+    files a step can actually use are ever read from disk.
+    """
+    step_lower = str(step).lower()
+
+    if "backend" in step_lower and ("model" in step_lower or "router" in step_lower):
+        return "architecture/backend.md"
+    elif "frontend" in step_lower:
+        return "architecture/frontend.md"
+    return "architecture/"
+
+
 def filter_files_for_step(
     step: str,
     files: Union[Dict[str, str], List[dict]],
@@ -105,21 +123,7 @@ def filter_files_for_step(
     architecture_only = {}
     
     # Define step-specific allowlists (Default: All architecture files)
-    allowlist_pattern = "architecture/"
-    
-    step_lower = str(step).lower()
-    
-    # DEBUG: Print step detection to verify logic
-    # print(f"[DEBUG] Filtering for step: '{step_lower}'")
-
-    if "backend" in step_lower and ("model" in step_lower or "router" in step_lower):
-        allowlist_pattern = "architecture/backend.md"
-    elif "frontend" in step_lower:
-        allowlist_pattern = "architecture/frontend.md"
-    elif "architecture" in step_lower:
-         allowlist_pattern = "architecture/"
-    
-    # print(f"[DEBUG] Allowlist pattern: '{allowlist_pattern}'")
+    allowlist_pattern = get_step_allowlist(step)
 
     for path, content in files.items():
         normalized_path = path.replace("\\", "/")
@@ -166,6 +170,7 @@ def build_context(
     system_prompt: Optional[str] = None,
     user_prompt: Optional[str] = None,
     is_retry: bool = False,
+    provider: Optional[str] = None,
 ) -> str:
     """
     Build the final prompt sent to the LLM.
@@ -176,6 +181,9 @@ def build_context(
       
     NOTE: ARTIFACT mode (HDAP) enforcement is now handled by enforce_artifact_mode().
     This function is only used for FREEFORM/STRUCTURED modes.
+    
+    Files, contracts and errors are packed into the step's input token
+    budget (see app/llm/context_packer.py).
     """
 
     context_parts: List[str] = []
@@ -199,32 +207,43 @@ def build_context(
             hints.append(f"Vibe: {vibe}")
         context_parts.append("CONTEXT:\n" + "\n".join(hints))
 
-    # 4️⃣ Existing project files (RAW CONTENT ONLY — NO LABELS)
+    # Fit files / contracts / errors into the step's input token budget
     if files and isinstance(files, dict):
         if step_name:
             files = filter_files_for_step(step_name, files)
+    else:
+        files = None
+    tool_block = "\n".join(f"- {t}" for t in tools or [])
+    packed = pack_context(
+        step_name or "",
+        fixed="\n\n".join(context_parts) + tool_block,
+        files=files,
+        contracts=contracts,
+        errors=errors,
+        provider=provider,
+    )
 
-        if files:
-            raw_files: List[str] = []
-            for content in files.values():
-                # 🚫 NO PATHS, NO HEADERS, NO MARKERS
-                raw_files.append(content.strip())
+    # 4️⃣ Existing project files (RAW CONTENT ONLY — NO LABELS)
+    if packed.files:
+        raw_files: List[str] = []
+        for packed_file in packed.files:
+            # 🚫 NO PATHS, NO HEADERS, NO MARKERS
+            raw_files.append(packed_file.content.strip())
 
-            context_parts.append("EXISTING PROJECT STATE:\n" + "\n\n".join(raw_files))
+        context_parts.append("EXISTING PROJECT STATE:\n" + "\n\n".join(raw_files))
 
     # 5️⃣ Architecture & Contracts (RAW TEXT)
-    if contracts:
-        context_parts.append("ARCHITECTURE / CONTRACTS (REFERENCE ONLY):\n" + contracts.strip())
+    if packed.contracts:
+        context_parts.append("ARCHITECTURE / CONTRACTS (REFERENCE ONLY):\n" + packed.contracts)
 
 
     # 6️⃣ Previous errors (instructional, not structural)
-    if errors:
-        error_block = "\n".join(f"- {e}" for e in errors)
+    if packed.errors:
+        error_block = "\n".join(f"- {e}" for e in packed.errors)
         context_parts.append("PREVIOUS ERRORS — MUST FIX:\n" + error_block)
 
     # 7️⃣ Tools (capabilities only — not output format)
     if tools:
-        tool_block = "\n".join(f"- {t}" for t in tools)
         context_parts.append("AVAILABLE TOOLS:\n" + tool_block)
 
     # FINAL ASSEMBLY
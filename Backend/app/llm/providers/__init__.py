@@ -2,6 +2,6 @@
 """
 LLM Providers - Individual provider implementations.
 """
-from . import gemini, openai, anthropic, ollama
+from . import gemini, openai, anthropic, ollama, replay
 
-__all__ = ["gemini", "openai", "anthropic", "ollama"]
+__all__ = ["gemini", "openai", "anthropic", "ollama", "replay"]
@@ -1,14 +1,73 @@
 # app/llm/providers/anthropic.py
 """
 Anthropic Claude provider implementation.
+
+A cached prompt prefix is sent as its own system block marked with
+cache_control, so Anthropic reuses it across calls (see app/llm/prefix_cache.py).
 """
+import json
 import aiohttp
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from app.core.config import settings
+from app.llm.prefix_cache import CachedPrefix
+from app.llm.transport import ProviderRateLimited, retry_after_seconds, session_scope, iter_sse_data, stream_timeout
 
 
 DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
 API_URL = "https://api.anthropic.com/v1/messages"
+PREFIX_CACHE = True
+
+
+def _build_payload(
+    prompt: str,
+    system_prompt: str,
+    model: str,
+    max_tokens: int,
+    stop_sequences: Optional[list],
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> Dict[str, Any]:
+    """Build the Messages API request body."""
+    payload = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    
+    if cache_prefix is not None:
+        # Cache breakpoint after the static prefix; the dynamic rest is not cached
+        system = [{"type": "text", "text": cache_prefix.text, "cache_control": {"type": "ephemeral"}}]
+        rest = cache_prefix.rest(system_prompt)
+        if rest.strip():
+            system.append({"type": "text", "text": rest})
+        payload["system"] = system
+    elif system_prompt:
+        payload["system"] = system_prompt
+    
+    # V2: Add stop sequences to prevent truncation
+    if stop_sequences:
+        payload["stop_sequences"] = stop_sequences
+    
+    return payload
+
+
+def _extract_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Token counts; Anthropic reports cache reads/writes separately from input_tokens."""
+    cached = usage.get("cache_read_input_tokens") or 0
+    written = usage.get("cache_creation_input_tokens") or 0
+    return {
+        "input": (usage.get("input_tokens") or 0) + cached + written,
+        "output": usage.get("output_tokens") or 0,
+        "cached": cached,
+        "cache_write": written,
+    }
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {
+        "x-api-key": api_key,
+        "anthropic-version": "2023-06-01",
+        "Content-Type": "application/json",
+    }
 
 
 async def call(
@@ -18,15 +77,19 @@ async def call(
     temperature: float = 0.7,
     max_tokens: int = 8000,
     stop_sequences: Optional[list] = None,
-) -> str:
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> Dict[str, Any]:
     """
     Call Anthropic Claude API.
     
     Args:
         stop_sequences: V2 - sequences that signal completion (prevents truncation)
+        session: Pooled keep-alive session from LLMTransport (optional)
+        cache_prefix: Cached system-prompt prefix from PrefixCache (optional)
     
     Returns:
-        The generated text
+        Dict with {"text": str, "usage": {"input", "output", "cached", "cache_write"}}
         
     Raises:
         Exception on API errors
@@ -37,34 +100,18 @@ async def call(
     
     model = model or DEFAULT_MODEL
     
-    payload = {
-        "model": model,
-        "max_tokens": max_tokens,
-        "messages": [{"role": "user", "content": prompt}],
-    }
-    
-    if system_prompt:
-        payload["system"] = system_prompt
-    
-    # V2: Add stop sequences to prevent truncation
-    if stop_sequences:
-        payload["stop_sequences"] = stop_sequences
-    
-    headers = {
-        "x-api-key": api_key,
-        "anthropic-version": "2023-06-01",
-        "Content-Type": "application/json",
-    }
+    payload = _build_payload(prompt, system_prompt, model, max_tokens, stop_sequences, cache_prefix)
+    headers = _headers(api_key)
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
+    async with session_scope(session) as http:
+        async with http.post(
             API_URL,
             json=payload,
             headers=headers,
-            timeout=aiohttp.ClientTimeout(total=120)
+            timeout=aiohttp.ClientTimeout(total=settings.llm.request_timeout)
         ) as response:
             if response.status == 429:
-                raise Exception("Rate limited (429)")
+                raise ProviderRateLimited("Rate limited (429)", retry_after_seconds(response.headers))
             
             if response.status != 200:
                 text = await response.text()
@@ -76,6 +123,70 @@ async def call(
                 content = data.get("content", [])
                 if not content:
                     raise Exception("No content in response")
-                return content[0].get("text", "")
+                return {
+                    "text": content[0].get("text", ""),
+                    "usage": _extract_usage(data.get("usage", {})),
+                }
             except (KeyError, IndexError) as e:
                 raise Exception(f"Failed to parse Anthropic response: {e}")
+
+
+async def stream(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an Anthropic Messages completion over SSE.
+    
+    Yields:
+        {"text": delta} for each text_delta, then a final
+        {"usage": {...}} event with the token counts.
+    """
+    api_key = settings.llm.anthropic_api_key
+    if not api_key:
+        raise Exception("ANTHROPIC_API_KEY not configured")
+    
+    model = model or DEFAULT_MODEL
+    payload = _build_payload(prompt, system_prompt, model, max_tokens, stop_sequences, cache_prefix)
+    payload["stream"] = True
+    
+    usage = {"input": 0, "output": 0}
+    async with session_scope(session) as http:
+        async with http.post(
+            API_URL,
+            json=payload,
+            headers=_headers(api_key),
+            timeout=stream_timeout()
+        ) as response:
+            if response.status == 429:
+                raise ProviderRateLimited("Rate limited (429)", retry_after_seconds(response.headers))
+            
+            if response.status != 200:
+                text = await response.text()
+                raise Exception(f"Anthropic API error {response.status}: {text[:200]}")
+            
+            async for data in iter_sse_data(response):
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError as e:
+                    raise Exception(f"Failed to parse Anthropic stream event: {e}")
+                
+                event_type = event.get("type")
+                if event_type == "message_start":
+                    usage = _extract_usage(event.get("message", {}).get("usage", {}))
+                elif event_type == "content_block_delta":
+                    delta = event.get("delta", {})
+                    if delta.get("type") == "text_delta" and delta.get("text"):
+                        yield {"text": delta["text"]}
+                elif event_type == "message_delta":
+                    usage["output"] = event.get("usage", {}).get("output_tokens", usage["output"])
+                elif event_type == "error":
+                    raise Exception(f"Anthropic stream error: {event.get('error', {})}")
+    
+    yield {"usage": usage}
@@ -1,42 +1,40 @@
 # app/llm/providers/gemini.py
 """
 Google Gemini provider implementation.
+
+Static prompt prefixes are cached as explicit cachedContents resources
+(created and refreshed by app/llm/prefix_cache.py).
 """
+import json
 import aiohttp
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from app.core.config import settings
+from app.llm.prefix_cache import CachedPrefix
+from app.llm.transport import (
+    PrefixCacheExpired, ProviderRateLimited, retry_after_seconds, session_scope, iter_sse_data, stream_timeout,
+)
 
 
 DEFAULT_MODEL = "gemini-2.0-flash-exp"
-API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+API_URL = f"{API_BASE}/models"
+PREFIX_CACHE = True
 
 
-async def call(
+def _build_payload(
     prompt: str,
-    system_prompt: str = "",
-    model: Optional[str] = None,
-    temperature: float = 0.7,
-    max_tokens: int = 8000,
-    stop_sequences: Optional[list] = None,
-) -> str:
-    """
-    Call Google Gemini API.
-    
-    Args:
-        stop_sequences: V2 - sequences that signal completion (prevents truncation)
-    
-    Returns:
-        The generated text
-        
-    Raises:
-        Exception on API errors
-    """
-    api_key = settings.llm.gemini_api_key
-    if not api_key:
-        raise Exception("GEMINI_API_KEY not configured")
-    
-    model = model or DEFAULT_MODEL
-    url = f"{API_URL}/{model}:generateContent?key={api_key}"
+    system_prompt: str,
+    max_tokens: int,
+    stop_sequences: Optional[list],
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> Dict[str, Any]:
+    """Build the generateContent / streamGenerateContent request body."""
+    # A request using cachedContent cannot carry its own systemInstruction:
+    # the cached prefix is the system instruction, the rest leads the user turn
+    if cache_prefix is not None and cache_prefix.handle:
+        rest = cache_prefix.rest(system_prompt).strip()
+        prompt = f"{rest}\n\n{prompt}" if rest else prompt
+        system_prompt = ""
     
     # Build content structure - Gemini expects specific format
     contents = []
@@ -67,28 +65,133 @@ async def call(
     if system_prompt:
         payload["systemInstruction"] = {"parts": [{"text": system_prompt}]}
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=120)) as response:
+    if cache_prefix is not None and cache_prefix.handle:
+        payload["cachedContent"] = cache_prefix.handle
+    
+    return payload
+
+
+async def create_cached_content(
+    model: Optional[str],
+    system_prompt: str,
+    ttl_seconds: int,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> str:
+    """Create a cachedContents resource holding system_prompt; returns its name."""
+    api_key = settings.llm.gemini_api_key
+    if not api_key:
+        raise Exception("GEMINI_API_KEY not configured")
+    
+    payload = {
+        "model": f"models/{model or DEFAULT_MODEL}",
+        "systemInstruction": {"parts": [{"text": system_prompt}]},
+        "ttl": f"{ttl_seconds}s",
+    }
+    async with session_scope(session) as http:
+        async with http.post(
+            f"{API_BASE}/cachedContents?key={api_key}",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=settings.llm.request_timeout),
+        ) as response:
+            text = await response.text()
+            _raise_for_status(response.status, text, response.headers)
+            name = json.loads(text).get("name")
+            if not name:
+                raise Exception("No cache name in cachedContents response")
+            return name
+
+
+async def delete_cached_content(name: str, session: Optional[aiohttp.ClientSession] = None) -> None:
+    """Delete a cachedContents resource (404 = already expired)."""
+    api_key = settings.llm.gemini_api_key
+    if not api_key:
+        return
+    async with session_scope(session) as http:
+        async with http.delete(
+            f"{API_BASE}/{name}?key={api_key}",
+            timeout=aiohttp.ClientTimeout(total=settings.llm.request_timeout),
+        ) as response:
+            if response.status not in (200, 404):
+                _raise_for_status(response.status, await response.text(), response.headers)
+
+
+def _raise_for_status(
+    status: int,
+    text: str,
+    headers: Optional[Any] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> None:
+    """Map Gemini HTTP errors to provider exceptions."""
+    if cache_prefix is not None and cache_prefix.handle and status in (400, 403, 404) and "cachedcontent" in text.lower():
+        raise PrefixCacheExpired(f"Cached content {cache_prefix.handle} is gone ({status})")
+    
+    if status == 429:
+        print(f"[GEMINI] 429 Rate limit response: {text[:500]}")
+        raise ProviderRateLimited(f"Rate limited (429): {text[:200]}", retry_after_seconds(headers, text))
+    
+    if status == 403:
+        print(f"[GEMINI] 403 Forbidden response: {text[:500]}")
+        raise Exception(f"API key invalid or quota exceeded (403): {text[:200]}")
+    
+    if status == 400:
+        print(f"[GEMINI] 400 Bad request: {text[:500]}")
+        raise Exception(f"Bad request (400): {text[:200]}")
+    
+    if status != 200:
+        print(f"[GEMINI] Error {status}: {text[:500]}")
+        raise Exception(f"Gemini API error {status}: {text[:200]}")
+
+
+def _extract_usage(data: Dict[str, Any]) -> Dict[str, int]:
+    """V3: Extract usage metadata for accurate cost tracking."""
+    usage_metadata = data.get("usageMetadata", {})
+    return {
+        "input": usage_metadata.get("promptTokenCount", 0),
+        "output": usage_metadata.get("candidatesTokenCount", 0),
+        "total": usage_metadata.get("totalTokenCount", 0),
+        "cached": usage_metadata.get("cachedContentTokenCount", 0),  # Included in "input"
+    }
+
+
+async def call(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> str:
+    """
+    Call Google Gemini API.
+    
+    Args:
+        stop_sequences: V2 - sequences that signal completion (prevents truncation)
+        session: Pooled keep-alive session from LLMTransport (optional)
+        cache_prefix: Cached system-prompt prefix from PrefixCache (optional)
+    
+    Returns:
+        The generated text
+        
+    Raises:
+        Exception on API errors
+    """
+    api_key = settings.llm.gemini_api_key
+    if not api_key:
+        raise Exception("GEMINI_API_KEY not configured")
+    
+    model = model or DEFAULT_MODEL
+    url = f"{API_URL}/{model}:generateContent?key={api_key}"
+    payload = _build_payload(prompt, system_prompt, max_tokens, stop_sequences, cache_prefix)
+    
+    async with session_scope(session) as http:
+        async with http.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=settings.llm.request_timeout)) as response:
             text = await response.text()
             
-            if response.status == 429:
-                print(f"[GEMINI] 429 Rate limit response: {text[:500]}")
-                raise Exception(f"Rate limited (429): {text[:200]}")
-            
-            if response.status == 403:
-                print(f"[GEMINI] 403 Forbidden response: {text[:500]}")
-                raise Exception(f"API key invalid or quota exceeded (403): {text[:200]}")
-            
-            if response.status == 400:
-                print(f"[GEMINI] 400 Bad request: {text[:500]}")
-                raise Exception(f"Bad request (400): {text[:200]}")
-            
-            if response.status != 200:
-                print(f"[GEMINI] Error {response.status}: {text[:500]}")
-                raise Exception(f"Gemini API error {response.status}: {text[:200]}")
+            _raise_for_status(response.status, text, response.headers, cache_prefix)
             
             # Parse the JSON response
-            import json
             try:
                 data = json.loads(text)
             except json.JSONDecodeError as e:
@@ -108,13 +211,7 @@ async def call(
                 
                 text_content = parts[0].get("text", "")
                 
-                # V3: Extract usage metadata for accurate cost tracking
-                usage_metadata = data.get("usageMetadata", {})
-                usage = {
-                    "input": usage_metadata.get("promptTokenCount", 0),
-                    "output": usage_metadata.get("candidatesTokenCount", 0),
-                    "total": usage_metadata.get("totalTokenCount", 0),
-                }
+                usage = _extract_usage(data)
                 
                 # Return dict with both text and usage
                 return {
@@ -123,3 +220,52 @@ async def call(
                 }
             except (KeyError, IndexError) as e:
                 raise Exception(f"Failed to parse Gemini response: {e}")
+
+
+async def stream(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a Gemini completion over SSE (streamGenerateContent?alt=sse).
+    
+    Yields:
+        {"text": delta} for each generated chunk, then a final
+        {"usage": {...}} event with the token counts.
+    """
+    api_key = settings.llm.gemini_api_key
+    if not api_key:
+        raise Exception("GEMINI_API_KEY not configured")
+    
+    model = model or DEFAULT_MODEL
+    url = f"{API_URL}/{model}:streamGenerateContent?alt=sse&key={api_key}"
+    payload = _build_payload(prompt, system_prompt, max_tokens, stop_sequences, cache_prefix)
+    
+    usage = {"input": 0, "output": 0, "total": 0}
+    async with session_scope(session) as http:
+        async with http.post(url, json=payload, timeout=stream_timeout()) as response:
+            if response.status != 200:
+                _raise_for_status(response.status, await response.text(), response.headers, cache_prefix)
+            
+            async for data in iter_sse_data(response):
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError as e:
+                    raise Exception(f"Failed to parse Gemini stream event: {e}")
+                
+                # Every event carries cumulative usage; the last one wins
+                if event.get("usageMetadata"):
+                    usage = _extract_usage(event)
+                
+                for candidate in event.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield {"text": part["text"]}
+    
+    yield {"usage": usage}
@@ -3,13 +3,47 @@
 Ollama provider implementation.
 """
 import aiohttp
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from app.core.config import settings
+from app.llm.transport import session_scope, iter_ndjson, stream_timeout
 
 
 DEFAULT_MODEL = "qwen2.5-coder:7b"
 
 
+def _build_payload(
+    prompt: str,
+    system_prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    stop_sequences: Optional[list],
+    stream: bool = False,
+) -> Dict[str, Any]:
+    """Build the /api/chat request body."""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    
+    options = {
+        "temperature": temperature,
+        "num_predict": max_tokens,
+    }
+    
+    # V2: Add stop sequences to prevent truncation
+    if stop_sequences:
+        options["stop"] = stop_sequences
+    
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "options": options,
+    }
+    return payload
+
+
 async def call(
     prompt: str,
     system_prompt: str = "",
@@ -17,12 +51,14 @@ async def call(
     temperature: float = 0.7,
     max_tokens: int = 8000,
     stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
 ) -> str:
     """
     Call Ollama API (local).
     
     Args:
         stop_sequences: V2 - sequences that signal completion (prevents truncation)
+        session: Pooled keep-alive session from LLMTransport (optional)
     
     Returns:
         The generated text
@@ -34,29 +70,10 @@ async def call(
     model = model or DEFAULT_MODEL
     api_url = f"{settings.llm.ollama_base_url}/api/chat"
     
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
-    
-    options = {
-        "temperature": temperature,
-        "num_predict": max_tokens,
-    }
-    
-    # V2: Add stop sequences to prevent truncation
-    if stop_sequences:
-        options["stop"] = stop_sequences
+    payload = _build_payload(prompt, system_prompt, model, temperature, max_tokens, stop_sequences)
     
-    payload = {
-        "model": model,
-        "messages": messages,
-        "stream": False,
-        "options": options,
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
+    async with session_scope(session) as http:
+        async with http.post(
             api_url, 
             json=payload,
             timeout=aiohttp.ClientTimeout(total=300)  # Ollama can be slower
@@ -71,3 +88,48 @@ async def call(
                 return data["message"]["content"]
             except (KeyError, IndexError) as e:
                 raise Exception(f"Failed to parse Ollama response: {e}")
+
+
+async def stream(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an Ollama chat completion (newline-delimited JSON).
+    
+    Yields:
+        {"text": delta} for each generated chunk, then a final
+        {"usage": {...}} event with the token counts.
+    """
+    model = model or DEFAULT_MODEL
+    api_url = f"{settings.llm.ollama_base_url}/api/chat"
+    payload = _build_payload(prompt, system_prompt, model, temperature, max_tokens, stop_sequences, stream=True)
+    
+    usage = {"input": 0, "output": 0}
+    async with session_scope(session) as http:
+        async with http.post(api_url, json=payload, timeout=stream_timeout()) as response:
+            if response.status != 200:
+                text = await response.text()
+                raise Exception(f"Ollama API error {response.status}: {text[:200]}")
+            
+            async for event in iter_ndjson(response):
+                if event.get("error"):
+                    raise Exception(f"Ollama stream error: {event['error']}")
+                
+                delta = event.get("message", {}).get("content")
+                if delta:
+                    yield {"text": delta}
+                
+                if event.get("done"):
+                    usage = {
+                        "input": event.get("prompt_eval_count", 0),
+                        "output": event.get("eval_count", 0),
+                    }
+                    break
+    
+    yield {"usage": usage}
@@ -1,14 +1,71 @@
 # app/llm/providers/openai.py
 """
 OpenAI provider implementation.
+
+OpenAI caches prompt prefixes automatically; a cached prefix (see
+app/llm/prefix_cache.py) adds a prompt_cache_key so requests sharing it are
+routed to the same cache.
 """
+import json
 import aiohttp
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from app.core.config import settings
+from app.llm.prefix_cache import CachedPrefix
+from app.llm.transport import ProviderRateLimited, retry_after_seconds, session_scope, iter_sse_data, stream_timeout
 
 
 DEFAULT_MODEL = "gpt-4o-mini"
 API_URL = "https://api.openai.com/v1/chat/completions"
+PREFIX_CACHE = True
+
+
+def _build_payload(
+    prompt: str,
+    system_prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    stop_sequences: Optional[list],
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> Dict[str, Any]:
+    """Build the chat completions request body."""
+    # Static content first, unchanged: automatic caching matches on the prefix
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    
+    # V2: Add stop sequences to prevent truncation
+    if stop_sequences:
+        payload["stop"] = stop_sequences[:4]  # OpenAI allows max 4
+    
+    if cache_prefix is not None:
+        payload["prompt_cache_key"] = cache_prefix.key
+    
+    return payload
+
+
+def _extract_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Token counts; cached prompt tokens are part of prompt_tokens."""
+    return {
+        "input": usage.get("prompt_tokens", 0),
+        "output": usage.get("completion_tokens", 0),
+        "cached": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+    }
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
 
 
 async def call(
@@ -18,15 +75,19 @@ async def call(
     temperature: float = 0.7,
     max_tokens: int = 8000,
     stop_sequences: Optional[list] = None,
-) -> str:
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> Dict[str, Any]:
     """
     Call OpenAI API.
     
     Args:
         stop_sequences: V2 - sequences that signal completion (prevents truncation)
+        session: Pooled keep-alive session from LLMTransport (optional)
+        cache_prefix: Cached system-prompt prefix from PrefixCache (optional)
     
     Returns:
-        The generated text
+        Dict with {"text": str, "usage": {"input", "output", "cached"}}
         
     Raises:
         Exception on API errors
@@ -37,36 +98,18 @@ async def call(
     
     model = model or DEFAULT_MODEL
     
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
+    payload = _build_payload(prompt, system_prompt, model, temperature, max_tokens, stop_sequences, cache_prefix)
+    headers = _headers(api_key)
     
-    payload = {
-        "model": model,
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-    }
-    
-    # V2: Add stop sequences to prevent truncation
-    if stop_sequences:
-        payload["stop"] = stop_sequences[:4]  # OpenAI allows max 4
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
+    async with session_scope(session) as http:
+        async with http.post(
             API_URL, 
             json=payload, 
             headers=headers,
-            timeout=aiohttp.ClientTimeout(total=120)
+            timeout=aiohttp.ClientTimeout(total=settings.llm.request_timeout)
         ) as response:
             if response.status == 429:
-                raise Exception("Rate limited (429)")
+                raise ProviderRateLimited("Rate limited (429)", retry_after_seconds(response.headers))
             
             if response.status != 200:
                 text = await response.text()
@@ -75,6 +118,69 @@ async def call(
             data = await response.json()
             
             try:
-                return data["choices"][0]["message"]["content"]
+                return {
+                    "text": data["choices"][0]["message"]["content"],
+                    "usage": _extract_usage(data.get("usage") or {}),
+                }
             except (KeyError, IndexError) as e:
                 raise Exception(f"Failed to parse OpenAI response: {e}")
+
+
+async def stream(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    cache_prefix: Optional[CachedPrefix] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an OpenAI chat completion over SSE.
+    
+    Yields:
+        {"text": delta} for each generated chunk, then a final
+        {"usage": {...}} event with the token counts.
+    """
+    api_key = settings.llm.openai_api_key
+    if not api_key:
+        raise Exception("OPENAI_API_KEY not configured")
+    
+    model = model or DEFAULT_MODEL
+    payload = _build_payload(prompt, system_prompt, model, temperature, max_tokens, stop_sequences, cache_prefix)
+    payload["stream"] = True
+    payload["stream_options"] = {"include_usage": True}
+    
+    usage = {"input": 0, "output": 0}
+    async with session_scope(session) as http:
+        async with http.post(
+            API_URL,
+            json=payload,
+            headers=_headers(api_key),
+            timeout=stream_timeout()
+        ) as response:
+            if response.status == 429:
+                raise ProviderRateLimited("Rate limited (429)", retry_after_seconds(response.headers))
+            
+            if response.status != 200:
+                text = await response.text()
+                raise Exception(f"OpenAI API error {response.status}: {text[:200]}")
+            
+            async for data in iter_sse_data(response):
+                if data.strip() == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError as e:
+                    raise Exception(f"Failed to parse OpenAI stream event: {e}")
+                
+                if event.get("usage"):
+                    usage = _extract_usage(event["usage"])
+                
+                for choice in event.get("choices", [])[:1]:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield {"text": delta}
+    
+    yield {"usage": usage}
@@ -0,0 +1,144 @@
+# app/llm/providers/replay.py
+"""
+Deterministic "replay" provider.
+
+Serves recorded outputs instead of calling a model, so the pipeline can be
+benchmarked without model latency or cost (see benchmarks/pipeline_bench.py).
+
+Recording format (JSON, settings.llm.replay_path):
+
+    {
+      "responses": [
+        {"name": "marcus_review",
+         "match": ["quality_score"],          # ALL substrings must appear in system+prompt
+         "text": "...",
+         "usage": {"input": 1200, "output": 300},   # optional (else ~4 chars/token)
+         "latency_ms": 50}                          # optional per-entry override
+      ],
+      "default": {"text": "..."}
+    }
+
+The first matching entry wins. Synthetic latency is
+latency_ms + output_tokens * ms_per_token (settings.llm.replay_*).
+"""
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+DEFAULT_MODEL = "replay"
+USES_HTTP = False  # No pooled session needed (see LLMAdapter._session_for)
+STREAM_CHUNK_CHARS = 256
+
+# path -> (mtime_ns, parsed recording)
+_recordings: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+
+def _load_recording(path: Optional[str]) -> Dict[str, Any]:
+    """Load (and memoize by mtime) the recording file."""
+    if not path:
+        raise Exception("LLM_REPLAY_PATH not configured")
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _recordings.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        recording = json.load(f)
+    _recordings[path] = (mtime_ns, recording)
+    return recording
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def match_response(prompt: str, system_prompt: str = "", path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pick the recorded response for a request.
+
+    Returns:
+        {"name", "text", "usage", "latency_ms"}
+    """
+    recording = _load_recording(path or settings.llm.replay_path)
+    haystack = f"{system_prompt}\n{prompt}"
+
+    entry = None
+    for candidate in recording.get("responses", []):
+        match = candidate.get("match") or []
+        if isinstance(match, str):
+            match = [match]
+        if all(m in haystack for m in match):
+            entry = candidate
+            break
+    if entry is None:
+        entry = recording.get("default")
+    if entry is None:
+        raise Exception("No recorded response matches this request and no default is set")
+
+    text = entry.get("text", "")
+    usage = dict(entry.get("usage") or {})
+    usage.setdefault("input", _estimate_tokens(haystack))
+    usage.setdefault("output", _estimate_tokens(text))
+    usage["total"] = usage["input"] + usage["output"]
+
+    latency_ms = entry.get("latency_ms")
+    if latency_ms is None:
+        latency_ms = settings.llm.replay_latency_ms + usage["output"] * settings.llm.replay_ms_per_token
+
+    return {
+        "name": entry.get("name", "default"),
+        "text": text,
+        "usage": usage,
+        "latency_ms": float(latency_ms),
+    }
+
+
+async def call(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Any = None,
+) -> Dict[str, Any]:
+    """
+    Return the recorded response after the synthetic latency.
+
+    Returns:
+        Dict with {"text": str, "usage": {"input": int, "output": int, "total": int}}
+    """
+    response = match_response(prompt, system_prompt)
+    if response["latency_ms"] > 0:
+        await asyncio.sleep(response["latency_ms"] / 1000)
+    return {"text": response["text"], "usage": response["usage"]}
+
+
+async def stream(
+    prompt: str,
+    system_prompt: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 8000,
+    stop_sequences: Optional[list] = None,
+    session: Any = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the recorded response in chunks, spreading the latency across them.
+
+    Yields:
+        {"text": delta} events, then one {"usage": {...}} event.
+    """
+    response = match_response(prompt, system_prompt)
+    text = response["text"]
+    chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+    delay = response["latency_ms"] / 1000 / len(chunks)
+
+    for chunk in chunks:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield {"text": chunk}
+    yield {"usage": response["usage"]}
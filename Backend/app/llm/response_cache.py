@@ -0,0 +1,211 @@
+# app/llm/response_cache.py
+"""
+Content-addressed LLM response cache.
+
+Keyed on a SHA-256 fingerprint of EVERYTHING that shapes a completion:
+(provider, model, system_prompt, prompt, temperature, max_tokens, stop sequences).
+Any change to file contents embedded in the prompt, the persona, or the model
+produces a different key - no false hits. Identical prompts from re-runs,
+refinements and other projects hit and cost zero tokens.
+
+Storage: local SQLite (WAL) with
+- size-bounded LRU eviction (least recently accessed first)
+- TTL expiry
+- hit / miss / store / eviction counters
+
+Only usable answers are stored (complete HDAP with files, or plain text -
+see hedging.valid_response), and a response whose output is rejected by
+supervision is dropped again via delete().
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT,
+    model TEXT,
+    response TEXT,        -- JSON {"text": ..., "usage": {...}}
+    size_bytes INTEGER,
+    created_at REAL,
+    last_access REAL,
+    hits INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+"""
+
+
+def fingerprint(
+    provider: str,
+    model: Optional[str],
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    stop_sequences: Optional[List[str]] = None,
+) -> str:
+    """Deterministic cache key for a fully-specified LLM request."""
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model or "",
+            "system_prompt": system_prompt or "",
+            "prompt": prompt or "",
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "stop_sequences": list(stop_sequences or []),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed LRU + TTL cache of LLM responses.
+
+    Thread-safe; the adapter calls it via asyncio.to_thread so lookups and
+    commits never block the event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = Path(path or settings.llm.cache_path)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.llm.cache_max_mb * 1024 * 1024
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.llm.cache_ttl_hours * 3600
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA_SQL)
+            row = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()
+            self._total_bytes = row[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a key, or None on miss/expiry."""
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT response, size_bytes, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+
+            response, size_bytes, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= size_bytes
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+
+            conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            self.counters["hits"] += 1
+            return json.loads(response)
+
+    def put(self, key: str, response: Dict[str, Any], provider: str = "", model: str = "") -> None:
+        """Store a response and evict least-recently-used entries beyond the size budget."""
+        blob = json.dumps(response, ensure_ascii=False)
+        size_bytes = len(blob.encode("utf-8"))
+        if self.max_bytes and size_bytes > self.max_bytes:
+            return  # Would evict everything else - not worth caching
+
+        with self._lock:
+            conn = self._get_conn()
+            now = time.time()
+            old = conn.execute("SELECT size_bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, size_bytes, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, provider, model or "", blob, size_bytes, now, now),
+            )
+            self._total_bytes += size_bytes - (old[0] if old else 0)
+            self.counters["stores"] += 1
+            self._evict_locked(conn)
+            conn.commit()
+
+    def delete(self, key: str) -> bool:
+        """Drop one response (e.g. its output was rejected). True if it was cached."""
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute("SELECT size_bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            self._total_bytes -= row[0]
+            self.counters["invalidated"] += 1
+            return True
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> None:
+        """Drop least-recently-accessed rows until under max_bytes."""
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT key, size_bytes FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        victims = []
+        for key, size_bytes in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._total_bytes -= size_bytes
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.counters["evictions"] += len(victims)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current size for monitoring."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        with self._lock:
+            entries = self._get_conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,484 @@
+# app/llm/scheduler.py
+"""
+Priority-aware LLM request scheduler with adaptive rate limits.
+
+Every agent called its provider as soon as it had a prompt. With parallel
+steps and concurrent projects that burst straight into the provider's
+RPM/TPM quota: the first 429 surfaced as an LLMError and stopped the
+workflow, even though waiting a few seconds would have succeeded, and a
+background validation call competed on equal terms with the refine request
+a user was waiting on. Now every provider call goes through one scheduler
+per process:
+
+- per-provider token buckets for requests/min and tokens/min
+  (LLM_PROVIDER_RPM / LLM_PROVIDER_TPM); without a configured limit a
+  provider is unthrottled until it answers 429
+- a 429 pauses the provider for its Retry-After (or retryDelay) and lowers
+  the request rate below what was just rejected; the rate creeps back up
+  while no 429 arrives (additive increase, multiplicative decrease)
+- queued calls are admitted by priority class - interactive (refine) >
+  generation > supervision > background - and round-robin across projects
+  within a class, so one busy project cannot starve the others
+- a rate-limited call is re-queued and retried instead of failing; only
+  after LLM_RATE_LIMIT_MAX_WAIT seconds of 429s does it raise RateLimitError
+- stats() reports queue-wait times per provider and class, queue depths,
+  429 counts and the learned limits (GET /api/providers/stats)
+
+Callers tag work with llm_context() / set_llm_context(); untagged calls are
+"generation" work.
+
+Usage:
+    with llm_context("supervision", project_id=project_id):
+        review = await call_llm(...)
+
+    result = await get_scheduler().run("gemini", lambda: module.call(...), estimated_tokens=1200)
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.exceptions import RateLimitError
+from app.core.logging import log
+from app.llm.token_estimator import get_token_estimator
+from app.llm.transport import ProviderRateLimited
+
+
+T = TypeVar("T")
+
+# Admission order: lower rank is served first
+PRIORITIES: Dict[str, int] = {"interactive": 0, "generation": 1, "supervision": 2, "background": 3}
+DEFAULT_PRIORITY = "generation"
+
+# Pause after a 429 that carries no Retry-After hint
+DEFAULT_COOLDOWN = 5.0
+# Learned request rate after a 429, relative to the rate that was rejected
+DECREASE_FACTOR = 0.75
+# Additive increase: +10% of the learned rate every INCREASE_INTERVAL seconds without a 429
+INCREASE_STEP = 0.1
+INCREASE_INTERVAL = 10.0
+WINDOW = 60.0
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+_project: ContextVar[Optional[str]] = ContextVar("llm_project", default=None)
+
+
+@contextmanager
+def llm_context(priority: Optional[str] = None, project_id: Optional[str] = None) -> Iterator[None]:
+    """Tag the LLM calls made inside the block with a priority class and/or project."""
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if project_id is not None:
+        tokens.append((_project, _project.set(project_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_llm_context(project_id: Optional[str] = None, priority: Optional[str] = None) -> None:
+    """Tag every LLM call of the current task (and the tasks it spawns), e.g. a workflow run."""
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+    if project_id is not None:
+        _project.set(project_id)
+    if priority is not None:
+        _priority.set(priority)
+
+
+def estimate_request_tokens(
+    prompt: str, system_prompt: str = "", max_tokens: int = 0, provider: Optional[str] = None
+) -> int:
+    """
+    Rough TPM charge for a request: the locally estimated input tokens (see
+    token_estimator.py) plus a quarter of the output budget. Reconciled with
+    the real usage afterwards.
+    """
+    estimator = get_token_estimator()
+    return estimator.estimate(system_prompt, provider) + estimator.estimate(prompt, provider) + max_tokens // 4
+
+
+class TokenBucket:
+    """Refills continuously at per_minute/60 per second, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]) -> None:
+        self.clock = clock
+        self.per_minute = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.per_minute)
+
+    def set_rate(self, per_minute: float) -> None:
+        self._refill()
+        self.per_minute = float(per_minute)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / WINDOW)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than the bucket wait for a full one)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing * WINDOW / self.per_minute) if missing > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) the difference between estimated and real usage."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain_to(self, level: float) -> None:
+        """Drop any saved-up burst above `level`."""
+        self._refill()
+        self.tokens = min(self.tokens, level)
+
+
+class ProviderLimiter:
+    """RPM/TPM buckets for one provider, tuned by the 429s it returns."""
+
+    def __init__(self, provider: str, rpm: Optional[int], tpm: Optional[int], clock: Callable[[], float]) -> None:
+        self.provider = provider
+        self.clock = clock
+        self.ceiling_rpm = rpm
+        self.requests: Optional[TokenBucket] = TokenBucket(rpm, clock) if rpm else None
+        self.tokens: Optional[TokenBucket] = TokenBucket(tpm, clock) if tpm else None
+        self.cooldown_until = 0.0
+        self.rate_limited = 0
+        self._recent: Deque[float] = deque()  # Admission times within the last minute
+        self._last_429: Optional[float] = None
+        self._last_increase = 0.0
+
+    def wait_time(self, tokens: int) -> float:
+        wait = max(0.0, self.cooldown_until - self.clock())
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def admit(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self._recent.append(self.clock())
+
+    def _trim(self) -> None:
+        horizon = self.clock() - WINDOW
+        while self._recent and self._recent[0] < horizon:
+            self._recent.popleft()
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> float:
+        """Back off after a 429; returns the pause in seconds."""
+        now = self.clock()
+        self.rate_limited += 1
+        self._last_429 = now
+        pause = retry_after if retry_after is not None and retry_after >= 0 else DEFAULT_COOLDOWN
+        self.cooldown_until = max(self.cooldown_until, now + pause)
+
+        # Multiplicative decrease below whatever rate was just rejected
+        self._trim()
+        rejected = float(len(self._recent))
+        if self.requests is not None:
+            rejected = min(self.requests.per_minute, rejected or self.requests.per_minute)
+        learned = max(1.0, rejected * DECREASE_FACTOR)
+        if self.requests is None:
+            self.requests = TokenBucket(learned, self.clock)
+        else:
+            self.requests.set_rate(learned)
+        # After the cooldown, pace requests at the new rate instead of bursting
+        self.requests.drain_to(1.0)
+        return pause
+
+    def on_success(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+        # Additive increase back towards the configured ceiling while 429-free
+        if self.requests is None or self._last_429 is None:
+            return
+        now = self.clock()
+        if now - self._last_429 < WINDOW or now - self._last_increase < INCREASE_INTERVAL:
+            return
+        self._last_increase = now
+        raised = self.requests.per_minute * (1 + INCREASE_STEP)
+        if self.ceiling_rpm is None:
+            self.requests.set_rate(raised)
+        else:
+            self.requests.set_rate(min(float(self.ceiling_rpm), raised))
+
+    def stats(self) -> Dict[str, Any]:
+        self._trim()
+        return {
+            "rpm_limit": round(self.requests.per_minute, 1) if self.requests is not None else None,
+            "rpm_configured": self.ceiling_rpm,
+            "tpm_limit": self.tokens.per_minute if self.tokens is not None else None,
+            "requests_last_minute": len(self._recent),
+            "rate_limited": self.rate_limited,
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - self.clock()), 2),
+        }
+
+
+@dataclass
+class Ticket:
+    """One admitted (or waiting) provider call."""
+    provider: str
+    tokens: int
+    priority: str
+    project_id: str
+    enqueued: float
+    deadline: float
+    attempts: int = 0
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+@dataclass
+class WaitStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_seconds": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_seconds": round(self.max, 3),
+        }
+
+
+class LLMScheduler:
+    """
+    Admits provider calls by priority and project fairness within each
+    provider's (configured or learned) rate limits.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[Dict[str, int]] = None,
+        tpm: Optional[Dict[str, int]] = None,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rpm = rpm if rpm is not None else settings.llm.provider_rpm
+        self.tpm = tpm if tpm is not None else settings.llm.provider_tpm
+        self.max_wait = max_wait if max_wait is not None else settings.llm.rate_limit_max_wait
+        self.clock = clock
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        # provider -> priority rank -> project -> waiting tickets (projects served round-robin)
+        self._queues: Dict[str, Dict[int, "OrderedDict[str, Deque[Ticket]]"]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._waits: Dict[Tuple[str, str], WaitStats] = {}
+        self._retries = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self._limiters:
+            self._limiters[provider] = ProviderLimiter(
+                provider, self.rpm.get(provider), self.tpm.get(provider), self.clock
+            )
+        return self._limiters[provider]
+
+    # ── Admission ─────────────────────────────────────────────────────────
+
+    async def acquire(
+        self,
+        provider: str,
+        estimated_tokens: int,
+        priority: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> Ticket:
+        """Wait for this call's turn and capacity."""
+        priority = priority or _priority.get()
+        now = self.clock()
+        ticket = Ticket(
+            provider=provider,
+            tokens=max(0, estimated_tokens),
+            priority=priority if priority in PRIORITIES else DEFAULT_PRIORITY,
+            project_id=project_id or _project.get() or "-",
+            enqueued=now,
+            deadline=now + self.max_wait,
+        )
+        await self._admit(ticket)
+        return ticket
+
+    async def _admit(self, ticket: Ticket) -> None:
+        self._bind_loop()
+        limiter = self.limiter(ticket.provider)
+        ticket.enqueued = self.clock()
+        if not self._waiting(ticket.provider) and limiter.wait_time(ticket.tokens) == 0:
+            limiter.admit(ticket.tokens)
+            self._record_wait(ticket)
+            return
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(ticket.provider, {})
+        queue.setdefault(PRIORITIES[ticket.priority], OrderedDict()).setdefault(ticket.project_id, deque()).append(ticket)
+        self._dispatch(ticket.provider)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self._discard(ticket)
+            raise
+
+    def _bind_loop(self) -> None:
+        # Waiters and timers belong to one event loop; start clean on a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queues.clear()
+            self._timers.clear()
+
+    def _waiting(self, provider: str) -> bool:
+        return any(projects for projects in self._queues.get(provider, {}).values())
+
+    def _next(self, provider: str) -> Optional[Ticket]:
+        queue = self._queues.get(provider, {})
+        for rank in sorted(queue):
+            for waiters in queue[rank].values():
+                if waiters:
+                    return waiters[0]
+        return None
+
+    def _pop(self, ticket: Ticket) -> None:
+        projects = self._queues[ticket.provider][PRIORITIES[ticket.priority]]
+        waiters = projects[ticket.project_id]
+        waiters.popleft()
+        if waiters:
+            projects.move_to_end(ticket.project_id)  # Round-robin across projects
+        else:
+            del projects[ticket.project_id]
+
+    def _discard(self, ticket: Ticket) -> None:
+        projects = self._queues.get(ticket.provider, {}).get(PRIORITIES[ticket.priority], {})
+        waiters = projects.get(ticket.project_id)
+        if waiters and ticket in waiters:
+            waiters.remove(ticket)
+            if not waiters:
+                del projects[ticket.project_id]
+        self._dispatch(ticket.provider)
+
+    def _dispatch(self, provider: str) -> None:
+        """Admit queued calls while capacity allows; otherwise wake up when it returns."""
+        timer = self._timers.pop(provider, None)
+        if timer is not None:
+            timer.cancel()
+        limiter = self.limiter(provider)
+        while (ticket := self._next(provider)) is not None:
+            if ticket.future.done():  # Cancelled while queued
+                self._pop(ticket)
+                continue
+            wait = limiter.wait_time(ticket.tokens)
+            if wait > 0:
+                self._timers[provider] = asyncio.get_running_loop().call_later(wait, self._dispatch, provider)
+                return
+            self._pop(ticket)
+            limiter.admit(ticket.tokens)
+            self._record_wait(ticket)
+            ticket.future.set_result(None)
+
+    def _record_wait(self, ticket: Ticket) -> None:
+        key = (ticket.provider, ticket.priority)
+        self._waits.setdefault(key, WaitStats()).add(self.clock() - ticket.enqueued)
+
+    # ── Outcomes ──────────────────────────────────────────────────────────
+
+    def complete(self, ticket: Ticket, actual_tokens: Optional[int] = None) -> None:
+        self.limiter(ticket.provider).on_success(ticket.tokens, actual_tokens)
+
+    def rate_limited(self, ticket: Ticket, error: ProviderRateLimited) -> bool:
+        """Record a 429. True if the call should be queued again, False once max_wait is spent."""
+        pause = self.limiter(ticket.provider).on_rate_limited(error.retry_after)
+        ticket.attempts += 1
+        if self.clock() + pause > ticket.deadline:
+            return False
+        self._retries += 1
+        log("LLM", f"⏳ {ticket.provider} rate limited - {ticket.priority} call for {ticket.project_id} "
+                   f"re-queued (retry in {pause:.1f}s, attempt {ticket.attempts})")
+        return True
+
+    async def retry(self, ticket: Ticket) -> None:
+        """Queue a rate-limited call again; it waits for the cooldown and its turn."""
+        await self._admit(ticket)
+
+    async def run(
+        self,
+        provider: str,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int,
+        priority: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> T:
+        """
+        Run `call` once admitted, retrying it on ProviderRateLimited.
+
+        Raises:
+            RateLimitError: if the provider kept rate-limiting past max_wait
+        """
+        ticket = await self.acquire(provider, estimated_tokens, priority, project_id)
+        while True:
+            try:
+                result = await call()
+            except ProviderRateLimited as e:
+                if not self.rate_limited(ticket, e):
+                    raise RateLimitError(provider, retries=ticket.attempts) from e
+                await self.retry(ticket)
+                continue
+            self.complete(ticket, usage_tokens(result))
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        providers: Dict[str, Any] = {}
+        for provider, limiter in self._limiters.items():
+            queue = self._queues.get(provider, {})
+            depth = {
+                name: sum(len(w) for w in queue.get(rank, {}).values())
+                for name, rank in PRIORITIES.items()
+            }
+            providers[provider] = {
+                **limiter.stats(),
+                "queue_depth": depth,
+                "wait": {
+                    name: stats.to_dict() for (p, name), stats in self._waits.items() if p == provider
+                },
+            }
+        return {"providers": providers, "retries": self._retries, "max_wait": self.max_wait}
+
+
+def usage_tokens(result: Any) -> Optional[int]:
+    """Total tokens reported by a provider response, if it reports any."""
+    if isinstance(result, dict) and isinstance(result.get("usage"), dict):
+        usage = result["usage"]
+        return int(usage.get("input", 0) or 0) + int(usage.get("output", 0) or 0)
+    return None
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler (one per API worker)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
@@ -0,0 +1,80 @@
+# app/llm/singleflight.py
+"""
+Singleflight coalescing of identical in-flight LLM calls.
+
+The response cache only helps once a response has been stored. Two browser
+tabs triggering the same step, a retry racing its original, or parallel
+entity loops issuing the same review prompt all missed the cache at the same
+moment and each paid full latency and cost. Now concurrent calls with the
+same request fingerprint share one provider call:
+
+- the first caller starts the call in its own task; later identical callers
+  await the same task instead of sending another request
+- a caller that is cancelled only stops waiting; the shared call is
+  cancelled once nobody is waiting for it any more
+- errors are shared too, so every caller sees the same LLMError
+- callers that must sample independently pass coalesce=False
+- stats() counts shared calls and the calls that joined them
+
+Usage:
+    flights = SingleFlight()
+    result, shared = await flights.do(key, lambda: provider_call(...))
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run fn() for key, or join the identical call already in flight.
+
+        Returns:
+            (result, shared) - shared is True if another caller's call was joined
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None and not flight.task.done() and flight.task.get_loop() is asyncio.get_running_loop()
+        if shared:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key: self._finished(key, task))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()  # Last one waiting - nobody needs the result
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so an error nobody awaited is not logged as lost
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), "calls": self.calls, "coalesced": self.coalesced}
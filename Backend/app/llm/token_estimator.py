@@ -0,0 +1,105 @@
+# app/llm/token_estimator.py
+"""
+Offline token estimates, calibrated per provider.
+
+Prompt size was never measured before sending: contexts were cut at fixed
+character counts (5 files, 2000 chars each, contracts at 15000 chars)
+whatever that came to in tokens. TokenEstimator now counts tokens locally,
+with no tokenizer download or network call:
+
+- text is split the way BPE tokenizers roughly split it (letter runs,
+  digit runs, punctuation runs, whitespace) and each piece is costed
+- each provider has a correction factor learned from the input counts the
+  providers already report (usage["input"]): after every call the adapter
+  passes the real count and the factor moves towards actual / counted
+- stats() shows each factor and the recent relative error, so drift is
+  visible in /api/providers/stats
+
+The context packer (context_packer.py) and the scheduler's TPM estimates
+use it.
+
+Usage:
+    estimator = get_token_estimator()
+    tokens = estimator.estimate(system_prompt + prompt, provider="gemini")
+    estimator.observe("gemini", system_prompt + prompt, usage["input"])
+"""
+import re
+from typing import Any, Dict, Optional
+
+
+_PIECES = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]+|_")
+
+# Starting factors before any usage has been seen (Claude's tokenizer is denser)
+DEFAULT_FACTORS = {"anthropic": 1.1}
+# Weight of one observation in the running factor
+LEARNING_RATE = 0.2
+# Calls smaller than this are dominated by per-request overhead - not learned from
+MIN_CALIBRATION_TOKENS = 200
+FACTOR_BOUNDS = (0.5, 2.0)
+
+
+def count_tokens(text: str) -> int:
+    """Uncalibrated local token count of text."""
+    if not text:
+        return 0
+    count = 0
+    for piece in _PIECES.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            count += (len(piece) + 3) // 4  # Common words are one token, identifiers split
+        elif first.isdigit():
+            count += (len(piece) + 2) // 3
+        elif first.isspace():
+            count += 0 if piece == " " else 1  # A single space merges into the next word
+        else:
+            count += (len(piece) + 1) // 2  # Operators like "):" and "==" are often one token
+    return count
+
+
+class TokenEstimator:
+    """Local token counts scaled by a per-provider factor learned from real usage."""
+
+    def __init__(self) -> None:
+        self._factors: Dict[str, float] = {}
+        self._errors: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+
+    def factor(self, provider: Optional[str]) -> float:
+        if provider is None:
+            return 1.0
+        return self._factors.get(provider, DEFAULT_FACTORS.get(provider, 1.0))
+
+    def estimate(self, text: str, provider: Optional[str] = None) -> int:
+        """Estimated input tokens of text for provider."""
+        return int(round(count_tokens(text) * self.factor(provider)))
+
+    def observe(self, provider: str, text: str, actual_tokens: int) -> None:
+        """Learn from a call whose input (text) the provider billed as actual_tokens."""
+        counted = count_tokens(text)
+        if counted < MIN_CALIBRATION_TOKENS or actual_tokens <= 0:
+            return
+        factor = self.factor(provider)
+        error = abs(counted * factor - actual_tokens) / actual_tokens
+        ratio = min(FACTOR_BOUNDS[1], max(FACTOR_BOUNDS[0], actual_tokens / counted))
+        self._factors[provider] = factor + LEARNING_RATE * (ratio - factor)
+        previous = self._errors.get(provider)
+        self._errors[provider] = error if previous is None else previous + LEARNING_RATE * (error - previous)
+        self._samples[provider] = self._samples.get(provider, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            provider: {
+                "factor": round(self._factors[provider], 3),
+                "samples": self._samples[provider],
+                "recent_error": round(self._errors[provider], 3),
+            }
+            for provider in self._factors
+        }
+
+
+_estimator = TokenEstimator()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Process-wide estimator shared by the adapter, scheduler and context packer."""
+    return _estimator
@@ -0,0 +1,204 @@
+# app/llm/transport.py
+"""
+Shared HTTP transport for LLM providers.
+
+One pooled, keep-alive aiohttp session per provider, owned by LLMAdapter.
+Reusing the session means DNS/TCP/TLS setup is paid once per connection
+instead of once per step, and the connector limit caps how many requests
+can be in flight to a provider at the same time.
+
+Sessions are bound to the event loop that created them. If the loop changes
+(e.g. asyncio.run() in scripts/tests), the pool is rebuilt transparently.
+"""
+import asyncio
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.logging import log
+
+
+class LLMTransport:
+    """
+    Process-wide connection pools for LLM providers.
+
+    Each provider gets its own ClientSession + TCPConnector so a slow or
+    saturated provider cannot starve connections for the others.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        dns_cache_ttl: Optional[int] = None,
+        provider_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_connections = max_connections or settings.llm.http_max_connections
+        self.keepalive_timeout = keepalive_timeout or settings.llm.http_keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl or settings.llm.http_dns_cache_ttl
+        self.provider_limits = dict(
+            provider_limits if provider_limits is not None else settings.llm.http_provider_limits
+        )
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._requests: Dict[str, int] = {}
+
+    def limit_for(self, provider: str) -> int:
+        """Connection limit for a provider (per-provider override or global default)."""
+        return self.provider_limits.get(provider, self.max_connections)
+
+    def session(self, provider: str) -> aiohttp.ClientSession:
+        """
+        Get the pooled session for a provider, creating it on first use.
+
+        Must be called from inside a running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions from a previous (possibly closed) loop are unusable
+            self._sessions = {}
+            self._loop = loop
+
+        session = self._sessions.get(provider)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit_for(provider),
+                limit_per_host=self.limit_for(provider),
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[provider] = session
+            log("LLM", f"🔌 Opened {provider} connection pool (limit={self.limit_for(provider)})")
+
+        self._requests[provider] = self._requests.get(provider, 0) + 1
+        return session
+
+    async def close(self) -> None:
+        """Close all provider sessions (called from FastAPI lifespan shutdown)."""
+        sessions = list(self._sessions.items())
+        self._sessions = {}
+        for provider, session in sessions:
+            try:
+                if not session.closed:
+                    await session.close()
+            except Exception as e:
+                log("LLM", f"⚠️ Failed to close {provider} pool: {e}")
+        if sessions:
+            # Give the SSL transports a tick to shut down cleanly
+            await asyncio.sleep(0)
+            log("LLM", f"🔌 Closed {len(sessions)} LLM connection pool(s)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-provider pool usage for monitoring."""
+        pools = {}
+        for provider, session in self._sessions.items():
+            connector = session.connector
+            pools[provider] = {
+                "limit": self.limit_for(provider),
+                "closed": session.closed,
+                "requests": self._requests.get(provider, 0),
+                "acquired": len(getattr(connector, "_acquired", ())) if connector else 0,
+            }
+        return {"pools": pools, "keepalive_timeout": self.keepalive_timeout}
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[aiohttp.ClientSession] = None):
+    """
+    Yield the pooled session if one was provided, otherwise a throwaway one.
+
+    Providers use this so they still work when called directly (scripts,
+    tests) without going through LLMAdapter.
+    """
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession() as temp_session:
+        yield temp_session
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RATE LIMITS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class ProviderRateLimited(Exception):
+    """HTTP 429 from a provider, with the server's requested delay if it sent one."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PrefixCacheExpired(Exception):
+    """The provider no longer has the cached prompt prefix a request referenced."""
+
+
+_RETRY_DELAY = re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"')
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]], body: str = "") -> Optional[float]:
+    """
+    Delay requested by a 429: the Retry-After header (seconds or HTTP date),
+    else Gemini's RetryInfo "retryDelay": "17s" in the body. None if absent.
+    """
+    value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = _RETRY_DELAY.search(body or "")
+    return float(match.group(1)) if match else None
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# STREAM READERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def stream_timeout() -> aiohttp.ClientTimeout:
+    """
+    Timeout for streamed completions.
+
+    A long generation legitimately runs past the request timeout, so streams
+    are bounded by an idle read timeout instead of a total deadline.
+    """
+    return aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=settings.llm.request_timeout)
+
+
+async def iter_sse_data(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """
+    Yield the `data:` payload of each Server-Sent Event in a response.
+
+    Multi-line data fields are joined with newlines; comments and other
+    fields (event:, id:, retry:) are ignored.
+    """
+    data_lines: List[str] = []
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip(" "))
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+async def iter_ndjson(response: aiohttp.ClientResponse) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one decoded JSON object per line of a newline-delimited JSON stream."""
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if line:
+            yield json.loads(line)
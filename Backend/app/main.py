@@ -2,6 +2,7 @@
 """
 GenCode Studio Backend - Clean Architecture
 """
+import asyncio
 import os
 import uvicorn
 from contextlib import asynccontextmanager
@@ -22,7 +23,7 @@ from slowapi.middleware import SlowAPIMiddleware
 from app.core.config import settings
 from app.lib.websocket import ConnectionManager
 from app.workflow import resume_workflow
-from app.lib.monitoring import register_monitoring
+from app.lib.monitoring import register_monitoring, register_websocket_metrics
 from app.core.logging import log
 from app.api import (
     health,
@@ -97,9 +98,43 @@ async def lifespan(app: FastAPI):
     # Initialize ArborMind metrics database (Mocked/SQLite)
     log("Main", "📊 ArborMind metrics database initialized")
     
+    # Deliver broadcasts from workflows running in other API workers
+    from app.lib.broadcast_bus import create_broadcast_bus
+    await manager.attach_bus(create_broadcast_bus())
+    
+    # Container state/health from docker events (replaces inspect/ps polling)
+    if settings.sandbox.docker_events_enabled:
+        from app.sandbox.container_state import get_container_states
+        await get_container_states().start()
+    
+    # Warm the sandbox pool in the background (first run builds golden images)
+    pool_task = None
+    if settings.sandbox.pool_enabled:
+        from app.sandbox.pool import initialize_pool
+        pool_task = asyncio.create_task(initialize_pool())
+    
     yield
     
     log("Main", "🔌 Shutting down...")
+    await manager.detach_bus()
+    await manager.close_all()
+    if pool_task is not None:
+        pool_task.cancel()
+        from app.sandbox.pool import get_sandbox_pool
+        await get_sandbox_pool().shutdown()
+    from app.sandbox.test_worker import shutdown_test_workers
+    await shutdown_test_workers()
+    from app.sandbox.container_state import stop_container_states
+    await stop_container_states()
+    from app.sandbox.docker_api import close_docker_api
+    await close_docker_api()
+    from app.llm import close_llm
+    await close_llm()
+    # Drain queued ledger events before the process exits
+    from app.arbormind.observation.execution_ledger import close_ledger
+    await asyncio.to_thread(close_ledger)
+    from app.validation import shutdown_validation_pool
+    await asyncio.to_thread(shutdown_validation_pool)
     await disconnect_db()
     
 
@@ -119,6 +154,7 @@ app.state.manager = manager
 # Monitoring
 
 register_monitoring(app)
+register_websocket_metrics(manager)
 
 # CORS - FIX #9: Use environment variable for allowed origins
 # In production, set CORS_ORIGINS to comma-separated list of allowed origins
@@ -175,6 +211,7 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str):
         await manager.disconnect(websocket, project_id)
     except Exception as e:
         log("WebSocket", f"Error: {e}")
+        await manager.disconnect(websocket, project_id)
 
 
 # ---------------------------------------------------------------------------
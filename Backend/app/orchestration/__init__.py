@@ -38,6 +38,7 @@ from .budget_manager import (
 )
 from .token_policy import (
     get_tokens_for_step,
+    get_input_budget,
     get_step_description,
     STEP_TOKEN_POLICIES,
 )
@@ -57,6 +58,7 @@ __all__ = [
     "reset_budget_manager",
     # Token policy (step-specific token allocation)
     "get_tokens_for_step",
+    "get_input_budget",
     "get_step_description",
     "STEP_TOKEN_POLICIES",
 ]
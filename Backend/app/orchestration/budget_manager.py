@@ -10,6 +10,7 @@ Key Features:
 - Dynamic attempt limiting based on remaining budget
 - Skippable steps for graceful degradation
 - Real token tracking from API responses
+- Cached prompt-prefix tokens priced at the provider's cached-input rate
 
 Usage:
     budget = BudgetManager()
@@ -24,8 +25,8 @@ Usage:
             # Critical step - abort
             raise BudgetExhaustedError()
     
-    # After LLM call:
-    budget.register_usage(input_tokens=5000, output_tokens=3000)
+    # After LLM call (cached_tokens: part of input_tokens served from the prompt cache):
+    budget.register_usage(input_tokens=5000, output_tokens=3000, cached_tokens=4000)
 """
 from __future__ import annotations
 from dataclasses import dataclass, field
@@ -68,6 +69,8 @@ class BudgetConfig:
     # Using higher estimates to ensure we don't exceed budget
     flash_input_usd_per_mtok: float = 0.30   # Actual: ~$0.15, using 2x buffer
     flash_output_usd_per_mtok: float = 2.50  # Actual: ~$0.60, using 4x buffer
+    # Cached input (context caching) is billed at 25% of the input rate
+    flash_cached_input_usd_per_mtok: float = 0.075
     
     # Step-level policies
     step_policies: Dict[str, StepPolicy] = field(default_factory=lambda: {
@@ -145,7 +148,7 @@ class BudgetManager:
     def _reset_run_state(self):
         """Reset state for a new run."""
         self.used_usd: float = 0.0
-        self.used_tokens: Dict[str, int] = {"input": 0, "output": 0}
+        self.used_tokens: Dict[str, int] = {"input": 0, "output": 0, "cached": 0}
         self.step_usage: Dict[str, Dict[str, int]] = {}  # Per-step tracking
         self.call_log: List[Dict] = []  # Detailed call log
         self.run_started_at: Optional[str] = None
@@ -164,12 +167,14 @@ class BudgetManager:
         """Maximum budget in USD."""
         return self.config.max_inr_per_run / self.config.usd_to_inr
     
-    def _estimate_cost_usd(self, input_tokens: int, output_tokens: int) -> float:
-        """Estimate cost in USD for given token counts."""
+    def _estimate_cost_usd(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        """Estimate cost in USD for given token counts (cached_tokens is a subset of input_tokens)."""
         c = self.config
-        in_usd = (input_tokens / 1_000_000) * c.flash_input_usd_per_mtok
+        cached_tokens = min(cached_tokens, input_tokens)
+        in_usd = ((input_tokens - cached_tokens) / 1_000_000) * c.flash_input_usd_per_mtok
+        cached_usd = (cached_tokens / 1_000_000) * c.flash_cached_input_usd_per_mtok
         out_usd = (output_tokens / 1_000_000) * c.flash_output_usd_per_mtok
-        return in_usd + out_usd
+        return in_usd + cached_usd + out_usd
     
     def _remaining_usd(self) -> float:
         """Remaining budget in USD."""
@@ -248,23 +253,30 @@ class BudgetManager:
         step: str = "",
         agent: str = "",
         is_retry: bool = False,
+        cached_tokens: int = 0,
+        model: str = "",
     ):
         """
         Call this after each ACTUAL Gemini call,
         using the real 'usage' object from the API response.
+        
+        cached_tokens is the part of input_tokens the provider served from its
+        prompt cache (usage["cached"]).
         """
         with self._lock:
-            cost = self._estimate_cost_usd(input_tokens, output_tokens)
+            cost = self._estimate_cost_usd(input_tokens, output_tokens, cached_tokens)
             self.used_usd += cost
             self.used_tokens["input"] += input_tokens
             self.used_tokens["output"] += output_tokens
+            self.used_tokens["cached"] += cached_tokens
             
             # Track per-step usage
             if step:
                 if step not in self.step_usage:
-                    self.step_usage[step] = {"input": 0, "output": 0, "calls": 0, "retries": 0}
+                    self.step_usage[step] = {"input": 0, "output": 0, "cached": 0, "calls": 0, "retries": 0}
                 self.step_usage[step]["input"] += input_tokens
                 self.step_usage[step]["output"] += output_tokens
+                self.step_usage[step]["cached"] += cached_tokens
                 self.step_usage[step]["calls"] += 1
                 if is_retry:
                     self.step_usage[step]["retries"] += 1
@@ -276,6 +288,8 @@ class BudgetManager:
                 "agent": agent,
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
+                "cached_tokens": cached_tokens,
+                "model": model,
                 "cost_usd": cost,
                 "is_retry": is_retry,
                 "remaining_usd": self._remaining_usd(),
@@ -390,6 +404,7 @@ def get_budget_for_api(project_id: str) -> dict:
             return {
                 "total_input_tokens": 0,
                 "total_output_tokens": 0,
+                "total_cached_tokens": 0,
                 "total_tokens": 0,
                 "total_estimated_cost": 0.0,
                 "by_step": {},
@@ -471,6 +486,7 @@ def get_budget_for_api(project_id: str) -> dict:
     return {
         "total_input_tokens": summary["tokens"]["input"],
         "total_output_tokens": summary["tokens"]["output"],
+        "total_cached_tokens": summary["tokens"]["cached"],
         "total_tokens": summary["tokens"]["input"] + summary["tokens"]["output"],
         "total_estimated_cost": summary["used_usd"],
         "total_cost_inr": summary["used_inr"],
@@ -4,106 +4,307 @@ FAST v2 Checkpoint Manager
 
 Stores SAFE checkpoints of each FAST step.
 Persists project state to disk for rollback and debugging.
+
+V2 storage layout (content-addressed, deduplicated):
+
+    .fast_checkpoints/
+        blobs/ab/abcdef...      zlib-compressed file content, keyed by sha256
+        manifests/{step}_{ts}.json
+                                meta + {rel_path: {"hash", "size", "mtime_ns"}}
+
+A snapshot only reads files whose (size, mtime_ns) differ from the previous
+manifest, and only writes blobs that do not exist yet. Old manifests beyond
+the retention limit are pruned and unreferenced blobs garbage-collected.
+Legacy `{step}_{ts}/` directory checkpoints are still readable.
 """
 import os
 import json
-import shutil
+import zlib
 import asyncio
+import hashlib
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+from app.core.profiling import phase
+
+
+SNAPSHOT_EXTENSIONS = ('.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.css', '.html', '.env')
+SNAPSHOT_IGNORE_DIRS = {".git", ".fast_checkpoints", ".fast_index", "node_modules", "__pycache__", "venv", ".venv"}
+
+# One lock per checkpoint directory: GC must not race a save that has written
+# blobs but not yet its manifest (managers are created per call).
+_store_locks: Dict[str, threading.Lock] = {}
+_store_locks_guard = threading.Lock()
+
+
+def _store_lock(base_dir: str) -> threading.Lock:
+    key = os.path.abspath(base_dir)
+    with _store_locks_guard:
+        return _store_locks.setdefault(key, threading.Lock())
+
 
 class CheckpointManagerV2:
     """
     Stores SAFE checkpoints of each FAST step.
     Does NOT store broken artifacts.
     """
-    
-    def __init__(self, base_dir: str = ".fast_checkpoints"):
+
+    def __init__(self, base_dir: str = ".fast_checkpoints", keep_per_step: Optional[int] = None):
         self.base_dir = base_dir
-        os.makedirs(self.base_dir, exist_ok=True)
+        self.blobs_dir = os.path.join(base_dir, "blobs")
+        self.manifests_dir = os.path.join(base_dir, "manifests")
+        if keep_per_step is None:
+            from app.core.config import settings
+            keep_per_step = settings.workflow.checkpoint_keep_per_step
+        self.keep_per_step = keep_per_step
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        self._lock = _store_lock(base_dir)
 
     async def save_project_snapshot(self, project_path: Path, step: str, **metadata) -> str:
         """
         Capture the entire project state from disk.
         Async wrapper for blocking IO.
         """
-        return await asyncio.to_thread(self._save_project_snapshot_sync, project_path, step, **metadata)
+        with phase("snapshot"):
+            return await asyncio.to_thread(self._save_project_snapshot_sync, project_path, step, **metadata)
 
     def _save_project_snapshot_sync(self, project_path: Path, step: str, **metadata) -> str:
-        """Sync implementation of project capture."""
-        files = {}
-        ignore_dirs = {".git", ".fast_checkpoints", "node_modules", "__pycache__", "venv", ".venv"}
-        
-        for root, dirs, filenames in os.walk(project_path):
-            dirs[:] = [d for d in dirs if d not in ignore_dirs]
-            for filename in filenames:
-                if filename.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.css', '.html', '.env')):
+        """Sync implementation of project capture (delta against the previous manifest)."""
+        previous = self._latest_manifest()
+        prev_entries = previous.get("entries", {}) if previous else {}
+        entries: Dict[str, Dict[str, Any]] = {}
+        stats = {"reused": 0, "hashed": 0, "blobs_written": 0}
+
+        with self._lock:
+            for root, dirs, filenames in os.walk(project_path):
+                dirs[:] = [d for d in dirs if d not in SNAPSHOT_IGNORE_DIRS]
+                for filename in filenames:
+                    if not filename.endswith(SNAPSHOT_EXTENSIONS):
+                        continue
                     filepath = Path(root) / filename
                     try:
                         rel_path = str(filepath.relative_to(project_path))
-                        files[rel_path] = filepath.read_text(encoding='utf-8')
+                        st = filepath.stat()
+                        prev = prev_entries.get(rel_path)
+                        if (
+                            prev
+                            and prev.get("size") == st.st_size
+                            and prev.get("mtime_ns") == st.st_mtime_ns
+                            and self._has_blob(prev["hash"])
+                        ):
+                            entries[rel_path] = prev
+                            stats["reused"] += 1
+                            continue
+                        data = filepath.read_text(encoding='utf-8').encode("utf-8")
                     except Exception:
-                        pass
-        
-        return self.save(step, files, **metadata)
+                        continue
+                    digest, written = self._put_blob(data)
+                    entries[rel_path] = {"hash": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                    stats["hashed"] += 1
+                    stats["blobs_written"] += int(written)
+
+            path = self._write_manifest(step, entries, stats, metadata)
+        self._maybe_gc(step)
+        return path
 
     def save(self, step: str, files: Dict[str, str], **metadata):
         """
         Save a checkpoint for a step using provided file content.
         """
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        directory = os.path.join(self.base_dir, f"{step}_{ts}")
-        os.makedirs(directory, exist_ok=True)
-
-        for rel_path, content in files.items():
-            safe_rel = rel_path.replace("\\", "/").lstrip("/")
-            full_path = os.path.join(directory, safe_rel)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, "w", encoding="utf-8") as f:
-                f.write(content)
-
-        # Save metadata
+        entries: Dict[str, Dict[str, Any]] = {}
+        stats = {"reused": 0, "hashed": 0, "blobs_written": 0}
+        with self._lock:
+            for rel_path, content in files.items():
+                safe_rel = rel_path.replace("\\", "/").lstrip("/")
+                data = content.encode("utf-8")
+                digest, written = self._put_blob(data)
+                entries[safe_rel] = {"hash": digest, "size": len(data)}
+                stats["hashed"] += 1
+                stats["blobs_written"] += int(written)
+            path = self._write_manifest(step, entries, stats, metadata)
+        self._maybe_gc(step)
+        return path
+
+    def get_latest(self, step: str) -> Optional[Dict[str, str]]:
+        """Get the latest checkpoint for a step."""
+        names = self._manifest_names(step)
+        if names:
+            manifest = self._read_json(os.path.join(self.manifests_dir, names[-1]))
+            if manifest is not None:
+                return {
+                    rel_path: self._get_blob(entry["hash"]).decode("utf-8")
+                    for rel_path, entry in manifest.get("entries", {}).items()
+                }
+        return self._get_latest_legacy(step)
+
+    def list_checkpoints(self, step: str = None) -> list:
+        """List all checkpoints, optionally filtered by step."""
+        checkpoints = []
+        for name in self._manifest_names(step):
+            manifest = self._read_json(os.path.join(self.manifests_dir, name))
+            if manifest is not None:
+                manifest.pop("entries", None)
+                checkpoints.append(manifest)
+
+        for name in self._legacy_dirs(step):
+            meta = self._read_json(os.path.join(self.base_dir, name, "meta.json"))
+            if meta is not None:
+                checkpoints.append(meta)
+
+        return sorted(checkpoints, key=lambda x: x.get("timestamp", ""), reverse=True)
+
+    def gc(self) -> Dict[str, int]:
+        """
+        Prune manifests beyond keep_per_step and delete unreferenced blobs.
+
+        Returns counts of removed manifests and blobs.
+        """
+        removed = {"manifests": 0, "blobs": 0}
+        with self._lock:
+            if self.keep_per_step > 0:
+                by_step: Dict[str, List[str]] = {}
+                for name in self._manifest_names():
+                    manifest = self._read_json(os.path.join(self.manifests_dir, name))
+                    step = manifest.get("step") if manifest else None
+                    by_step.setdefault(step or name, []).append(name)
+                for names in by_step.values():
+                    for name in names[:-self.keep_per_step]:
+                        try:
+                            os.remove(os.path.join(self.manifests_dir, name))
+                            removed["manifests"] += 1
+                        except OSError:
+                            pass
+
+            referenced = set()
+            for name in self._manifest_names():
+                manifest = self._read_json(os.path.join(self.manifests_dir, name))
+                if manifest is None:
+                    continue
+                referenced.update(e["hash"] for e in manifest.get("entries", {}).values())
+
+            for shard in os.listdir(self.blobs_dir):
+                shard_dir = os.path.join(self.blobs_dir, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for blob in os.listdir(shard_dir):
+                    if blob not in referenced:
+                        try:
+                            os.remove(os.path.join(shard_dir, blob))
+                            removed["blobs"] += 1
+                        except OSError:
+                            pass
+        return removed
+
+    # ------------------------------------------------------------------
+    # Blob store
+    # ------------------------------------------------------------------
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def _has_blob(self, digest: str) -> bool:
+        return os.path.exists(self._blob_path(digest))
+
+    def _put_blob(self, data: bytes) -> tuple:
+        """Store data under its sha256. Returns (digest, written)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp_path, path)
+        return digest, True
+
+    def _get_blob(self, digest: str) -> bytes:
+        with open(self._blob_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    # ------------------------------------------------------------------
+    # Manifests
+    # ------------------------------------------------------------------
+
+    def _write_manifest(self, step: str, entries: Dict[str, Dict[str, Any]], stats: Dict[str, int], metadata: Dict[str, Any]) -> str:
+        # Microseconds keep several snapshots per second of one step distinct
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         meta = {
             "step": step,
             "timestamp": ts,
-            "files": list(files.keys())
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "files": sorted(entries),
+            "dedup": stats,
         }
         meta.update(metadata) # Merge extra metadata
-        with open(os.path.join(directory, "meta.json"), "w") as f:
-            json.dump(meta, f, indent=2)
-            
-        return directory
+        meta["entries"] = entries
 
-    def get_latest(self, step: str) -> Optional[Dict[str, str]]:
-        """Get the latest checkpoint for a step."""
-        if not os.path.exists(self.base_dir):
-            return None
+        path = os.path.join(self.manifests_dir, f"{step}_{ts}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, path)
+        return path
 
-        # Find all checkpoints for this step
-        checkpoints = []
-        for name in os.listdir(self.base_dir):
-            if name.startswith(f"{step}_"):
-                checkpoints.append(name)
+    def _maybe_gc(self, step: str) -> None:
+        """Run GC once a step exceeds its retention limit (called outside the lock)."""
+        if self.keep_per_step > 0 and len(self._manifest_names(step)) > self.keep_per_step:
+            self.gc()
 
-        if not checkpoints:
+    def _manifest_names(self, step: Optional[str] = None) -> List[str]:
+        """Manifest file names (oldest first), optionally for one step."""
+        try:
+            names = [n for n in os.listdir(self.manifests_dir) if n.endswith(".json")]
+        except OSError:
+            return []
+        if step is not None:
+            names = [n for n in names if self._name_matches(n[:-5], step)]
+        return sorted(names, key=lambda n: n[:-5].rsplit("_", 3)[-3:])
+
+    @staticmethod
+    def _name_matches(stem: str, step: str) -> bool:
+        # Stems are "{step}_{YYYYmmdd}_{HHMMSS}_{micro}"; step names contain "_" too
+        return stem.rsplit("_", 3)[0] == step
+
+    def _latest_manifest(self) -> Optional[Dict[str, Any]]:
+        names = self._manifest_names()
+        if not names:
             return None
+        return self._read_json(os.path.join(self.manifests_dir, names[-1]))
 
-        # Sort by timestamp (newest first)
-        checkpoints.sort(reverse=True)
-        latest_dir = os.path.join(self.base_dir, checkpoints[0])
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Legacy directory checkpoints (pre-V2 stores)
+    # ------------------------------------------------------------------
+
+    def _legacy_dirs(self, step: Optional[str] = None) -> List[str]:
+        try:
+            names = os.listdir(self.base_dir)
+        except OSError:
+            return []
+        return sorted(
+            n for n in names
+            if n not in ("blobs", "manifests")
+            and (step is None or n.startswith(f"{step}_"))
+            and os.path.isdir(os.path.join(self.base_dir, n))
+        )
 
-        # Load metadata
-        meta_path = os.path.join(latest_dir, "meta.json")
-        if not os.path.exists(meta_path):
-            # Fallback: traverse dir
-            pass
-        else:
-            with open(meta_path, "r") as f:
-                meta = json.load(f)
+    def _get_latest_legacy(self, step: str) -> Optional[Dict[str, str]]:
+        checkpoints = self._legacy_dirs(step)
+        if not checkpoints:
+            return None
+        latest_dir = os.path.join(self.base_dir, checkpoints[-1])
 
-        # Load files recursively
         files = {}
         for root, _, filenames in os.walk(latest_dir):
             for filename in filenames:
@@ -113,22 +314,3 @@ class CheckpointManagerV2:
                 files[rel_path] = full_path.read_text(encoding="utf-8")
 
         return files
-
-    def list_checkpoints(self, step: str = None) -> list:
-        """List all checkpoints, optionally filtered by step."""
-        if not os.path.exists(self.base_dir):
-            return []
-
-        checkpoints = []
-        for name in os.listdir(self.base_dir):
-            if step is None or name.startswith(f"{step}_"):
-                meta_path = os.path.join(self.base_dir, name, "meta.json")
-                if os.path.exists(meta_path):
-                    try:
-                        with open(meta_path, "r") as f:
-                            meta = json.load(f)
-                        checkpoints.append(meta)
-                    except:
-                        pass
-
-        return sorted(checkpoints, key=lambda x: x.get("timestamp", ""), reverse=True)
@@ -11,13 +11,18 @@ from typing import Any, Dict, List, Optional
 from pathlib import Path
 from datetime import datetime
 import traceback
+from dataclasses import replace
 
+from app.core.config import settings
 from app.core.logging import log, log_section
+from app.core.profiling import phase, set_current_step, reset_current_step
 from app.orchestration.utils import broadcast_to_project, pluralize
 from app.orchestration.task_graph import TaskGraph
 from app.orchestration.context import CrossStepContext
 from app.orchestration.structural_compiler import StructuralCompiler
 from app.orchestration.checkpoint import CheckpointManagerV2
+from app.orchestration.workspace_index import WorkspaceIndex
+from app.core.project_files import invalidate_project_files
 from app.orchestration.state import WorkflowStateManager
 from app.core.constants import WSMessageType
 from app.utils.entity_discovery import discover_primary_entity, extract_all_models_from_models_py
@@ -131,6 +136,9 @@ class FASTOrchestratorV2(OrchestrationGuard):
         self.cross_ctx = CrossStepContext.get_or_create(project_id)
         self.compiler = StructuralCompiler()
         self.checkpoint = CheckpointManagerV2(base_dir=str(project_path / ".fast_checkpoints"))
+        self.workspace_index = WorkspaceIndex(project_path)
+        self._step_changes: Dict[str, set] = {}  # Open file-tracking scopes
+        self._checkpoint_lock = asyncio.Lock()
         
         self.completed_steps = []
         if self.is_refinement:
@@ -161,7 +169,9 @@ class FASTOrchestratorV2(OrchestrationGuard):
                     step=step,
                     input_tokens=usage.get("input", 0),
                     output_tokens=usage.get("output", 0),
-                    model=self.model or "gemini-2.0-flash-exp" # Default to flash if not set
+                    cached_tokens=usage.get("cached", 0),
+                    # A hedged backup that answered names its own model
+                    model=usage.get("model") or self.model or "gemini-2.0-flash-exp" # Default to flash if not set
                 )
         except Exception as e:
             # Non-critical - don't crash workflow on metrics
@@ -172,7 +182,7 @@ class FASTOrchestratorV2(OrchestrationGuard):
         Execute the branch.
         Minimal logic, only execution.
         """
-        from app.handlers import HANDLERS, STEP_AGENTS
+        from app.handlers import HANDLERS
         from app.orchestration.state import CURRENT_MANAGERS
         
         # ArborMind Imports (Phase 2)
@@ -182,13 +192,19 @@ class FASTOrchestratorV2(OrchestrationGuard):
         from app.arbormind.runtime.observer import observe
         from app.arbormind.cognition.execution_report import ExecutionReport
         from app.arbormind.runtime.execution_router import ExecutionRouter
-        from app.arbormind.runtime.decision import ExecutionAction
         from app.orchestration.budget_manager import get_budget_manager
 
         # 1️⃣ ENTRY POINT — Initialize Tree + Root Branch
         # Create root branch - capture input only
         from app.arbormind.core.archetypes import get_archetype
         
+        # Subprocesses started by this run (and its step tasks) are killed on force-stop
+        from app.core.process_runner import set_process_owner
+        set_process_owner(self.project_id)
+        # LLM calls are queued per project; refinements are a user waiting on a reply
+        from app.llm.scheduler import set_llm_context
+        set_llm_context(self.project_id, "interactive" if self.is_refinement else None)
+
         # Initialize budget for this run
         self.budget = get_budget_manager(self.project_id)
         self.budget.start_run()
@@ -261,6 +277,11 @@ class FASTOrchestratorV2(OrchestrationGuard):
             steps = self.graph.get_steps()
             step_idx = 0
             
+            if settings.workflow.parallel_steps and not self.is_refinement:
+                # Dependency-aware scheduling: independent steps overlap
+                await self._run_steps_parallel(steps, HANDLERS, branch_to_execute)
+                step_idx = len(steps)
+            
             while step_idx < len(steps):
                 step = steps[step_idx]
                 step_idx += 1
@@ -273,452 +294,8 @@ class FASTOrchestratorV2(OrchestrationGuard):
                 if not handler:
                     continue
 
-                log("FAST-V2", f"▶️ Executing: {step}")
-                step_start = datetime.now()
-                
-                # 🧠 SQLITE: Record step decision (start) - "I choose to run this tool"
-                agent_name = STEP_AGENTS.get(step, "System")
-                record_decision_event(
-                    run_id=self.run_id,
-                    step=step,
-                    agent=agent_name,
-                    decision="RUN_TOOL",
-                    reason=f"Starting step: {step}",
-                )
-                
-                # 📊 METRICS: Start step tracking (Legacy removed)
-                step_order = steps.index(step)
-                # if self.run_id:
-                #     try:
-                #         start_step(self.run_id, step, step_order)
-                #     except Exception as me:
-                #         log("METRICS", f"⚠️ Failed to start step metrics: {me}")
-
-                # ───────────────────────────────────────────────────────────────
-                # 📸 PHASE 3: Step State Snapshot - ENTRY (Horizontal Continuity)
-                # ───────────────────────────────────────────────────────────────
-                try:
-                    record_step_entry(self.run_id, step)
-                except Exception:
-                    pass  # SSS must never crash execution
-
-                try:
-                    # ──────────────────────────────────────────────────────────────────
-                    # 🧠 PHASE 9: Centralized Decision Making (ExecutionRouter)
-                    # ──────────────────────────────────────────────────────────────────
-                    router = ExecutionRouter()
-                    
-                    decision = router.decide(
-                        branch=branch_to_execute,
-                        context={
-                            "expected_outputs": 1,  # Handlers expect at least 1 file
-                            "step": step,
-                        }
-                    )
-                    
-                    # ──────────────────────────────────────────────────────────────────
-                    # 📊 PHASE 9: Observational Recording (Non-blocking)
-                    # ──────────────────────────────────────────────────────────────────
-                    record_decision_event(
-                        run_id=self.run_id,
-                        step=step,
-                        agent="ROUTER",
-                        decision=decision.action.value,
-                        reason=decision.reason
-                    )
-                    
-                    # ──────────────────────────────────────────────────────────────────
-                    # 🔧 Execute Based on Decision
-                    # ──────────────────────────────────────────────────────────────────
-                    result = None
-                    
-                    if decision.action == ExecutionAction.STOP:
-                        log("FAST-V2", f"🛑 ExecutionRouter decided to STOP: {decision.reason}")
-                        self.failed_steps.append(step)
-                        self.step_results[step] = {"status": "stopped", "reason": decision.reason}
-                        break
-                    
-                    elif decision.action == ExecutionAction.HEAL:
-                        log("FAST-V2", f"🩹 Healing requested: {decision.reason}")
-                        self.failed_steps.append(step)
-                        self.step_results[step] = {"status": "healed", "reason": decision.reason}
-                        break
-
-                    elif decision.action == ExecutionAction.MUTATE:
-                        log("FAST-V2", f"🧬 Mutation requested: {decision.reason}")
-                        self.failed_steps.append(step)
-                        self.step_results[step] = {"status": "mutated", "reason": decision.reason}
-                        break
-                    elif decision.action == ExecutionAction.RUN_TOOL:
-                        # Phase-1: Take filesystem snapshot BEFORE execution for relative change detection
-                        before_snapshot = self._get_project_snapshot()
-                        
-                        # ═══════════════════════════════════════════════════════
-                        # TOOL PLANNING: Build and execute capability-based plan
-                        # ═══════════════════════════════════════════════════════
-                        # Step → Capabilities → Tools → Ordered Execution
-                        try:
-                            # Build tool plan from step capabilities
-                            tool_plan = await build_tool_plan(
-                                step=step,
-                                branch=branch_to_execute,
-                                goal=f"Execute {step} step for {self.user_request[:100]}...",
-                            )
-                            
-                            log("FAST-V2", f"📋 Tool plan: {' → '.join(tool_plan.tool_names)}")
-                            
-                            # Execute the tool plan (linear, observable)
-                            plan_result = await execute_tool_plan(tool_plan, branch_to_execute)
-                            
-                            # Extract result for downstream compatibility
-                            result = plan_result.final_output
-                            
-                            # If tool plan failed, wrap for handler compatibility
-                            if not plan_result.success:
-                                log("FAST-V2", f"❌ Tool plan failed: {plan_result.error}")
-                                result = StepExecutionResult(
-                                    outcome=StepOutcome.HARD_FAILURE,
-                                    data={"error": plan_result.error},
-                                    artifacts={},
-                                )
-                        except StepFailure as sf:
-                            log("FAST-V2", f"❌ Step failure: {sf}")
-                            result = StepExecutionResult(
-                                outcome=StepOutcome.HARD_FAILURE,
-                                data={"error": str(sf)},
-                                artifacts={},
-                            )
-                        except Exception as e:
-                            # Fallback to legacy handler if tool planning fails
-                            log("FAST-V2", f"⚠️ Tool planning failed, falling back to handler: {e}")
-                            result = await handler(branch_to_execute)
-                        
-                        # Register token usage (Budget Manager)
-                        self._register_usage(step, result)
-
-                        # Phase-1: Take filesystem snapshot AFTER execution
-                        after_snapshot = self._get_project_snapshot()
-                        
-                        # ═══════════════════════════════════════════════════════
-                        # PHASE-0/1: FILE TRACKING AND RETRY LOGIC
-                        # ═══════════════════════════════════════════════════════
-                        
-                        # Get execution policy for this step
-                        policy = get_execution_policy(step)
-                        
-                        # Phase-1: Compute actual files created/modified on disk
-                        # This is the "Truth" observed by the Orchestrator
-                        files_generated = self._compute_file_delta(before_snapshot, after_snapshot)
-                        
-                        # Phase-0: Register files created
-                        if files_generated:
-                            self._register_step_files_from_paths(step, files_generated)
-                        
-                        # Phase-1: Check if ARTIFACT step produced output
-                        if policy.mode == ExecutionMode.ARTIFACT and policy.requires_output:
-                            if not files_generated or len(files_generated) == 0:
-                                log("FAST-V2", f"⚠️ ARTIFACT step '{step}' produced ZERO files")
-                                log("FAST-V2", f"   Policy: requires_output=True, is_fatal={policy.is_fatal}")
-                                
-                                # Check if retry is allowed
-                                if self._should_retry_step(step):
-                                    log("FAST-V2", f"🔄 Phase-1: Attempting retry for {step}")
-                                    
-                                    # Phase-0: Rollback any partial files
-                                    self._rollback_step(step)
-                                    
-                                    # Phase-1: Retry with hardened prompt
-                                    # Note: retry also does snapshots inside its loop logic if needed, 
-                                    # but here we just take the final result.
-                                    retry_before = self._get_project_snapshot()
-                                    retry_success, retry_result = await self._retry_step_with_hardened_prompt(
-                                        step, handler, branch_to_execute
-                                    )
-                                    retry_after = self._get_project_snapshot()
-                                    
-                                    if retry_success:
-                                        log("FAST-V2", f"✅ Retry succeeded for {step}")
-                                        result = retry_result
-                                        
-                                        # Register usage for retry
-                                        self._register_usage(step, result)
-                                        
-                                        files_generated = self._compute_file_delta(retry_before, retry_after)
-                                        if files_generated:
-                                            self._register_step_files_from_paths(step, files_generated)
-                                    else:
-                                        log("FAST-V2", f"❌ Retry FAILED for {step}")
-                                        
-                                        # Generate halt artifact
-                                        halt_artifact = self._generate_halt_artifact(
-                                            step_name=step,
-                                            reason="Zero files produced after retry",
-                                            attempts=2
-                                        )
-                                        
-                                        # Record failure
-                                        self.failed_steps.append(step)
-                                        self.step_results[step] = {
-                                            "status": "failed",
-                                            "reason": "zero_files_after_retry",
-                                            "halt_artifact": halt_artifact
-                                        }
-                                        
-                                        # 🧠 ARBORMIND LEARNING: Ingest failure (canonical)
-                                        ingest_failure(
-                                            run_id=self.run_id,
-                                            step=step,
-                                            primary_class=FailureClass.F1_INVARIANT_VIOLATION,
-                                            scope=FailureScope.STEP_LOCAL,
-                                            raw_error="Zero files produced after retry",
-                                            agent=agent_name,
-                                            retry_index=1,
-                                            is_hard_failure=policy.is_fatal,
-                                        )
-                                        
-                                        # Phase-1: If fatal, stop workflow
-                                        if policy.is_fatal:
-                                            log("FAST-V2", f"🛑 FATAL: {step} failed after retry - HALTING WORKFLOW")
-                                            break
-                                        else:
-                                            log("FAST-V2", f"⚠️ NON-FATAL: {step} failed but continuing")
-                                            continue  # Skip to next step
-                                else:
-                                    # No retry allowed, but empty output
-                                    log("FAST-V2", f"❌ {step} produced zero files (no retry allowed)")
-                                    
-                                    # Generate halt artifact (attempt 1 only)
-                                    halt_artifact = self._generate_halt_artifact(
-                                        step_name=step,
-                                        reason="Zero files produced",
-                                        attempts=1
-                                    )
-                                    
-                                    self.failed_steps.append(step)
-                                    self.step_results[step] = {
-                                        "status": "failed",
-                                        "reason": "zero_files",
-                                        "halt_artifact": halt_artifact
-                                    }
-                                    
-                                    # 🧠 ARBORMIND LEARNING: Ingest failure (canonical)
-                                    # ingest_failure(
-                                    #     run_id=self.run_id,
-                                    #     step=step,
-                                    #     primary_class=FailureClass.F1_INVARIANT_VIOLATION,
-                                    #     scope=FailureScope.STEP_LOCAL,
-                                    #     raw_error="Zero files produced (no retry allowed)",
-                                    #     agent=agent_name,
-                                    #     retry_index=0,
-                                    #     is_hard_failure=policy.is_fatal,
-                                    # )
-                                    
-                                    if policy.is_fatal:
-                                        log("FAST-V2", f"🛑 FATAL: {step} produced zero files - HALTING WORKFLOW")
-                                        break
-                                    else:
-                                        log("FAST-V2", f"⚠️ NON-FATAL: {step} produced zero files but continuing")
-                                        continue
-                        
-                        # ═══════════════════════════════════════════════════════
-                        # EXISTING FAILURE HANDLING (after Phase-0/1 checks)
-                        # ═══════════════════════════════════════════════════════
-                        
-                        # 🛑 CRITICAL: FailureBoundary catches exceptions and returns StepExecutionResult
-                        # We MUST check if the result indicates failure
-                        if isinstance(result, StepExecutionResult):
-                            if result.outcome != StepOutcome.SUCCESS:
-                                log("FAST-V2", f"⚠️ Step {step} returned failure: {result.outcome.value}")
-                                log("FAST-V2", f"   Error: {result.error_details}")
-                                
-                                # ═══════════════════════════════════════════════════════
-                                # PHASE 2: Failure Severity Classification
-                                # ═══════════════════════════════════════════════════════
-                                # Map StepOutcome to failure code for severity lookup
-                                failure_code = {
-                                    StepOutcome.HARD_FAILURE: "RepeatedInvariant",
-                                    StepOutcome.COGNITIVE_FAILURE: "SupervisorRejection",
-                                    StepOutcome.ENVIRONMENT_FAILURE: "InfraTransient",
-                                }.get(result.outcome, "QualityWarning")
-                                
-                                severity = get_failure_severity(failure_code)
-                                is_fatal_failure = severity == FailureSeverity.FATAL
-                                
-                                self.failed_steps.append(step)
-                                self.step_results[step] = {
-                                    "status": "failed",
-                                    "outcome": result.outcome.value,
-                                    "error": result.error_details,
-                                    "severity": severity.value,  # Track severity
-                                }
-                                
-                                # 🧠 SQLITE: Update decision with failure
-                                duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
-                                # 🧠 OBSERVATION: Update decision with failure
-                                duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
-                                record_step_exit(
-                                    run_id=self.run_id,
-                                    step=step,
-                                    status="FAILED"
-                                )
-                                
-                                # 🧠 OBSERVATION: Record specific failure details (telemetry)
-                                record_failure_event(
-                                    run_id=self.run_id,
-                                    step=step,
-                                    origin="STEP_LOGIC",
-                                    signal=result.outcome.value,
-                                    message=result.error_details or "Unknown error",
-                                )
-                                
-                                # 🧠 ARBORMIND LEARNING: Ingest canonical failure
-                                # Map StepOutcome to FailureClass
-                                failure_class_map = {
-                                    StepOutcome.HARD_FAILURE: FailureClass.F1_INVARIANT_VIOLATION,
-                                    StepOutcome.COGNITIVE_FAILURE: FailureClass.F4_QUALITY_REJECTION,
-                                    StepOutcome.ENVIRONMENT_FAILURE: FailureClass.F9_EXTERNAL_FAILURE,
-                                }
-                                canonical_class = failure_class_map.get(
-                                    result.outcome, 
-                                    FailureClass.F7_RUNTIME_EXCEPTION
-                                )
-                                
-                                # ingest_failure(
-                                #     run_id=self.run_id,
-                                #     step=step,
-                                #     primary_class=canonical_class,
-                                #     scope=FailureScope.STEP_LOCAL if step not in self.CRITICAL_STEPS else FailureScope.CROSS_STEP,
-                                #     raw_error=result.error_details or "Unknown error",
-                                #     agent=agent_name,
-                                #     retry_index=0,
-                                #     is_hard_failure=is_fatal_failure or step in self.CRITICAL_STEPS,
-                                # )
-                                
-                                # ═══════════════════════════════════════════════════════
-                                # PHASE 2: Only FATAL failures or CRITICAL STEPS stop the workflow
-                                # ═══════════════════════════════════════════════════════
-                                if is_fatal_failure or step in self.CRITICAL_STEPS:
-                                    log("FAST-V2", f"🛑 FATAL: Step {step} failed (or is critical) - stopping workflow")
-                                    
-                                    # Generate halt artifact before stopping
-                                    self._generate_halt_artifact(
-                                        step_name=step,
-                                        reason=f"Step failed with outcome: {result.outcome.value}",
-                                        attempts=1 # Regular failures don't have Phase-1 auto-retries yet
-                                    )
-                                    
-                                    if step in self.CRITICAL_STEPS:
-                                        break
-                                    elif is_fatal_failure:
-                                        break
-                                else:
-                                    # This handles the User's "Signal, not Stop" requirement
-                                    log("FAST-V2", f"⚠️ NON-FATAL SIGNAL: Step {step} failed - continuing branch per stabilization rules")
-                                    # Continue to next step
-                    
-                    duration = (datetime.now() - step_start).total_seconds()
-
-                    # VALIDATE OUTPUT (Gate, not cognition)
-                    validation_passed = self._validate_step_output(step)
-                    
-                    if not validation_passed:
-                        log("FAST-V2", f"🛑 Step {step} validation failed. Reporting failure.")
-                        self.failed_steps.append(step)
-                        self.step_results[step] = {"status": "failed", "reason": "validation_failed"}
-                        break # Stop on failure
-
-                    # PERSISTENCE (Muscle)
-                    await self._save_checkpoint(step)
-                    await self._record_step_context(step, result)
-                    
-                    self.completed_steps.append(step)
-                    self.step_results[step] = {"status": "ok", "duration": duration}
-
-                    # Handle Legacy StepResult flow control (e.g. Refine -> Preview)
-                    if isinstance(result, StepResult) and result.nextstep:
-                        # Map WorkflowStep enum to string if needed
-                        next_step_str = result.nextstep.value if hasattr(result.nextstep, "value") else str(result.nextstep)
-                        
-                        # Only append if not already in queue and not complete
-                        # Note: FAST V2 usually strictly follows graph, but Refine is dynamic
-                        if next_step_str not in steps and next_step_str != "complete":
-                            log("FAST-V2", f"🔀 Dynamic step transition: {step} -> {next_step_str}")
-                            steps.append(next_step_str)
-                    
-
-                    
-                    # 🧠 SQLITE: Update decision with success and metrics
-                    duration_ms = int(duration * 1000)
-                    artifacts_count = 0
-                    if result and isinstance(result, StepExecutionResult) and result.data:
-                         # Extract artifacts count if possible (handlers typically return generated files list)
-                         files = result.data.get("files", []) or result.data.get("modified_files", [])
-                         artifacts_count = len(files) if isinstance(files, list) else 0
-
-                    update_decision_outcome(
-                        run_id=self.run_id,
-                        step=step,
-                        outcome="success",
-                        duration_ms=duration_ms,
-                        artifacts_count=artifacts_count
-                    )
-                    
-                    # ───────────────────────────────────────────────────────────────
-                    # 📸 PHASE 3: Step State Snapshot - EXIT (Horizontal Continuity)
-                    # ───────────────────────────────────────────────────────────────
-                    try:
-                        record_step_exit(self.run_id, step, self.project_path)
-                    except Exception:
-                        pass  # SSS must never crash execution
-                    
-                    if self.run_id:
-                        # complete_step(self.run_id, step, True, 1)
-                        pass
-
-                except Exception as e:
-                    log("FAST-V2", f"❌ {step} failed: {e}")
-                    self.failed_steps.append(step)
-                    self.step_results[step] = {"status": "error", "error": str(e)}
-                    
-                    # 🧠 SQLITE: Update decision with exception failure
-                    duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
-                    update_decision_outcome(
-                        run_id=self.run_id,
-                        step=step,
-                        outcome="failure",
-                        duration_ms=duration_ms,
-                        artifacts_count=0
-                    )
-
-                    import traceback
-                    tb_str = traceback.format_exc()
-                    
-                    # 🧠 SQLITE: Record failure (telemetry)
-                    record_failure(
-                        run_id=self.run_id,
-                        step=step,
-                        failure_type="exception",
-                        message=str(e),
-                        stack_trace=tb_str,
-                    )
-                    
-                    # 🧠 ARBORMIND LEARNING: Ingest canonical failure (F7 Runtime Exception)
-                    ingest_runtime_exception(
-                        run_id=self.run_id,
-                        step=step,
-                        exception_info=f"{str(e)}\n{tb_str}",
-                        agent=agent_name,
-                    )
-                    
-                    # ───────────────────────────────────────────────────────────────
-                    # 📸 PHASE 3: Step State Snapshot - EXIT on FAILURE
-                    # ───────────────────────────────────────────────────────────────
-                    try:
-                        record_step_exit(self.run_id, step, self.project_path)
-                    except Exception:
-                        pass  # SSS must never crash execution
-                    
-                    break # Stop on exception
+                if await self._execute_step(step, handler, steps, branch_to_execute):
+                    break
 
             # WORKFLOW COMPLETE
             total_duration = (datetime.now() - start_time).total_seconds()
@@ -772,10 +349,563 @@ class FASTOrchestratorV2(OrchestrationGuard):
                 # complete_pipeline_run(self.run_id, False, "crash", str(e))
                 pass
         finally:
+            self.workspace_index.close()
             from app.orchestration.state import CURRENT_MANAGERS
             CURRENT_MANAGERS.pop(self.project_id, None)
             await WorkflowStateManager.stop_workflow(self.project_id)
 
+    async def _execute_step(self, step: str, handler, steps: List[str], branch_to_execute) -> bool:
+        """
+        Execute ONE step end to end (decision, tools, file tracking, failure
+        handling, persistence).
+
+        Shared by the sequential loop and the parallel scheduler.
+
+        Returns:
+            True if the workflow must HALT, False to proceed.
+        """
+        # Per-step copy: retries rewrite intent (retry prompt, temperature), and
+        # parallel steps must never see each other's overrides
+        if branch_to_execute is not None:
+            branch_to_execute = replace(branch_to_execute, intent=dict(branch_to_execute.intent))
+        # Benchmarks: attribute phase timings (snapshot, ledger, llm...) to this step
+        token = set_current_step(step)
+        try:
+            with phase("step"):
+                return await self._execute_step_body(step, handler, steps, branch_to_execute)
+        finally:
+            reset_current_step(token)
+
+    async def _execute_step_body(self, step: str, handler, steps: List[str], branch_to_execute) -> bool:
+        """Body of _execute_step (runs inside the step's profiling scope)."""
+        from app.handlers import STEP_AGENTS
+        from app.arbormind.runtime.decision import ExecutionAction
+
+        log("FAST-V2", f"▶️ Executing: {step}")
+        step_start = datetime.now()
+
+        # 🧠 SQLITE: Record step decision (start) - "I choose to run this tool"
+        agent_name = STEP_AGENTS.get(step, "System")
+        record_decision_event(
+            run_id=self.run_id,
+            step=step,
+            agent=agent_name,
+            decision="RUN_TOOL",
+            reason=f"Starting step: {step}",
+        )
+
+        # 📊 METRICS: Start step tracking (Legacy removed)
+        step_order = steps.index(step)
+        # if self.run_id:
+        #     try:
+        #         start_step(self.run_id, step, step_order)
+        #     except Exception as me:
+        #         log("METRICS", f"⚠️ Failed to start step metrics: {me}")
+
+        # ───────────────────────────────────────────────────────────────
+        # 📸 PHASE 3: Step State Snapshot - ENTRY (Horizontal Continuity)
+        # ───────────────────────────────────────────────────────────────
+        try:
+            record_step_entry(self.run_id, step)
+        except Exception:
+            pass  # SSS must never crash execution
+
+        try:
+            # ──────────────────────────────────────────────────────────────────
+            # 🧠 PHASE 9: Centralized Decision Making (ExecutionRouter)
+            # ──────────────────────────────────────────────────────────────────
+            router = ExecutionRouter()
+
+            decision = router.decide(
+                branch=branch_to_execute,
+                context={
+                    "expected_outputs": 1,  # Handlers expect at least 1 file
+                    "step": step,
+                }
+            )
+
+            # ──────────────────────────────────────────────────────────────────
+            # 📊 PHASE 9: Observational Recording (Non-blocking)
+            # ──────────────────────────────────────────────────────────────────
+            record_decision_event(
+                run_id=self.run_id,
+                step=step,
+                agent="ROUTER",
+                decision=decision.action.value,
+                reason=decision.reason
+            )
+
+            # ──────────────────────────────────────────────────────────────────
+            # 🔧 Execute Based on Decision
+            # ──────────────────────────────────────────────────────────────────
+            result = None
+
+            if decision.action == ExecutionAction.STOP:
+                log("FAST-V2", f"🛑 ExecutionRouter decided to STOP: {decision.reason}")
+                self.failed_steps.append(step)
+                self.step_results[step] = {"status": "stopped", "reason": decision.reason}
+                return True
+
+            elif decision.action == ExecutionAction.HEAL:
+                log("FAST-V2", f"🩹 Healing requested: {decision.reason}")
+                self.failed_steps.append(step)
+                self.step_results[step] = {"status": "healed", "reason": decision.reason}
+                return True
+
+            elif decision.action == ExecutionAction.MUTATE:
+                log("FAST-V2", f"🧬 Mutation requested: {decision.reason}")
+                self.failed_steps.append(step)
+                self.step_results[step] = {"status": "mutated", "reason": decision.reason}
+                return True
+            elif decision.action == ExecutionAction.RUN_TOOL:
+                # Phase-1: Open this step's file-tracking scope BEFORE execution
+                # so the post-step delta reports only what this step changed
+                self._begin_file_tracking(step)
+
+                # ═══════════════════════════════════════════════════════
+                # TOOL PLANNING: Build and execute capability-based plan
+                # ═══════════════════════════════════════════════════════
+                # Step → Capabilities → Tools → Ordered Execution
+                try:
+                    # Build tool plan from step capabilities
+                    tool_plan = await build_tool_plan(
+                        step=step,
+                        branch=branch_to_execute,
+                        goal=f"Execute {step} step for {self.user_request[:100]}...",
+                    )
+
+                    log("FAST-V2", f"📋 Tool plan: {' → '.join(tool_plan.tool_names)}")
+
+                    # Execute the tool plan (linear, observable)
+                    plan_result = await execute_tool_plan(tool_plan, branch_to_execute)
+
+                    # Extract result for downstream compatibility
+                    result = plan_result.final_output
+
+                    # If tool plan failed, wrap for handler compatibility
+                    if not plan_result.success:
+                        log("FAST-V2", f"❌ Tool plan failed: {plan_result.error}")
+                        result = StepExecutionResult(
+                            outcome=StepOutcome.HARD_FAILURE,
+                            data={"error": plan_result.error},
+                            artifacts={},
+                        )
+                except StepFailure as sf:
+                    log("FAST-V2", f"❌ Step failure: {sf}")
+                    result = StepExecutionResult(
+                        outcome=StepOutcome.HARD_FAILURE,
+                        data={"error": str(sf)},
+                        artifacts={},
+                    )
+                except Exception as e:
+                    # Fallback to legacy handler if tool planning fails
+                    log("FAST-V2", f"⚠️ Tool planning failed, falling back to handler: {e}")
+                    result = await handler(branch_to_execute)
+
+                # Register token usage (Budget Manager)
+                self._register_usage(step, result)
+
+                # Phase-1: Close the file-tracking scope AFTER execution
+                step_files = self._end_file_tracking(step)
+
+                # ═══════════════════════════════════════════════════════
+                # PHASE-0/1: FILE TRACKING AND RETRY LOGIC
+                # ═══════════════════════════════════════════════════════
+
+                # Get execution policy for this step
+                policy = get_execution_policy(step)
+
+                # Phase-1: Compute actual files created/modified on disk
+                # This is the "Truth" observed by the Orchestrator
+                files_generated = step_files
+
+                # Phase-0: Register files created
+                if files_generated:
+                    self._register_step_files_from_paths(step, files_generated)
+
+                # Phase-1: Check if ARTIFACT step produced output
+                if policy.mode == ExecutionMode.ARTIFACT and policy.requires_output:
+                    if not files_generated or len(files_generated) == 0:
+                        log("FAST-V2", f"⚠️ ARTIFACT step '{step}' produced ZERO files")
+                        log("FAST-V2", f"   Policy: requires_output=True, is_fatal={policy.is_fatal}")
+
+                        # Check if retry is allowed
+                        if self._should_retry_step(step):
+                            log("FAST-V2", f"🔄 Phase-1: Attempting retry for {step}")
+
+                            # Phase-0: Rollback any partial files
+                            self._rollback_step(step)
+
+                            # Phase-1: Retry with hardened prompt
+                            # Note: retry also does snapshots inside its loop logic if needed, 
+                            # but here we just take the final result.
+                            self._begin_file_tracking(step)
+                            retry_success, retry_result = await self._retry_step_with_hardened_prompt(
+                                step, handler, branch_to_execute
+                            )
+                            retry_files = self._end_file_tracking(step)
+
+                            if retry_success:
+                                log("FAST-V2", f"✅ Retry succeeded for {step}")
+                                result = retry_result
+
+                                # Register usage for retry
+                                self._register_usage(step, result)
+
+                                files_generated = retry_files
+                                if files_generated:
+                                    self._register_step_files_from_paths(step, files_generated)
+                            else:
+                                log("FAST-V2", f"❌ Retry FAILED for {step}")
+
+                                # Generate halt artifact
+                                halt_artifact = self._generate_halt_artifact(
+                                    step_name=step,
+                                    reason="Zero files produced after retry",
+                                    attempts=2
+                                )
+
+                                # Record failure
+                                self.failed_steps.append(step)
+                                self.step_results[step] = {
+                                    "status": "failed",
+                                    "reason": "zero_files_after_retry",
+                                    "halt_artifact": halt_artifact
+                                }
+
+                                # 🧠 ARBORMIND LEARNING: Ingest failure (canonical)
+                                ingest_failure(
+                                    run_id=self.run_id,
+                                    step=step,
+                                    primary_class=FailureClass.F1_INVARIANT_VIOLATION,
+                                    scope=FailureScope.STEP_LOCAL,
+                                    raw_error="Zero files produced after retry",
+                                    agent=agent_name,
+                                    retry_index=1,
+                                    is_hard_failure=policy.is_fatal,
+                                )
+
+                                # Phase-1: If fatal, stop workflow
+                                if policy.is_fatal:
+                                    log("FAST-V2", f"🛑 FATAL: {step} failed after retry - HALTING WORKFLOW")
+                                    return True
+                                else:
+                                    log("FAST-V2", f"⚠️ NON-FATAL: {step} failed but continuing")
+                                    return False  # Skip to next step
+                        else:
+                            # No retry allowed, but empty output
+                            log("FAST-V2", f"❌ {step} produced zero files (no retry allowed)")
+
+                            # Generate halt artifact (attempt 1 only)
+                            halt_artifact = self._generate_halt_artifact(
+                                step_name=step,
+                                reason="Zero files produced",
+                                attempts=1
+                            )
+
+                            self.failed_steps.append(step)
+                            self.step_results[step] = {
+                                "status": "failed",
+                                "reason": "zero_files",
+                                "halt_artifact": halt_artifact
+                            }
+
+                            # 🧠 ARBORMIND LEARNING: Ingest failure (canonical)
+                            # ingest_failure(
+                            #     run_id=self.run_id,
+                            #     step=step,
+                            #     primary_class=FailureClass.F1_INVARIANT_VIOLATION,
+                            #     scope=FailureScope.STEP_LOCAL,
+                            #     raw_error="Zero files produced (no retry allowed)",
+                            #     agent=agent_name,
+                            #     retry_index=0,
+                            #     is_hard_failure=policy.is_fatal,
+                            # )
+
+                            if policy.is_fatal:
+                                log("FAST-V2", f"🛑 FATAL: {step} produced zero files - HALTING WORKFLOW")
+                                return True
+                            else:
+                                log("FAST-V2", f"⚠️ NON-FATAL: {step} produced zero files but continuing")
+                                return False
+
+                # ═══════════════════════════════════════════════════════
+                # EXISTING FAILURE HANDLING (after Phase-0/1 checks)
+                # ═══════════════════════════════════════════════════════
+
+                # 🛑 CRITICAL: FailureBoundary catches exceptions and returns StepExecutionResult
+                # We MUST check if the result indicates failure
+                if isinstance(result, StepExecutionResult):
+                    if result.outcome != StepOutcome.SUCCESS:
+                        log("FAST-V2", f"⚠️ Step {step} returned failure: {result.outcome.value}")
+                        log("FAST-V2", f"   Error: {result.error_details}")
+
+                        # ═══════════════════════════════════════════════════════
+                        # PHASE 2: Failure Severity Classification
+                        # ═══════════════════════════════════════════════════════
+                        # Map StepOutcome to failure code for severity lookup
+                        failure_code = {
+                            StepOutcome.HARD_FAILURE: "RepeatedInvariant",
+                            StepOutcome.COGNITIVE_FAILURE: "SupervisorRejection",
+                            StepOutcome.ENVIRONMENT_FAILURE: "InfraTransient",
+                        }.get(result.outcome, "QualityWarning")
+
+                        severity = get_failure_severity(failure_code)
+                        is_fatal_failure = severity == FailureSeverity.FATAL
+
+                        self.failed_steps.append(step)
+                        self.step_results[step] = {
+                            "status": "failed",
+                            "outcome": result.outcome.value,
+                            "error": result.error_details,
+                            "severity": severity.value,  # Track severity
+                        }
+
+                        # 🧠 SQLITE: Update decision with failure
+                        duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
+                        # 🧠 OBSERVATION: Update decision with failure
+                        duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
+                        record_step_exit(
+                            run_id=self.run_id,
+                            step=step,
+                            status="FAILED"
+                        )
+
+                        # 🧠 OBSERVATION: Record specific failure details (telemetry)
+                        record_failure_event(
+                            run_id=self.run_id,
+                            step=step,
+                            origin="STEP_LOGIC",
+                            signal=result.outcome.value,
+                            message=result.error_details or "Unknown error",
+                        )
+
+                        # 🧠 ARBORMIND LEARNING: Ingest canonical failure
+                        # Map StepOutcome to FailureClass
+                        failure_class_map = {
+                            StepOutcome.HARD_FAILURE: FailureClass.F1_INVARIANT_VIOLATION,
+                            StepOutcome.COGNITIVE_FAILURE: FailureClass.F4_QUALITY_REJECTION,
+                            StepOutcome.ENVIRONMENT_FAILURE: FailureClass.F9_EXTERNAL_FAILURE,
+                        }
+                        canonical_class = failure_class_map.get(
+                            result.outcome, 
+                            FailureClass.F7_RUNTIME_EXCEPTION
+                        )
+
+                        # ingest_failure(
+                        #     run_id=self.run_id,
+                        #     step=step,
+                        #     primary_class=canonical_class,
+                        #     scope=FailureScope.STEP_LOCAL if step not in self.CRITICAL_STEPS else FailureScope.CROSS_STEP,
+                        #     raw_error=result.error_details or "Unknown error",
+                        #     agent=agent_name,
+                        #     retry_index=0,
+                        #     is_hard_failure=is_fatal_failure or step in self.CRITICAL_STEPS,
+                        # )
+
+                        # ═══════════════════════════════════════════════════════
+                        # PHASE 2: Only FATAL failures or CRITICAL STEPS stop the workflow
+                        # ═══════════════════════════════════════════════════════
+                        if is_fatal_failure or step in self.CRITICAL_STEPS:
+                            log("FAST-V2", f"🛑 FATAL: Step {step} failed (or is critical) - stopping workflow")
+
+                            # Generate halt artifact before stopping
+                            self._generate_halt_artifact(
+                                step_name=step,
+                                reason=f"Step failed with outcome: {result.outcome.value}",
+                                attempts=1 # Regular failures don't have Phase-1 auto-retries yet
+                            )
+
+                            if step in self.CRITICAL_STEPS:
+                                return True
+                            elif is_fatal_failure:
+                                return True
+                        else:
+                            # This handles the User's "Signal, not Stop" requirement
+                            log("FAST-V2", f"⚠️ NON-FATAL SIGNAL: Step {step} failed - continuing branch per stabilization rules")
+                            # Continue to next step
+
+            duration = (datetime.now() - step_start).total_seconds()
+
+            # VALIDATE OUTPUT (Gate, not cognition)
+            validation_passed = self._validate_step_output(step)
+
+            if not validation_passed:
+                log("FAST-V2", f"🛑 Step {step} validation failed. Reporting failure.")
+                self.failed_steps.append(step)
+                self.step_results[step] = {"status": "failed", "reason": "validation_failed"}
+                return True # Stop on failure
+
+            # PERSISTENCE (Muscle)
+            await self._save_checkpoint(step)
+            await self._record_step_context(step, result)
+
+            self.completed_steps.append(step)
+            self.step_results[step] = {"status": "ok", "duration": duration}
+
+            # Handle Legacy StepResult flow control (e.g. Refine -> Preview)
+            if isinstance(result, StepResult) and result.nextstep:
+                # Map WorkflowStep enum to string if needed
+                next_step_str = result.nextstep.value if hasattr(result.nextstep, "value") else str(result.nextstep)
+
+                # Only append if not already in queue and not complete
+                # Note: FAST V2 usually strictly follows graph, but Refine is dynamic
+                if next_step_str not in steps and next_step_str != "complete":
+                    log("FAST-V2", f"🔀 Dynamic step transition: {step} -> {next_step_str}")
+                    steps.append(next_step_str)
+
+
+
+            # 🧠 SQLITE: Update decision with success and metrics
+            duration_ms = int(duration * 1000)
+            artifacts_count = 0
+            if result and isinstance(result, StepExecutionResult) and result.data:
+                 # Extract artifacts count if possible (handlers typically return generated files list)
+                 files = result.data.get("files", []) or result.data.get("modified_files", [])
+                 artifacts_count = len(files) if isinstance(files, list) else 0
+
+            update_decision_outcome(
+                run_id=self.run_id,
+                step=step,
+                outcome="success",
+                duration_ms=duration_ms,
+                artifacts_count=artifacts_count
+            )
+
+            # ───────────────────────────────────────────────────────────────
+            # 📸 PHASE 3: Step State Snapshot - EXIT (Horizontal Continuity)
+            # ───────────────────────────────────────────────────────────────
+            try:
+                record_step_exit(self.run_id, step, self.project_path)
+            except Exception:
+                pass  # SSS must never crash execution
+
+            if self.run_id:
+                # complete_step(self.run_id, step, True, 1)
+                pass
+
+        except Exception as e:
+            log("FAST-V2", f"❌ {step} failed: {e}")
+            self.failed_steps.append(step)
+            self.step_results[step] = {"status": "error", "error": str(e)}
+
+            # 🧠 SQLITE: Update decision with exception failure
+            duration_ms = int((datetime.now() - step_start).total_seconds() * 1000)
+            update_decision_outcome(
+                run_id=self.run_id,
+                step=step,
+                outcome="failure",
+                duration_ms=duration_ms,
+                artifacts_count=0
+            )
+
+            import traceback
+            tb_str = traceback.format_exc()
+
+            # 🧠 SQLITE: Record failure (telemetry)
+            record_failure(
+                run_id=self.run_id,
+                step=step,
+                failure_type="exception",
+                message=str(e),
+                stack_trace=tb_str,
+            )
+
+            # 🧠 ARBORMIND LEARNING: Ingest canonical failure (F7 Runtime Exception)
+            ingest_runtime_exception(
+                run_id=self.run_id,
+                step=step,
+                exception_info=f"{str(e)}\n{tb_str}",
+                agent=agent_name,
+            )
+
+            # ───────────────────────────────────────────────────────────────
+            # 📸 PHASE 3: Step State Snapshot - EXIT on FAILURE
+            # ───────────────────────────────────────────────────────────────
+            try:
+                record_step_exit(self.run_id, step, self.project_path)
+            except Exception:
+                pass  # SSS must never crash execution
+
+            return True # Stop on exception
+
+        return False
+
+    async def _run_steps_parallel(self, steps: List[str], handlers: Dict[str, Any], branch_to_execute) -> None:
+        """
+        Run steps as soon as their dependencies settle, overlapping independent ones.
+        
+        A step starts when every dependency has finished (completed OR failed -
+        the sequential loop also proceeds past non-fatal failures), its file
+        scope does not overlap a running step, and the concurrency cap allows.
+        A HALT stops new launches; running steps are allowed to finish. If the
+        scheduler itself is cancelled (force-stop) or crashes, running steps
+        are cancelled with it.
+        """
+        max_parallel = max(1, settings.workflow.max_parallel_steps)
+        started = set()
+        if self.resume_from_checkpoint:
+            for step in self.completed_steps:
+                if step in steps:
+                    log("FAST-V2", f"⏭️ Skipping completed step: {step}")
+                    started.add(step)
+        running: Dict[asyncio.Task, str] = {}
+        halted = False
+        
+        try:
+            while True:
+                if not halted:
+                    settled = list(self.completed_steps) + list(self.failed_steps)
+                    for step in self.graph.get_parallel_batch(settled):
+                        if len(running) >= max_parallel:
+                            break
+                        if step in started or step not in steps:
+                            continue
+                        if any(self.graph.scopes_conflict(step, other) for other in running.values()):
+                            continue
+                        started.add(step)
+                        handler = handlers.get(step)
+                        if not handler:
+                            self.completed_steps.append(step)  # Nothing to run - unblock dependents
+                            continue
+                    
+                        overlapping = sorted(running.values())
+                        if overlapping:
+                            log("FAST-V2", f"⏩ Parallel: {step} overlaps {', '.join(overlapping)}")
+                            record_decision_event(
+                                run_id=self.run_id,
+                                step=step,
+                                agent="SCHEDULER",
+                                decision="PARALLEL_START",
+                                reason=f"Overlaps with: {', '.join(overlapping)}",
+                            )
+                        task = asyncio.create_task(self._execute_step(step, handler, steps, branch_to_execute))
+                        running[task] = step
+            
+                if not running:
+                    break
+            
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = running.pop(task)
+                    try:
+                        halt = task.result()
+                    except Exception as e:
+                        log("FAST-V2", f"❌ {step} crashed in scheduler: {e}")
+                        self.failed_steps.append(step)
+                        self.step_results[step] = {"status": "error", "error": str(e)}
+                        halt = True
+                    if halt and not halted:
+                        halted = True
+                        if running:
+                            log("FAST-V2", f"🛑 {step} halted the workflow - waiting for {', '.join(sorted(running.values()))}")
+        finally:
+            # Force-stop / scheduler crash: never leave step tasks running detached
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
     def _validate_step_output(self, step: str) -> bool:
         """Minimal output validation gate."""
         # For now, just return True or implement very basic file existence checks
@@ -794,12 +924,14 @@ class FASTOrchestratorV2(OrchestrationGuard):
             if record:
                 metadata["execution_record"] = record.to_dict()
 
-            checkpoint_dir = await self.checkpoint.save_project_snapshot(
-                self.project_path, 
-                step, 
-                run_id=self.run_id,
-                **metadata
-            )
+            # Serialized: parallel steps must not interleave snapshot captures
+            async with self._checkpoint_lock:
+                checkpoint_dir = await self.checkpoint.save_project_snapshot(
+                    self.project_path, 
+                    step, 
+                    run_id=self.run_id,
+                    **metadata
+                )
             # log("FAST-V2", f"   💾 Checkpoint saved: {checkpoint_dir}")
         except Exception as e:
             log("FAST-V2", f"   ⚠️ Checkpoint failed: {e}")
@@ -917,42 +1049,47 @@ class FASTOrchestratorV2(OrchestrationGuard):
         self.execution_records[step_name] = record
         log("FAST-V2", f"   📝 Registered {len(record.files_created)} files for {step_name}")
 
-    def _get_project_snapshot(self) -> dict:
-        """Capture a snapshot of the project filesystem for change detection."""
-        snapshot = {}
-        if not self.project_path.exists():
-            return snapshot
-            
-        # Recursive scan, ignoring heavy/system dirs
-        # We only care about source code and architecture artifacts
-        ignore_dirs = {
-            "node_modules", ".git", "venv", "__pycache__", 
-            ".gemini", ".next", "dist", "build", ".pytest_cache"
-        }
+    def _begin_file_tracking(self, step_name: str):
+        """Open (or reset) a step's file-tracking scope."""
+        self._route_workspace_changes()
+        self._step_changes[step_name] = set()
+
+    def _end_file_tracking(self, step_name: str) -> list:
+        """Close a step's scope and return the files it created/modified."""
+        self._route_workspace_changes()
+        return sorted(self._step_changes.pop(step_name, set()))
+
+    def _route_workspace_changes(self):
+        """
+        Attribute changes since the last refresh to the open step scopes.
         
-        for path in self.project_path.rglob("*"):
-            # Check if any part of the path is in ignore_dirs
-            if any(p in path.parts for p in ignore_dirs):
-                continue
-                
-            if path.is_file():
-                try:
-                    # Store mtime and size as an identity tuple (fast)
-                    stat = path.stat()
-                    rel_path = str(path.relative_to(self.project_path))
-                    snapshot[rel_path] = (stat.st_mtime, stat.st_size)
-                except Exception:
-                    continue  # Skip files that disappear during scan
-        return snapshot
-
-    def _compute_file_delta(self, before: dict, after: dict) -> list:
-        """Identify files that were created or modified between snapshots."""
-        changed_paths = []
-        for path, meta in after.items():
-            # If new file or modified existing file
-            if path not in before or before[path] != meta:
-                changed_paths.append(path)
-        return changed_paths
+        With one step running it owns every change (sequential behaviour).
+        While steps overlap, each change goes to the step whose file scope
+        contains it; anything else is recorded as an unowned write.
+        """
+        delta = self.workspace_index.refresh()
+        if delta:
+            invalidate_project_files(self.project_path, delta.changed + sorted(delta.deleted))
+        if not self._step_changes:
+            return
+        
+        open_steps = list(self._step_changes)
+        for path in delta.changed:
+            if len(open_steps) == 1:
+                owners = open_steps
+            else:
+                owners = [s for s in open_steps if self.graph.owns(s, path)]
+            for owner in owners:
+                self._step_changes[owner].add(path)
+            if not owners:
+                log("FAST-V2", f"   ⚠️ Unowned write during overlap: {path}")
+                record_decision_event(
+                    run_id=self.run_id,
+                    step=",".join(sorted(open_steps)),
+                    agent="SCHEDULER",
+                    decision="UNOWNED_WRITE",
+                    reason=path,
+                )
 
     def _register_step_files(self, step_name: str, files: list):
         """
@@ -7,7 +7,7 @@ behavior INSIDE each step (hybrid adaptive mode).
 Steps cannot be removed, added, or reordered globally.
 Only intra-step adaptation is allowed.
 """
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 
 class TaskGraph:
@@ -46,6 +46,24 @@ class TaskGraph:
                 ]  # Phase 9: Preview depends on CODE availability, not TEST success
         }
 
+        # File-ownership scopes (project-relative path prefixes a step may write).
+        # Steps with overlapping scopes never run concurrently, and files that
+        # appear while steps overlap are attributed to the owning step.
+        # Steps not listed own the WHOLE workspace (always run alone).
+        self.file_scopes: Dict[str, List[str]] = {
+            "frontend_mock": ["frontend/"],
+            "backend_models": ["backend/", "entity_plan.json"],
+            "testing_backend": ["backend/"],
+            "testing_frontend": ["frontend/", ".test_history/"],
+        }
+
+        # Shared runtime resources (non-file). Steps holding the same resource
+        # never run concurrently: both test steps drive the project's compose
+        # sandbox, and testing_backend's force_rebuild runs `compose down`.
+        self.resources: Dict[str, List[str]] = {
+            "testing_backend": ["sandbox"],
+            "testing_frontend": ["sandbox"],
+        }
 
 
     def get_steps(self) -> List[str]:
@@ -81,3 +99,24 @@ class TaskGraph:
             if step not in completed and self.is_ready(step, completed):
                 ready.append(step)
         return ready
+
+    def scope_for(self, step: str) -> Optional[List[str]]:
+        """Path prefixes owned by a step (None = whole workspace)."""
+        return self.file_scopes.get(step)
+
+    def owns(self, step: str, path: str) -> bool:
+        """Check if a project-relative path falls inside a step's scope."""
+        scope = self.scope_for(step)
+        if scope is None:
+            return True
+        path = path.replace("\\", "/")
+        return any(path == prefix.rstrip("/") or path.startswith(prefix) for prefix in scope)
+
+    def scopes_conflict(self, step_a: str, step_b: str) -> bool:
+        """Check if two steps could write the same files or share a resource."""
+        if set(self.resources.get(step_a, [])) & set(self.resources.get(step_b, [])):
+            return True
+        scope_a, scope_b = self.scope_for(step_a), self.scope_for(step_b)
+        if scope_a is None or scope_b is None:
+            return True
+        return any(a.startswith(b) or b.startswith(a) for a in scope_a for b in scope_b)
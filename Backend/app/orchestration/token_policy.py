@@ -20,6 +20,10 @@ This prevents:
 - Stochastic truncation (unlimited tokens = random cutoff)
 - Token waste on doomed generations
 - Hidden costs from healing/retry loops
+
+INPUT BUDGETS:
+- input_tokens caps the whole prompt (system + task + context) of a step
+- app/llm/context_packer.py fits files, contracts and errors into it
 ════════════════════════════════════════════════════════════════════════════════
 """
 
@@ -52,6 +56,7 @@ STEP_TOKEN_POLICIES = {
     
     "architecture": {
         "max_tokens": 8000,       # Architecture plan with UI design system (increased to avoid truncation)
+        "input_tokens": 8000,     # Prompt budget: Contracts + user request only
         "retry_tokens": None,     # CAUSAL: No retry
         "description": "Architecture planning and UI design system",
         "is_causal": True,
@@ -59,6 +64,7 @@ STEP_TOKEN_POLICIES = {
     
     "backend_models": {
         "max_tokens": 8000,       # models.py with multiple entities - needs larger budget
+        "input_tokens": 10000,    # Prompt budget: Contracts drive the models
         "retry_tokens": None,     # CAUSAL: No retry
         "description": "Database models (Beanie Documents)",
         "is_causal": True,
@@ -66,6 +72,7 @@ STEP_TOKEN_POLICIES = {
     
     "backend_routers": {
         "max_tokens": 12000,      # Multiple routers with full CRUD - INCREASED to prevent truncation
+        "input_tokens": 14000,    # Prompt budget: Models + contracts
         "retry_tokens": None,     # CAUSAL: No retry  
         "description": "API routers with CRUD operations",
         "is_causal": True,
@@ -73,6 +80,7 @@ STEP_TOKEN_POLICIES = {
     
     "frontend_mock": {
         "max_tokens": 12000,      # Frontend components need more tokens - INCREASED
+        "input_tokens": 14000,    # Prompt budget: Contracts + existing components
         "retry_tokens": None,     # CAUSAL: No retry
         "description": "Frontend page/component with mock data",
         "is_causal": True,
@@ -80,6 +88,7 @@ STEP_TOKEN_POLICIES = {
     
     "system_integration": {
         "max_tokens": 6000,       # Wire up routers in main.py - INCREASED from 3000
+        "input_tokens": 10000,    # Prompt budget: main.py + router signatures
         "retry_tokens": None,     # CAUSAL: No retry
         "description": "System integration (main.py only)",
         "is_causal": True,
@@ -90,6 +99,7 @@ STEP_TOKEN_POLICIES = {
     # ───────────────────────────────────────────────────
     "testing_backend": {
         "max_tokens": 12000,      # Test generation + execution - INCREASED from 6000
+        "input_tokens": 14000,    # Prompt budget: Routers/models under test + errors
         "retry_tokens": 14000,    # EVIDENCE: Can retry on infra failure
         "description": "Backend testing with pytest",
         "is_causal": False,
@@ -97,6 +107,7 @@ STEP_TOKEN_POLICIES = {
     
     "testing_frontend": {
         "max_tokens": 10000,      # E2E test generation - complete test file with HDAP markers
+        "input_tokens": 12000,    # Prompt budget: Pages under test + selectors
         "retry_tokens": 12000,    # EVIDENCE: Can retry on infra failure
         "description": "Frontend E2E testing - OBSERVATION ONLY",
         "is_causal": False,
@@ -104,6 +115,7 @@ STEP_TOKEN_POLICIES = {
     
     "preview_final": {
         "max_tokens": 4000,       # Final preview summary - INCREASED from 2000
+        "input_tokens": 6000,     # Prompt budget: Summary inputs
         "retry_tokens": 5000,     # EVIDENCE: Can retry on infra failure
         "description": "Final preview and summary",
         "is_causal": False,
@@ -111,6 +123,7 @@ STEP_TOKEN_POLICIES = {
     
     "refine": {
         "max_tokens": 2500,       # Single file refinement
+        "input_tokens": 10000,    # Prompt budget: The file being refined + neighbours
         "retry_tokens": None,     # Treated as causal (modifies code)
         "description": "Post-workflow refinements - ONE FILE",
         "is_causal": True,
@@ -118,6 +131,7 @@ STEP_TOKEN_POLICIES = {
     
     "complete": {
         "max_tokens": 1500,       # Summary only
+        "input_tokens": 3000,     # Prompt budget: Summary inputs
         "retry_tokens": None,     # No retry needed
         "description": "Workflow completion summary",
         "is_causal": False,
@@ -131,6 +145,54 @@ STEP_TOKEN_POLICIES = {
 
 DEFAULT_FALLBACK_TOKENS = 2000   # Conservative default
 DEFAULT_RETRY_TOKENS = None      # Unknown steps don't retry
+DEFAULT_INPUT_TOKENS = 8000      # Prompt budget for unknown steps
+
+
+# ═══════════════════════════════════════════════════════
+# STEP NAME ALIASES
+# ═══════════════════════════════════════════════════════
+
+# Step name aliases - map human-readable names to policy keys
+# This handles both space-separated AND underscore-separated versions
+STEP_ALIASES = {
+    # Frontend Mock variations (from different sources)
+    "frontend (mock data)": "frontend_mock",
+    "frontend mock": "frontend_mock",
+    "frontend mock data": "frontend_mock",
+    "frontend_mock_data": "frontend_mock",  # From supervisor.py step_id transform
+    
+    # Backend variations
+    "backend implementation": "backend_routers",
+    "backend vertical": "backend_routers",
+    
+    # Testing variations
+    "testing backend": "testing_backend",
+    "testing frontend": "testing_frontend",
+    "backend test diagnosis": "testing_backend",
+    "backend_test_diagnosis": "testing_backend",
+    "backend testing fix": "testing_backend",
+    "backend_testing_fix": "testing_backend",
+    "test_file_generation": "testing_backend",
+    "test file generation": "testing_backend",
+    "e2e_test_generation": "testing_frontend",
+    "e2e test generation": "testing_frontend",
+    
+    # Integration variations
+    "system integration": "system_integration",
+}
+
+
+def _normalize_step(step_name: str) -> str:
+    """Map a step name or alias to its STEP_TOKEN_POLICIES key."""
+    # Normalize step name (remove extra spaces, lowercase)
+    normalized_step = step_name.lower().strip()
+    
+    # Check aliases first
+    if normalized_step in STEP_ALIASES:
+        return STEP_ALIASES[normalized_step]
+    # Fallback: replace spaces with underscores and remove parentheses
+    return normalized_step.replace(" ", "_").replace("(", "").replace(")", "")
+
 
 
 # ═══════════════════════════════════════════════════════
@@ -156,47 +218,7 @@ def get_tokens_for_step(step_name: str, is_retry: bool = False) -> int:
         >>> get_tokens_for_step("analysis", is_retry=False)
         8000
     """
-    # Step name aliases - map human-readable names to policy keys
-    # This handles both space-separated AND underscore-separated versions
-    STEP_ALIASES = {
-        # Frontend Mock variations (from different sources)
-        "frontend (mock data)": "frontend_mock",
-        "frontend mock": "frontend_mock",
-        "frontend mock data": "frontend_mock",
-        "frontend_mock_data": "frontend_mock",  # From supervisor.py step_id transform
-        
-        # Backend variations
-        "backend implementation": "backend_routers",
-        "backend vertical": "backend_routers",
-        
-        # Testing variations
-        "testing backend": "testing_backend",
-        "testing frontend": "testing_frontend",
-        "backend test diagnosis": "testing_backend",
-        "backend_test_diagnosis": "testing_backend",
-        "backend testing fix": "testing_backend",
-        "backend_testing_fix": "testing_backend",
-        "test_file_generation": "testing_backend",
-        "test file generation": "testing_backend",
-        "e2e_test_generation": "testing_frontend",
-        "e2e test generation": "testing_frontend",
-        
-        # Integration variations
-        "system integration": "system_integration",
-    }
-    
-    # Normalize step name (remove extra spaces, lowercase)
-    normalized_step = step_name.lower().strip()
-    
-    # Check aliases first
-    if normalized_step in STEP_ALIASES:
-        normalized_step = STEP_ALIASES[normalized_step]
-    else:
-        # Fallback: replace spaces with underscores and remove parentheses
-        normalized_step = normalized_step.replace(" ", "_").replace("(", "").replace(")", "")
-    
-    # Look up policy
-    policy = STEP_TOKEN_POLICIES.get(normalized_step)
+    policy = STEP_TOKEN_POLICIES.get(_normalize_step(step_name))
     
     if policy:
         return policy["retry_tokens"] if is_retry else policy["max_tokens"]
@@ -205,6 +227,23 @@ def get_tokens_for_step(step_name: str, is_retry: bool = False) -> int:
     return DEFAULT_RETRY_TOKENS if is_retry else DEFAULT_FALLBACK_TOKENS
 
 
+def get_input_budget(step_name: str) -> int:
+    """
+    Get the prompt (input) token budget for a workflow step.
+    
+    Covers system prompt, task and packed context together; see
+    app/llm/context_packer.py.
+    
+    Example:
+        >>> get_input_budget("Backend Implementation")
+        14000
+    """
+    policy = STEP_TOKEN_POLICIES.get(_normalize_step(step_name))
+    if policy:
+        return policy.get("input_tokens", DEFAULT_INPUT_TOKENS)
+    return DEFAULT_INPUT_TOKENS
+
+
 def get_step_description(step_name: str) -> str:
     """Get human-readable description of a workflow step."""
     normalized_step = step_name.lower().replace(" ", "_").strip()
@@ -0,0 +1,394 @@
+# app/orchestration/workspace_index.py
+"""
+Incremental workspace change tracker.
+
+Replaces the full `rglob("*")` + stat snapshot the orchestrator took before and
+after every step (and every retry).
+
+- Walks with os.scandir and PRUNES ignored directories (node_modules is never
+  entered, instead of being string-matched path by path)
+- Keeps a (mtime_ns, size, inode) stamp per file, persisted between runs
+- On Linux, uses inotify (via libc, no extra dependency) so a refresh only
+  re-stats the paths that actually changed - no rescan at all
+- refresh() returns precise created / modified / deleted sets
+
+inotify events are queued by the kernel when the write syscall happens, so a
+refresh right after a step sees every change the step made. Queue overflow or
+directory renames fall back to one pruned rescan.
+"""
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import stat
+import struct
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.logging import log
+
+
+DEFAULT_IGNORE_DIRS = frozenset({
+    "node_modules", ".git", "venv", ".venv", "__pycache__",
+    ".gemini", ".next", "dist", "build", ".pytest_cache",
+    ".fast_checkpoints", ".fast_index",
+})
+
+INDEX_DIR = ".fast_index"
+INDEX_FILE = "workspace.json"
+INDEX_VERSION = 1
+
+# (mtime_ns, size, inode)
+FileStamp = Tuple[int, int, int]
+
+
+@dataclass
+class WorkspaceDelta:
+    """Files that changed between two refreshes (relative paths)."""
+    created: Set[str] = field(default_factory=set)
+    modified: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+
+    @property
+    def changed(self) -> List[str]:
+        """Created + modified paths, sorted (what a step 'generated')."""
+        return sorted(self.created | self.modified)
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.modified or self.deleted)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INOTIFY (Linux only, via libc)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """Minimal non-blocking inotify wrapper - one watch per (non-ignored) directory."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd_to_dir: Dict[int, str] = {}
+
+    def add_watch(self, path: str, rel_dir: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._wd_to_dir[wd] = rel_dir
+
+    def read_events(self) -> Tuple[Set[str], Set[str], bool]:
+        """
+        Drain queued events.
+
+        Returns:
+            (dirty paths, new directories, needs_rescan)
+        """
+        dirty: Set[str] = set()
+        new_dirs: Set[str] = set()
+        needs_rescan = False
+
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(buf[offset:offset + name_len].rstrip(b"\0"))
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    needs_rescan = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._wd_to_dir.pop(wd, None)
+                    continue
+                parent = self._wd_to_dir.get(wd)
+                if parent is None:
+                    continue
+                if mask & IN_ISDIR and mask & (IN_MOVED_FROM | IN_MOVED_TO):
+                    # Renamed directories invalidate every watch path beneath them
+                    needs_rescan = True
+                    continue
+                if mask & IN_MOVE_SELF and parent == "":
+                    needs_rescan = True
+                    continue
+                if not name:
+                    continue  # Event about the watched directory itself
+
+                rel = os.path.join(parent, name) if parent else name
+                dirty.add(rel)
+                if mask & IN_ISDIR and mask & IN_CREATE:
+                    new_dirs.add(rel)
+
+        return dirty, new_dirs, needs_rescan
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self._wd_to_dir.clear()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WORKSPACE INDEX
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class WorkspaceIndex:
+    """
+    Tracks file stamps for a project directory and reports what changed.
+
+    Usage:
+        index = WorkspaceIndex(project_path)
+        index.refresh()              # baseline (absorbs earlier changes)
+        ... run step ...
+        delta = index.refresh()      # exactly what the step touched
+        index.close()
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS,
+        use_inotify: Optional[bool] = None,
+        persist: bool = True,
+    ):
+        self.root = Path(root)
+        self.ignore_dirs = frozenset(ignore_dirs)
+        self.persist = persist
+        if use_inotify is None:
+            use_inotify = settings.workflow.workspace_inotify
+        self._want_inotify = use_inotify and sys.platform.startswith("linux")
+        self._inotify: Optional[_Inotify] = None
+        self._entries: Dict[str, FileStamp] = self._load() if persist else {}
+        self._needs_rescan = True  # First refresh establishes watches
+        self.stats = {"rescans": 0, "incremental": 0}
+
+    @property
+    def watching(self) -> bool:
+        """True when refreshes are driven by inotify instead of rescans."""
+        return self._inotify is not None
+
+    @property
+    def files(self) -> Dict[str, FileStamp]:
+        """Current stamp per relative path (read-only copy)."""
+        return dict(self._entries)
+
+    # ───────────────────────────────────────────────────────────────────────
+    # Public API
+    # ───────────────────────────────────────────────────────────────────────
+
+    def refresh(self) -> WorkspaceDelta:
+        """Bring the index up to date and return what changed since last refresh."""
+        if not self.root.exists():
+            delta = WorkspaceDelta(deleted=set(self._entries))
+            self._entries = {}
+            return delta
+
+        if self._inotify is not None and not self._needs_rescan:
+            dirty, new_dirs, needs_rescan = self._inotify.read_events()
+            if not needs_rescan:
+                delta = self._apply_dirty(dirty, new_dirs)
+                self.stats["incremental"] += 1
+                if delta:
+                    self._save()
+                return delta
+            log("WORKSPACE", "⚠️ inotify overflow/rename - rescanning")
+
+        delta = self._rescan()
+        self._save()
+        return delta
+
+    def close(self) -> None:
+        """Stop watching. The next refresh() rescans."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._needs_rescan = True
+
+    # ───────────────────────────────────────────────────────────────────────
+    # Scanning
+    # ───────────────────────────────────────────────────────────────────────
+
+    def _rescan(self) -> WorkspaceDelta:
+        """Full pruned walk; (re)establishes inotify watches."""
+        self.stats["rescans"] += 1
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._want_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                log("WORKSPACE", f"⚠️ inotify unavailable, using rescans: {e}")
+                self._want_inotify = False
+
+        current: Dict[str, FileStamp] = {}
+        self._walk("", current)
+        self._needs_rescan = False
+        return self._diff_replace(current)
+
+    def _walk(self, rel_dir: str, into: Dict[str, FileStamp]) -> None:
+        """Walk rel_dir (pruning ignored dirs), stamping files and adding watches."""
+        stack = [rel_dir]
+        while stack:
+            current_rel = stack.pop()
+            current_abs = os.path.join(self.root, current_rel) if current_rel else str(self.root)
+
+            if self._inotify is not None:
+                try:
+                    self._inotify.add_watch(current_abs, current_rel)
+                except OSError as e:
+                    if e.errno == errno.ENOSPC:
+                        log("WORKSPACE", "⚠️ inotify watch limit reached, using rescans")
+                    self._inotify.close()
+                    self._inotify = None
+                    self._want_inotify = False
+
+            try:
+                with os.scandir(current_abs) as it:
+                    for entry in it:
+                        rel = os.path.join(current_rel, entry.name) if current_rel else entry.name
+                        try:
+                            if entry.is_dir():
+                                if entry.name not in self.ignore_dirs:
+                                    stack.append(rel)
+                            elif entry.is_file():
+                                st = entry.stat()
+                                into[rel] = (st.st_mtime_ns, st.st_size, st.st_ino)
+                        except OSError:
+                            continue  # Vanished during the walk
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+
+    def _apply_dirty(self, dirty: Set[str], new_dirs: Set[str]) -> WorkspaceDelta:
+        """Re-stat only the paths inotify reported."""
+        delta = WorkspaceDelta()
+
+        for rel in sorted(dirty):
+            if self._is_ignored(rel):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                self._remove(rel, delta)
+                continue
+
+            if stat.S_ISDIR(st.st_mode):
+                if rel in new_dirs:
+                    found: Dict[str, FileStamp] = {}
+                    self._walk(rel, found)
+                    for path, stamp in found.items():
+                        self._set(path, stamp, delta)
+                continue
+
+            self._set(rel, (st.st_mtime_ns, st.st_size, st.st_ino), delta)
+
+        return delta
+
+    def _set(self, rel: str, stamp: FileStamp, delta: WorkspaceDelta) -> None:
+        previous = self._entries.get(rel)
+        if previous is None:
+            delta.created.add(rel)
+            delta.deleted.discard(rel)
+        elif previous != stamp:
+            delta.modified.add(rel)
+        self._entries[rel] = stamp
+
+    def _remove(self, rel: str, delta: WorkspaceDelta) -> None:
+        """Drop a file, or everything beneath a removed directory."""
+        prefix = rel + os.sep
+        gone = [p for p in self._entries if p == rel or p.startswith(prefix)]
+        for path in gone:
+            del self._entries[path]
+            if path in delta.created:
+                delta.created.discard(path)
+            else:
+                delta.modified.discard(path)
+                delta.deleted.add(path)
+
+    def _diff_replace(self, current: Dict[str, FileStamp]) -> WorkspaceDelta:
+        previous = self._entries
+        delta = WorkspaceDelta(
+            created={p for p in current if p not in previous},
+            modified={p for p, stamp in current.items() if p in previous and previous[p] != stamp},
+            deleted={p for p in previous if p not in current},
+        )
+        self._entries = current
+        return delta
+
+    def _is_ignored(self, rel: str) -> bool:
+        parts = Path(rel).parts
+        # Only directory components prune (a FILE named "build" is still tracked)
+        return any(part in self.ignore_dirs for part in parts[:-1]) or (
+            parts and parts[-1] in self.ignore_dirs and os.path.isdir(os.path.join(self.root, rel))
+        )
+
+    # ───────────────────────────────────────────────────────────────────────
+    # Persistence
+    # ───────────────────────────────────────────────────────────────────────
+
+    def _index_path(self) -> Path:
+        return self.root / INDEX_DIR / INDEX_FILE
+
+    def _load(self) -> Dict[str, FileStamp]:
+        try:
+            data = json.loads(self._index_path().read_text(encoding="utf-8"))
+            if data.get("version") != INDEX_VERSION:
+                return {}
+            return {path: tuple(stamp) for path, stamp in data.get("files", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save(self) -> None:
+        if not self.persist or not self.root.exists():
+            return
+        try:
+            index_path = self._index_path()
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = index_path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps({"version": INDEX_VERSION, "files": self._entries}),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            log("WORKSPACE", f"⚠️ Failed to persist workspace index: {e}")
@@ -0,0 +1,405 @@
+# app/sandbox/container_state.py
+"""
+Event-driven container state cache.
+
+HealthMonitor.wait_for_healthy used to `docker inspect` every container every
+2 seconds, and SandboxManager forked `docker ps` whenever it needed a
+project's containers. With dozens of sandboxes that is hundreds of CLI forks
+per minute, and readiness is noticed up to one poll interval late.
+
+ContainerStateCache keeps an in-memory map of every container (state, health,
+compose project/service, ports) fed by one long-lived `docker events`
+subscriber:
+
+- start(): one `docker ps -a` snapshot, then `docker events --since <snapshot
+  time>` so nothing between the two is missed
+- create/start/die/stop/destroy/health_status events update the map; a start
+  triggers a single `docker ps` refresh of that container for its ports
+- every change wakes waiters: wait_for(predicate) is an awaitable on state
+  transitions, not a poll loop
+- if the stream drops, the cache is marked not live, callers fall back to
+  the CLI, and the subscriber reconnects (with backoff) and re-snapshots
+
+When the Docker Engine API socket is available (docker_api.get_docker_api),
+the snapshot, refreshes and the events stream go over it instead of the CLI.
+Otherwise, loops without subprocess support (Windows SelectorEventLoop)
+cannot stream, so the cache stays disabled there.
+
+Usage:
+    states = get_container_states()
+    await states.start()
+    if states.live:
+        containers = states.project_containers(project_id)
+        await states.wait_for(lambda: ..., timeout=60)
+"""
+import asyncio
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.logging import log
+from app.sandbox.docker_api import API_ERRORS, format_ports, get_docker_api
+from app.sandbox.docker_cli import DockerRunner, run_docker
+
+
+COMPOSE_PROJECT = "com.docker.compose.project"
+COMPOSE_SERVICE = "com.docker.compose.service"
+
+_PS_FORMAT = "{{json .}}"
+_HEALTH = re.compile(r"\((healthy|unhealthy|health: starting)\)")
+
+# (since, on_line) -> returns when the stream ends
+EventSource = Callable[[float, Callable[[str], None]], Awaitable[None]]
+
+
+@dataclass
+class ContainerState:
+    """Last known state of one container."""
+    id: str
+    name: str
+    status: str = "created"          # created, running, paused, exited, dead
+    health: Optional[str] = None     # None (no healthcheck), starting, healthy, unhealthy
+    ports: str = ""
+    labels: Dict[str, str] = field(default_factory=dict)
+    updated: float = 0.0             # time.monotonic()
+
+    @property
+    def service(self) -> str:
+        service = self.labels.get(COMPOSE_SERVICE)
+        if service:
+            return service
+        for candidate in ("backend", "frontend", "mongo"):
+            if f"-{candidate}-" in self.name or self.name.endswith(f"-{candidate}"):
+                return candidate
+        return "unknown"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """SandboxManager container format."""
+        return {
+            "id": self.id,
+            "short_id": self.id[:12],
+            "name": self.name,
+            "status": self.status,
+            "health": self.health,
+            "ports": self.ports,
+        }
+
+
+def parse_labels(text: str) -> Dict[str, str]:
+    """`docker ps` Labels column ("k=v,k2=v2")."""
+    labels = {}
+    for item in (text or "").split(","):
+        key, sep, value = item.partition("=")
+        if sep:
+            labels[key.strip()] = value
+    return labels
+
+
+def state_from_ps(row: Dict[str, Any]) -> ContainerState:
+    """ContainerState from one `docker ps --format '{{json .}}'` row."""
+    match = _HEALTH.search(row.get("Status", ""))
+    health = match.group(1).replace("health: ", "") if match else None
+    return ContainerState(
+        id=row.get("ID", ""),
+        name=row.get("Names", ""),
+        status=row.get("State") or ("running" if row.get("Status", "").startswith("Up") else "exited"),
+        health=health,
+        ports=row.get("Ports", ""),
+        labels=parse_labels(row.get("Labels", "")),
+        updated=time.monotonic(),
+    )
+
+
+def state_from_api(row: Dict[str, Any]) -> ContainerState:
+    """ContainerState from one Engine API /containers/json entry."""
+    status = row.get("Status", "")
+    match = _HEALTH.search(status)
+    names = row.get("Names") or [""]
+    return ContainerState(
+        id=row.get("Id", ""),
+        name=names[0].lstrip("/"),
+        status=row.get("State") or ("running" if status.startswith("Up") else "exited"),
+        health=match.group(1).replace("health: ", "") if match else None,
+        ports=format_ports(row.get("Ports") or []),
+        labels=dict(row.get("Labels") or {}),
+        updated=time.monotonic(),
+    )
+
+
+class ContainerStateCache:
+    """In-memory container state/health map kept current by `docker events`."""
+
+    def __init__(
+        self,
+        runner: Optional[DockerRunner] = None,
+        events_source: Optional[EventSource] = None,
+        max_backoff: float = 30.0,
+    ):
+        self._docker = runner or run_docker
+        self._use_api = runner is None and events_source is None
+        self._events_source = events_source or self._docker_events
+        self.max_backoff = max_backoff
+
+        self.containers: Dict[str, ContainerState] = {}  # full id -> state
+        self.live = False
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_tasks: set = set()
+        self._counters = {
+            "events": 0,
+            "snapshots": 0,
+            "refreshes": 0,
+            "reconnects": 0,
+            "waits": 0,
+            "wakeups": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> bool:
+        """Start the subscriber. Returns False where events cannot be streamed."""
+        if self._task is not None and not self._task.done():
+            return True
+        loop = asyncio.get_running_loop()
+        api = get_docker_api() if self._use_api else None
+        if api is None and sys.platform == "win32" and not isinstance(loop, getattr(asyncio, "ProactorEventLoop", ())):
+            log("SANDBOX", "⚠️ Container events need subprocess support - using docker CLI polling")
+            return False
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._subscribe())
+        return True
+
+    async def stop(self) -> None:
+        self.live = False
+        for task in [self._task, *self._refresh_tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in [self._task, *self._refresh_tasks] if t is not None), return_exceptions=True
+        )
+        self._task = None
+        self._refresh_tasks.clear()
+
+    async def _subscribe(self) -> None:
+        backoff = initial = min(1.0, self.max_backoff)
+        while True:
+            try:
+                since = time.time()
+                await self.snapshot()
+                self.live = True
+                backoff = initial
+                await self._events_source(since, self._on_line)
+                log("SANDBOX", "⚠️ docker events stream ended - reconnecting")
+            except asyncio.CancelledError:
+                self.live = False
+                raise
+            except Exception as e:
+                log("SANDBOX", f"⚠️ Container state subscriber error: {e}")
+            self.live = False
+            self._counters["reconnects"] += 1
+            self._notify()
+            await asyncio.sleep(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def _docker_events(self, since: float, on_line: Callable[[str], None]) -> None:
+        from app.core.process_runner import run_process
+
+        api = get_docker_api() if self._use_api else None
+        if api is not None:
+            async for event in api.events(since=since, filters={"type": ["container"]}):
+                self.handle_event(event)
+            return
+
+        await run_process(
+            ["docker", "events", "--filter", "type=container", "--format", _PS_FORMAT, "--since", f"{since:.3f}"],
+            timeout=None,
+            on_stdout=on_line,
+            max_output=0,  # Lines are consumed by the callback; nothing to keep
+        )
+
+    # ------------------------------------------------------------------
+    # State updates
+    # ------------------------------------------------------------------
+
+    async def snapshot(self) -> None:
+        """Replace the map with `docker ps -a` (or the Engine API equivalent)."""
+        api = get_docker_api() if self._use_api else None
+        if api is not None:
+            states = [state_from_api(row) for row in await api.list_containers(all=True)]
+        else:
+            returncode, stdout, stderr = await self._docker(["ps", "-a", "--no-trunc", "--format", _PS_FORMAT], 30)
+            if returncode != 0:
+                raise RuntimeError(f"docker ps failed: {stderr.strip()[-200:]}")
+            states = []
+            for line in stdout.splitlines():
+                try:
+                    states.append(state_from_ps(json.loads(line)))
+                except ValueError:
+                    continue
+        self.containers = {state.id: state for state in states}
+        self._counters["snapshots"] += 1
+        self._notify()
+
+    async def refresh(self, container_id: str) -> None:
+        """Re-read one container (ports are not part of events)."""
+        self._counters["refreshes"] += 1
+        for fresh in await self._list_one(container_id):
+            current = self.containers.get(fresh.id)
+            if current is not None and current.health is not None and fresh.health is None:
+                fresh.health = current.health
+            self.containers[fresh.id] = fresh
+        self._notify()
+
+    async def _list_one(self, container_id: str) -> List[ContainerState]:
+        api = get_docker_api() if self._use_api else None
+        if api is not None:
+            try:
+                rows = await api.list_containers(all=True, filters={"id": [container_id]})
+                return [state_from_api(row) for row in rows]
+            except API_ERRORS:
+                pass
+        returncode, stdout, _ = await self._docker(
+            ["ps", "-a", "--no-trunc", "--filter", f"id={container_id}", "--format", _PS_FORMAT], 10
+        )
+        if returncode != 0:
+            return []
+        states = []
+        for line in stdout.splitlines():
+            try:
+                states.append(state_from_ps(json.loads(line)))
+            except ValueError:
+                continue
+        return states
+
+    def _on_line(self, line: str) -> None:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        self.handle_event(event)
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        """Apply one `docker events` JSON message."""
+        if event.get("Type", "container") != "container":
+            return
+        actor = event.get("Actor") or {}
+        container_id = actor.get("ID") or event.get("id")
+        action = event.get("Action") or event.get("status") or ""
+        if not container_id or not action:
+            return
+        self._counters["events"] += 1
+
+        if action == "destroy":
+            self.containers.pop(container_id, None)
+            self._notify()
+            return
+
+        attributes = dict(actor.get("Attributes") or {})
+        state = self.containers.get(container_id)
+        if state is None:
+            state = self.containers[container_id] = ContainerState(
+                id=container_id, name=attributes.get("name", container_id[:12])
+            )
+        state.labels.update({k: v for k, v in attributes.items() if k not in ("name", "image")})
+
+        if action.startswith("health_status"):
+            state.health = action.partition(":")[2].strip() or None
+        elif action in ("start", "restart", "unpause"):
+            state.status = "running"
+            if action != "unpause":
+                self._schedule_refresh(container_id)
+        elif action in ("die", "stop", "kill", "oom"):
+            if action != "kill":  # kill is followed by die
+                state.status = "exited"
+                state.health = None
+        elif action == "pause":
+            state.status = "paused"
+        elif action == "create":
+            state.status = "created"
+        else:
+            return
+        state.updated = time.monotonic()
+        self._notify()
+
+    def _schedule_refresh(self, container_id: str) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(self.refresh(container_id))
+        except RuntimeError:
+            return  # No loop (synchronous test use)
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def _notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, container_id: str) -> Optional[ContainerState]:
+        """State by full id, id prefix or name."""
+        state = self.containers.get(container_id)
+        if state is not None:
+            return state
+        for candidate in self.containers.values():
+            if candidate.id.startswith(container_id) or candidate.name == container_id:
+                return candidate
+        return None
+
+    def project_containers(self, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """Running containers whose name contains project_id (as `docker ps --filter name=`), by service."""
+        return {
+            state.service: state.to_dict()
+            for state in self.containers.values()
+            if project_id in state.name and state.status == "running"
+        }
+
+    async def changed(self, timeout: float) -> bool:
+        """Wait for the next state change. False on timeout."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._counters["wakeups"] += 1
+        return True
+
+    async def wait_for(self, predicate: Callable[[], bool], timeout: float) -> bool:
+        """Wait until predicate() is true, re-checking only when state changes."""
+        self._counters["waits"] += 1
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.changed(remaining):
+                return predicate()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for state in self.containers.values():
+            states[state.status] = states.get(state.status, 0) + 1
+        return {"live": self.live, "containers": len(self.containers), "states": states, **self._counters}
+
+
+_states: Optional[ContainerStateCache] = None
+
+
+def get_container_states() -> ContainerStateCache:
+    """Process-wide container state cache."""
+    global _states
+    if _states is None:
+        _states = ContainerStateCache()
+    return _states
+
+
+async def stop_container_states() -> None:
+    if _states is not None:
+        await _states.stop()
@@ -0,0 +1,324 @@
+# app/sandbox/docker_api.py
+"""
+Async Docker Engine API client (HTTP over the unix socket).
+
+Status queries, execs and log tails used to fork the docker CLI, paying
+process startup and JSON re-parsing each time. DockerEngineClient talks to
+the daemon directly over /var/run/docker.sock with one keep-alive aiohttp
+session:
+
+    list_containers / inspect / exec / logs / stats / events
+
+Compose stays on the CLI (`up` / `down` / `run`), and so do the sandbox pool,
+image cache and test workers, which take an injectable DockerRunner.
+
+get_docker_api() returns the client when DOCKER_API is enabled and the
+socket exists, else None; callers keep their CLI path as the fallback and
+also use it when a call fails with one of API_ERRORS.
+
+Like the LLM transport, the session is bound to the event loop that created
+it and is rebuilt transparently if the loop changes.
+
+Usage:
+    api = get_docker_api()
+    if api is not None:
+        exit_code, stdout, stderr = await api.exec(container, ["pytest", "-q"], workdir="/app")
+"""
+import asyncio
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+
+from app.core.logging import log
+
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+API_VERSION = "v1.41"  # Docker 20.10+
+
+STDOUT, STDERR = 1, 2
+_FRAME_HEADER = struct.Struct(">BxxxL")
+
+
+class DockerAPIError(Exception):
+    """Non-2xx response from the Docker Engine API."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+# Failures after which callers fall back to the docker CLI
+API_ERRORS = (DockerAPIError, aiohttp.ClientError, OSError, asyncio.TimeoutError)
+
+
+def socket_path_from_env() -> str:
+    """DOCKER_SOCKET, else a unix:// DOCKER_HOST, else the default socket."""
+    from app.core.config import settings
+
+    if settings.sandbox.docker_socket:
+        return settings.sandbox.docker_socket
+    host = os.getenv("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    return DEFAULT_SOCKET
+
+
+def format_ports(ports: List[Dict[str, Any]]) -> str:
+    """Engine API Ports list -> the `docker ps` column ("0.0.0.0:32768->8001/tcp, ...")."""
+    parts = []
+    for port in ports or []:
+        private = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        if port.get("PublicPort"):
+            ip = port.get("IP") or "0.0.0.0"
+            host = f"[{ip}]" if ":" in ip and ip != "::" else ip
+            parts.append(f"{host}:{port['PublicPort']}->{private}")
+        else:
+            parts.append(private)
+    return ", ".join(parts)
+
+
+async def demultiplex(stream: aiohttp.StreamReader) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Yield (stream type, chunk) from an attach/logs/exec body.
+
+    Without a TTY the daemon frames output as [type, 0, 0, 0, size(4)]
+    + payload; with a TTY the body is raw stdout. The first header decides.
+    """
+    try:
+        header = await stream.readexactly(_FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            yield STDOUT, e.partial
+        return
+    if header[0] not in (0, 1, 2) or header[1:4] != b"\0\0\0":
+        yield STDOUT, header
+        async for chunk in stream.iter_chunked(64 * 1024):
+            yield STDOUT, chunk
+        return
+    while True:
+        kind, size = _FRAME_HEADER.unpack(header)
+        if size:
+            yield (STDERR if kind == STDERR else STDOUT), await stream.readexactly(size)
+        try:
+            header = await stream.readexactly(_FRAME_HEADER.size)
+        except asyncio.IncompleteReadError:
+            return
+
+
+class DockerEngineClient:
+    """Minimal async client for the Docker Engine API."""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        api_version: str = API_VERSION,
+        timeout: float = 30.0,
+        max_connections: int = 32,
+    ):
+        self.socket_path = socket_path or socket_path_from_env()
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._requests = 0
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path, limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=5),
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _url(self, path: str) -> str:
+        return f"http://docker/{self.api_version}{path}"
+
+    async def _request(
+        self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+    ) -> Any:
+        self._requests += 1
+        async with self.session().request(
+            method, self._url(path), params=params, json=body,
+            timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+        ) as resp:
+            data = await resp.read()
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(data))
+            if not data:
+                return None
+            if resp.content_type == "application/json":
+                return json.loads(data)
+            return data.decode("utf-8", errors="replace")
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    async def ping(self) -> bool:
+        try:
+            return await self._request("GET", "/_ping", timeout=5) == "OK"
+        except API_ERRORS:
+            return False
+
+    async def list_containers(
+        self, all: bool = False, filters: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        params = {"all": "1" if all else "0"}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        return await self._request("GET", "/containers/json", params=params) or []
+
+    async def inspect(self, container: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/containers/{quote(container)}/json")
+
+    async def stats(self, container: str) -> Dict[str, Any]:
+        """One stats sample (no stream)."""
+        return await self._request("GET", f"/containers/{quote(container)}/stats", params={"stream": "0"})
+
+    async def exec(
+        self,
+        container: str,
+        cmd: List[str],
+        workdir: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str, str]:
+        """
+        Run a command in a running container. Returns (exit code, stdout, stderr);
+        (-1, partial stdout, "... timed out ...") when the timeout expires.
+        """
+        config: Dict[str, Any] = {"Cmd": cmd, "AttachStdout": True, "AttachStderr": True, "Tty": False}
+        if workdir:
+            config["WorkingDir"] = workdir
+        if env:
+            config["Env"] = [f"{k}={v}" for k, v in env.items()]
+        created = await self._request("POST", f"/containers/{quote(container)}/exec", body=config)
+        exec_id = created["Id"]
+
+        out: List[bytes] = []
+        err: List[bytes] = []
+
+        async def collect():
+            self._requests += 1
+            async with self.session().post(
+                self._url(f"/exec/{exec_id}/start"), json={"Detach": False, "Tty": False},
+                timeout=aiohttp.ClientTimeout(total=None),
+            ) as resp:
+                if resp.status >= 400:
+                    raise DockerAPIError(resp.status, _error_message(await resp.read()))
+                async for kind, chunk in demultiplex(resp.content):
+                    (err if kind == STDERR else out).append(chunk)
+
+        try:
+            await asyncio.wait_for(collect(), timeout)
+        except asyncio.TimeoutError:
+            return -1, _text(out), _text(err) + f"\nexec timed out after {timeout}s"
+        info = await self._request("GET", f"/exec/{exec_id}/json")
+        exit_code = info.get("ExitCode")
+        return (exit_code if exit_code is not None else -1), _text(out), _text(err)
+
+    async def logs(
+        self, container: str, follow: bool = False, tail: Optional[int] = None, timestamps: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield log lines (stdout and stderr interleaved); follow=True streams until the container stops."""
+        params = {"stdout": "1", "stderr": "1", "follow": "1" if follow else "0", "timestamps": "1" if timestamps else "0"}
+        if tail is not None:
+            params["tail"] = str(tail)
+        self._requests += 1
+        async with self.session().get(
+            self._url(f"/containers/{quote(container)}/logs"), params=params,
+            timeout=aiohttp.ClientTimeout(total=None if follow else self.timeout),
+        ) as resp:
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(await resp.read()))
+            partial = {STDOUT: b"", STDERR: b""}
+            async for kind, chunk in demultiplex(resp.content):
+                *lines, partial[kind] = (partial[kind] + chunk).split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+            for rest in partial.values():
+                if rest:
+                    yield rest.decode("utf-8", errors="replace")
+
+    async def events(
+        self, since: Optional[float] = None, filters: Optional[Dict[str, List[str]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream daemon events (JSON objects) until the connection closes."""
+        params = {}
+        if since is not None:
+            params["since"] = f"{since:.3f}"
+        if filters:
+            params["filters"] = json.dumps(filters)
+        self._requests += 1
+        async with self.session().get(
+            self._url("/events"), params=params, timeout=aiohttp.ClientTimeout(total=None)
+        ) as resp:
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, _error_message(await resp.read()))
+            async for line in resp.content:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def stats_summary(self) -> Dict[str, Any]:
+        return {"socket": self.socket_path, "api_version": self.api_version, "requests": self._requests}
+
+
+def _text(chunks: List[bytes]) -> str:
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+def _error_message(data: bytes) -> str:
+    try:
+        return json.loads(data).get("message", "") or data.decode("utf-8", errors="replace")
+    except (ValueError, AttributeError):
+        return data.decode("utf-8", errors="replace")
+
+
+_client: Optional[DockerEngineClient] = None
+
+
+def get_docker_api() -> Optional[DockerEngineClient]:
+    """The Engine API client, or None if disabled or the socket is missing (use the CLI)."""
+    global _client
+    from app.core.config import settings
+
+    if not settings.sandbox.docker_api_enabled:
+        return None
+    if _client is None:
+        _client = DockerEngineClient()
+    if not Path(_client.socket_path).exists():
+        return None
+    return _client
+
+
+async def close_docker_api() -> None:
+    if _client is not None:
+        await _client.close()
+
+
+def log_fallback(operation: str, error: Exception) -> None:
+    """Callers fall back to the CLI when an API call fails."""
+    log("SANDBOX", f"⚠️ Docker API {operation} failed, using docker CLI: {error}")
@@ -0,0 +1,26 @@
+# app/sandbox/docker_cli.py
+"""
+Docker CLI invocation shared by the sandbox pool, base image cache and test
+workers (async subprocesses, see app/core/process_runner.py).
+
+Components take a DockerRunner callable so tests can substitute an
+in-memory Docker.
+"""
+from typing import Awaitable, Callable, List, Tuple
+
+from app.core.process_runner import run_process
+
+
+# (docker args, timeout) -> (returncode, stdout, stderr)
+DockerRunner = Callable[[List[str], int], Awaitable[Tuple[int, str, str]]]
+
+
+async def run_docker(args: List[str], timeout: int = 60) -> Tuple[int, str, str]:
+    """Run `docker <args>` (async subprocess, under the docker CLI concurrency limit)."""
+    try:
+        result = await run_process(["docker", *args], timeout=timeout, limit="docker")
+    except OSError as e:
+        return -1, "", str(e)
+    if result.timed_out:
+        return -1, result.stdout, f"docker {args[0]} timed out after {timeout}s"
+    return result.returncode, result.stdout, result.stderr
@@ -1,17 +1,35 @@
 """
 Health Monitor
-Checks and monitors container health status using docker CLI (no docker SDK).
+Checks and monitors container health status via the Docker Engine API socket
+(docker CLI fallback; no docker SDK).
 """
 
 import asyncio
 import json
-import subprocess
 import time
 from typing import Dict, Any, Optional
 
+from .docker_api import API_ERRORS, DockerAPIError, get_docker_api, log_fallback
+from .docker_cli import run_docker
+
+
+def summarize_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """CPU % and memory from one Engine API stats sample."""
+    cpu = stats.get("cpu_stats") or {}
+    precpu = stats.get("precpu_stats") or {}
+    cpu_delta = (cpu.get("cpu_usage") or {}).get("total_usage", 0) - (precpu.get("cpu_usage") or {}).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    cpus = cpu.get("online_cpus") or 1
+    memory = stats.get("memory_stats") or {}
+    return {
+        "cpu_percent": round(cpu_delta / system_delta * cpus * 100, 2) if system_delta > 0 else 0.0,
+        "memory_bytes": memory.get("usage", 0),
+        "memory_limit_bytes": memory.get("limit", 0),
+    }
+
 
 class HealthMonitor:
-    """Monitors health of sandbox containers via `docker inspect`."""
+    """Monitors health of sandbox containers (container state cache, Engine API or `docker inspect`)."""
 
     def __init__(self, docker_client: Optional[Any] = None):
         # docker_client kept only for backwards compatibility – not used.
@@ -27,6 +45,12 @@ class HealthMonitor:
         Wait for all containers to become healthy, based on Docker's healthcheck.
         Returns: { service_name: bool }
         """
+        from app.sandbox.container_state import get_container_states
+
+        states = get_container_states()
+        if states.live:
+            return await self._wait_for_healthy_events(project_id, containers, timeout, states)
+
         start_time = time.monotonic()
         health_status: Dict[str, bool] = {service: False for service in containers.keys()}
 
@@ -57,6 +81,58 @@ class HealthMonitor:
         print(f"[HEALTH] ⚠️ Timeout reached. Unhealthy services: {unhealthy}")
         return health_status
 
+    async def _wait_for_healthy_events(
+        self,
+        project_id: str,
+        containers: Dict[str, Dict[str, Any]],
+        timeout: int,
+        states: Any,
+    ) -> Dict[str, bool]:
+        """
+        wait_for_healthy driven by the container state cache: re-evaluated on
+        each state transition instead of inspecting every 2 seconds. A running
+        backend that Docker does not yet report healthy still gets the
+        Invariant C HTTP check, at most every 2 seconds.
+        """
+        deadline = time.monotonic() + timeout
+        health_status: Dict[str, bool] = {service: False for service in containers.keys()}
+
+        while True:
+            needs_http = False
+            for service_name, container_info in containers.items():
+                if health_status[service_name]:
+                    continue
+                state = states.get(container_info.get("id") or container_info.get("name") or "")
+                if state is None or state.status != "running":
+                    continue
+                if state.health == "healthy":
+                    health_status[service_name] = True
+                elif service_name == "backend" and container_info.get("ports"):
+                    needs_http = True
+                    health_status[service_name] = await self._check_http_health(container_info["ports"])
+                elif service_name != "backend":
+                    health_status[service_name] = True
+
+            if all(health_status.values()):
+                print(f"[HEALTH] ✅ All services healthy for {project_id}")
+                return health_status
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not states.live:
+                break
+            await states.changed(timeout=min(remaining, 2) if needs_http else remaining)
+
+        if not states.live and time.monotonic() < deadline:
+            # Stream dropped - finish with polling
+            pending = {s: c for s, c in containers.items() if not health_status[s]}
+            remaining = max(1, int(deadline - time.monotonic()))
+            health_status.update(await self.wait_for_healthy(project_id, pending, timeout=remaining))
+            return health_status
+
+        unhealthy = [s for s, h in health_status.items() if not h]
+        print(f"[HEALTH] ⚠️ Timeout reached. Unhealthy services: {unhealthy}")
+        return health_status
+
     async def _check_container_health(self, container_id: str, service_name: str, ports: str = "") -> bool:
         """
         Check if a specific container is healthy.
@@ -68,7 +144,7 @@ class HealthMonitor:
         For other services: Fall back to Docker state check
         """
         try:
-            state = self._inspect_container_state(container_id)
+            state = await self._inspect_container_state(container_id)
             if not state:
                 return False
 
@@ -139,22 +215,30 @@ class HealthMonitor:
             print(f"[HEALTH] Error: {e}")
             return False
 
-    def _inspect_container_state(self, container_id: str) -> Optional[Dict[str, Any]]:
+    async def _inspect_container_state(self, container_id: str) -> Optional[Dict[str, Any]]:
         """
-        Run `docker inspect` and return the .State dict, or None on failure.
+        Inspect the container (Engine API, else `docker inspect`) and return
+        the .State dict, or None on failure.
         """
+        api = get_docker_api()
+        if api is not None:
+            try:
+                return (await api.inspect(container_id)).get("State", {})
+            except DockerAPIError as e:
+                if e.status == 404:
+                    print(f"[HEALTH] Container {container_id} not found")
+                    return None
+                log_fallback("inspect", e)
+            except API_ERRORS as e:
+                log_fallback("inspect", e)
+
         try:
-            result = subprocess.run(
-                ["docker", "inspect", container_id],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if result.returncode != 0:
-                print(f"[HEALTH] docker inspect failed for {container_id}: {result.stderr.strip()}")
+            returncode, stdout, stderr = await run_docker(["inspect", container_id], 5)
+            if returncode != 0:
+                print(f"[HEALTH] docker inspect failed for {container_id}: {stderr.strip()}")
                 return None
 
-            info = json.loads(result.stdout)
+            info = json.loads(stdout)
             if not info:
                 return None
 
@@ -171,7 +255,7 @@ class HealthMonitor:
     ) -> Dict[str, Any]:
         """
         Get detailed health information for all containers.
-        Uses docker CLI only.
+        Uses the Engine API (docker CLI fallback; resource usage is API-only).
         
         INVARIANT C: For backend, includes HTTP responsiveness status.
         """
@@ -183,7 +267,7 @@ class HealthMonitor:
                 continue
 
             try:
-                state = self._inspect_container_state(cid) or {}
+                state = await self._inspect_container_state(cid) or {}
                 ports = container_info.get("ports", "")
                 
                 # Base info from Docker state
@@ -195,6 +279,14 @@ class HealthMonitor:
                     "started_at": state.get("StartedAt"),
                 }
                 
+                # Resource usage (Engine API only - no CLI fallback for diagnostics)
+                api = get_docker_api()
+                if api is not None and service_details["running"]:
+                    try:
+                        service_details["resources"] = summarize_stats(await api.stats(cid))
+                    except API_ERRORS:
+                        pass
+                
                 # INVARIANT C: For backend, add HTTP responsiveness check
                 if service_name == "backend" and ports and state.get("Status") == "running":
                     http_healthy = await self._check_http_health(ports)
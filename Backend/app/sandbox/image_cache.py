@@ -0,0 +1,334 @@
+# app/sandbox/image_cache.py
+"""
+Base image cache for sandbox builds.
+
+`docker compose up -d --build` used to reinstall every Python and npm
+dependency for every project, although nearly all projects share the seed
+set. Dependencies now live in base images keyed by what determines them:
+
+    backend   templates/backend/Dockerfile + requirements.lock + the project's
+              requirements.txt (seed lines + dependency_fixer additions)
+    frontend  templates/frontend/Dockerfile + package.json dependencies
+              + package-lock.json (if any)
+
+A base image is the template Dockerfile without its `COPY . .`, built once
+per key and tagged gencode-base-{kind}:{key}. Each project gets a
+Dockerfile.cached (`FROM <base>` + `COPY . .`) and a docker-compose.cache.yml
+override pointing compose at it, so `up --build` only copies source.
+
+Lock pins are applied as pip constraints, except for packages whose
+requirement the project changed from the seed (e.g. a dependency_fixer
+`pytest>=9.0.0`), which would otherwise conflict with their pin.
+
+Usage per tag is recorded in <workspaces>/.image_cache.json; prune() removes
+base images unused for `max_idle_days` (seed images are always kept).
+"""
+import asyncio
+import hashlib
+import json
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.logging import log
+from app.sandbox.docker_cli import DockerRunner, run_docker
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent.parent / "templates"
+
+BASE_LABEL = "gencode.base-image"
+CACHED_DOCKERFILE = "Dockerfile.cached"
+COMPOSE_OVERRIDE = "docker-compose.cache.yml"
+STATE_FILE = ".image_cache.json"
+KINDS = ("backend", "frontend")
+
+_REQ_NAME = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def requirement_name(line: str) -> Optional[str]:
+    """Normalized package name of a requirements.txt line (None for comments/options)."""
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("-"):
+        return None
+    match = _REQ_NAME.match(line)
+    return match.group(1).lower().replace("_", "-") if match else None
+
+
+def requirement_lines(text: str) -> Dict[str, str]:
+    """Package name -> normalized requirement line."""
+    lines = {}
+    for line in text.splitlines():
+        name = requirement_name(line)
+        if name:
+            lines[name] = re.sub(r"\s+", "", line.split("#", 1)[0])
+    return lines
+
+
+def requirement_names(text: str) -> Set[str]:
+    """Normalized package names from a requirements.txt."""
+    return set(requirement_lines(text))
+
+
+def package_names(text: str) -> Set[str]:
+    """dependencies + devDependencies of a package.json."""
+    data = json.loads(text)
+    return set(data.get("dependencies") or {}) | set(data.get("devDependencies") or {})
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    """A base image: its tag and the build context it is made from."""
+    kind: str
+    tag: str
+    files: Tuple[Tuple[str, bytes], ...]  # (name in build context, content)
+
+
+def _spec(kind: str, files: Dict[str, bytes]) -> ImageSpec:
+    digest = hashlib.sha256()
+    for name, content in sorted(files.items()):
+        digest.update(name.encode())
+        digest.update(b"\0")
+        digest.update(content)
+        digest.update(b"\0")
+    return ImageSpec(kind, f"gencode-base-{kind}:{digest.hexdigest()[:12]}", tuple(sorted(files.items())))
+
+
+class BaseImageCache:
+    """Builds, tracks and prunes dependency base images for sandbox projects."""
+
+    def __init__(
+        self,
+        templates_dir: Path = TEMPLATES_DIR,
+        runner: Optional[DockerRunner] = None,
+        state_path: Optional[Path] = None,
+        max_idle_days: Optional[float] = None,
+    ):
+        from app.core.config import settings
+        self.templates_dir = templates_dir
+        self._docker = runner or run_docker
+        self.state_path = state_path or settings.paths.workspaces_dir / STATE_FILE
+        self.max_idle_days = settings.sandbox.image_max_idle_days if max_idle_days is None else max_idle_days
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        self._state = self._load_state()
+        self._counters = {"hits": 0, "misses": 0, "build_failures": 0, "build_seconds": 0.0}
+
+    # ------------------------------------------------------------------
+    # Image specs
+    # ------------------------------------------------------------------
+
+    def base_dockerfile(self, kind: str) -> str:
+        """The template Dockerfile minus the source copy (and, for backend, with lock constraints)."""
+        text = (self.templates_dir / kind / "Dockerfile").read_text(encoding="utf-8")
+        lines = [line for line in text.splitlines() if line.strip() != "COPY . ."]
+        dockerfile = "\n".join(lines) + "\n"
+        if kind == "backend":
+            dockerfile = dockerfile.replace(
+                "COPY requirements.txt ./requirements.txt", "COPY requirements.txt requirements.lock ./"
+            ).replace("-r requirements.txt", "-r requirements.txt -c requirements.lock")
+        return dockerfile
+
+    def backend_spec(self, requirements_text: str) -> ImageSpec:
+        lines = requirement_lines(requirements_text)
+        seed = requirement_lines(self._seed_text("backend", "requirements.txt"))
+        changed = {name for name, line in lines.items() if seed.get(name) != line}
+        lock_path = self.templates_dir / "backend" / "requirements.lock"
+        lock = lock_path.read_text(encoding="utf-8") if lock_path.exists() else ""
+        pins = [line.strip() for line in lock.splitlines() if requirement_name(line) and requirement_name(line) not in changed]
+        return _spec("backend", {
+            "Dockerfile": self.base_dockerfile("backend").encode(),
+            "requirements.txt": "".join(f"{line}\n" for line in sorted(lines.values())).encode(),
+            "requirements.lock": "".join(f"{pin}\n" for pin in pins).encode(),
+        })
+
+    def frontend_spec(self, package_json_text: str, lock_text: Optional[str] = None) -> ImageSpec:
+        data = json.loads(package_json_text)
+        manifest = {
+            key: data[key]
+            for key in ("name", "version", "type", "dependencies", "devDependencies", "overrides")
+            if key in data
+        }
+        files = {
+            "Dockerfile": self.base_dockerfile("frontend").encode(),
+            "package.json": json.dumps(manifest, indent=2, sort_keys=True).encode(),
+        }
+        if lock_text:
+            files["package-lock.json"] = lock_text.encode()
+        return _spec("frontend", files)
+
+    def seed_specs(self) -> Dict[str, ImageSpec]:
+        """Base images for an unmodified seed project (used by the sandbox pool)."""
+        seed_lock = self.templates_dir / "frontend" / "seed" / "package-lock.json"
+        return {
+            "backend": self.backend_spec(self._seed_text("backend", "requirements.txt")),
+            "frontend": self.frontend_spec(
+                self._seed_text("frontend", "package.json"),
+                seed_lock.read_text(encoding="utf-8") if seed_lock.exists() else None,
+            ),
+        }
+
+    def specs_for_project(self, project_path: Path) -> Dict[str, ImageSpec]:
+        specs = {}
+        requirements = project_path / "backend" / "requirements.txt"
+        if (project_path / "backend").is_dir():
+            text = requirements.read_text(encoding="utf-8") if requirements.exists() else self._seed_text("backend", "requirements.txt")
+            specs["backend"] = self.backend_spec(text)
+        frontend = project_path / "frontend"
+        if frontend.is_dir():
+            package_json = frontend / "package.json"
+            lock = frontend / "package-lock.json"
+            specs["frontend"] = self.frontend_spec(
+                package_json.read_text(encoding="utf-8") if package_json.exists() else self._seed_text("frontend", "package.json"),
+                lock.read_text(encoding="utf-8") if lock.exists() else None,
+            )
+        return specs
+
+    # ------------------------------------------------------------------
+    # Building / project wiring
+    # ------------------------------------------------------------------
+
+    async def ensure(self, spec: ImageSpec, project_id: Optional[str] = None) -> str:
+        """Build the base image unless its tag already exists. Returns the tag."""
+        lock = self._build_locks.setdefault(spec.tag, asyncio.Lock())
+        async with lock:
+            returncode, _, _ = await self._docker(["image", "inspect", spec.tag], 30)
+            if returncode == 0:
+                self._counters["hits"] += 1
+            else:
+                self._counters["misses"] += 1
+                await self._build(spec)
+        self._record_use(spec, project_id)
+        return spec.tag
+
+    async def prepare_project(self, project_path: Path, project_id: Optional[str] = None) -> Dict[str, str]:
+        """Ensure the project's base images and point its compose build at them."""
+        tags = {}
+        for kind, spec in self.specs_for_project(project_path).items():
+            tags[kind] = await self.ensure(spec, project_id)
+        self.write_overrides(project_path, tags)
+        return tags
+
+    def write_overrides(self, project_path: Path, tags: Dict[str, str]) -> None:
+        services = []
+        for kind, tag in tags.items():
+            (project_path / kind / CACHED_DOCKERFILE).write_text(
+                "# Generated by the sandbox image cache - dependencies come from the base image\n"
+                f"FROM {tag}\nWORKDIR /app\nCOPY . .\n",
+                encoding="utf-8",
+            )
+            services.append(f"  {kind}:\n    build:\n      context: ./{kind}\n      dockerfile: {CACHED_DOCKERFILE}\n")
+        (project_path / COMPOSE_OVERRIDE).write_text(
+            "# Generated by the sandbox image cache\nservices:\n" + "".join(services), encoding="utf-8"
+        )
+
+    @staticmethod
+    def clear_overrides(project_path: Path) -> None:
+        """Fall back to the project's full Dockerfiles."""
+        for path in (project_path / COMPOSE_OVERRIDE, *(project_path / kind / CACHED_DOCKERFILE for kind in KINDS)):
+            path.unlink(missing_ok=True)
+
+    async def _build(self, spec: ImageSpec) -> None:
+        log("SANDBOX", f"🏗️ Building base image {spec.tag}")
+        start = time.monotonic()
+        with tempfile.TemporaryDirectory(prefix=f"gencode-base-{spec.kind}-") as context:
+            for name, content in spec.files:
+                (Path(context) / name).write_bytes(content)
+            returncode, _, stderr = await self._docker(
+                ["build", "-t", spec.tag, "--label", BASE_LABEL, "--label", f"{BASE_LABEL}.kind={spec.kind}", context],
+                1800,
+            )
+        elapsed = time.monotonic() - start
+        if returncode != 0:
+            self._counters["build_failures"] += 1
+            raise RuntimeError(f"Failed to build {spec.tag}: {stderr.strip()[-500:]}")
+        self._counters["build_seconds"] = round(self._counters["build_seconds"] + elapsed, 3)
+        self._state["tags"].setdefault(spec.tag, {})["build_seconds"] = round(elapsed, 3)
+        log("SANDBOX", f"✅ Built {spec.tag} in {elapsed:.1f}s")
+
+    # ------------------------------------------------------------------
+    # Reporting / pruning
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "images": len(self._state["tags"]),
+            "tags": self._state["tags"],
+        }
+
+    async def prune(self, max_idle_days: Optional[float] = None) -> List[str]:
+        """Remove base images not used for max_idle_days (untracked ones included)."""
+        max_idle = self.max_idle_days if max_idle_days is None else max_idle_days
+        cutoff = time.time() - max_idle * 86400
+        keep = {spec.tag for spec in self.seed_specs().values()}
+
+        _, stdout, _ = await self._docker(
+            ["images", "--filter", f"label={BASE_LABEL}", "--format", "{{.Repository}}:{{.Tag}}"], 30
+        )
+        removed = []
+        for tag in stdout.split():
+            if tag in keep or self._state["tags"].get(tag, {}).get("last_used", 0) >= cutoff:
+                continue
+            returncode, _, stderr = await self._docker(["image", "rm", tag], 120)
+            if returncode == 0:
+                removed.append(tag)
+                self._state["tags"].pop(tag, None)
+            else:
+                log("SANDBOX", f"⚠️ Could not remove {tag}: {stderr.strip()[-200:]}")
+        if removed:
+            self._save_state()
+            log("SANDBOX", f"🧹 Pruned {len(removed)} unused base image(s)")
+        return removed
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _seed_text(self, kind: str, name: str) -> str:
+        return (self.templates_dir / kind / "seed" / name).read_text(encoding="utf-8")
+
+    def _record_use(self, spec: ImageSpec, project_id: Optional[str]) -> None:
+        entry = self._state["tags"].setdefault(spec.tag, {})
+        now = time.time()
+        entry.setdefault("kind", spec.kind)
+        entry.setdefault("created", now)
+        entry["last_used"] = now
+        entry["uses"] = entry.get("uses", 0) + 1
+        if project_id:
+            projects = entry.setdefault("projects", [])
+            if project_id not in projects:
+                projects.append(project_id)
+        self._save_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state.get("tags"), dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"tags": {}}
+
+    def _save_state(self) -> None:
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2)
+            tmp_path.replace(self.state_path)
+        except OSError as e:
+            log("SANDBOX", f"⚠️ Could not save image cache state: {e}")
+
+
+_cache: Optional[BaseImageCache] = None
+
+
+def get_image_cache() -> BaseImageCache:
+    """Process-wide base image cache."""
+    global _cache
+    if _cache is None:
+        _cache = BaseImageCache()
+    return _cache
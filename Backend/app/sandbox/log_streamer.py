@@ -2,22 +2,62 @@
 Log Streamer
 Real-time streaming of Docker container logs via WebSocket
 
-This implementation uses the `docker` CLI instead of the Python docker SDK.
+Logs are followed over the Docker Engine API socket when it is available
+(one HTTP stream, no process per viewer); otherwise via the `docker` CLI.
+Neither path uses the Python docker SDK.
 """
 
 import asyncio
 from typing import Dict, Any, Optional, Callable
 
+from .docker_api import API_ERRORS, get_docker_api
+
 
 class LogStreamer:
     """
-    Streams container logs in real-time using `docker logs -f`.
+    Streams container logs in real-time (Engine API, or `docker logs -f`).
     """
 
     def __init__(self, docker_client: Optional[Any] = None):
         # docker_client is kept only for backwards compatibility; it's unused.
         self.docker_client = docker_client
         self.stream_processes: Dict[str, asyncio.subprocess.Process] = {}
+        self.stream_tasks: Dict[str, asyncio.Task] = {}
+
+    async def _stream_logs_from_api(
+        self,
+        stream_id: str,
+        container_id: str,
+        websocket_send: Callable[[str], Any],
+    ) -> None:
+        """
+        Follow the container's logs over the Engine API and forward each line.
+        Falls back to the CLI if the API call fails before any line arrived.
+        """
+        api = get_docker_api()
+        print(f"[LOG_STREAM] Following logs via Docker API for container {container_id} (stream_id={stream_id})")
+        forwarded = 0
+        try:
+            async for text in api.logs(container_id, follow=True):
+                if not text:
+                    continue
+                forwarded += 1
+                await websocket_send(text)
+        except asyncio.CancelledError:
+            print(f"[LOG_STREAM] Log streaming cancelled for {stream_id}")
+            raise
+        except API_ERRORS as e:
+            if forwarded == 0:
+                print(f"[LOG_STREAM] Docker API logs failed ({e}), falling back to docker CLI")
+                await self._stream_logs_from_cli(stream_id, container_id, websocket_send)
+                return
+            print(f"[LOG_STREAM] Error while streaming logs for {stream_id}: {e}")
+        except Exception as e:
+            print(f"[LOG_STREAM] Error while streaming logs for {stream_id}: {e}")
+        finally:
+            if self.stream_tasks.get(stream_id) is asyncio.current_task():
+                self.stream_tasks.pop(stream_id, None)
+        print(f"[LOG_STREAM] Log streaming ended for {stream_id}")
 
     async def _stream_logs_from_cli(
         self,
@@ -84,8 +124,9 @@ class LogStreamer:
         `websocket_send` is an async function that takes a string log line.
         """
         # Run the streaming task in the background
-        asyncio.create_task(
-            self._stream_logs_from_cli(stream_id, container_id, websocket_send)
+        stream = self._stream_logs_from_api if get_docker_api() is not None else self._stream_logs_from_cli
+        self.stream_tasks[stream_id] = asyncio.create_task(
+            stream(stream_id, container_id, websocket_send)
         )
         print(f"[LOG_STREAM] Started streaming {stream_id}")
 
@@ -93,6 +134,10 @@ class LogStreamer:
         """
         Stop a log stream, if running.
         """
+        task = self.stream_tasks.pop(stream_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
         process = self.stream_processes.get(stream_id)
         if process and process.returncode is None:
             print(f"[LOG_STREAM] Terminating log stream process for {stream_id}")
@@ -108,5 +153,5 @@ class LogStreamer:
         """
         Stop all active log streams.
         """
-        for stream_id in list(self.stream_processes.keys()):
+        for stream_id in list({**self.stream_tasks, **self.stream_processes}):
             await self.stop_streaming(stream_id)
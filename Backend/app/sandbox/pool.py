@@ -2,296 +2,591 @@
 """
 Docker Sandbox Pool - Pre-warmed Container Management
 
-Reduces sandbox startup from 49s to <5s by maintaining a pool of
-pre-warmed containers ready for immediate use.
+Reduces sandbox startup from ~49s (`docker compose up -d --build`) to a few
+seconds by keeping sandboxes warm:
+
+- Golden images are the seed base images of the image cache
+  (app/sandbox/image_cache.py): templates/backend and templates/frontend
+  with the seed requirements.txt / package.json preinstalled, built once
+- A pooled sandbox ("slot") is a private network with mongo already running.
+  Handing a slot to a project creates the backend / frontend containers from
+  the golden images (deps preinstalled, so no build/install) with ONLY that
+  project's backend/ and frontend/ bind-mounted - generated code in one slot
+  can never see another project's workspace
+- On release the project database is dropped and the app containers are
+  removed; slots past their max uses / age are replaced instead
+- The ready target follows recent demand between min and max size; idle
+  surplus slots are removed and dead slots evicted by a background check
+
+Projects whose requirements.txt / package.json need packages outside the
+seed set are not pool-compatible: acquire() returns None and
+SandboxManager falls back to the cold compose path.
 
 Usage:
-    pool = SandboxPool(size=3)
+    pool = get_sandbox_pool()
     await pool.initialize()
-    
-    # Get a pre-warmed container (instant!)
-    container = await pool.acquire(project_id)
-    
-    # Return when done
-    await pool.release(container)
+
+    # Pre-warmed sandbox for a project (None -> cold start)
+    sandbox = await pool.acquire(project_id, project_path)
+
+    # Reset and return when done
+    await pool.release(project_id)
 """
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
 
 from app.core.logging import log
+from app.sandbox.docker_cli import DockerRunner, run_docker
+from app.sandbox.image_cache import (
+    TEMPLATES_DIR,
+    BaseImageCache,
+    get_image_cache,
+    package_names,
+    requirement_names,
+)
+
+
+POOL_LABEL = "gencode.sandbox-pool"
+MONGO_IMAGE = "mongo:7"
+BACKEND_PORT = 8001
+FRONTEND_PORT = 5174
+WORKSPACES_MOUNT = "/app/workspaces"  # Under /app so vite resolves /app/node_modules
+DB_NAME = "app_database"
+SERVICES = ("backend", "frontend")
 
 
 @dataclass
 class PooledSandbox:
-    """A pre-warmed sandbox ready for use."""
-    container_id: str
+    """A pre-warmed sandbox slot (network + mongo/backend/frontend containers)."""
+    slot_id: str
     network_name: str
     created_at: datetime
-    status: str  # "ready", "in_use", "warming"
+    status: str  # "warming", "ready", "in_use"
+    containers: Dict[str, str] = field(default_factory=dict)  # service -> container name (app ones exist while in use)
+    ports: Dict[str, str] = field(default_factory=dict)       # service -> "0.0.0.0:HOST->PORT/tcp"
+    workdirs: Dict[str, str] = field(default_factory=dict)    # service -> project dir in container
     assigned_project: Optional[str] = None
+    uses: int = 0
+    ready_since: float = 0.0  # time.monotonic()
 
 
 class SandboxPool:
     """
-    Manages a pool of pre-warmed Docker containers.
-    
+    Manages a pool of pre-warmed Docker sandboxes.
+
     Benefits:
-    - 49s → 5s startup time
-    - No cold start delays
-    - Async pool refill
+    - No image build or dependency install per project
+    - Network and mongo already running; hand-off is two `docker run -d`
+    - Async, demand-driven pool refill
     """
-    
-    def __init__(self, pool_size: int = 2, warmup_timeout: int = 60):
-        self.pool_size = pool_size
+
+    def __init__(
+        self,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        max_age: Optional[int] = None,
+        idle_ttl: Optional[int] = None,
+        scale_window: Optional[int] = None,
+        check_interval: Optional[int] = None,
+        acquire_wait: Optional[float] = None,
+        warmup_timeout: int = 600,
+        workspaces_root: Optional[Path] = None,
+        templates_dir: Path = TEMPLATES_DIR,
+        runner: Optional[DockerRunner] = None,
+        image_cache: Optional[BaseImageCache] = None,
+    ):
+        from app.core.config import settings
+        cfg = settings.sandbox
+        self.min_size = cfg.pool_min_size if min_size is None else min_size
+        self.max_size = max(self.min_size, cfg.pool_max_size if max_size is None else max_size)
+        self.max_uses = max_uses or cfg.pool_max_uses
+        self.max_age = max_age or cfg.pool_max_age
+        self.idle_ttl = cfg.pool_idle_ttl if idle_ttl is None else idle_ttl
+        self.scale_window = scale_window or cfg.pool_scale_window
+        self.check_interval = check_interval or cfg.pool_check_interval
+        self.acquire_wait = cfg.pool_acquire_wait if acquire_wait is None else acquire_wait
         self.warmup_timeout = warmup_timeout
+        self.workspaces_root = Path(workspaces_root or settings.paths.workspaces_dir).resolve()
+        self.templates_dir = templates_dir
+        self._docker = runner or run_docker
+        self.image_cache = image_cache or get_image_cache()
+
+        self.images: Dict[str, str] = {}
         self.ready_pool: List[PooledSandbox] = []
         self.warming_pool: List[PooledSandbox] = []
         self.active_sandboxes: Dict[str, PooledSandbox] = {}
         self._lock = asyncio.Lock()
+        self._ready_event = asyncio.Event()
         self._warmup_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._acquire_times: Deque[float] = deque()
+        self._seed_packages: Dict[str, Set[str]] = {}
         self._initialized = False
-    
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "incompatible": 0,
+            "evicted": 0,
+            "recycled": 0,
+            "scaled_down": 0,
+            "warm_failures": 0,
+        }
+        self._last_warm_seconds: Optional[float] = None
+        self._last_acquire_seconds: Optional[float] = None
+
     async def initialize(self) -> bool:
         """
-        Initialize the pool with pre-warmed containers.
-        
-        Call this on application startup.
+        Build/verify golden images and start warming the pool.
+
+        Call this on application startup (it may build images the first time).
         """
         if self._initialized:
             return True
-        
-        log("POOL", f"🔥 Initializing sandbox pool (size={self.pool_size})")
-        
+
+        log("POOL", f"🔥 Initializing sandbox pool (min={self.min_size}, max={self.max_size})")
+
         try:
-            # Start warming containers in the background
-            self._warmup_task = asyncio.create_task(self._maintain_pool())
-            self._initialized = True
-            
-            # Wait for at least one container to be ready
-            for _ in range(self.warmup_timeout):
-                if self.ready_pool:
-                    log("POOL", f"✅ Pool ready with {len(self.ready_pool)} container(s)")
-                    return True
-                await asyncio.sleep(1)
-            
-            log("POOL", "⚠️ Pool initialization timed out - will use on-demand creation")
-            return False
-            
+            await self._remove_orphans()  # Slots left behind by a previous process
+            await self.ensure_images()
+            self._seed_packages = {
+                "backend": requirement_names((self.templates_dir / "backend" / "seed" / "requirements.txt").read_text(encoding="utf-8")),
+                "frontend": package_names((self.templates_dir / "frontend" / "seed" / "package.json").read_text(encoding="utf-8")),
+            }
         except Exception as e:
             log("POOL", f"❌ Pool initialization failed: {e}")
             return False
-    
+
+        self._initialized = True
+        self._warmup_task = asyncio.create_task(self._maintain_pool())
+
+        # Wait for at least one sandbox to be ready
+        if self.min_size > 0:
+            try:
+                await asyncio.wait_for(self._wait_for_ready(), timeout=self.warmup_timeout)
+            except asyncio.TimeoutError:
+                log("POOL", "⚠️ Pool warm-up timed out - projects will start cold until slots are ready")
+                return False
+            log("POOL", f"✅ Pool ready with {len(self.ready_pool)} sandbox(es)")
+        return True
+
+    async def ensure_images(self) -> Dict[str, str]:
+        """Build the seed base images unless already present."""
+        for kind, spec in self.image_cache.seed_specs().items():
+            self.images[kind] = await self.image_cache.ensure(spec)
+        return self.images
+
+    def is_compatible(self, project_path: Path) -> bool:
+        """True if the project's dependencies are all preinstalled in the golden images."""
+        try:
+            requirements = project_path / "backend" / "requirements.txt"
+            if requirements.exists():
+                if not requirement_names(requirements.read_text(encoding="utf-8")) <= self._seed_packages.get("backend", set()):
+                    return False
+            package_json = project_path / "frontend" / "package.json"
+            if package_json.exists():
+                if not package_names(package_json.read_text(encoding="utf-8")) <= self._seed_packages.get("frontend", set()):
+                    return False
+        except (OSError, ValueError):
+            return False
+        return True
+
     async def acquire(self, project_id: str, project_path: Path) -> Optional[Dict[str, Any]]:
         """
-        Acquire a sandbox for a project.
-        
-        Returns immediately if a pre-warmed container is available,
-        otherwise falls back to on-demand creation.
-        
+        Acquire a pre-warmed sandbox for a project.
+
+        Waits up to acquire_wait seconds for a slot that is still warming.
+
         Args:
             project_id: Project identifier
-            project_path: Path to project workspace
-            
+            project_path: Path to project workspace (under the workspaces root)
+
         Returns:
-            Sandbox info dict or None on failure
+            Sandbox info dict, or None if the project must start cold
         """
-        async with self._lock:
-            # Check if this project already has a sandbox
-            if project_id in self.active_sandboxes:
-                log("POOL", f"♻️ Reusing existing sandbox for {project_id}")
-                return self._sandbox_to_dict(self.active_sandboxes[project_id])
-            
-            # Try to get a pre-warmed container
-            if self.ready_pool:
-                sandbox = self.ready_pool.pop(0)
-                sandbox.status = "in_use"
-                sandbox.assigned_project = project_id
-                self.active_sandboxes[project_id] = sandbox
-                
-                # Trigger async pool refill
-                asyncio.create_task(self._refill_pool())
-                
-                log("POOL", f"⚡ Acquired pre-warmed sandbox for {project_id} (<1s)")
-                return self._sandbox_to_dict(sandbox)
-            
-            # Fallback: Create on-demand
-            log("POOL", f"🐢 Pool empty - creating sandbox on-demand for {project_id}")
-            return await self._create_on_demand(project_id, project_path)
-    
+        if not self._initialized:
+            return None
+
+        if project_id in self.active_sandboxes:
+            log("POOL", f"♻️ Reusing existing sandbox for {project_id}")
+            return self._sandbox_to_dict(self.active_sandboxes[project_id])
+
+        project_path = Path(project_path).resolve()
+        try:
+            rel_path = project_path.relative_to(self.workspaces_root)
+        except ValueError:
+            rel_path = None
+        if rel_path is None or not self.is_compatible(project_path):
+            self._counters["incompatible"] += 1
+            log("POOL", f"🐢 {project_id} needs packages outside the seed images - starting cold")
+            return None
+
+        start = time.monotonic()
+        self._acquire_times.append(time.time())
+        sandbox = await self._take_ready()
+        if sandbox is None:
+            self._counters["misses"] += 1
+            log("POOL", f"🐢 Pool empty - {project_id} starts cold")
+            return None
+
+        sandbox.status = "in_use"
+        sandbox.assigned_project = project_id
+        sandbox.uses += 1
+        self.active_sandboxes[project_id] = sandbox
+        self._schedule(self._refill_pool())
+
+        try:
+            await self._hand_off(sandbox, project_path, rel_path)
+        except Exception as e:
+            log("POOL", f"❌ Hand-off of {sandbox.slot_id} to {project_id} failed: {e}")
+            self.active_sandboxes.pop(project_id, None)
+            await self._destroy(sandbox)
+            return None
+
+        self._counters["hits"] += 1
+        self._last_acquire_seconds = round(time.monotonic() - start, 3)
+        log("POOL", f"⚡ Acquired pooled sandbox {sandbox.slot_id} for {project_id} ({self._last_acquire_seconds:.1f}s)")
+        return self._sandbox_to_dict(sandbox)
+
     async def release(self, project_id: str) -> bool:
         """
-        Release a sandbox back to the pool or stop it.
-        
+        Reset a project's sandbox and return it to the pool (or replace it).
+
         Args:
             project_id: Project to release
-            
+
         Returns:
-            True if released successfully
+            True if the project had a pooled sandbox
         """
         async with self._lock:
-            if project_id not in self.active_sandboxes:
-                return False
-            
-            sandbox = self.active_sandboxes.pop(project_id)
-            
-            # Check if container is still healthy
-            if await self._is_healthy(sandbox):
-                # Reset and return to pool
-                sandbox.status = "ready"
-                sandbox.assigned_project = None
-                self.ready_pool.append(sandbox)
-                log("POOL", f"♻️ Returned sandbox to pool (pool size: {len(self.ready_pool)})")
-            else:
-                # Container is unhealthy, stop it
-                await self._stop_sandbox(sandbox)
-                # Trigger refill
-                asyncio.create_task(self._refill_pool())
-            
+            sandbox = self.active_sandboxes.pop(project_id, None)
+        if sandbox is None:
+            return False
+
+        sandbox.assigned_project = None
+
+        if sandbox.uses >= self.max_uses or self._expired(sandbox) or not await self._reset(sandbox):
+            self._counters["recycled"] += 1
+            log("POOL", f"🗑️ Recycling sandbox {sandbox.slot_id} after {sandbox.uses} use(s)")
+            await self._destroy(sandbox)
+            self._schedule(self._refill_pool())
             return True
-    
+
+        sandbox.status = "ready"
+        sandbox.ready_since = time.monotonic()
+        async with self._lock:
+            self.ready_pool.append(sandbox)
+        self._ready_event.set()
+        log("POOL", f"♻️ Returned sandbox to pool (pool size: {len(self.ready_pool)})")
+        return True
+
     async def shutdown(self):
-        """Shutdown the pool and all containers."""
+        """Shutdown the pool and remove all pooled containers."""
         log("POOL", "🛑 Shutting down sandbox pool")
-        
+
         if self._warmup_task:
             self._warmup_task.cancel()
-        
-        # Stop all containers
-        for sandbox in self.ready_pool + list(self.active_sandboxes.values()):
-            await self._stop_sandbox(sandbox)
-        
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        # Everything pooled carries the label - including half-warmed slots
+        await self._remove_orphans()
+
         self.ready_pool.clear()
+        self.warming_pool.clear()
         self.active_sandboxes.clear()
         self._initialized = False
-    
-    @property
+
+    def target_ready(self) -> int:
+        """Ready slots to keep: recent acquisitions, within [min_size, max_size - active]."""
+        now = time.time()
+        while self._acquire_times and now - self._acquire_times[0] > self.scale_window:
+            self._acquire_times.popleft()
+        room = self.max_size - len(self.active_sandboxes)
+        return max(0, min(room, max(self.min_size, len(self._acquire_times))))
+
     def stats(self) -> Dict[str, Any]:
         """Get pool statistics."""
         return {
-            "pool_size": self.pool_size,
+            "initialized": self._initialized,
+            "images": dict(self.images),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "target_ready": self.target_ready(),
             "ready": len(self.ready_pool),
             "warming": len(self.warming_pool),
             "active": len(self.active_sandboxes),
-            "initialized": self._initialized,
+            **self._counters,
+            "last_warm_seconds": self._last_warm_seconds,
+            "last_acquire_seconds": self._last_acquire_seconds,
         }
-    
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _schedule(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _wait_for_ready(self) -> None:
+        while not self.ready_pool:
+            self._ready_event.clear()
+            await self._ready_event.wait()
+
+    async def _take_ready(self) -> Optional[PooledSandbox]:
+        """Pop a ready slot, waiting for a warming one for up to acquire_wait."""
+        deadline = time.monotonic() + self.acquire_wait
+        await self._refill_pool()
+        while True:
+            async with self._lock:
+                if self.ready_pool:
+                    return self.ready_pool.pop(0)
+                self._ready_event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.warming_pool:
+                return None
+            try:
+                await asyncio.wait_for(self._ready_event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+
     async def _maintain_pool(self):
-        """Background task to maintain pool size."""
+        """Background task: evict unhealthy slots, scale down idle surplus, refill."""
         while True:
             try:
+                await self._evict_unhealthy()
+                await self._scale_down()
                 await self._refill_pool()
-                await asyncio.sleep(30)  # Check every 30 seconds
+                await asyncio.sleep(self.check_interval)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 log("POOL", f"⚠️ Pool maintenance error: {e}")
                 await asyncio.sleep(10)
-    
+
     async def _refill_pool(self):
-        """Refill the pool to maintain target size."""
-        needed = self.pool_size - len(self.ready_pool) - len(self.warming_pool)
-        
+        """Start warming slots up to the demand-driven target."""
+        needed = self.target_ready() - len(self.ready_pool) - len(self.warming_pool)
+
         if needed <= 0:
             return
-        
-        log("POOL", f"🔄 Refilling pool (need {needed} container(s))")
-        
+
+        log("POOL", f"🔄 Refilling pool (need {needed} sandbox(es))")
+
         for _ in range(needed):
-            asyncio.create_task(self._warm_container())
-    
-    async def _warm_container(self):
-        """Create and warm a new container."""
-        
+            sandbox = self._new_slot()
+            self.warming_pool.append(sandbox)  # Counted before the task runs
+            self._schedule(self._warm_container(sandbox))
+
+    def _new_slot(self) -> PooledSandbox:
+        slot_id = uuid.uuid4().hex[:8]
+        name = f"gencode-pool-{slot_id}"
+        return PooledSandbox(
+            slot_id=slot_id,
+            network_name=f"{name}-net",
+            created_at=datetime.now(timezone.utc),
+            status="warming",
+            containers={service: f"{name}-{service}" for service in ("mongo", *SERVICES)},
+        )
+
+    async def _warm_container(self, sandbox: PooledSandbox):
+        """Create the slot's network and mongo (app containers are created at hand-off)."""
+        start = time.monotonic()
+        names = sandbox.containers
+        label = ["--label", POOL_LABEL]
+
         try:
-            # Create a minimal container that can be configured later
-            # This uses a lightweight approach - just start the base image
-            sandbox = PooledSandbox(
-                container_id="warming",
-                network_name="gencode_pool",
-                created_at=datetime.now(timezone.utc),
-                status="warming",
-            )
-            self.warming_pool.append(sandbox)
-            
-            # Note: In a real implementation, you would:
-            # 1. Pull the base images if not present
-            # 2. Create a container from the template
-            # 3. Start it with minimal configuration
-            # For now, we'll use a simpler approach
-            
-            log("POOL", "🔥 Warming new container...")
-            
-            # Simulate warming time
-            await asyncio.sleep(2)
-            
-            # Mark as ready
-            sandbox.status = "ready"
-            sandbox.container_id = f"pool_{len(self.ready_pool)}_{datetime.now().timestamp()}"
-            
-            self.warming_pool.remove(sandbox)
-            self.ready_pool.append(sandbox)
-            
-            log("POOL", f"✅ Container warmed and ready (pool size: {len(self.ready_pool)})")
-            
+            log("POOL", f"🔥 Warming sandbox {sandbox.slot_id}...")
+            await self._docker_ok(["network", "create", *label, sandbox.network_name])
+            await self._docker_ok([
+                "run", "-d", "--name", names["mongo"], *label,
+                "--network", sandbox.network_name, "--network-alias", "mongo",
+                MONGO_IMAGE,
+            ])
+            if not await self._is_healthy(sandbox):
+                raise RuntimeError("containers exited during warm-up")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            log("POOL", f"❌ Failed to warm container: {e}")
-    
-    async def _create_on_demand(self, project_id: str, project_path: Path) -> Optional[Dict[str, Any]]:
-        """Fallback: Create sandbox on-demand using existing SandboxManager."""
-        try:
-            from app.sandbox import SandboxManager, SandboxConfig
-            
-            manager = SandboxManager()
-            result = await manager.create_sandbox(
-                project_id=project_id,
-                project_path=project_path,
-                config=SandboxConfig(),
+            self._counters["warm_failures"] += 1
+            log("POOL", f"❌ Failed to warm sandbox {sandbox.slot_id}: {e}")
+            if sandbox in self.warming_pool:
+                self.warming_pool.remove(sandbox)
+            await self._destroy(sandbox)
+            self._ready_event.set()  # Wake waiters so they stop waiting on this slot
+            return
+
+        sandbox.status = "ready"
+        sandbox.ready_since = time.monotonic()
+        async with self._lock:
+            if sandbox in self.warming_pool:
+                self.warming_pool.remove(sandbox)
+            self.ready_pool.append(sandbox)
+        self._ready_event.set()
+        self._last_warm_seconds = round(time.monotonic() - start, 3)
+        log("POOL", f"✅ Sandbox {sandbox.slot_id} warmed in {self._last_warm_seconds:.1f}s (pool size: {len(self.ready_pool)})")
+
+    async def _hand_off(self, sandbox: PooledSandbox, project_path: Path, rel_path: Path) -> None:
+        """
+        Start the project's dev servers in app containers on the golden images.
+
+        Only <project>/<service> is mounted (at its usual path under
+        /app/workspaces), never the workspaces root.
+        """
+        root = f"{WORKSPACES_MOUNT}/{rel_path.as_posix()}"
+        services = {
+            "backend": (
+                BACKEND_PORT,
+                ["-e", "MONGO_URL=mongodb://mongo:27017", "-e", f"DB_NAME={DB_NAME}",
+                 "-e", "ENVIRONMENT=development", "-e", "PYTHONUNBUFFERED=1"],
+                ["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", str(BACKEND_PORT), "--reload"],
+            ),
+            "frontend": (
+                FRONTEND_PORT,
+                ["-e", f"VITE_API_URL=http://backend:{BACKEND_PORT}/api", "-e", "NODE_ENV=development"],
+                ["/app/node_modules/.bin/vite", "--host", "0.0.0.0", "--port", str(FRONTEND_PORT)],
+            ),
+        }
+        for service, (port, env, command) in services.items():
+            if not (project_path / service).is_dir():
+                continue
+            workdir = f"{root}/{service}"
+            if service == "backend":
+                env = [*env, "-e", f"PYTHONPATH={workdir}"]
+            await self._docker_ok([
+                "run", "-d", "--name", sandbox.containers[service], "--label", POOL_LABEL,
+                "--network", sandbox.network_name, "--network-alias", service,
+                "-p", f"0:{port}", "-v", f"{project_path / service}:{workdir}", "-w", workdir,
+                *env, self.images[service], *command,
+            ])
+            sandbox.workdirs[service] = workdir
+        await self._read_ports(sandbox)
+        if not await self._is_healthy(sandbox):
+            raise RuntimeError("app containers exited on start")
+
+    async def _reset(self, sandbox: PooledSandbox) -> bool:
+        """Drop the project database and remove the app containers (and their mounts)."""
+        await self._docker([
+            "exec", sandbox.containers["mongo"], "mongosh", "--quiet", "--eval",
+            f"db.getSiblingDB('{DB_NAME}').dropDatabase()",
+        ], 30)
+        services = list(sandbox.workdirs)
+        sandbox.workdirs = {}
+        sandbox.ports = {}
+        if services:
+            returncode, _, _ = await self._docker(
+                ["rm", "-f", *(sandbox.containers[s] for s in services)], 60
             )
-            
-            if result.get("success"):
-                # Track in active sandboxes
-                sandbox = PooledSandbox(
-                    container_id=project_id,
-                    network_name=f"gencode_{project_id}",
-                    created_at=datetime.now(timezone.utc),
-                    status="in_use",
-                    assigned_project=project_id,
-                )
-                self.active_sandboxes[project_id] = sandbox
-                return result
-            
-            return None
-            
-        except Exception as e:
-            log("POOL", f"❌ On-demand creation failed: {e}")
-            return None
-    
+            if returncode != 0:
+                return False
+        return await self._is_healthy(sandbox)
+
+    def _expired(self, sandbox: PooledSandbox) -> bool:
+        age = (datetime.now(timezone.utc) - sandbox.created_at).total_seconds()
+        return age >= self.max_age
+
     async def _is_healthy(self, sandbox: PooledSandbox) -> bool:
-        """Check if a sandbox container is healthy."""
-        # Simple health check - in production, would ping the container
-        age_seconds = (datetime.now(timezone.utc) - sandbox.created_at).total_seconds()
-        return age_seconds < 3600  # Max 1 hour old
-    
-    async def _stop_sandbox(self, sandbox: PooledSandbox):
-        """Stop a sandbox container."""
+        """Mongo and (while in use) the app containers are running."""
+        names = [sandbox.containers["mongo"], *(sandbox.containers[s] for s in sandbox.workdirs)]
+        returncode, stdout, _ = await self._docker(
+            ["inspect", "-f", "{{.State.Running}}", *names], 15
+        )
+        states = stdout.split()
+        return returncode == 0 and len(states) == len(names) and all(s == "true" for s in states)
+
+    async def _evict_unhealthy(self) -> None:
+        async with self._lock:
+            candidates = list(self.ready_pool)
+        healthy = await asyncio.gather(*(self._is_healthy(s) for s in candidates))
+        for sandbox, ok in zip(candidates, healthy):
+            if ok and not self._expired(sandbox):
+                continue
+            async with self._lock:
+                if sandbox not in self.ready_pool:
+                    continue  # Acquired meanwhile
+                self.ready_pool.remove(sandbox)
+            self._counters["evicted"] += 1
+            log("POOL", f"🩺 Evicting {'expired' if ok else 'unhealthy'} sandbox {sandbox.slot_id}")
+            await self._destroy(sandbox)
+
+    async def _scale_down(self) -> None:
+        """Remove ready slots above target that have been idle longer than idle_ttl."""
+        now = time.monotonic()
+        async with self._lock:
+            surplus = len(self.ready_pool) - self.target_ready()
+            idle = [s for s in self.ready_pool if now - s.ready_since >= self.idle_ttl]
+            victims = sorted(idle, key=lambda s: s.ready_since)[:max(0, surplus)]
+            for sandbox in victims:
+                self.ready_pool.remove(sandbox)
+        for sandbox in victims:
+            self._counters["scaled_down"] += 1
+            log("POOL", f"📉 Scaling down idle sandbox {sandbox.slot_id}")
+            await self._destroy(sandbox)
+
+    async def _read_ports(self, sandbox: PooledSandbox) -> None:
+        for service, port in (("backend", BACKEND_PORT), ("frontend", FRONTEND_PORT)):
+            if service not in sandbox.workdirs:
+                continue
+            _, stdout, _ = await self._docker(["port", sandbox.containers[service], f"{port}/tcp"], 10)
+            bindings = stdout.split()
+            if bindings:
+                # Prefer the IPv4 binding - URL helpers parse "0.0.0.0:HOST->PORT"
+                host = next((b for b in bindings if b.startswith("0.0.0.0:")), bindings[0])
+                sandbox.ports[service] = f"{host}->{port}/tcp"
+
+    async def _destroy(self, sandbox: PooledSandbox) -> None:
+        """Remove a slot's containers and network."""
         try:
-            log("POOL", f"🛑 Stopping sandbox {sandbox.container_id}")
-            # In production, would run: docker stop {container_id}
+            log("POOL", f"🛑 Removing sandbox {sandbox.slot_id}")
+            await self._docker(["rm", "-f", *sandbox.containers.values()], 60)
+            await self._docker(["network", "rm", sandbox.network_name], 30)
         except Exception as e:
-            log("POOL", f"⚠️ Failed to stop sandbox: {e}")
-    
+            log("POOL", f"⚠️ Failed to remove sandbox {sandbox.slot_id}: {e}")
+
+    async def _remove_orphans(self) -> None:
+        """Remove every pooled container/network (labelled), e.g. after a crash."""
+        _, stdout, _ = await self._docker(["ps", "-aq", "--filter", f"label={POOL_LABEL}"], 30)
+        if stdout.split():
+            await self._docker(["rm", "-f", *stdout.split()], 120)
+        _, stdout, _ = await self._docker(["network", "ls", "-q", "--filter", f"label={POOL_LABEL}"], 30)
+        if stdout.split():
+            await self._docker(["network", "rm", *stdout.split()], 60)
+
+    async def _docker_ok(self, args: List[str], timeout: int = 120) -> str:
+        returncode, stdout, stderr = await self._docker(args, timeout)
+        if returncode != 0:
+            raise RuntimeError(f"docker {' '.join(args[:2])} failed: {stderr.strip()[-300:]}")
+        return stdout
+
     def _sandbox_to_dict(self, sandbox: PooledSandbox) -> Dict[str, Any]:
-        """Convert PooledSandbox to dict."""
+        """Sandbox info in SandboxManager's container format."""
+        containers = {
+            service: {
+                "id": sandbox.containers[service],
+                "short_id": sandbox.containers[service],
+                "name": sandbox.containers[service],
+                "status": "running",
+                "ports": sandbox.ports.get(service, ""),
+                "workdir": workdir,
+            }
+            for service, workdir in sandbox.workdirs.items()
+        }
         return {
             "success": True,
-            "container_id": sandbox.container_id,
+            "pooled": True,
+            "slot_id": sandbox.slot_id,
             "network_name": sandbox.network_name,
-            "status": sandbox.status,
             "project_id": sandbox.assigned_project,
-            "pooled": True,
+            "containers": containers,
         }
 
 
@@ -303,7 +598,7 @@ def get_sandbox_pool() -> SandboxPool:
     """Get the global sandbox pool instance."""
     global _pool
     if _pool is None:
-        _pool = SandboxPool(pool_size=2)
+        _pool = SandboxPool()
     return _pool
 
 
@@ -13,6 +13,9 @@ from typing import Dict, Any, Optional, Union, List
 from datetime import datetime, timezone
 import traceback
 
+from app.core.process_runner import run_process
+from .docker_api import API_ERRORS, get_docker_api, log_fallback
+from .docker_cli import run_docker
 from .sandbox_config import SandboxConfig
 from .health_monitor import HealthMonitor
 from .log_streamer import LogStreamer
@@ -124,8 +127,16 @@ class SandboxManager:
                     # This is a WARNING, not an error. Allow starting for health check.
                     # But log it so we can diagnose if tests fail later.
 
+            # Pre-warmed pool: hand the project a running sandbox instead of a cold build
+            pooled = await self._start_from_pool(project_id, project_path, wait_healthy)
+            if pooled is not None:
+                return pooled
+
             print(f"[SANDBOX] Starting containers for {project_id} (Services: {services or 'ALL'})")
 
+            # Dependencies come from cached base images; the build only copies source
+            await self._prepare_base_images(project_id, project_path)
+
             # Build command: docker compose up -d --build [service1 service2 ...]
             cmd_args = "up -d --build"
             if services:
@@ -150,7 +161,7 @@ class SandboxManager:
 
             await asyncio.sleep(3)
 
-            containers = self._get_project_containers(project_id)
+            containers = await self._get_project_containers_async(project_id)
             info["containers"] = containers
             info["status"] = "running"
 
@@ -182,6 +193,16 @@ class SandboxManager:
             info = self.active_sandboxes[project_id]
             project_path: Path = info["project_path"]
 
+            from app.sandbox.test_worker import get_test_workers
+            await get_test_workers().release(project_id)
+
+            if info.get("pooled"):
+                from app.sandbox.pool import get_sandbox_pool
+                print(f"[SANDBOX] Releasing pooled sandbox for {project_id}")
+                await get_sandbox_pool().release(project_id)
+                info.update(status="stopped", containers={}, pooled=False)
+                return {"success": True}
+
             print(f"[SANDBOX] Stopping containers for {project_id}")
             result = await self._run_compose_command(project_path, "down", timeout=120)
 
@@ -227,7 +248,8 @@ class SandboxManager:
 
     async def run_backend_tests(self, project_id: str, timeout: int = 300) -> Dict[str, Any]:
         """
-        Run backend tests using Docker Compose.
+        Run backend tests in the project's persistent test worker
+        (`docker compose run --rm` when SANDBOX_TEST_WORKER=false).
         Compatible with WSL2 (no Firecracker/KVM required).
 
         Returns:
@@ -244,7 +266,7 @@ class SandboxManager:
         info = self.active_sandboxes[project_id]
         project_path: Path = info["project_path"]
 
-        print(f"[SANDBOX] Running backend tests for {project_id} using Docker Compose")
+        print(f"[SANDBOX] Running backend tests for {project_id}")
 
         # Validate project structure before running tests
         validation = self._validate_project_structure(project_path)
@@ -256,11 +278,9 @@ class SandboxManager:
                 "details": validation,
             }
 
-        # Run pytest in the backend container
-        result = await self._run_compose_command(
-            project_path,
-            "run --rm backend pytest -v",
-            timeout=timeout
+        # Run pytest in the backend test worker (or a one-off container)
+        result = await self._run_test_pass(
+            project_id, "backend", "run --rm backend pytest -v", timeout
         )
 
         return {
@@ -274,7 +294,8 @@ class SandboxManager:
 
     async def run_frontend_tests(self, project_id: str, timeout: int = 600) -> Dict[str, Any]:
         """
-        Run frontend tests (Playwright) using Docker Compose.
+        Run frontend tests (Playwright) in the project's persistent test worker
+        (`docker compose run --rm` when SANDBOX_TEST_WORKER=false).
         Compatible with WSL2 (no Firecracker/KVM required).
 
         Returns:
@@ -291,7 +312,7 @@ class SandboxManager:
         info = self.active_sandboxes[project_id]
         project_path: Path = info["project_path"]
 
-        print(f"[SANDBOX] Running frontend tests for {project_id} using Docker Compose")
+        print(f"[SANDBOX] Running frontend tests for {project_id}")
 
         validation = self._validate_project_structure(project_path)
         if not validation["valid"]:
@@ -302,11 +323,9 @@ class SandboxManager:
                 "details": validation,
             }
 
-        # Run Playwright tests in the frontend container
-        result = await self._run_compose_command(
-            project_path,
-            "run --rm frontend npx playwright test",
-            timeout=timeout
+        # Run Playwright tests in the frontend test worker (or a one-off container)
+        result = await self._run_test_pass(
+            project_id, "frontend", "run --rm frontend npx playwright test", timeout
         )
 
         return {
@@ -322,41 +341,97 @@ class SandboxManager:
     # PRIVATE HELPERS
     # =========================================================================
 
+    async def _start_from_pool(
+        self, project_id: str, project_path: Path, wait_healthy: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Start result backed by a pre-warmed sandbox, or None to start cold."""
+        from app.core.config import settings
+        from app.sandbox.pool import get_sandbox_pool
+
+        info = self.active_sandboxes[project_id]
+        if info.get("pooled") and info.get("status") == "running":
+            return {"success": True, "containers": info["containers"], "health": {}, "pooled": True}
+        if not settings.sandbox.pool_enabled:
+            return None
+
+        acquired = await get_sandbox_pool().acquire(project_id, project_path)
+        if acquired is None:
+            return None
+
+        containers = acquired["containers"]
+        info.update(containers=containers, status="running", pooled=True)
+        print(f"[SANDBOX] ⚡ Using pooled sandbox {acquired['slot_id']} for {project_id}")
+
+        health = {}
+        if wait_healthy:
+            health = await self.health_monitor.wait_for_healthy(project_id, containers, timeout=60)
+        return {"success": True, "containers": containers, "health": health, "pooled": True}
+
+    async def _run_test_pass(
+        self, project_id: str, service: str, compose_command: str, timeout: int
+    ) -> Dict[str, Any]:
+        """Run a test pass in the warm test worker, falling back to `compose run --rm`."""
+        from app.core.config import settings
+        from app.sandbox.test_worker import get_test_workers
+
+        info = self.active_sandboxes[project_id]
+        project_path: Path = info["project_path"]
+        if settings.sandbox.test_worker_enabled:
+            # Pooled sandboxes already have a container with the project mounted
+            container = info["containers"].get(service) if info.get("pooled") else None
+            try:
+                result = await get_test_workers().run_tests(
+                    project_id, project_path, service, timeout=timeout, container=container
+                )
+                print(f"[SANDBOX] Tests ran in worker {result['worker']} ({result['shards']} shard(s))")
+                return result
+            except Exception as e:
+                print(f"[SANDBOX] ⚠️ Test worker unavailable, using a one-off container: {e}")
+
+        return await self._run_compose_command(project_path, compose_command, timeout=timeout)
+
+    async def _prepare_base_images(self, project_id: str, project_path: Path) -> None:
+        """Build/reuse the project's base images and write its compose override."""
+        from app.core.config import settings
+        from app.sandbox.image_cache import get_image_cache
+
+        cache = get_image_cache()
+        if not settings.sandbox.image_cache_enabled:
+            cache.clear_overrides(project_path)
+            return
+        try:
+            tags = await cache.prepare_project(project_path, project_id)
+            print(f"[SANDBOX] Using base images {tags}")
+        except Exception as e:
+            # Full Dockerfiles still work - just slower
+            print(f"[SANDBOX] ⚠️ Base image cache unavailable, building from scratch: {e}")
+            cache.clear_overrides(project_path)
+
     async def _run_compose_command(self, project_path: Path, command: str, timeout: int = 60):
+        from app.sandbox.image_cache import COMPOSE_OVERRIDE
+
         compose_file = project_path / "docker-compose.yml"
         base = self._get_compose_command()
-        full_cmd = f'{base} -f "{compose_file}" {command}'
+        full_cmd = f'{base} -f "{compose_file}"'
+        override_file = project_path / COMPOSE_OVERRIDE
+        if override_file.exists():
+            full_cmd += f' -f "{override_file}"'
+        full_cmd += f" {command}"
 
         try:
-            # Execute docker compose command in a thread (Windows compatibility)
-
-            # FIX ASYNC-001: Bypass asyncio subprocess limitations on Windows by using threads
-            # This works regardless of Selector vs Proactor event loop
-            def run_sync_cmd():
-                return subprocess.run(
-                    full_cmd,
-                    shell=True,
-                    capture_output=True, # Capture stdout/stderr
-                    text=True,           # Decode as string
-                    encoding="utf-8",    # Explicit encoding
-                    errors="replace",    # Safe error handling
-                    cwd=str(project_path),
-                    timeout=timeout
-                )
-
-            # Offload blocking IO to a thread
-            proc = await asyncio.to_thread(run_sync_cmd)
-            
+            result = await run_process(
+                full_cmd, shell=True, cwd=str(project_path), timeout=timeout, limit="docker"
+            )
+            if result.timed_out:
+                return {
+                    "returncode": -1,
+                    "stdout": result.stdout,
+                    "stderr": "[Sandbox] docker compose command timed out.",
+                }
             return {
-                "returncode": proc.returncode,
-                "stdout": proc.stdout,
-                "stderr": proc.stderr,
-            }
-        except subprocess.TimeoutExpired:
-             return {
-                "returncode": -1,
-                "stdout": "",
-                "stderr": "[Sandbox] docker compose command timed out.",
+                "returncode": result.returncode,
+                "stdout": result.stdout,
+                "stderr": result.stderr,
             }
         except Exception as e:
             print(f"[SANDBOX CRITICAL] Exception in docker compose: {e!r}")
@@ -429,23 +504,27 @@ class SandboxManager:
         return self._compose_cmd
 
     async def _get_project_containers_async(self, project_id: str) -> Dict[str, Dict[str, Any]]:
-        """Async version of _get_project_containers."""
+        """Async version of _get_project_containers (events cache when live, else Engine API, else CLI)."""
+        from app.sandbox.container_state import get_container_states, state_from_api
+
+        states = get_container_states()
+        if states.live:
+            return states.project_containers(project_id)
+
+        api = get_docker_api()
+        if api is not None:
+            try:
+                rows = await api.list_containers(filters={"name": [project_id]})
+                return {state.service: state.to_dict() for state in map(state_from_api, rows)}
+            except API_ERRORS as e:
+                log_fallback("list containers", e)
+
         containers: Dict[str, Dict[str, Any]] = {}
         try:
-            # FIX ASYNC-001: Use asyncio.to_thread for Windows compatibility
-            def run_docker_ps():
-                return subprocess.run(
-                    ["docker", "ps", "--filter", f"name={project_id}", "--format", "{{json .}}"],
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",  # Explicit encoding
-                    errors="replace",  # Safe error handling
-                    timeout=10
-                )
-            
-            proc = await asyncio.to_thread(run_docker_ps)
-            stdout = proc.stdout or ""
-            
+            _, stdout, _ = await run_docker(
+                ["ps", "--filter", f"name={project_id}", "--format", "{{json .}}"], 10
+            )
+
             for line in stdout.splitlines():
                 try:
                     data = json.loads(line)
@@ -540,31 +619,37 @@ class SandboxManager:
                 return {"success": False, "error": f"Service {service} not found"}
 
             container_id = containers[service]["short_id"]
-            # Use -w /app to ensure commands run from the correct working directory
-            full_cmd = f"docker exec -w /app {container_id} {command}"
-
-            # FIX ASYNC-001: Bypass asyncio subprocess limitations on Windows by using threads
-            # This works regardless of Selector vs Proactor event loop
-            def run_sync_cmd():
-                return subprocess.run(
-                    full_cmd,
-                    shell=True,
-                    capture_output=True,  # Capture stdout/stderr
-                    text=True,            # Decode as string
-                    encoding="utf-8",     # Explicit encoding
-                    errors="replace",     # Safe error handling
-                    timeout=timeout
-                )
-
-            # Offload blocking IO to a thread
-            proc = await asyncio.to_thread(run_sync_cmd)
+            # Use -w /app (or the project dir of a pooled sandbox) so commands run
+            # from the correct working directory
+            workdir = containers[service].get("workdir") or "/app"
 
-            # Map subprocess.run result to the expected dictionary format
+            api = get_docker_api()
+            if api is not None:
+                try:
+                    # sh -c: `&&` chains and redirects run inside the container
+                    returncode, stdout, stderr = await api.exec(
+                        container_id, ["sh", "-c", command], workdir=workdir, timeout=timeout
+                    )
+                    return {
+                        "stdout": stdout,
+                        "stderr": stderr,
+                        "returncode": returncode,
+                        "success": returncode == 0,
+                    }
+                except API_ERRORS as e:
+                    log_fallback("exec", e)
+
+            # Same `sh -c` as the Engine API path - the host shell never sees the command
+            result = await run_process(
+                ["docker", "exec", "-w", workdir, container_id, "sh", "-c", command],
+                timeout=timeout,
+                limit="docker",
+            )
             return {
-                "stdout": proc.stdout,
-                "stderr": proc.stderr,
-                "returncode": proc.returncode,
-                "success": proc.returncode == 0
+                "stdout": result.stdout,
+                "stderr": result.stderr,
+                "returncode": result.returncode,
+                "success": result.success,
             }
 
         except Exception as e:
@@ -0,0 +1,348 @@
+# app/sandbox/test_worker.py
+"""
+Persistent test workers for sandbox test passes.
+
+run_backend_tests / run_frontend_tests used `docker compose run --rm`, which
+creates and destroys a container (and its network attachment) on every
+attempt. A test worker is one long-lived container per (project, service):
+
+    docker compose -f docker-compose.yml [-f docker-compose.cache.yml]
+        run -d --name gencode-test-<project>-<service> <service> sleep infinity
+
+It is created from the same compose service, so it joins the project network
+(mongo reachable as before) and the project's ./backend or ./frontend is
+bind-mounted at /app - test passes always see the current source. Tests then
+run with `docker exec`, so a repeat pass starts in well under a second.
+
+Sharding (shards > 1):
+    backend   pytest-xdist `-n N` when the image has it, otherwise the test
+              files are split round-robin over N parallel `docker exec`s
+    frontend  Playwright `--workers=N` (one exec, one dev server)
+
+Pooled sandboxes already run on a container with the project mounted; their
+tests exec there directly. Workers idle for `idle_ttl` are removed by a
+background reaper, a worker whose pass timed out is removed immediately, and
+a worker that disappeared is recreated once.
+
+Usage:
+    workers = get_test_workers()
+    result = await workers.run_tests(project_id, project_path, "backend")
+    await workers.release(project_id)  # on sandbox stop
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logging import log
+from app.sandbox.docker_cli import DockerRunner, run_docker
+
+
+WORKER_LABEL = "gencode.test-worker"
+SERVICES = ("backend", "frontend")
+
+# docker exec failures that mean the worker itself is gone
+_DEAD_WORKER = ("No such container", "is not running", "cannot exec in a stopped")
+
+
+@dataclass
+class TestWorker:
+    """A warm container that test passes exec into."""
+    __test__ = False  # Not a pytest test class
+
+    project_id: str
+    service: str
+    container: str
+    workdir: str = "/app"
+    owned: bool = True       # False for pooled sandbox containers (not ours to remove)
+    xdist: Optional[bool] = None
+    in_use: int = 0
+    runs: int = 0
+    last_used: float = 0.0   # time.monotonic()
+
+
+def worker_name(project_id: str, service: str) -> str:
+    """Deterministic container name, so a leftover worker is replaced on start."""
+    safe = re.sub(r"[^a-zA-Z0-9_.-]", "-", project_id).strip("-.").lower() or "project"
+    return f"gencode-test-{safe}-{service}"
+
+
+def shard_files(files: List[str], shards: int) -> List[List[str]]:
+    """Split test files round-robin into at most `shards` non-empty groups."""
+    groups = [files[i::shards] for i in range(max(1, shards))]
+    return [group for group in groups if group]
+
+
+class TestWorkerManager:
+    """Keeps one warm test container per project service and runs tests in it."""
+    __test__ = False
+
+    def __init__(
+        self,
+        idle_ttl: Optional[int] = None,
+        shards: Optional[int] = None,
+        runner: Optional[DockerRunner] = None,
+        start_timeout: int = 300,
+    ):
+        from app.core.config import settings
+        cfg = settings.sandbox
+        self.idle_ttl = cfg.test_worker_idle_ttl if idle_ttl is None else idle_ttl
+        self.shards = max(1, cfg.test_shards if shards is None else shards)
+        self.start_timeout = start_timeout
+        self._docker = runner or run_docker
+
+        self.workers: Dict[Tuple[str, str], TestWorker] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._counters = {
+            "starts": 0,
+            "reuses": 0,
+            "restarts": 0,
+            "reaped": 0,
+            "timeouts": 0,
+            "runs": 0,
+        }
+        self._last_start_seconds: Optional[float] = None
+        self._last_acquire_seconds: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def run_tests(
+        self,
+        project_id: str,
+        project_path: Path,
+        service: str,
+        timeout: int = 300,
+        shards: Optional[int] = None,
+        container: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the service's test suite in its warm worker.
+
+        `container` is a SandboxManager container dict (name + workdir) to
+        exec in instead of a dedicated worker - used for pooled sandboxes.
+
+        Returns {returncode, stdout, stderr, shards, worker}. Raises
+        RuntimeError if no worker could be started.
+        """
+        if service not in SERVICES:
+            raise ValueError(f"No test runner for service {service!r}")
+        shards = max(1, shards or self.shards)
+
+        for attempt in range(2):
+            acquire_start = time.monotonic()
+            worker = await self._acquire(project_id, Path(project_path), service, container)
+            self._last_acquire_seconds = round(time.monotonic() - acquire_start, 4)
+            worker.in_use += 1
+            try:
+                if service == "backend":
+                    result = await self._run_backend(worker, Path(project_path), shards, timeout)
+                else:
+                    result = await self._run_frontend(worker, shards, timeout)
+            finally:
+                worker.in_use -= 1
+                worker.last_used = time.monotonic()
+
+            if attempt == 0 and worker.owned and self._worker_gone(result):
+                log("SANDBOX", f"🔁 Test worker {worker.container} is gone - recreating")
+                self._counters["restarts"] += 1
+                self.workers.pop((project_id, service), None)
+                continue
+            break
+
+        worker.runs += 1
+        self._counters["runs"] += 1
+        if result["returncode"] == -1 and "timed out" in result["stderr"] and worker.owned:
+            # docker exec returned but the tests keep running inside the container
+            self._counters["timeouts"] += 1
+            await self._remove(worker)
+        return {**result, "worker": worker.container}
+
+    async def release(self, project_id: str) -> None:
+        """Remove a project's workers (sandbox stopped/destroyed)."""
+        for key in [k for k in self.workers if k[0] == project_id]:
+            await self._remove(self.workers[key])
+
+    async def reap_idle(self) -> int:
+        """Remove workers idle for longer than idle_ttl. Returns how many."""
+        now = time.monotonic()
+        idle = [
+            w for w in self.workers.values()
+            if w.owned and w.in_use == 0 and now - w.last_used >= self.idle_ttl
+        ]
+        for worker in idle:
+            log("SANDBOX", f"💤 Removing idle test worker {worker.container}")
+            await self._remove(worker)
+        self._counters["reaped"] += len(idle)
+        return len(idle)
+
+    async def shutdown(self) -> None:
+        """Stop the reaper and remove every worker (labelled ones included)."""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            await asyncio.gather(self._reaper_task, return_exceptions=True)
+            self._reaper_task = None
+        self.workers.clear()
+        _, stdout, _ = await self._docker(["ps", "-aq", "--filter", f"label={WORKER_LABEL}"], 30)
+        if stdout.split():
+            await self._docker(["rm", "-f", *stdout.split()], 120)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "idle_ttl": self.idle_ttl,
+            "shards": self.shards,
+            "workers": {
+                w.container: {"project_id": w.project_id, "service": w.service, "runs": w.runs, "xdist": w.xdist}
+                for w in self.workers.values()
+            },
+            **self._counters,
+            "last_start_seconds": self._last_start_seconds,
+            "last_acquire_seconds": self._last_acquire_seconds,
+        }
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _acquire(
+        self, project_id: str, project_path: Path, service: str, container: Optional[Dict[str, Any]]
+    ) -> TestWorker:
+        key = (project_id, service)
+        if container is not None:
+            worker = self.workers.get(key)
+            if worker is None or worker.container != container["name"]:
+                worker = TestWorker(
+                    project_id, service, container["name"], container.get("workdir") or "/app", owned=False
+                )
+                self.workers[key] = worker
+            self._counters["reuses"] += 1
+            return worker
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            worker = self.workers.get(key)
+            if worker is not None:
+                self._counters["reuses"] += 1
+                return worker
+            worker = await self._start(project_id, project_path, service)
+            self.workers[key] = worker
+            self._ensure_reaper()
+            return worker
+
+    async def _start(self, project_id: str, project_path: Path, service: str) -> TestWorker:
+        from app.sandbox.image_cache import COMPOSE_OVERRIDE
+
+        name = worker_name(project_id, service)
+        log("SANDBOX", f"🧪 Starting test worker {name}")
+        start = time.monotonic()
+        # A worker left behind by a crashed process has the same name
+        await self._docker(["rm", "-f", name], 60)
+
+        compose = ["compose", "-f", str(project_path / "docker-compose.yml")]
+        if (project_path / COMPOSE_OVERRIDE).exists():
+            compose += ["-f", str(project_path / COMPOSE_OVERRIDE)]
+        returncode, _, stderr = await self._docker(
+            [*compose, "run", "-d", "--name", name, "--label", WORKER_LABEL, service, "sleep", "infinity"],
+            self.start_timeout,
+        )
+        if returncode != 0:
+            raise RuntimeError(f"Could not start test worker {name}: {stderr.strip()[-300:]}")
+
+        self._counters["starts"] += 1
+        self._last_start_seconds = round(time.monotonic() - start, 3)
+        return TestWorker(project_id, service, name, last_used=time.monotonic())
+
+    async def _remove(self, worker: TestWorker) -> None:
+        self.workers.pop((worker.project_id, worker.service), None)
+        if worker.owned:
+            await self._docker(["rm", "-f", worker.container], 60)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        interval = max(1, min(60, self.idle_ttl // 2))
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.reap_idle()
+                if not any(w.owned for w in self.workers.values()):
+                    self._reaper_task = None
+                    return
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log("SANDBOX", f"⚠️ Test worker reaper error: {e}")
+
+    @staticmethod
+    def _worker_gone(result: Dict[str, Any]) -> bool:
+        return any(marker in result["stderr"] for marker in _DEAD_WORKER)
+
+    # ------------------------------------------------------------------
+    # Test runners
+    # ------------------------------------------------------------------
+
+    async def _exec(self, worker: TestWorker, command: List[str], timeout: int, env: Optional[Dict[str, str]] = None):
+        args = ["exec", "-w", worker.workdir]
+        for key, value in (env or {}).items():
+            args += ["-e", f"{key}={value}"]
+        return await self._docker([*args, worker.container, *command], timeout)
+
+    async def _run_backend(self, worker: TestWorker, project_path: Path, shards: int, timeout: int) -> Dict[str, Any]:
+        # Pooled containers run on the workspaces mount, not /app
+        env = {"PYTHONPATH": worker.workdir}
+        if shards > 1 and worker.xdist is None:
+            returncode, _, _ = await self._exec(worker, ["python", "-c", "import xdist"], 30)
+            worker.xdist = returncode == 0
+
+        if shards == 1 or worker.xdist:
+            command = ["pytest", "-v"] + (["-n", str(shards)] if shards > 1 else [])
+            returncode, stdout, stderr = await self._exec(worker, command, timeout, env)
+            return {"returncode": returncode, "stdout": stdout, "stderr": stderr, "shards": shards}
+
+        # No xdist in the image: split test files over parallel execs
+        tests_dir = project_path / "backend" / "tests"
+        files = sorted(p.relative_to(project_path / "backend").as_posix() for p in tests_dir.rglob("test_*.py"))
+        groups = shard_files(files, shards)
+        if len(groups) <= 1:
+            return await self._run_backend(worker, project_path, 1, timeout)
+
+        results = await asyncio.gather(
+            *(self._exec(worker, ["pytest", "-v", *group], timeout, env) for group in groups)
+        )
+        return self._merge(results)
+
+    async def _run_frontend(self, worker: TestWorker, shards: int, timeout: int) -> Dict[str, Any]:
+        command = ["npx", "playwright", "test"] + ([f"--workers={shards}"] if shards > 1 else [])
+        returncode, stdout, stderr = await self._exec(worker, command, timeout)
+        return {"returncode": returncode, "stdout": stdout, "stderr": stderr, "shards": shards}
+
+    @staticmethod
+    def _merge(results: List[Tuple[int, str, str]]) -> Dict[str, Any]:
+        """Combine shard outputs; the pass fails with the first failing shard's code."""
+        total = len(results)
+        stdout = "\n".join(f"===== shard {i}/{total} =====\n{out}" for i, (_, out, _) in enumerate(results, 1))
+        stderr = "\n".join(err for _, _, err in results if err)
+        returncode = next((code for code, _, _ in results if code != 0), 0)
+        return {"returncode": returncode, "stdout": stdout, "stderr": stderr, "shards": total}
+
+
+_workers: Optional[TestWorkerManager] = None
+
+
+def get_test_workers() -> TestWorkerManager:
+    """Process-wide test worker manager."""
+    global _workers
+    if _workers is None:
+        _workers = TestWorkerManager()
+    return _workers
+
+
+async def shutdown_test_workers() -> None:
+    """Remove all test workers on app shutdown (no-op if none were used)."""
+    if _workers is not None:
+        await _workers.shutdown()
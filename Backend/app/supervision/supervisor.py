@@ -12,8 +12,10 @@ from typing import Any, Dict, List, Optional
 
 from app.core.logging import log, log_section, log_files, log_result
 from app.core.logging import log, log_section, log_files, log_result
+from app.core.profiling import phase
 from app.llm import call_llm, call_llm_with_usage
 from app.llm.prompts import MARCUS_SUPERVISION_PROMPT
+from app.llm.scheduler import llm_context
 from app.tracking.quality import track_quality_score
 from app.orchestration.checkpoint import CheckpointManagerV2
 from app.arbormind.observation.execution_ledger import record_supervisor_event, get_current_run_id
@@ -44,10 +46,11 @@ async def marcus_supervise(
     # ═══════════════════════════════════════════════════════
     # This runs BEFORE the expensive LLM review, saving $0.10+ per rejection
     
-    from app.validation import preflight_check
+    from app.validation import preflight_check_async
     
-    # Run pre-flight validation on all files
-    cleaned_output, rejection_reasons = preflight_check(agent_output)
+    # Run pre-flight validation on all files (worker processes for large batches)
+    with phase("validation"):
+        cleaned_output, rejection_reasons = await preflight_check_async(agent_output)
     
     # If pre-flight failed, reject immediately
     # If pre-flight failed, reject immediately
@@ -343,11 +346,14 @@ RESPOND WITH JSON:
         # Cap at reasonable limit for reviews (don't need full generation tokens)
         review_tokens = min(review_tokens, 12000)
         
-        llm_result = await call_llm_with_usage(
-            prompt=review_prompt,
-            system_prompt=MARCUS_SUPERVISION_PROMPT,
-            max_tokens=review_tokens,
-        )
+        with llm_context("supervision"):
+            llm_result = await call_llm_with_usage(
+                prompt=review_prompt,
+                system_prompt=MARCUS_SUPERVISION_PROMPT,
+                max_tokens=review_tokens,
+                cache_prefix=MARCUS_SUPERVISION_PROMPT,  # Static: provider may cache it
+                use_cache=False,  # A replayed verdict would skip the actual review
+            )
         response = llm_result.get("text", "")
         usage = llm_result.get("usage", {})
 
@@ -359,7 +365,8 @@ RESPOND WITH JSON:
                      step=f"{step_name}:Review",
                      input_tokens=usage.get("input", 0),
                      output_tokens=usage.get("output", 0),
-                     model="gemini-2.0-flash-exp"
+                     cached_tokens=usage.get("cached", 0),
+                     model=usage.get("model") or "gemini-2.0-flash-exp"
                  )
              except Exception:
                  pass # Don't fail on budget tracking
@@ -623,7 +630,7 @@ async def supervised_agent_call(
     """
     from app.tools import run_tool
     from app.llm.prompt_management import filter_files_for_step
-    import os
+    from app.core.project_files import read_project_files
 
     # 1. Prepare Context (Muscle)
     archetype = _extract_archetype(user_request)
@@ -635,24 +642,9 @@ async def supervised_agent_call(
 
 
     # Read project files (Muscle - context preparation)
-    def _read_files():
-        files = []
-        for root, _, filenames in os.walk(project_path):
-            for filename in filenames:
-                if filename.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md')):
-                    file_path = Path(root) / filename
-                    rel_path = file_path.relative_to(project_path)
-                    if any(skip in str(rel_path) for skip in ['node_modules', 'dist', '__pycache__', '.git']):
-                        continue
-                    try:
-                        content = file_path.read_text(encoding="utf-8", errors="ignore")
-                        if len(content) < 50000:
-                            files.append({"path": str(rel_path).replace("\\", "/"), "content": content})
-                    except Exception:
-                        pass
-        return files
-    
-    all_files = await asyncio.to_thread(_read_files)
+    # V3: Cached + step-scoped - only files this step can see are stat'ed/read
+    with phase("file_io"):
+        all_files = await asyncio.to_thread(read_project_files, project_path, step_id)
     relevant_files = filter_files_for_step(step_id, all_files)
 
     log_section("SUPERVISION", f"🔄 {agent_name} - {step_name}", project_id)
@@ -669,7 +661,7 @@ async def supervised_agent_call(
         "archetype": archetype,
         "vibe": vibe,
         "files": relevant_files,
-        "contracts": contracts[:15000] if contracts else "",
+        "contracts": contracts or "",  # Fitted to the step's token budget by the context packer
         "temperature_override": temperature_override,
         "is_retry": is_retry,
     }
@@ -686,19 +678,25 @@ async def supervised_agent_call(
         parsed = normalize_llm_output(str(raw_output), step_name=step_id)
 
     # 4. Verify with Marcus (Law/Gate)
-    review = await marcus_supervise(
-        project_id=project_id,
-        manager=manager,
-        agent_name=agent_name,
-        step_name=step_name,
-        agent_output=parsed,
-        contracts=contracts,
-        user_request=user_request,
-    )
+    with phase("supervision"):
+        review = await marcus_supervise(
+            project_id=project_id,
+            manager=manager,
+            agent_name=agent_name,
+            step_name=step_name,
+            agent_output=parsed,
+            contracts=contracts,
+            user_request=user_request,
+        )
 
     quality = review.get("quality_score", 7)
     approved = review.get("approved", False)
     
+    if not approved and isinstance(parsed, dict) and parsed.get("cache_key"):
+        # Never replay a rejected generation from the response cache
+        from app.llm import evict_cached_response
+        await evict_cached_response(parsed["cache_key"])
+    
     # 5. Persistence (Muscle)
     if approved:
         ckpt_mgr = CheckpointManagerV2(base_dir=str(project_path / ".fast_checkpoints"))
@@ -150,7 +150,7 @@ async def tiered_review(
     Returns:
         Tuple of (approved_files, review_summary)
     """
-    from app.validation import validate_syntax
+    from app.validation import get_validation_service
     
     classified = classify_files(files)
     approved_files = []
@@ -179,11 +179,10 @@ async def tiered_review(
     if preflight_files:
         log("TIERED", f"🔍 Pre-flight checking {len(preflight_files)} files...")
         
-        for f in preflight_files:
+        results = await get_validation_service().validate_each(preflight_files)
+        for f, result in zip(preflight_files, results):
             path = f.get("path", "")
-            content = f.get("content", "")
             
-            result = validate_syntax(path, content)
             if result.valid:
                 approved_files.append(f)
                 review_results["preflight_only"] += 1
@@ -199,11 +198,8 @@ async def tiered_review(
     if lightweight_files:
         # For now, treat lightweight same as preflight
         # In future, could use a faster/cheaper LLM
-        for f in lightweight_files:
-            path = f.get("path", "")
-            content = f.get("content", "")
-            
-            result = validate_syntax(path, content)
+        results = await get_validation_service().validate_each(lightweight_files)
+        for f, result in zip(lightweight_files, results):
             if result.valid:
                 approved_files.append(f)
                 review_results["preflight_only"] += 1
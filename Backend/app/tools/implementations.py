@@ -20,7 +20,6 @@ import os
 import ast
 import json
 import asyncio
-import subprocess
 from enum import Enum
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
@@ -35,6 +34,7 @@ from app.sandbox import SandboxManager, SandboxConfig  # type: ignore[import]
 from app.utils.path_utils import get_project_path
 from app.tools.patching import PatchEngine, apply_unified_patch
 from app.core.logging import log
+from app.core.process_runner import run_process
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TIT: Tool Invocation Trace
@@ -78,7 +78,7 @@ SANDBOX: Optional[SandboxManager] = None  # Set to None initially
 
 # =====================================================================
 # FIX ASYNC-001: Async subprocess helper to avoid blocking event loop
-# Uses asyncio.to_thread for Windows compatibility (SelectorEventLoop)
+# Uses the shared async process runner (app/core/process_runner.py)
 # =====================================================================
 async def _async_run_command(
     cmd: Union[str, List[str]],
@@ -87,39 +87,27 @@ async def _async_run_command(
     shell: bool = True,
 ) -> Dict[str, Any]:
     """
-    Run a command asynchronously using asyncio.to_thread + subprocess.run.
-    This is Windows-compatible (works with SelectorEventLoop).
+    Run a command asynchronously (killed with its process group on timeout/cancel).
     Returns dict with success, stdout, stderr, returncode.
     """
     try:
-        def run_sync():
-            return subprocess.run(
-                cmd if isinstance(cmd, str) else " ".join(cmd) if shell else cmd,
-                shell=shell,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",  # Explicitly force UTF-8
-                errors="replace",  # Replace bad characters instead of crashing
-                cwd=cwd,
-                timeout=timeout
-            )
-        
-        proc = await asyncio.to_thread(run_sync)
-        
+        if shell and not isinstance(cmd, str):
+            cmd = " ".join(cmd)
+        proc = await run_process(cmd, shell=shell, cwd=cwd, timeout=timeout)
+        if proc.timed_out:
+            return {
+                "success": False,
+                "stdout": proc.stdout,
+                "stderr": proc.stderr,
+                "returncode": -1,
+                "error": f"Command timed out after {timeout}s",
+            }
         return {
-            "success": proc.returncode == 0,
-            "stdout": proc.stdout or "",
-            "stderr": proc.stderr or "",
+            "success": proc.success,
+            "stdout": proc.stdout,
+            "stderr": proc.stderr,
             "returncode": proc.returncode,
         }
-    except subprocess.TimeoutExpired:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": "",
-            "returncode": -1,
-            "error": f"Command timed out after {timeout}s",
-        }
     except Exception as e:
         return {
             "success": False,
@@ -1097,6 +1085,7 @@ async def tool_cross_llm_validator(args: Dict[str, Any]) -> Dict[str, Any]:
     
     try:
         from app.llm import call_llm
+        from app.llm.scheduler import llm_context
         
         # Build validation prompt based on type
         prompts = {
@@ -1133,13 +1122,14 @@ Code:
         prompt = prompts.get(validation_type, prompts["code_review"])
         
         # Call secondary LLM
-        response = await call_llm(
-            prompt=prompt,
-            provider=secondary_provider,
-            system_prompt="You are a code reviewer. Return only valid JSON.",
-            temperature=0.1,
-            max_tokens=2000,
-        )
+        with llm_context("background"):
+            response = await call_llm(
+                prompt=prompt,
+                provider=secondary_provider,
+                system_prompt="You are a code reviewer. Return only valid JSON.",
+                temperature=0.1,
+                max_tokens=2000,
+            )
         
         # Try to parse JSON response
         import json
@@ -294,6 +294,33 @@ def _extract_from_architecture_legacy(path: Path) -> Tuple[Optional[str], Option
      return (None, None)
 
 
+def _document_classes(content: str, strict: bool = False) -> List[str]:
+    """
+    Document class names defined in models.py content.
+    
+    Uses the shared (content-hash cached) parse from app.validation; falls back
+    to a line scan that skips comments when the file does not parse.
+    strict=True only matches `class X(Document)`.
+    """
+    from app.validation.ast_cache import analyze_python
+    
+    analysis = analyze_python(content)
+    if analysis.ok:
+        return analysis.document_classes(strict=strict)
+    
+    pattern = r'class\s+(\w+)\s*\(\s*Document\s*\)' if strict else r'class\s+(\w+)\s*\([^)]*Document[^)]*\)'
+    models = []
+    # Process line-by-line to properly skip comments
+    for line in content.splitlines():
+        stripped = line.lstrip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        match = re.match(pattern, stripped)
+        if match:
+            models.append(match.group(1))
+    return models
+
+
 def _extract_from_models(path: Path) -> Tuple[Optional[str], Optional[str]]:
     """Extract entity from models.py Document class definitions.
     
@@ -306,22 +333,10 @@ def _extract_from_models(path: Path) -> Tuple[Optional[str], Optional[str]]:
     try:
         content = path.read_text(encoding="utf-8")
         
-        # Process line-by-line to properly skip comments
-        for line in content.splitlines():
-            # Strip leading whitespace for the check
-            stripped = line.lstrip()
-            
-            # Skip empty lines and comments
-            if not stripped or stripped.startswith('#'):
-                continue
-            
-            # Match actual class definition on this line
-            match = re.match(r'class\s+(\w+)\s*\(\s*Document\s*\)', stripped)
-            if match:
-                model_name = match.group(1)
-                # Skip base classes
-                if model_name not in ["BaseDocument", "BaseModel", "Document"]:
-                    return (model_name.lower(), model_name)
+        for model_name in _document_classes(content, strict=True):
+            # Skip base classes
+            if model_name not in ["BaseDocument", "BaseModel", "Document"]:
+                return (model_name.lower(), model_name)
                 
     except Exception as e:
         log("DISCOVERY", f"Error reading models.py: {e}")
@@ -350,24 +365,11 @@ def extract_all_models_from_models_py(project_path: Path) -> List[str]:
     
     try:
         content = models_path.read_text(encoding="utf-8")
-        models = []
-        
-        # Process line-by-line to properly skip comments
-        for line in content.splitlines():
-            stripped = line.lstrip()
-            
-            # Skip empty lines and comments
-            if not stripped or stripped.startswith('#'):
-                continue
-            
-            # Match actual class definitions that inherit from Document
-            # Updated to handle multiple inheritance: class X(Document, BaseClass)
-            match = re.match(r'class\s+(\w+)\s*\([^)]*Document[^)]*\)', stripped)
-            if match:
-                model_name = match.group(1)
-                # Skip base classes
-                if model_name not in ["BaseDocument", "BaseModel", "Document"]:
-                    models.append(model_name)
+        models = [
+            model_name for model_name in _document_classes(content)
+            # Skip base classes
+            if model_name not in ["BaseDocument", "BaseModel", "Document"]
+        ]
         
         if models:
             log("DISCOVERY", f"✅ Found {len(models)} models in models.py: {models}")
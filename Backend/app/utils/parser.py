@@ -28,7 +28,7 @@ STRICT PROTOCOL:
 """
 
 import re
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # HDAP MARKERS (Attribute-based format)
@@ -124,6 +124,113 @@ def parse_hdap(raw_output: str) -> Dict[str, Any]:
     }
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# INCREMENTAL HDAP PARSER (Streaming)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Markers can be split across stream chunks - rescan this many trailing chars
+_STREAM_RESCAN_CHARS = 512
+
+
+class HDAPStreamParser:
+    """
+    Incremental HDAP state machine for streamed LLM output.
+    
+    Feed text chunks as they arrive; each <<<FILE ...>>> ... <<<END_FILE>>>
+    block is returned from feed() as soon as its END_FILE marker lands, so
+    callers can start validation / progress reporting while the model is
+    still generating.
+    
+    close() returns the authoritative parse_hdap() result for the full text,
+    so streaming never changes what the pipeline ultimately sees.
+    
+    Usage:
+        parser = HDAPStreamParser()
+        async for chunk in stream:
+            for file in parser.feed(chunk):
+                ...  # {"path": ..., "content": ...}
+        result = parser.close()
+    """
+    
+    def __init__(self):
+        self._text = ""
+        self._scan_pos = 0          # Where to look for the next marker
+        self._current: Optional[Tuple[str, int]] = None  # (path, content_start) of open file
+        self._start_pattern = None  # Locked to attribute or legacy format on first marker
+        self.files: List[Dict[str, str]] = []
+        self.incomplete_files: List[str] = []
+    
+    @property
+    def text(self) -> str:
+        """Full text received so far."""
+        return self._text
+    
+    def _find_start(self, pos: int):
+        if self._start_pattern is not None:
+            return self._start_pattern.search(self._text, pos)
+        match = FILE_START_PATTERN.search(self._text, pos)
+        legacy = LEGACY_FILE_START.search(self._text, pos)
+        if legacy and (not match or legacy.start() < match.start()):
+            match = legacy
+        return match
+    
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        """
+        Append a chunk and return any files completed by it.
+        """
+        if not chunk:
+            return []
+        
+        self._text += chunk
+        completed: List[Dict[str, str]] = []
+        
+        while True:
+            if self._current is None:
+                match = self._find_start(self._scan_pos)
+                if not match:
+                    # Keep a tail so a marker split across chunks is still found
+                    self._scan_pos = max(self._scan_pos, len(self._text) - _STREAM_RESCAN_CHARS)
+                    break
+                if self._start_pattern is None:
+                    self._start_pattern = (
+                        FILE_START_PATTERN if FILE_START_PATTERN.match(self._text, match.start())
+                        else LEGACY_FILE_START
+                    )
+                self._current = (match.group(1).strip(), match.end())
+                self._scan_pos = match.end()
+                continue
+            
+            path, content_start = self._current
+            end_match = FILE_END_PATTERN.search(self._text, self._scan_pos)
+            next_start = self._find_start(self._scan_pos)
+            
+            if end_match and (not next_start or end_match.start() < next_start.start()):
+                file = {"path": path, "content": self._text[content_start:end_match.start()].strip()}
+                self.files.append(file)
+                completed.append(file)
+                self._current = None
+                self._scan_pos = end_match.end()
+                continue
+            
+            if next_start:
+                # New FILE marker before END_FILE: previous file was truncated
+                self.incomplete_files.append(path)
+                self._current = None
+                self._scan_pos = next_start.start()
+                continue
+            
+            self._scan_pos = max(content_start, len(self._text) - _STREAM_RESCAN_CHARS)
+            break
+        
+        return completed
+    
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish the stream and return the full parse_hdap() result.
+        """
+        return parse_hdap(self._text)
+
+
 def _is_valid_file_path(path: str) -> bool:
     """Check if a path looks like a valid file path."""
     if not path or len(path) < 3:
@@ -356,6 +463,7 @@ def normalize_unicode_aggressively(content: str, filepath: str = "") -> str:
 __all__ = [
     "normalize_llm_output",
     "parse_hdap",
+    "HDAPStreamParser",
     "parse_json",
     "parse_json_metadata",
     "sanitize_marcus_output",
@@ -19,6 +19,13 @@ from .syntax_validator import (
     assert_no_empty_defs,
     check_duplicate_attributes,
 )
+from .pool import (
+    ValidationService,
+    get_validation_service,
+    validate_files_batch_async,
+    preflight_check_async,
+    shutdown_validation_pool,
+)
 
 # Re-export with shorter names
 validate_python = validate_python_syntax
@@ -35,6 +42,13 @@ __all__ = [
     "validate_files_batch",
     "preflight_check",
     
+    # Async (process pool) validation
+    "ValidationService",
+    "get_validation_service",
+    "validate_files_batch_async",
+    "preflight_check_async",
+    "shutdown_validation_pool",
+    
     # Result and error types
     "ValidationResult",
     "IncompleteCodeError",
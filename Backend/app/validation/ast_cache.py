@@ -0,0 +1,264 @@
+# app/validation/ast_cache.py
+"""
+Shared Python analysis cache for the validation pipeline.
+
+The same generated file used to be parsed by assert_no_empty_defs,
+check_undefined_names, StaticValidator and llm_output_integrity, with
+regex scans for Document classes on top. Here ONE ast.parse + ONE walk
+collects everything those checks need, memoized by content hash in a
+bounded LRU:
+
+- syntax error (if any)
+- defined names (imports, classes, functions, assignments)
+- annotation name references (AnnAssign, returns, args, kwonly args)
+- empty function/class bodies (pass / docstring / ... only)
+- classes with their base names (Document detection)
+- FastAPI route decorators (@router.get / @app.post ...)
+
+JSX duplicate-attribute scans are memoized in the same cache.
+
+Only analysis results are kept - never the AST itself - so entries stay small.
+"""
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+HTTP_METHODS = {"get", "post", "put", "delete", "patch"}
+ROUTE_OBJECTS = {"router", "app"}
+
+
+@dataclass(frozen=True)
+class PythonAnalysis:
+    """Everything the validators need from one parse of a Python file."""
+    syntax_error: Optional[Tuple[str, Optional[int], Optional[int], Optional[str]]]  # (msg, lineno, offset, text)
+    defined_names: FrozenSet[str] = frozenset()
+    annotation_refs: Tuple[Tuple[str, int], ...] = ()
+    empty_defs: Tuple[Tuple[str, str], ...] = ()      # (node type, name), ast.walk order
+    classes: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()  # (name, base names), source order
+    route_methods: Tuple[str, ...] = ()
+    value_error: Optional[str] = None  # ast.parse ValueError (e.g. null bytes)
+
+    @property
+    def ok(self) -> bool:
+        return self.syntax_error is None and self.value_error is None
+
+    def raise_parse_error(self, filename: str = "<unknown>") -> None:
+        """Re-raise the cached parse failure as if ast.parse(filename=...) had failed."""
+        if self.value_error is not None:
+            raise ValueError(self.value_error)
+        if self.syntax_error is None:
+            return
+        msg, lineno, offset, text = self.syntax_error
+        raise SyntaxError(msg, (filename, lineno, offset, text))
+
+    def document_classes(self, strict: bool = False) -> List[str]:
+        """
+        Names of classes deriving from a Document.
+
+        strict=True: exactly `class X(Document)`; otherwise any base whose
+        name contains "Document" (e.g. `class X(Document, Mixin)`).
+        """
+        if strict:
+            return [name for name, bases in self.classes if bases == ("Document",)]
+        return [name for name, bases in self.classes if any("Document" in b for b in bases)]
+
+
+def _base_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return _base_name(node.value)
+    return ""
+
+
+def _annotation_names(node: Optional[ast.expr]) -> List[Tuple[str, int]]:
+    """Recursively extract all names from a type annotation."""
+    names: List[Tuple[str, int]] = []
+    if node is None:
+        return names
+    if isinstance(node, ast.Name):
+        names.append((node.id, node.lineno))
+    elif isinstance(node, ast.Subscript):
+        # Handle List[X], Optional[X], etc.
+        names.extend(_annotation_names(node.value))
+        names.extend(_annotation_names(node.slice))
+    elif isinstance(node, ast.Tuple):
+        for elt in node.elts:
+            names.extend(_annotation_names(elt))
+    elif isinstance(node, ast.BinOp):
+        # Handle X | Y (union type in Python 3.10+)
+        names.extend(_annotation_names(node.left))
+        names.extend(_annotation_names(node.right))
+    # ast.Attribute (module.Name): only the base is checked upstream - skip
+    return names
+
+
+def _is_empty_body(body: List[ast.stmt]) -> bool:
+    for stmt in body:
+        if isinstance(stmt, ast.Pass):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+            continue
+        return False
+    return True
+
+
+def _analyze_python(code: str) -> PythonAnalysis:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return PythonAnalysis(syntax_error=(e.msg, e.lineno, e.offset, e.text))
+    except ValueError as e:
+        return PythonAnalysis(syntax_error=None, value_error=str(e))
+
+    defined: set = set()
+    refs: List[Tuple[str, int]] = []
+    empty_defs: List[Tuple[str, str]] = []
+    classes: List[Tuple[int, str, Tuple[str, ...]]] = []
+    routes: List[Tuple[int, str]] = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                defined.add(alias.asname if alias.asname else alias.name.split('.')[0])
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name != '*':  # Can't track * imports
+                    defined.add(alias.asname if alias.asname else alias.name)
+        elif isinstance(node, ast.ClassDef):
+            defined.add(node.name)
+            classes.append((node.lineno, node.name, tuple(_base_name(b) for b in node.bases)))
+            if _is_empty_body(node.body):
+                empty_defs.append(("ClassDef", node.name))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            defined.add(node.name)
+            if _is_empty_body(node.body):
+                empty_defs.append((type(node).__name__, node.name))
+            refs.extend(_annotation_names(node.returns))
+            for arg in node.args.args + node.args.kwonlyargs:
+                refs.extend(_annotation_names(arg.annotation))
+            for decorator in node.decorator_list:
+                func = decorator.func if isinstance(decorator, ast.Call) else None
+                if (
+                    isinstance(func, ast.Attribute)
+                    and func.attr in HTTP_METHODS
+                    and isinstance(func.value, ast.Name)
+                    and func.value.id in ROUTE_OBJECTS
+                ):
+                    routes.append((decorator.lineno, func.attr))
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    defined.add(target.id)
+        elif isinstance(node, ast.AnnAssign):
+            if isinstance(node.target, ast.Name):
+                defined.add(node.target.id)
+            refs.extend(_annotation_names(node.annotation))
+
+    return PythonAnalysis(
+        syntax_error=None,
+        defined_names=frozenset(defined),
+        annotation_refs=tuple(refs),
+        empty_defs=tuple(empty_defs),
+        classes=tuple((name, bases) for _, name, bases in sorted(classes, key=lambda c: c[0])),
+        route_methods=tuple(method for _, method in sorted(routes, key=lambda r: r[0])),
+    )
+
+
+_TAG_PATTERN = re.compile(r'<([A-Z][a-zA-Z0-9]*|[a-z][a-zA-Z0-9-]*)\s+([^>]+?)(?:/?>)')
+_ATTR_PATTERN = re.compile(r'([a-zA-Z][a-zA-Z0-9-]*)(?:\s*=)')
+
+
+def _analyze_jsx_attributes(code: str) -> Tuple[Tuple[str, str, int, int], ...]:
+    """Duplicate JSX attributes as (attr, tag, first_line, second_line)."""
+    duplicates = []
+    for match in _TAG_PATTERN.finditer(code):
+        line_num = code.count('\n', 0, match.start()) + 1
+        seen: Dict[str, int] = {}
+        for attr in _ATTR_PATTERN.findall(match.group(2)):
+            attr_lower = attr.lower()  # Case-insensitive for HTML
+            if attr_lower in seen:
+                duplicates.append((attr, match.group(1), seen[attr_lower], line_num))
+            else:
+                seen[attr_lower] = line_num
+    return tuple(duplicates)
+
+
+class AnalysisCache:
+    """Content-hash keyed LRU of analysis results (thread-safe)."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        if max_entries is None:
+            from app.core.config import settings
+            max_entries = settings.workflow.ast_cache_entries
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_compute(self, kind: str, content: str, compute: Callable[[str], Any]) -> Any:
+        key = self._key(kind, content)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key]
+            self.stats["misses"] += 1
+
+        value = compute(content)
+        self._store(key, value)
+        return value
+
+    def put(self, kind: str, content: str, value: Any) -> None:
+        """Seed an analysis computed elsewhere (e.g. in a validation worker process)."""
+        self._store(self._key(kind, content), value)
+
+    @staticmethod
+    def _key(kind: str, content: str) -> Tuple[str, str]:
+        return (kind, hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest())
+
+    def _store(self, key: Tuple[str, str], value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Process-wide analysis cache (created on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache()
+    return _cache
+
+
+def analyze_python(code: str) -> PythonAnalysis:
+    """Parse + analyze Python source once per unique content."""
+    return get_analysis_cache().get_or_compute("py", code, _analyze_python)
+
+
+def analyze_jsx_attributes(code: str) -> Tuple[Tuple[str, str, int, int], ...]:
+    """Duplicate JSX attribute scan, once per unique content."""
+    return get_analysis_cache().get_or_compute("jsx-attrs", code, _analyze_jsx_attributes)
@@ -0,0 +1,278 @@
+# app/validation/pool.py
+"""
+Process-pool offload for pre-flight validation.
+
+validate_syntax is pure CPU work (Unicode normalization, ast.parse, regex
+scans). Run synchronously inside marcus_supervise it stalls the event loop
+for every file of a large HDAP batch - WebSocket heartbeats and parallel
+steps included. ValidationService runs it in worker processes instead:
+
+- Files of a batch are validated in parallel across cores
+- At most `max_pending` files are submitted at once (bounded queue; callers
+  wait for a slot instead of piling work onto the pool)
+- Each file gets `file_timeout` seconds; a file that times out is rejected
+  and the pool is recycled so the stuck worker does not keep a slot
+- Batches smaller than `inline_max_bytes` are validated in-process, where
+  IPC would cost more than the work itself
+- If the pool cannot start or breaks, files are validated in a thread
+- prevalidate() starts a single file early (streamed HDAP files, as each
+  <<<END_FILE>>> arrives); a later batch containing the same path+content
+  picks up that result instead of validating it again
+
+Results are identical to validate_files_batch / preflight_check: the same
+split_batch_results / summarize_preflight helpers assemble them. Workers
+send back their Python analyses so the parent's ast_cache still sees each
+unique content once.
+
+Usage:
+    from app.validation.pool import preflight_check_async
+    cleaned_output, rejection_reasons = await preflight_check_async(agent_output)
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logging import log
+from app.validation.ast_cache import PythonAnalysis, analyze_python, get_analysis_cache
+from app.validation.syntax_validator import (
+    ValidationResult,
+    split_batch_results,
+    summarize_preflight,
+    validate_syntax,
+)
+
+
+EARLY_RESULTS_MAX = 256  # Started-early validations kept for a later batch
+
+
+def _validate_in_worker(path: str, content: str) -> Tuple[ValidationResult, Optional[PythonAnalysis]]:
+    """Worker-side validate_syntax; also returns the analysis of valid Python."""
+    result = validate_syntax(path, content)
+    analysis = None
+    if result.valid and path.lower().endswith(".py"):
+        analysis = analyze_python(result.fixed_content or content)  # Worker cache hit
+    return result, analysis
+
+
+def _default_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class ValidationService:
+    """Async pre-flight validation backed by a lazily started process pool."""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        file_timeout: Optional[float] = None,
+        inline_max_bytes: Optional[int] = None,
+    ):
+        from app.core.config import settings
+        wf = settings.workflow
+        self.enabled = wf.validation_process_pool if enabled is None else enabled
+        self.max_workers = max_workers or wf.validation_workers or _default_workers()
+        self.max_pending = max(1, max_pending or wf.validation_max_pending)
+        self.file_timeout = file_timeout if file_timeout is not None else wf.validation_file_timeout
+        self.inline_max_bytes = wf.validation_inline_max_bytes if inline_max_bytes is None else inline_max_bytes
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._early: "OrderedDict[Tuple[str, str], asyncio.Task]" = OrderedDict()
+        self.stats = {
+            "early_files": 0,
+            "early_hits": 0,
+            "inline_batches": 0,
+            "pooled_batches": 0,
+            "pooled_files": 0,
+            "timeouts": 0,
+            "fallbacks": 0,
+            "recycles": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def prevalidate(self, file: Dict[str, str]) -> None:
+        """Start validating one file in the background (result kept for validate_each)."""
+        path, content = file.get("path", ""), file.get("content", "")
+        key = self._early_key(path, content)
+        if key in self._early:
+            return
+        self.stats["early_files"] += 1
+        self._early[key] = asyncio.create_task(self._validate_early(path, content))
+        while len(self._early) > EARLY_RESULTS_MAX:
+            self._early.popitem(last=False)[1].cancel()
+
+    async def validate_each(self, files: List[Dict[str, str]]) -> List[ValidationResult]:
+        """validate_syntax for every file, in order."""
+        if not files:
+            return []
+        early = [self._early.pop(self._early_key(f.get("path", ""), f.get("content", "")), None) for f in files]
+        fresh = iter(await self._validate_batch([f for f, task in zip(files, early) if task is None]))
+        results = []
+        for f, task in zip(files, early):
+            if task is None:
+                results.append(next(fresh))
+                continue
+            try:
+                results.append(await task)
+                self.stats["early_hits"] += 1
+            except Exception:
+                # e.g. started on another event loop - validate it now
+                results.append((await self._validate_batch([f]))[0])
+        return results
+
+    async def _validate_batch(self, files: List[Dict[str, str]]) -> List[ValidationResult]:
+        if not files:
+            return []
+        if not self.enabled or self._batch_bytes(files) < self.inline_max_bytes:
+            self.stats["inline_batches"] += 1
+            return [validate_syntax(f.get("path", ""), f.get("content", "")) for f in files]
+
+        self.stats["pooled_batches"] += 1
+        return list(await asyncio.gather(*(
+            self._validate_one(f.get("path", ""), f.get("content", "")) for f in files
+        )))
+
+    async def validate_files(self, files: List[Dict[str, str]]) -> Tuple[List[Dict], List[Dict]]:
+        """Async validate_files_batch: (valid_files, invalid_files)."""
+        results = await self.validate_each(files)
+        return split_batch_results(files, results)
+
+    async def preflight_check(self, agent_output: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Async preflight_check: (cleaned_output, rejection_reasons)."""
+        files = agent_output.get("files", [])
+        if not files:
+            return agent_output, []
+        valid_files, invalid_files = await self.validate_files(files)
+        return summarize_preflight(agent_output, valid_files, invalid_files)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (they restart lazily on next use)."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _early_key(path: str, content: str) -> Tuple[str, str]:
+        return (path, hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest())
+
+    async def _validate_early(self, path: str, content: str) -> ValidationResult:
+        if not self.enabled or len(content) < self.inline_max_bytes:
+            return validate_syntax(path, content)
+        return await self._validate_one(path, content)
+
+    @staticmethod
+    def _batch_bytes(files: List[Dict[str, str]]) -> int:
+        return sum(len(f.get("content", "")) for f in files)
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # One semaphore per event loop (tests and scripts may run several)
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._pool_lock:
+            if self._pool is None:
+                try:
+                    # spawn: forking a process that runs threads (ledger writer,
+                    # inotify watcher) is unsafe
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    log("VALIDATION", f"🧵 Started validation pool ({self.max_workers} workers)")
+                except (OSError, ValueError) as e:
+                    log("VALIDATION", f"⚠️ Validation pool unavailable, validating in-process: {e}")
+                    self.enabled = False
+                    return None
+            return self._pool
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """Replace a broken or stuck pool; its workers are terminated."""
+        with self._pool_lock:
+            if self._pool is not pool:
+                return  # Already replaced by another file of the batch
+            self._pool = None
+        self.stats["recycles"] += 1
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def _validate_one(self, path: str, content: str) -> ValidationResult:
+        async with self._get_slots():
+            pool = self._get_pool()
+            if pool is None:
+                self.stats["fallbacks"] += 1
+                return await asyncio.to_thread(validate_syntax, path, content)
+
+            loop = asyncio.get_running_loop()
+            try:
+                result, analysis = await asyncio.wait_for(
+                    loop.run_in_executor(pool, _validate_in_worker, path, content),
+                    timeout=self.file_timeout,
+                )
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                log("VALIDATION", f"⏱️ Validation of {path} exceeded {self.file_timeout}s - recycling pool")
+                self._recycle(pool)
+                return ValidationResult(False, [f"Validation timed out after {self.file_timeout}s"])
+            except BrokenProcessPool:
+                self.stats["fallbacks"] += 1
+                log("VALIDATION", f"⚠️ Validation pool broke on {path}, validating in-process")
+                self._recycle(pool)
+                return await asyncio.to_thread(validate_syntax, path, content)
+
+        self.stats["pooled_files"] += 1
+        if analysis is not None:
+            get_analysis_cache().put("py", result.fixed_content or content, analysis)
+        return result
+
+
+_service: Optional[ValidationService] = None
+_service_lock = threading.Lock()
+
+
+def get_validation_service() -> ValidationService:
+    """Process-wide validation service (pool starts on first pooled batch)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ValidationService()
+    return _service
+
+
+async def validate_files_batch_async(files: List[Dict[str, str]]) -> Tuple[List[Dict], List[Dict]]:
+    return await get_validation_service().validate_files(files)
+
+
+async def preflight_check_async(agent_output: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    return await get_validation_service().preflight_check(agent_output)
+
+
+def shutdown_validation_pool() -> None:
+    """Stop validation workers (application shutdown)."""
+    if _service is not None:
+        _service.shutdown()
@@ -7,12 +7,12 @@ The workflow aggregator makes the final decision.
 
 Phase 4: Implements Adjustment 2 - Evidence emission only.
 """
-import ast
-import re
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
 
+from app.validation.ast_cache import analyze_python
+
 logger = logging.getLogger(__name__)
 
 
@@ -198,9 +198,10 @@ class StaticValidator:
         try:
             content = file_path.read_text(encoding="utf-8")
             
-            # Check syntax
+            # Check syntax (one shared parse per unique content)
+            analysis = analyze_python(content)
             try:
-                ast.parse(content)
+                analysis.raise_parse_error()
             except SyntaxError as e:
                 result["syntax_errors"].append({
                     "file": str(file_path),
@@ -211,18 +212,10 @@ class StaticValidator:
                 return result
             
             # Find FastAPI routes
-            route_patterns = [
-                r'@router\.(get|post|put|delete|patch)\(',
-                r'@app\.(get|post|put|delete|patch)\('
-            ]
-            for pattern in route_patterns:
-                matches = re.findall(pattern, content)
-                result["routes"].extend([match for match in matches])
+            result["routes"].extend(analysis.route_methods)
             
             # Find MongoDB models (Document classes)
-            model_pattern = r'class\s+(\w+)\s*\(\s*Document\s*\)'
-            matches = re.findall(model_pattern, content)
-            result["models"].extend(matches)
+            result["models"].extend(analysis.document_classes(strict=True))
             
         except Exception as e:
             result["syntax_errors"].append({
@@ -12,11 +12,11 @@ Validates:
 - data-testid presence in React components
 - Common LLM mistakes (all code on one line)
 """
-import ast
 import re
 from typing import Dict, List, Tuple, Optional, Any
 
 from app.core.logging import log
+from app.validation.ast_cache import analyze_python, analyze_jsx_attributes
 
 
 class ValidationResult:
@@ -49,30 +49,39 @@ class IncompleteCodeError(Exception):
     pass
 
 
+# Python builtins that are always available
+_BUILTIN_NAMES = frozenset({
+    'True', 'False', 'None', 'str', 'int', 'float', 'bool', 'list', 'dict',
+    'set', 'tuple', 'bytes', 'object', 'type', 'range', 'enumerate', 'zip',
+    'map', 'filter', 'sorted', 'reversed', 'len', 'min', 'max', 'sum', 'any',
+    'all', 'abs', 'round', 'print', 'input', 'open', 'super', 'property',
+    'staticmethod', 'classmethod', 'isinstance', 'issubclass', 'hasattr',
+    'getattr', 'setattr', 'delattr', 'callable', 'repr', 'hash', 'id', 'dir',
+    'vars', 'globals', 'locals', 'iter', 'next', 'slice', 'format', 'chr',
+    'ord', 'hex', 'bin', 'oct', 'pow', 'divmod', 'complex', 'memoryview',
+    'bytearray', 'frozenset', 'Exception', 'BaseException', 'ValueError',
+    'TypeError', 'KeyError', 'IndexError', 'AttributeError', 'ImportError',
+    'RuntimeError', 'StopIteration', 'NotImplementedError', 'AssertionError',
+})
+
+# Common typing module names (often imported with *)
+_TYPING_NAMES = frozenset({
+    'List', 'Dict', 'Set', 'Tuple', 'Optional', 'Union', 'Any', 'Callable',
+    'Type', 'Sequence', 'Mapping', 'Iterable', 'Iterator', 'Generator',
+    'Literal', 'ClassVar', 'Final', 'TypeVar', 'Generic', 'Protocol',
+})
+
+
 def assert_no_empty_defs(path: str, content: str) -> None:
     """Check for empty function/class definitions (only pass/docstring)."""
-    try:
-        tree = ast.parse(content, filename=path)
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                # Check if body has any substantive code
-                has_code = False
-                for stmt in node.body:
-                    if isinstance(stmt, ast.Pass):
-                        continue
-                    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, (ast.Str, ast.Constant, ast.Ellipsis)):
-                        continue
-                    has_code = True
-                    break
-                
-                if not has_code:
-                     raise IncompleteCodeError(
-                        f"Incomplete {type(node).__name__} '{node.name}' in {path} (empty body)"
-                     )
-
-    except SyntaxError:
-        # Let SyntaxError propagate or be handled by caller
-        raise
+    analysis = analyze_python(content)
+    # Let SyntaxError propagate or be handled by caller
+    analysis.raise_parse_error(path)
+    if analysis.empty_defs:
+        node_type, name = analysis.empty_defs[0]
+        raise IncompleteCodeError(
+            f"Incomplete {node_type} '{name}' in {path} (empty body)"
+        )
 
 
 def check_undefined_names(code: str, filename: str) -> List[str]:
@@ -89,117 +98,20 @@ def check_undefined_names(code: str, filename: str) -> List[str]:
     """
     issues = []
     
-    try:
-        tree = ast.parse(code)
-    except SyntaxError:
+    analysis = analyze_python(code)
+    if analysis.syntax_error is not None:
         return []  # Syntax errors handled elsewhere
+    analysis.raise_parse_error(filename)
     
-    # Python builtins that are always available
-    builtins = {
-        'True', 'False', 'None', 'str', 'int', 'float', 'bool', 'list', 'dict',
-        'set', 'tuple', 'bytes', 'object', 'type', 'range', 'enumerate', 'zip',
-        'map', 'filter', 'sorted', 'reversed', 'len', 'min', 'max', 'sum', 'any',
-        'all', 'abs', 'round', 'print', 'input', 'open', 'super', 'property',
-        'staticmethod', 'classmethod', 'isinstance', 'issubclass', 'hasattr',
-        'getattr', 'setattr', 'delattr', 'callable', 'repr', 'hash', 'id', 'dir',
-        'vars', 'globals', 'locals', 'iter', 'next', 'slice', 'format', 'chr',
-        'ord', 'hex', 'bin', 'oct', 'pow', 'divmod', 'complex', 'memoryview',
-        'bytearray', 'frozenset', 'Exception', 'BaseException', 'ValueError',
-        'TypeError', 'KeyError', 'IndexError', 'AttributeError', 'ImportError',
-        'RuntimeError', 'StopIteration', 'NotImplementedError', 'AssertionError',
-    }
+    # Collect all defined names (imports, classes, functions, variables)
+    defined_names = _BUILTIN_NAMES | _TYPING_NAMES | analysis.defined_names
     
-    # Common typing module names (often imported with *)
-    typing_names = {
-        'List', 'Dict', 'Set', 'Tuple', 'Optional', 'Union', 'Any', 'Callable',
-        'Type', 'Sequence', 'Mapping', 'Iterable', 'Iterator', 'Generator',
-        'Literal', 'ClassVar', 'Final', 'TypeVar', 'Generic', 'Protocol',
+    # Check class field, parameter and return type annotations
+    undefined_names = {
+        (name, lineno) for name, lineno in analysis.annotation_refs
+        if name not in defined_names
     }
     
-    # Collect all defined names
-    defined_names = builtins | typing_names
-    
-    for node in ast.walk(tree):
-        # Import statements
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                name = alias.asname if alias.asname else alias.name.split('.')[0]
-                defined_names.add(name)
-        
-        # From imports
-        elif isinstance(node, ast.ImportFrom):
-            for alias in node.names:
-                if alias.name == '*':
-                    # Can't track * imports - assume they provide what's needed
-                    continue
-                name = alias.asname if alias.asname else alias.name
-                defined_names.add(name)
-        
-        # Class definitions
-        elif isinstance(node, ast.ClassDef):
-            defined_names.add(node.name)
-        
-        # Function definitions
-        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            defined_names.add(node.name)
-        
-        # Variable assignments
-        elif isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name):
-                    defined_names.add(target.id)
-        
-        # Annotated assignments
-        elif isinstance(node, ast.AnnAssign):
-            if isinstance(node.target, ast.Name):
-                defined_names.add(node.target.id)
-    
-    # Now check for undefined names in type annotations
-    undefined_names = set()
-    
-    def extract_names_from_annotation(annotation_node):
-        """Recursively extract all names from a type annotation."""
-        names = []
-        if isinstance(annotation_node, ast.Name):
-            names.append((annotation_node.id, annotation_node.lineno))
-        elif isinstance(annotation_node, ast.Subscript):
-            # Handle List[X], Optional[X], etc.
-            names.extend(extract_names_from_annotation(annotation_node.value))
-            names.extend(extract_names_from_annotation(annotation_node.slice))
-        elif isinstance(annotation_node, ast.Tuple):
-            for elt in annotation_node.elts:
-                names.extend(extract_names_from_annotation(elt))
-        elif isinstance(annotation_node, ast.BinOp):
-            # Handle X | Y (union type in Python 3.10+)
-            names.extend(extract_names_from_annotation(annotation_node.left))
-            names.extend(extract_names_from_annotation(annotation_node.right))
-        elif isinstance(annotation_node, ast.Attribute):
-            # Handle module.Name - we only check the base for simplicity
-            pass
-        return names
-    
-    # Check class field annotations
-    for node in ast.walk(tree):
-        if isinstance(node, ast.AnnAssign) and node.annotation:
-            for name, lineno in extract_names_from_annotation(node.annotation):
-                if name not in defined_names:
-                    undefined_names.add((name, lineno))
-        
-        # Check function parameter and return type annotations
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            # Check return annotation
-            if node.returns:
-                for name, lineno in extract_names_from_annotation(node.returns):
-                    if name not in defined_names:
-                        undefined_names.add((name, lineno))
-            
-            # Check argument annotations
-            for arg in node.args.args + node.args.kwonlyargs:
-                if arg.annotation:
-                    for name, lineno in extract_names_from_annotation(arg.annotation):
-                        if name not in defined_names:
-                            undefined_names.add((name, lineno))
-    
     # Generate error messages
     for name, lineno in sorted(undefined_names, key=lambda x: x[1]):
         issues.append(
@@ -468,34 +380,12 @@ def check_duplicate_attributes(code: str, filename: str) -> List[str]:
     """
     issues = []
     
-    # Find all JSX opening tags with attributes
-    # Pattern matches: <TagName attr1="val1" attr2="val2" ...>
-    # We look for self-closing /> or regular >
-    tag_pattern = r'<([A-Z][a-zA-Z0-9]*|[a-z][a-zA-Z0-9-]*)\s+([^>]+?)(?:/?>)'
-    
-    for match in re.finditer(tag_pattern, code):
-        tag_name = match.group(1)
-        attributes_str = match.group(2)
-        
-        # Find line number for better error messages
-        line_num = code[:match.start()].count('\n') + 1
-        
-        # Extract all attribute names (handles attr="val", attr={expr}, attr)
-        # Pattern: word characters, optionally followed by - (for data-testid, etc.)
-        attr_pattern = r'([a-zA-Z][a-zA-Z0-9-]*)(?:\s*=)'
-        attr_list = re.findall(attr_pattern, attributes_str)
-        
-        # Check for duplicates
-        seen = {}
-        for attr in attr_list:
-            attr_lower = attr.lower()  # Case-insensitive for HTML
-            if attr_lower in seen:
-                issues.append(
-                    f"Duplicate attribute '{attr}' on <{tag_name}> at line {line_num}. "
-                    f"Only the last value will be used! (First: line {seen[attr_lower]}, Second: line {line_num})"
-                )
-            else:
-                seen[attr_lower] = line_num
+    # Scan is memoized per content (JSX tags + attribute names per tag)
+    for attr, tag_name, first_line, line_num in analyze_jsx_attributes(code):
+        issues.append(
+            f"Duplicate attribute '{attr}' on <{tag_name}> at line {line_num}. "
+            f"Only the last value will be used! (First: line {first_line}, Second: line {line_num})"
+        )
     
     return issues
 
@@ -567,14 +457,24 @@ def validate_files_batch(files: List[Dict[str, str]]) -> Tuple[List[Dict], List[
     Each invalid file dict includes validation errors.
     Valid files will have their content UPDATED if auto-fixes were applied.
     """
+    results = [validate_syntax(f.get("path", ""), f.get("content", "")) for f in files]
+    return split_batch_results(files, results)
+
+
+def split_batch_results(
+    files: List[Dict[str, str]], results: List[ValidationResult]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Sort validated files into (valid_files, invalid_files).
+    
+    Shared by validate_files_batch and the process-pool service
+    (app/validation/pool.py), so both paths apply fixes identically.
+    """
     valid_files = []
     invalid_files = []
     
-    for file_entry in files:
+    for file_entry, result in zip(files, results):
         path = file_entry.get("path", "")
-        content = file_entry.get("content", "")
-        
-        result = validate_syntax(path, content)
         
         if result.valid:
             if result.warnings:
@@ -615,14 +515,21 @@ def preflight_check(agent_output: Dict[str, Any]) -> Tuple[Dict[str, Any], List[
     If rejection_reasons is non-empty, the output should be rejected
     and the agent should be asked to regenerate.
     """
-    rejection_reasons = []
-    
     files = agent_output.get("files", [])
     if not files:
         # No files to validate
         return agent_output, []
     
     valid_files, invalid_files = validate_files_batch(files)
+    return summarize_preflight(agent_output, valid_files, invalid_files)
+
+
+def summarize_preflight(
+    agent_output: Dict[str, Any], valid_files: List[Dict], invalid_files: List[Dict]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Build (cleaned_output, rejection_reasons) from a validated batch."""
+    rejection_reasons = []
+    files = agent_output.get("files", [])
     
     # Build rejection reasons
     for invalid in invalid_files:
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Pipeline benchmarks (see pipeline_bench.py)."""
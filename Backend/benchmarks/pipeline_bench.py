@@ -0,0 +1,286 @@
+# benchmarks/pipeline_bench.py
+"""
+FAST v2 pipeline benchmark.
+
+Drives FASTOrchestratorV2.run end-to-end against the deterministic "replay"
+LLM provider (app/llm/providers/replay.py), so orchestrator overhead can be
+measured separately from model latency. Reports per-step wall time plus the
+time spent in each instrumented phase (app/core/profiling.py):
+
+    step         whole step (decision, handler, tracking, persistence)
+    llm          provider calls (replayed; synthetic latency only)
+    supervision  Marcus review (includes its own llm time)
+    validation   pre-flight + LLM output integrity checks
+    file_io      project file reads + validated writes
+    snapshot     checkpoint captures
+    ledger       enqueueing ledger events (caller side)
+    ledger_flush ledger writer thread commits (step "-")
+
+Phases may nest (supervision contains llm), so they do not sum to "step".
+
+Each run is appended to a JSON results file together with the git commit,
+and compared against the previous run with the same configuration.
+
+Usage (from Backend/, MongoDB reachable as for the API server):
+
+    python -m benchmarks.pipeline_bench
+    python -m benchmarks.pipeline_bench --latency-ms 200 --ms-per-token 2 --repeat 3
+    python -m benchmarks.pipeline_bench --parallel --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_RECORDING = BENCH_DIR / "recordings" / "default.json"
+DEFAULT_RESULTS = BENCH_DIR / "results.json"
+DEFAULT_STEPS = ["architecture", "frontend_mock", "backend_models", "backend_routers", "system_integration"]
+DEFAULT_REQUEST = "Build a simple task manager where users can create, update and complete tasks."
+
+# A phase regresses when it is BOTH this much slower (relative) and absolute
+REGRESSION_THRESHOLD = 0.10
+REGRESSION_MIN_SECONDS = 0.05
+
+
+async def run_once(
+    recording: Path,
+    steps: List[str],
+    latency_ms: float,
+    ms_per_token: float,
+    parallel: bool,
+    workspace: Path,
+) -> Dict[str, Any]:
+    """Run the pipeline once against the replay provider and return timings."""
+    from app.core.config import settings
+    from app.core.profiling import enable_profiling, reset_profile, profile_snapshot
+    from app.llm.adapter import get_adapter
+    from app.lib.websocket import ConnectionManager
+    from app.orchestration.fast_orchestrator import FASTOrchestratorV2
+    from app.arbormind.observation.execution_ledger import flush_ledger
+
+    settings.llm.default_provider = "replay"
+    settings.llm.default_model = "replay"
+    settings.llm.replay_path = str(recording)
+    settings.llm.replay_latency_ms = latency_ms
+    settings.llm.replay_ms_per_token = ms_per_token
+    settings.workflow.parallel_steps = parallel
+
+    adapter = get_adapter()
+    adapter.default_provider = "replay"
+    adapter.default_model = "replay"
+    adapter.cache = None  # Every run must do the same work
+
+    with open(recording, "r", encoding="utf-8") as f:
+        user_request = json.load(f).get("user_request", DEFAULT_REQUEST)
+
+    engine = FASTOrchestratorV2(
+        project_id=f"bench-{uuid.uuid4().hex[:8]}",
+        manager=ConnectionManager(),
+        project_path=workspace,
+        user_request=user_request,
+        provider="replay",
+        model="replay",
+    )
+    engine.graph.steps = [s for s in engine.graph.steps if s in steps]
+
+    reset_profile()
+    enable_profiling(True)
+    start = time.perf_counter()
+    try:
+        await engine.run()
+        await asyncio.to_thread(flush_ledger, 30.0)
+    finally:
+        total = time.perf_counter() - start
+        enable_profiling(False)
+
+    return {
+        "total_seconds": round(total, 6),
+        "completed": list(engine.completed_steps),
+        "failed": list(engine.failed_steps),
+        "steps": profile_snapshot(),
+    }
+
+
+def median_profile(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine repeated runs: median of total and of every (step, phase)."""
+    if len(runs) == 1:
+        return runs[0]
+
+    keys = {(step, phase) for run in runs for step, phases in run["steps"].items() for phase in phases}
+    steps: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for step, phase in sorted(keys):
+        samples = [run["steps"].get(step, {}).get(phase, {"seconds": 0.0, "count": 0}) for run in runs]
+        steps.setdefault(step, {})[phase] = {
+            "seconds": round(statistics.median(s["seconds"] for s in samples), 6),
+            "count": int(statistics.median(s["count"] for s in samples)),
+        }
+    return {
+        "total_seconds": round(statistics.median(run["total_seconds"] for run in runs), 6),
+        "completed": runs[-1]["completed"],
+        "failed": runs[-1]["failed"],
+        "steps": steps,
+        "repeats": len(runs),
+    }
+
+
+def compare_runs(
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD,
+    min_seconds: float = REGRESSION_MIN_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    List (step, phase) timings that got slower than the previous run.
+
+    Returns:
+        [{"step", "phase", "before", "after", "change"}] sorted by absolute slowdown
+    """
+    rows = [("total", "total", previous.get("total_seconds", 0.0), current.get("total_seconds", 0.0))]
+    for step, phases in current.get("steps", {}).items():
+        for phase, timing in phases.items():
+            before = previous.get("steps", {}).get(step, {}).get(phase)
+            if before is not None:
+                rows.append((step, phase, before["seconds"], timing["seconds"]))
+
+    regressions = []
+    for step, phase, before, after in rows:
+        delta = after - before
+        if delta >= min_seconds and before > 0 and delta / before >= threshold:
+            regressions.append({
+                "step": step,
+                "phase": phase,
+                "before": round(before, 6),
+                "after": round(after, 6),
+                "change": round(delta / before, 4),
+            })
+    return sorted(regressions, key=lambda r: r["after"] - r["before"], reverse=True)
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {"runs": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_baseline(results: Dict[str, Any], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Most recent earlier run with the same configuration."""
+    for run in reversed(results.get("runs", [])):
+        if run.get("config") == config:
+            return run
+    return None
+
+
+def save_results(path: Path, results: Dict[str, Any]) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    tmp_path.replace(path)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=BENCH_DIR,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def format_report(run: Dict[str, Any]) -> str:
+    """Per-step table of phase timings."""
+    phases = sorted({phase for step in run["steps"].values() for phase in step})
+    header = f"{'step':<20}" + "".join(f"{p:>14}" for p in phases)
+    lines = [header, "-" * len(header)]
+    for step, timings in sorted(run["steps"].items()):
+        cells = "".join(
+            f"{timings[p]['seconds']:>14.3f}" if p in timings else f"{'':>14}" for p in phases
+        )
+        lines.append(f"{step:<20}{cells}")
+    lines.append(f"\ntotal: {run['total_seconds']:.3f}s  completed={run['completed']}  failed={run['failed']}")
+    return "\n".join(lines)
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    from app.db import connect_db, disconnect_db
+
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    config = {
+        "recording": Path(args.recording).name,
+        "steps": steps,
+        "latency_ms": args.latency_ms,
+        "ms_per_token": args.ms_per_token,
+        "parallel": args.parallel,
+    }
+
+    await connect_db()
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            workspace = Path(tempfile.mkdtemp(prefix="fast-bench-"))
+            try:
+                runs.append(await run_once(
+                    Path(args.recording), steps, args.latency_ms, args.ms_per_token, args.parallel, workspace
+                ))
+            finally:
+                if not args.keep_workspace:
+                    shutil.rmtree(workspace, ignore_errors=True)
+    finally:
+        await disconnect_db()
+
+    run = median_profile(runs)
+    run.update({
+        "label": args.label,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+    })
+    print(format_report(run))
+
+    results_path = Path(args.results)
+    results = load_results(results_path)
+    baseline = find_baseline(results, config)
+    regressions = compare_runs(baseline, run, args.threshold) if baseline else []
+    if baseline:
+        print(f"\nBaseline: {baseline.get('commit')} ({baseline.get('timestamp')})")
+        for r in regressions:
+            print(f"  REGRESSION {r['step']}/{r['phase']}: {r['before']:.3f}s -> {r['after']:.3f}s (+{r['change']:.0%})")
+        if not regressions:
+            print("  No regressions")
+
+    results["runs"].append(run)
+    save_results(results_path, results)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the FAST v2 pipeline with replayed LLM outputs")
+    parser.add_argument("--recording", default=str(DEFAULT_RECORDING), help="Replay recording (JSON)")
+    parser.add_argument("--steps", default=",".join(DEFAULT_STEPS), help="Comma-separated pipeline steps to run")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Synthetic latency per LLM call")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Synthetic latency per output token")
+    parser.add_argument("--parallel", action="store_true", help="Use the parallel step scheduler")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs to take the median of")
+    parser.add_argument("--results", default=str(DEFAULT_RESULTS), help="JSON results file (appended)")
+    parser.add_argument("--label", default="", help="Free-form label stored with the run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative slowdown that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any phase regressed")
+    parser.add_argument("--keep-workspace", action="store_true", help="Keep generated workspaces for inspection")
+    args = parser.parse_args(argv)
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
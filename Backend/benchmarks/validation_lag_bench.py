@@ -0,0 +1,126 @@
+# benchmarks/validation_lag_bench.py
+"""
+Event-loop lag during pre-flight validation.
+
+Validates a synthetic HDAP batch (many large Python + JSX files) while a
+ticker task measures how late the event loop wakes it up, first with the
+old in-loop preflight_check and then through the process-pool
+ValidationService (app/validation/pool.py). Lag is what every other
+coroutine - WebSocket broadcasts, parallel steps, LLM streams - waits.
+
+Usage (from Backend/):
+
+    python -m benchmarks.validation_lag_bench
+    python -m benchmarks.validation_lag_bench --files 60 --functions 300 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+TICK_SECONDS = 0.001
+
+
+def synthetic_batch(files: int, functions: int) -> List[Dict[str, str]]:
+    """HDAP-style file list: alternating routers and React pages."""
+    batch = []
+    for i in range(files):
+        if i % 2 == 0:
+            body = "\n\n".join(
+                f"@router.get(\"/items{i}_{n}\")\nasync def get_item_{n}(item_id: str, limit: int = 10) -> Dict[str, Any]:\n"
+                f"    \"\"\"Fetch item {n}.\"\"\"\n    data = {{\"id\": item_id, \"n\": {n}, \"limit\": limit}}\n    return data\n"
+                for n in range(functions)
+            )
+            content = "from typing import Any, Dict\nfrom fastapi import APIRouter\n\nrouter = APIRouter()\n\n\n" + body
+            batch.append({"path": f"backend/app/routers/items_{i}.py", "content": content})
+        else:
+            rows = "\n".join(
+                f'      <li data-testid="row-{n}" className="row">{{items[{n}]}}</li>' for n in range(functions)
+            )
+            content = (
+                "import React from 'react';\n\n"
+                f"export default function Page{i}({{ items }}) {{\n  return (\n    <ul data-testid=\"page-{i}\">\n"
+                f"{rows}\n    </ul>\n  );\n}}\n"
+            )
+            batch.append({"path": f"frontend/src/pages/Page{i}.jsx", "content": content})
+    return batch
+
+
+async def measure_loop_lag(work: Callable[[], Awaitable[Any]]) -> Dict[str, float]:
+    """Run work() while a ticker records how late each TICK_SECONDS sleep returns."""
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(max(0.0, time.perf_counter() - start - TICK_SECONDS))
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # Let the ticker start
+    start = time.perf_counter()
+    try:
+        await work()
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await tick_task
+
+    lags.sort()
+    return {
+        "seconds": round(elapsed, 4),
+        "max_lag_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+        "p99_lag_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 2) if lags else 0.0,
+        "median_lag_ms": round(statistics.median(lags) * 1000, 2) if lags else 0.0,
+        "ticks": len(lags),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    from app.validation import preflight_check
+    from app.validation.ast_cache import get_analysis_cache
+    from app.validation.pool import ValidationService
+
+    batch = synthetic_batch(args.files, args.functions)
+    agent_output = {"files": batch}
+    size_kb = sum(len(f["content"]) for f in batch) / 1024
+    print(f"Batch: {len(batch)} files, {size_kb:.0f} KB")
+
+    async def inline():
+        preflight_check(agent_output)
+
+    service = ValidationService(enabled=True, max_workers=args.workers, inline_max_bytes=0)
+    await service.preflight_check({"files": batch[:1]})  # Start workers outside the measurement
+
+    async def pooled():
+        await service.preflight_check(agent_output)
+
+    try:
+        rows = []
+        for name, work in (("inline", inline), ("process-pool", pooled)):
+            get_analysis_cache().clear()  # Both modes parse from scratch
+            rows.append((name, await measure_loop_lag(work)))
+    finally:
+        service.shutdown()
+
+    print(f"{'mode':<14}{'seconds':>10}{'max lag ms':>12}{'p99 lag ms':>12}{'ticks':>8}")
+    for name, r in rows:
+        print(f"{name:<14}{r['seconds']:>10.3f}{r['max_lag_ms']:>12.1f}{r['p99_lag_ms']:>12.1f}{r['ticks']:>8}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Event-loop lag of in-loop vs process-pool pre-flight validation")
+    parser.add_argument("--files", type=int, default=40, help="Files in the synthetic batch")
+    parser.add_argument("--functions", type=int, default=200, help="Routes / list rows per file")
+    parser.add_argument("--workers", type=int, default=None, help="Validation worker processes")
+    args = parser.parse_args(argv)
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,10 @@ Provides:
 - Mock manager for broadcasting
 - Mock LLM responses
 - Entity plan fixtures
+- An isolated LLM response cache (autouse) and shared fakes
 """
+import asyncio
+import json
 import pytest
 import tempfile
 import shutil
@@ -63,6 +66,148 @@ class MockEntityPlan:
         path.write_text(json.dumps(data, indent=2), encoding="utf-8")
 
 
+# ═══════════════════════════════════════════════════════
+# SHARED FAKES (import: from tests.conftest import ...)
+# ═══════════════════════════════════════════════════════
+
+class FakeClock:
+    """Manually advanced monotonic clock; set or bump `.now` (seconds)."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeWebSocket:
+    """Records sent messages; `stalled` blocks every send until `.gate` is set."""
+
+    def __init__(self, stalled=False):
+        self.messages = []
+        self.gate = asyncio.Event()
+        if not stalled:
+            self.gate.set()
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.messages.append(json.loads(text))
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class FakeDocker:
+    """
+    In-memory docker CLI for code that takes a DockerRunner (args, timeout).
+
+    Every call is recorded in `.calls`. State:
+    - images: `image inspect`, `build` (also listed in `.builds`), `images`, `image rm`
+    - running: container name -> running flag, set by `run` / `compose run --name`,
+      cleared by `rm`; read by `inspect` and `exec` (a missing container fails)
+    - rows: `docker ps` JSON rows (`--filter id=...` narrows them)
+    - `port` hands out increasing host ports; `exec` answers `.exec_result`
+      (`python -c "import xdist"` succeeds only with xdist=True)
+
+    Other commands succeed with no output, or fail when strict=True.
+    """
+
+    def __init__(self, images=(), rows=(), xdist=False, strict=False):
+        self.calls = []
+        self.images = set(images)
+        self.builds = []
+        self.running = {}
+        self.rows = list(rows)
+        self.xdist = xdist
+        self.strict = strict
+        self.exec_result = (0, "passed", "")
+        self.next_port = 32000
+
+    async def __call__(self, args, timeout):
+        self.calls.append(list(args))
+        cmd = args[0]
+        if args[:2] == ["image", "inspect"]:
+            return (0, "[]", "") if args[2] in self.images else (1, "", "No such image")
+        if args[:2] == ["image", "rm"]:
+            self.images.discard(args[2])
+            return 0, "", ""
+        if cmd == "build":
+            self.builds.append(args[2])
+            self.images.add(args[2])
+            return 0, "", ""
+        if cmd == "images":
+            return 0, "\n".join(sorted(self.images)), ""
+        if cmd in ("run", "compose") and "--name" in args:
+            self.running[args[args.index("--name") + 1]] = True
+            return 0, "cid\n", ""
+        if cmd == "exec":
+            return self._exec(args)
+        if cmd == "inspect":
+            names = args[3:]
+            states = ["true" if self.running[n] else "false" for n in names if n in self.running]
+            return (0 if len(states) == len(names) else 1), "\n".join(states), ""
+        if cmd == "rm":
+            for name in args[2:]:
+                self.running.pop(name, None)
+            return 0, "", ""
+        if cmd == "port":
+            self.next_port += 1
+            return 0, f"0.0.0.0:{self.next_port}\n[::]:{self.next_port}\n", ""
+        if cmd == "ps":
+            rows = self.rows
+            if "--filter" in args:
+                key, _, wanted = args[args.index("--filter") + 1].partition("=")
+                rows = [r for r in rows if key == "id" and r.get("ID") == wanted]
+            if "-aq" in args:
+                return 0, "\n".join(r["ID"] for r in rows), ""
+            return 0, "\n".join(json.dumps(r) for r in rows), ""
+        if self.strict:
+            return 1, "", "unexpected docker call"
+        return 0, "", ""
+
+    def _exec(self, args):
+        i = 1  # exec [-d] [-w <dir>] [-e KEY=VALUE ...] <container> ...
+        while args[i].startswith("-"):
+            i += 2 if args[i] in ("-w", "-e") else 1
+        container = args[i]
+        if not self.running.get(container):
+            return 1, "", f"Error response from daemon: No such container: {container}"
+        if "import xdist" in args:
+            return (0 if self.xdist else 1), "", ""
+        return self.exec_result
+
+    def commands(self, prefix):
+        return [c for c in self.calls if c[:len(prefix)] == prefix]
+
+    def test_execs(self):
+        return [c for c in self.commands(["exec"]) if "import xdist" not in c]
+
+
+# ═══════════════════════════════════════════════════════
+# FIXTURES - LLM Response Cache
+# ═══════════════════════════════════════════════════════
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache(tmp_path, monkeypatch):
+    """Every LLMAdapter built in a test caches into a throwaway database, never data/llm_cache.sqlite."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings.llm, "cache_path", tmp_path / "llm_cache.sqlite")
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    """Adapters built in the test have no response cache (it would absorb repeated calls)."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings.llm, "cache_enabled", False)
+
+
 # ═══════════════════════════════════════════════════════
 # FIXTURES - Project Setup
 # ═══════════════════════════════════════════════════════
@@ -0,0 +1,137 @@
+# tests/test_ast_cache.py
+"""
+Tests for the shared parsed-Python analysis cache.
+
+Validates:
+- Pre-flight + integrity + static checks parse each unique content ONCE
+- Cached analyses give the same verdicts as the per-check parses did
+- The LRU stays bounded
+"""
+import ast
+
+import pytest
+
+from app.core.llm_output_integrity import validate_llm_files
+from app.utils.entity_discovery import extract_all_models_from_models_py
+from app.validation import ast_cache, preflight_check
+from app.validation.ast_cache import AnalysisCache, analyze_python
+from app.validation.static_validator import StaticValidator
+from app.validation.syntax_validator import (
+    IncompleteCodeError,
+    assert_no_empty_defs,
+    check_duplicate_attributes,
+    check_undefined_names,
+)
+
+
+MODELS = '''from typing import Optional
+from beanie import Document
+
+
+class Task(Document):
+    title: str
+    owner: Optional[str] = None
+
+
+class Project(
+    Document,
+):
+    name: str
+
+
+class TaskCreate(BaseModel):
+    title: str
+'''
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = AnalysisCache(max_entries=64)
+    monkeypatch.setattr(ast_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    calls = {"n": 0}
+    real_parse = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        calls["n"] += 1
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(ast_cache.ast, "parse", counting_parse)
+    return calls
+
+
+class TestAnalysisCache:
+    """Test suite for the shared analysis cache."""
+
+    def test_backend_step_parses_each_file_once(self, fresh_cache, count_parses):
+        """
+        GIVEN a 20-file backend step (with duplicated contents)
+        WHEN pre-flight and the integrity gate both validate it
+        THEN every unique content is parsed exactly once
+        """
+        files = [
+            {"path": f"backend/app/routers/r{i}.py", "content": f"from fastapi import APIRouter\n\nrouter = APIRouter()\nVALUE = {i % 10}\n"}
+            for i in range(20)
+        ]
+
+        cleaned, reasons = preflight_check({"files": files})
+        validate_llm_files({f["path"]: f["content"] for f in cleaned["files"]}, "backend_routers")
+
+        assert reasons == []
+        assert count_parses["n"] == 10
+        assert fresh_cache.stats["misses"] == 10
+
+    def test_verdicts_match_direct_checks(self, fresh_cache):
+        """
+        GIVEN broken, truncated and under-imported Python
+        WHEN the cached checks run
+        THEN they report what the dedicated parses reported
+        """
+        with pytest.raises(SyntaxError) as exc:
+            assert_no_empty_defs("bad.py", "def f(:\n")
+        assert exc.value.filename == "bad.py"
+
+        with pytest.raises(IncompleteCodeError, match="Incomplete FunctionDef 'todo'"):
+            assert_no_empty_defs("stub.py", "def ok():\n    return 1\n\ndef todo():\n    pass\n")
+
+        issues = check_undefined_names("def f(x: Task) -> List[Task]:\n    return [x]\n", "m.py")
+        assert issues == ["Undefined name 'Task' at line 1 in m.py. Did you forget to import it?"]
+
+        dupes = check_duplicate_attributes('<main data-testid="a" className="x" data-testid="b">', "Page.jsx")
+        assert len(dupes) == 1 and "data-testid" in dupes[0]
+
+    def test_document_classes_shared_with_discovery_and_static(self, fresh_cache, tmp_path):
+        """
+        GIVEN a models.py with single- and multi-line Document classes
+        WHEN entity discovery and the static validator inspect it
+        THEN both see the Document classes from one cached parse
+        """
+        models_path = tmp_path / "backend" / "app" / "models.py"
+        models_path.parent.mkdir(parents=True)
+        models_path.write_text(MODELS)
+
+        assert extract_all_models_from_models_py(tmp_path) == ["Task", "Project"]
+        evidence = StaticValidator(tmp_path).validate_backend_step("backend_models")
+
+        assert evidence.models_found == ["Task", "Project"]  # multi-line def included
+        assert fresh_cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+    def test_lru_is_bounded(self):
+        """
+        GIVEN a cache with room for two entries
+        WHEN three contents are analyzed and the first is re-used
+        THEN the oldest is evicted and recomputed
+        """
+        cache = AnalysisCache(max_entries=2)
+        for code in ("a = 1\n", "b = 2\n", "c = 3\n"):
+            cache.get_or_compute("py", code, ast_cache._analyze_python)
+        cache.get_or_compute("py", "a = 1\n", ast_cache._analyze_python)
+
+        assert len(cache) == 2
+        assert cache.stats["evictions"] == 2
+        assert cache.stats["misses"] == 4
+        assert analyze_python("x = 1\n").ok
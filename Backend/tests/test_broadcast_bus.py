@@ -0,0 +1,208 @@
+# tests/test_broadcast_bus.py
+"""
+Tests for the cross-worker broadcast bus.
+
+Validates:
+- A broadcast on one worker reaches the project's sockets on every worker, once
+- broadcast_json reaches all projects on other workers
+- When the worker hosting the socket broker exits, another one takes over
+- The mongo backend publishes envelopes and delivers change-stream inserts
+- Unusable backends fall back to in-process delivery
+"""
+import asyncio
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.lib.broadcast_bus import BroadcastBus, MongoBus, SocketBus, create_broadcast_bus
+from app.lib.websocket import ConnectionManager
+from tests.conftest import FakeWebSocket
+
+
+async def until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def socket_path():
+    # Short directory: unix socket paths are limited to ~108 bytes
+    with tempfile.TemporaryDirectory(prefix="gencode-bus") as tmp:
+        yield str(Path(tmp) / "bus.sock")
+
+
+@pytest_asyncio.fixture
+async def workers():
+    """Factory for (manager, bus) pairs standing in for API worker processes."""
+    created = []
+
+    async def make(bus):
+        manager = ConnectionManager(max_queue=100, send_timeout=5)
+        await manager.attach_bus(bus)
+        created.append(manager)
+        return manager
+
+    yield make
+    for manager in created:
+        await manager.detach_bus()
+        await manager.close_all()
+
+
+async def client(manager, project_id):
+    ws = FakeWebSocket()
+    await manager.connect(ws, project_id)
+    return ws
+
+
+class TestSocketBus:
+    """Test the local socket broker backend."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_other_workers(self, workers, socket_path):
+        """
+        GIVEN two workers on a unix socket bus, each with a client for proj-1
+        WHEN worker A broadcasts to proj-1 and to everyone
+        THEN both clients receive each message exactly once, other projects only the global one
+        """
+        a = await workers(SocketBus(socket_path, reconnect_delay=0.05))
+        b = await workers(SocketBus(socket_path, reconnect_delay=0.05))
+        await until(lambda: a.bus.connected and b.bus.connected)
+        ws_a, ws_b, other = await client(a, "proj-1"), await client(b, "proj-1"), await client(b, "proj-2")
+
+        await a.broadcast("proj-1", {"type": "WORKFLOW_UPDATE", "step": 1})
+        await a.broadcast_json({"type": "WORKSPACE_UPDATED"})
+        await until(lambda: len(ws_b.messages) == 2 and len(other.messages) == 1)
+        await asyncio.sleep(0.05)
+
+        assert [m["type"] for m in ws_a.messages] == ["WORKFLOW_UPDATE", "WORKSPACE_UPDATED"]
+        assert ws_b.messages == ws_a.messages
+        assert [m["type"] for m in other.messages] == ["WORKSPACE_UPDATED"]
+        assert [a.bus.hosting, b.bus.hosting].count(True) == 1
+        assert b.stats()["bus"]["received"] == 2
+
+    @pytest.mark.asyncio
+    async def test_broker_failover(self, workers, socket_path):
+        """
+        GIVEN three workers where the first hosts the broker
+        WHEN the hosting worker shuts down
+        THEN another worker hosts it and the remaining two still exchange messages
+        """
+        host = await workers(SocketBus(socket_path, reconnect_delay=0.05))
+        await until(lambda: host.bus.hosting and host.bus.connected)
+        b = await workers(SocketBus(socket_path, reconnect_delay=0.05))
+        c = await workers(SocketBus(socket_path, reconnect_delay=0.05))
+        await until(lambda: b.bus.connected and c.bus.connected)
+
+        await host.detach_bus()
+        await until(lambda: (b.bus.hosting or c.bus.hosting) and b.bus.connected and c.bus.connected)
+        ws_c = await client(c, "proj-1")
+        await b.broadcast("proj-1", {"type": "WORKFLOW_UPDATE"})
+
+        await until(lambda: len(ws_c.messages) == 1)
+
+    @pytest.mark.asyncio
+    async def test_tcp_address(self, workers):
+        """
+        GIVEN two workers on a host:port bus
+        WHEN one broadcasts
+        THEN the other delivers it
+        """
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        a = await workers(SocketBus(f"127.0.0.1:{port}", reconnect_delay=0.05))
+        b = await workers(SocketBus(f"127.0.0.1:{port}", reconnect_delay=0.05))
+        await until(lambda: a.bus.connected and b.bus.connected)
+        ws_b = await client(b, "proj-1")
+
+        await a.broadcast("proj-1", {"type": "AGENT_LOG", "message": "hi"})
+
+        await until(lambda: ws_b.messages == [{"type": "AGENT_LOG", "message": "hi"}])
+
+
+class FakeChangeStream:
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class FakeCollection:
+    """insert_many feeds the change streams of every watcher."""
+
+    def __init__(self):
+        self.inserted = []
+        self.watchers = []
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            self.inserted.append(doc)
+            for queue in self.watchers:
+                await queue.put({"_id": len(self.inserted), "fullDocument": dict(doc)})
+
+    def watch(self, pipeline, resume_after=None):
+        queue = asyncio.Queue()
+        self.watchers.append(queue)
+        return FakeChangeStream(queue)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collection = FakeCollection()
+        self.created = []
+
+    async def create_collection(self, name, **options):
+        self.created.append((name, options))
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+class TestMongoBusAndFactory:
+    """Test the change-stream backend and backend selection."""
+
+    @pytest.mark.asyncio
+    async def test_mongo_bus_round_trip(self, workers):
+        """
+        GIVEN two workers sharing a (fake) capped collection
+        WHEN one broadcasts
+        THEN the envelope is inserted and the other worker delivers it
+        """
+        db = FakeDatabase()
+        a = await workers(MongoBus(db=db))
+        b = await workers(MongoBus(db=db))
+        await until(lambda: a.bus.watching and b.bus.watching)
+        ws_b = await client(b, "proj-1")
+
+        await a.broadcast("proj-1", {"type": "WORKFLOW_UPDATE"})
+
+        await until(lambda: len(ws_b.messages) == 1)
+        assert db.created[0] == ("broadcast_events", {"capped": True, "size": 64 * 1024 * 1024})
+        assert db.collection.inserted[0]["p"] == "proj-1"
+        assert a.stats()["bus"]["received"] == 0  # Own message is not delivered twice
+
+    def test_factory_falls_back_to_memory(self):
+        """
+        GIVEN mongo requested without a database connection, or an unknown backend
+        WHEN the bus is created
+        THEN the in-process bus is used
+        """
+        assert type(create_broadcast_bus("mongo")) is BroadcastBus
+        assert type(create_broadcast_bus("redis")) is BroadcastBus
+        assert isinstance(create_broadcast_bus("socket"), SocketBus)
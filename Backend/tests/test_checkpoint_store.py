@@ -0,0 +1,94 @@
+# tests/test_checkpoint_store.py
+"""
+Tests for the content-addressed checkpoint store.
+
+Validates:
+- Snapshots round-trip through manifests + blobs
+- Unchanged files are neither re-read nor re-written
+- Old manifests are pruned and unreferenced blobs collected
+- Legacy directory checkpoints remain readable
+"""
+import json
+import os
+
+import pytest
+
+from app.orchestration.checkpoint import CheckpointManagerV2
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "backend" / "app").mkdir(parents=True)
+    (root / "backend" / "app" / "main.py").write_text("app = 1\n")
+    (root / "backend" / "app" / "models.py").write_text("class Task: pass\n")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "ignored.js").write_text("x")
+    return root
+
+
+def _blob_count(store: CheckpointManagerV2) -> int:
+    return sum(len(files) for _, _, files in os.walk(store.blobs_dir))
+
+
+class TestCheckpointStore:
+    """Test suite for CheckpointManagerV2."""
+
+    def test_snapshot_round_trip_and_dedup(self, project, tmp_path):
+        """
+        GIVEN a snapshot of a project
+        WHEN a second snapshot is taken after changing one file
+        THEN only that file is hashed/stored and both restore correctly
+        """
+        store = CheckpointManagerV2(base_dir=str(tmp_path / "ckpt"), keep_per_step=0)
+        store._save_project_snapshot_sync(project, "backend_models", approved=True)
+        assert _blob_count(store) == 2
+
+        (project / "backend" / "app" / "main.py").write_text("app = 2\n")
+        manifest_path = store._save_project_snapshot_sync(project, "backend_routers")
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        assert manifest["dedup"] == {"reused": 1, "hashed": 1, "blobs_written": 1}
+        assert _blob_count(store) == 3
+
+        main_py = os.path.join("backend", "app", "main.py")
+        assert store.get_latest("backend_models")[main_py] == "app = 1\n"
+        assert store.get_latest("backend_routers")[main_py] == "app = 2\n"
+        assert store.list_checkpoints("backend_models")[0]["approved"] is True
+        assert "entries" not in store.list_checkpoints()[0]
+
+    def test_retention_collects_unreferenced_blobs(self, project, tmp_path):
+        """
+        GIVEN keep_per_step=1
+        WHEN a step is snapshotted twice with different content
+        THEN only the newest manifest survives and the old blob is collected
+        """
+        store = CheckpointManagerV2(base_dir=str(tmp_path / "ckpt"), keep_per_step=1)
+        store.save("backend_models", {"a.py": "v1\n"})
+        store.save("backend_models", {"a.py": "v2\n"})
+        store.save("architecture", {"a.py": "v1\n", "b.md": "# B\n"})
+
+        assert len(store.list_checkpoints("backend_models")) == 1
+        assert store.get_latest("backend_models") == {"a.py": "v2\n"}
+        assert store.get_latest("architecture") == {"a.py": "v1\n", "b.md": "# B\n"}
+
+        store.save("architecture", {"b.md": "# B\n"})
+        assert _blob_count(store) == 2  # v2 + "# B"
+
+    def test_reads_legacy_directory_checkpoints(self, tmp_path):
+        """
+        GIVEN a pre-V2 `{step}_{ts}/` checkpoint directory
+        WHEN the store is opened
+        THEN get_latest and list_checkpoints still see it
+        """
+        base = tmp_path / "ckpt"
+        legacy = base / "architecture_20240101_120000"
+        (legacy / "architecture").mkdir(parents=True)
+        (legacy / "architecture" / "backend.md").write_text("# Legacy\n")
+        (legacy / "meta.json").write_text(json.dumps({"step": "architecture", "timestamp": "20240101_120000"}))
+
+        store = CheckpointManagerV2(base_dir=str(base), keep_per_step=0)
+
+        assert store.get_latest("architecture") == {os.path.join("architecture", "backend.md"): "# Legacy\n"}
+        assert [c["timestamp"] for c in store.list_checkpoints("architecture")] == ["20240101_120000"]
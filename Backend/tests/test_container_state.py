@@ -0,0 +1,209 @@
+# tests/test_container_state.py
+"""
+Tests for the docker events container state cache.
+
+Validates:
+- The snapshot parses `docker ps` rows (state, health, compose labels, ports)
+- Events move containers through created/running/healthy/exited/destroyed
+- Waiters wake on state transitions instead of polling
+- A dropped stream marks the cache not live, then reconnects and re-snapshots
+- wait_for_healthy and project container lookups use the cache without CLI forks
+"""
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.sandbox import container_state as state_module
+from app.sandbox.container_state import ContainerStateCache, state_from_ps
+from app.sandbox.health_monitor import HealthMonitor
+from app.sandbox.sandbox_manager import SandboxManager
+from tests.conftest import FakeDocker
+
+
+BACKEND_ID = "a" * 64
+FRONTEND_ID = "b" * 64
+
+
+def ps_row(cid, name, service, state="running", status="Up 3 seconds (health: starting)", ports=""):
+    return {
+        "ID": cid,
+        "Names": name,
+        "State": state,
+        "Status": status,
+        "Ports": ports,
+        "Labels": f"com.docker.compose.project=proj-1,com.docker.compose.service={service}",
+    }
+
+
+def event(cid, action, name="", service=""):
+    attributes = {"name": name}
+    if service:
+        attributes["com.docker.compose.service"] = service
+    return {"Type": "container", "Action": action, "Actor": {"ID": cid, "Attributes": attributes}}
+
+
+class FakeEvents:
+    """Event stream fed from a queue; None ends the stream."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.connections = 0
+
+    async def __call__(self, since, on_line):
+        self.connections += 1
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            on_line(json.dumps(item))
+
+
+@pytest.fixture
+def docker():
+    return FakeDocker(rows=[
+        ps_row(BACKEND_ID, "proj-1-backend-1", "backend", ports="0.0.0.0:32001->8001/tcp"),
+        ps_row(FRONTEND_ID, "proj-1-frontend-1", "frontend", status="Up 3 seconds (healthy)"),
+    ], strict=True)
+
+
+@pytest_asyncio.fixture
+async def live_cache(docker):
+    events = FakeEvents()
+    cache = ContainerStateCache(runner=docker, events_source=events, max_backoff=0.01)
+    cache.events = events
+    await cache.start()
+    assert await cache.wait_for(lambda: cache.live, timeout=2)
+    yield cache
+    await cache.stop()
+
+
+async def until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+class TestContainerStateCache:
+    """Test state tracking."""
+
+    def test_ps_row_parsing(self):
+        """
+        GIVEN docker ps rows with and without a health suffix
+        WHEN they are parsed
+        THEN state, health, service and ports are extracted
+        """
+        starting = state_from_ps(ps_row(BACKEND_ID, "proj-1-backend-1", "backend", ports="0.0.0.0:1->8001/tcp"))
+        plain = state_from_ps(ps_row(FRONTEND_ID, "x", "frontend", state="exited", status="Exited (0) 1 minute ago"))
+
+        assert (starting.status, starting.health, starting.service) == ("running", "starting", "backend")
+        assert starting.ports == "0.0.0.0:1->8001/tcp"
+        assert (plain.status, plain.health) == ("exited", None)
+
+    @pytest.mark.asyncio
+    async def test_events_drive_transitions(self, live_cache, docker):
+        """
+        GIVEN a live cache
+        WHEN a container is created, started, becomes healthy, dies and is removed
+        THEN each event updates the map (start refreshes ports once)
+        """
+        cid = "c" * 64
+        docker.rows.append(ps_row(cid, "proj-2-backend-1", "backend", ports="0.0.0.0:32009->8001/tcp"))
+
+        live_cache.handle_event(event(cid, "create", "proj-2-backend-1", "backend"))
+        assert live_cache.get(cid).status == "created"
+        live_cache.handle_event(event(cid, "start", "proj-2-backend-1"))
+        await until(lambda: live_cache.get(cid).ports)
+        assert live_cache.get("c" * 12).ports == "0.0.0.0:32009->8001/tcp"
+        live_cache.handle_event(event(cid, "health_status: healthy"))
+        assert live_cache.get(cid).health == "healthy"
+        live_cache.handle_event(event(cid, "die"))
+        assert (live_cache.get(cid).status, live_cache.get(cid).health) == ("exited", None)
+        live_cache.handle_event(event(cid, "destroy"))
+        assert live_cache.get(cid) is None
+
+    @pytest.mark.asyncio
+    async def test_waiters_wake_on_transition(self, live_cache):
+        """
+        GIVEN a waiter for the backend becoming healthy
+        WHEN the health event arrives through the stream
+        THEN the waiter returns immediately (no poll interval)
+        """
+        waiter = asyncio.create_task(
+            live_cache.wait_for(lambda: live_cache.get(BACKEND_ID).health == "healthy", timeout=5)
+        )
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        await live_cache.events.queue.put(event(BACKEND_ID, "health_status: healthy"))
+
+        assert await waiter is True
+        assert time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_dropped_stream_reconnects(self, live_cache):
+        """
+        GIVEN a live cache
+        WHEN the events stream ends
+        THEN the cache goes not-live, reconnects and takes a fresh snapshot
+        """
+        await live_cache.events.queue.put(None)
+
+        await until(lambda: live_cache.events.connections == 2 and live_cache.live)
+        stats = live_cache.stats()
+        assert stats["reconnects"] == 1 and stats["snapshots"] == 2
+
+
+class TestCacheConsumers:
+    """Test HealthMonitor and SandboxManager on top of the cache."""
+
+    @pytest.mark.asyncio
+    async def test_wait_for_healthy_is_event_driven(self, live_cache, docker, monkeypatch):
+        """
+        GIVEN a live cache with a starting backend and a healthy frontend
+        WHEN wait_for_healthy runs and the backend health event arrives
+        THEN it returns on the event without any docker inspect
+        """
+        monkeypatch.setattr(state_module, "_states", live_cache)
+
+        async def http_down(ports):
+            return False
+
+        monitor = HealthMonitor()
+        monkeypatch.setattr(monitor, "_check_http_health", http_down)
+        containers = {
+            "backend": {"id": BACKEND_ID, "ports": "0.0.0.0:32001->8001/tcp"},
+            "frontend": {"id": FRONTEND_ID, "ports": ""},
+        }
+        calls_before = len(docker.calls)
+
+        async def become_healthy():
+            await asyncio.sleep(0.1)
+            await live_cache.events.queue.put(event(BACKEND_ID, "health_status: healthy"))
+
+        asyncio.create_task(become_healthy())
+        start = time.monotonic()
+        health = await monitor.wait_for_healthy("proj-1", containers, timeout=10)
+
+        assert health == {"backend": True, "frontend": True}
+        assert time.monotonic() - start < 1
+        assert len(docker.calls) == calls_before
+
+    @pytest.mark.asyncio
+    async def test_project_containers_from_cache(self, live_cache, docker, monkeypatch):
+        """
+        GIVEN a live cache
+        WHEN SandboxManager lists a project's containers
+        THEN they come from the cache by service, with no docker ps
+        """
+        monkeypatch.setattr(state_module, "_states", live_cache)
+        calls_before = len(docker.calls)
+
+        containers = await SandboxManager()._get_project_containers_async("proj-1")
+
+        assert set(containers) == {"backend", "frontend"}
+        assert containers["backend"]["ports"] == "0.0.0.0:32001->8001/tcp"
+        assert containers["backend"]["short_id"] == BACKEND_ID[:12]
+        assert len(docker.calls) == calls_before
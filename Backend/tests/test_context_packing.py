@@ -0,0 +1,217 @@
+# tests/test_context_packing.py
+"""
+Tests for local token estimates and token-aware context packing.
+
+Validates:
+- Token counts are calibrated per provider from reported usage
+- The adapter feeds real input counts back into the estimator
+- Context is packed into the step's input budget: errors first, contracts
+  capped, file signatures before bodies, overflow dropped
+- enforce_artifact_mode uses the packer instead of fixed character cuts
+"""
+import pytest
+
+from app.core.config import settings
+from app.llm.adapter import LLMAdapter
+from app.llm.artifact_enforcement import enforce_artifact_mode
+from app.llm.context_packer import TRUNCATED_MARK, outline, pack_context, truncate_to_tokens
+from app.llm.token_estimator import MIN_CALIBRATION_TOKENS, TokenEstimator, count_tokens, get_token_estimator
+from app.orchestration.token_policy import DEFAULT_INPUT_TOKENS, get_input_budget
+
+
+MODELS_PY = '''from beanie import Document
+from pydantic import BaseModel
+
+
+class Task(Document):
+    title: str
+    done: bool = False
+
+    def summary(self) -> str:
+        words = self.title.split()
+        return " ".join(words[:5])
+
+
+async def list_tasks():
+    tasks = await Task.find_all().to_list()
+    return [t for t in tasks if not t.done]
+'''
+
+BIG = "\n".join(f"line {i}: some descriptive text about the architecture" for i in range(400))
+
+
+@pytest.fixture(autouse=True)
+def fresh_estimator(monkeypatch):
+    """Packing tests must not depend on calibration learned by other tests."""
+    from app.llm import context_packer, token_estimator
+    estimator = TokenEstimator()
+    monkeypatch.setattr(token_estimator, "_estimator", estimator)
+    monkeypatch.setattr(context_packer, "get_token_estimator", lambda: estimator)
+    return estimator
+
+
+class TestTokenEstimator:
+    """Test local counting and per-provider calibration."""
+
+    def test_counts_words_code_and_whitespace(self):
+        """
+        GIVEN prose, code and repeated whitespace
+        WHEN tokens are counted
+        THEN short words cost one token and long identifiers / operators add up
+        """
+        assert count_tokens("") == 0
+        assert count_tokens("the cat sat") == 3
+        assert count_tokens("def summary(self) -> str:") == 9
+        assert count_tokens("x\n\n\n    y") == 3
+
+    def test_calibrates_towards_reported_usage(self):
+        """
+        GIVEN a provider that keeps billing 30% more tokens than counted
+        WHEN its usage is observed repeatedly
+        THEN its estimates converge on the billed count and other providers are unaffected
+        """
+        estimator = TokenEstimator()
+        text = BIG
+        counted = count_tokens(text)
+        for _ in range(30):
+            estimator.observe("gemini", text, int(counted * 1.3))
+        estimator.observe("openai", "tiny prompt", 5000)  # Below MIN_CALIBRATION_TOKENS
+
+        assert estimator.estimate(text, "gemini") == pytest.approx(counted * 1.3, rel=0.01)
+        assert estimator.estimate(text, "openai") == counted
+        assert estimator.stats()["gemini"]["samples"] == 30
+        assert estimator.stats()["gemini"]["recent_error"] < 0.05
+        assert "openai" not in estimator.stats()
+        assert count_tokens("tiny prompt") < MIN_CALIBRATION_TOKENS
+
+    @pytest.mark.asyncio
+    async def test_adapter_reports_usage_to_estimator(self, monkeypatch, tmp_path, fresh_estimator):
+        """
+        GIVEN a provider call that reports its input token count
+        WHEN the adapter makes the call
+        THEN the estimator learns from it
+        """
+        from app.llm.providers import gemini
+
+        async def fake_call(**kwargs):
+            return {"text": "ok", "usage": {"input": 2 * count_tokens(kwargs["system_prompt"] + kwargs["prompt"]), "output": 1}}
+
+        monkeypatch.setattr(settings.llm, "cache_path", tmp_path / "llm_cache.sqlite")
+        monkeypatch.setattr(settings.llm, "cache_enabled", False)
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        adapter.token_estimator = fresh_estimator
+        try:
+            await adapter.call("task", BIG, provider="gemini", model="m")
+        finally:
+            await adapter.aclose()
+
+        assert fresh_estimator.stats()["gemini"]["samples"] == 1
+        assert fresh_estimator.factor("gemini") > 1.0
+
+
+class TestContextPacker:
+    """Test budget-driven packing of files, contracts and errors."""
+
+    def test_input_budgets_per_step(self):
+        """
+        GIVEN step names and aliases
+        WHEN input budgets are looked up
+        THEN each step gets its own budget and unknown steps the default
+        """
+        assert get_input_budget("backend_routers") == get_input_budget("Backend Implementation") == 14000
+        assert get_input_budget("refine") < get_input_budget("frontend_mock")
+        assert get_input_budget("unknown_step") == DEFAULT_INPUT_TOKENS
+
+    def test_outline_keeps_signatures(self):
+        """
+        GIVEN a Python models file
+        WHEN it is outlined
+        THEN imports, classes, fields and defs stay and bodies are elided
+        """
+        result = outline("backend/app/models.py", MODELS_PY)
+
+        assert "class Task(Document):" in result and "    title: str" in result
+        assert "    def summary(self) -> str:" in result and "async def list_tasks():" in result
+        assert "words = self.title.split()" not in result
+        assert "        ..." in result
+        assert outline("README.md", BIG).endswith(TRUNCATED_MARK)
+
+    def test_everything_fits(self):
+        """
+        GIVEN small files, contracts and errors well inside the budget
+        WHEN they are packed
+        THEN nothing is trimmed
+        """
+        packed = pack_context("backend_routers", fixed="system", files={"a.py": MODELS_PY},
+                              contracts="## Task\n- title", errors=["E1", "E1", "E2"])
+
+        assert packed.files_dict() == {"a.py": MODELS_PY}
+        assert packed.contracts == "## Task\n- title"
+        assert packed.errors == ["E1", "E2"]
+        assert not packed.dropped and packed.tokens <= packed.budget
+
+    def test_signatures_before_bodies(self):
+        """
+        GIVEN six files with room for about four in full
+        WHEN they are packed
+        THEN all six get their signatures, then the first gets its body,
+             and the total stays within the budget
+        """
+        files = [{"path": f"backend/app/routers/r{i}.py", "content": MODELS_PY * 4} for i in range(6)]
+        budget = count_tokens(MODELS_PY * 4) * 4
+
+        packed = pack_context("backend_routers", files=files, budget=budget)
+
+        assert [f.trimmed for f in packed.files] == [""] + ["signatures"] * 5
+        assert packed.files[0].content == MODELS_PY * 4
+        assert not packed.dropped and packed.tokens <= budget
+
+        packed = pack_context("backend_routers", files=files, budget=budget // 2)
+        assert packed.dropped == ["backend/app/routers/r3.py", "backend/app/routers/r4.py", "backend/app/routers/r5.py"]
+
+    def test_errors_first_contracts_capped(self):
+        """
+        GIVEN an error, huge contracts and a file, with room for only part of it
+        WHEN they are packed
+        THEN the error is kept, contracts are cut at a line and marked, and the file is included
+        """
+        budget = 1500
+        packed = pack_context("backend_routers", files={"m.py": MODELS_PY}, contracts=BIG,
+                              errors=["ImportError: cannot import name 'Task'"], budget=budget)
+
+        assert packed.errors == ["ImportError: cannot import name 'Task'"]
+        assert packed.contracts.endswith(TRUNCATED_MARK)
+        assert packed.contracts.split("\n")[-2].startswith("line ")
+        assert packed.files_dict() == {"m.py": MODELS_PY}
+        assert packed.tokens <= budget
+
+    def test_truncate_to_tokens(self):
+        """
+        GIVEN a long text
+        WHEN it is truncated to 100 tokens
+        THEN the result fits and ends with the truncation mark
+        """
+        cut = truncate_to_tokens(BIG, 100)
+
+        assert count_tokens(cut) <= 100 and cut.endswith(TRUNCATED_MARK)
+        assert truncate_to_tokens("short", 100) == "short"
+        assert truncate_to_tokens(BIG, 0) == ""
+
+    def test_artifact_mode_uses_packer(self):
+        """
+        GIVEN eight files, contracts larger than 15000 characters and a retry error
+        WHEN artifact-mode prompts are built for a step with room for them
+        THEN all files and the full contracts are sent, plus the error
+        """
+        files = [{"path": f"f{i}.py", "content": "x = 1\n"} for i in range(8)]
+        contracts = "\n".join(f"- field_{i}: str" for i in range(1500))
+        assert len(contracts) > 15000
+
+        prompts = enforce_artifact_mode("You are Derek.", "Build routers", "backend_routers",
+                                        files=files, contracts=contracts, errors=["E1"])
+
+        assert all(f"--- f{i}.py ---" in prompts["user_prompt"] for i in range(8))
+        assert contracts in prompts["user_prompt"]
+        assert "PREVIOUS ERRORS — MUST FIX:\n- E1" in prompts["user_prompt"]
+        assert get_token_estimator().estimate(prompts["system_prompt"] + prompts["user_prompt"]) <= 14000
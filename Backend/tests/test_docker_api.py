@@ -0,0 +1,403 @@
+# tests/test_docker_api.py
+"""
+Tests for the Docker Engine API client.
+
+Validates:
+- The client speaks the Engine API over a unix socket (served by FakeEngine)
+- Exec and log bodies are demultiplexed into stdout/stderr
+- HealthMonitor, SandboxManager, LogStreamer and the state cache use the API
+  without forking the docker CLI
+- Callers fall back to the CLI when the socket is missing
+"""
+import asyncio
+import json
+import struct
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.core.config import settings
+from app.sandbox import container_state as state_module
+from app.sandbox import docker_api
+from app.sandbox import health_monitor as health_module
+from app.sandbox import sandbox_manager as manager_module
+from app.sandbox.container_state import ContainerStateCache
+from app.sandbox.docker_api import DockerAPIError, DockerEngineClient
+from app.sandbox.health_monitor import HealthMonitor
+from app.sandbox.log_streamer import LogStreamer
+from app.sandbox.sandbox_manager import SandboxManager
+
+
+BACKEND_ID = "a" * 64
+
+
+def frame(kind: int, data: bytes) -> bytes:
+    return struct.pack(">BxxxL", kind, len(data)) + data
+
+
+def api_row(cid, name, service, state="running", status="Up 5 seconds (healthy)", public=32001):
+    return {
+        "Id": cid,
+        "Names": [f"/{name}"],
+        "State": state,
+        "Status": status,
+        "Ports": [{"IP": "0.0.0.0", "PrivatePort": 8001, "PublicPort": public, "Type": "tcp"}],
+        "Labels": {"com.docker.compose.project": "proj-1", "com.docker.compose.service": service},
+    }
+
+
+class FakeEngine:
+    """
+    Minimal Docker Engine API served on a unix socket.
+
+    Containers come from `rows`; execs answer with `exec_reply(cmd, workdir)`;
+    `log_lines` is served as multiplexed frames and, with follow=1, the stream
+    stays open for lines put on `follow_queue` (None ends it); events are
+    streamed from `events_queue`. Every request path is recorded.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.rows = [api_row(BACKEND_ID, "proj-1-backend-1", "backend")]
+        self.exec_reply = lambda cmd, workdir: (0, f"{workdir}$ {' '.join(cmd)}\n", "warn\n")
+        self.exec_delay = 0.0
+        self.execs = {}
+        self.log_lines = ["line one", "line two"]
+        self.follow_queue: asyncio.Queue = asyncio.Queue()
+        self.events_queue: asyncio.Queue = asyncio.Queue()
+        self.requests = []
+        self._runner = None
+
+    async def start(self):
+        app = web.Application(middlewares=[self._record])
+        app.router.add_get("/{v}/_ping", self.ping)
+        app.router.add_get("/{v}/containers/json", self.list_containers)
+        app.router.add_get("/{v}/containers/{id}/json", self.inspect)
+        app.router.add_get("/{v}/containers/{id}/stats", self.stats)
+        app.router.add_get("/{v}/containers/{id}/logs", self.logs)
+        app.router.add_post("/{v}/containers/{id}/exec", self.exec_create)
+        app.router.add_post("/{v}/exec/{eid}/start", self.exec_start)
+        app.router.add_get("/{v}/exec/{eid}/json", self.exec_inspect)
+        app.router.add_get("/{v}/events", self.events)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.UnixSite(self._runner, self.socket_path).start()
+
+    async def stop(self):
+        await self.follow_queue.put(None)
+        await self.events_queue.put(None)
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _record(self, request, handler):
+        self.requests.append(request.path)
+        return await handler(request)
+
+    def _find(self, cid):
+        for row in self.rows:
+            if row["Id"].startswith(cid) or row["Names"][0] == f"/{cid}":
+                return row
+        raise web.HTTPNotFound(text=json.dumps({"message": f"No such container: {cid}"}),
+                               content_type="application/json")
+
+    async def ping(self, request):
+        return web.Response(text="OK")
+
+    async def list_containers(self, request):
+        filters = json.loads(request.query.get("filters", "{}"))
+        rows = [r for r in self.rows if request.query.get("all") == "1" or r["State"] == "running"]
+        for name in filters.get("name", []):
+            rows = [r for r in rows if name in r["Names"][0]]
+        for cid in filters.get("id", []):
+            rows = [r for r in rows if r["Id"].startswith(cid)]
+        return web.json_response(rows)
+
+    async def inspect(self, request):
+        row = self._find(request.match_info["id"])
+        health = "healthy" if "(healthy)" in row["Status"] else "starting"
+        return web.json_response({"Id": row["Id"], "State": {
+            "Status": row["State"], "Running": row["State"] == "running", "ExitCode": 0,
+            "StartedAt": "2026-01-01T00:00:00Z", "Health": {"Status": health},
+        }})
+
+    async def stats(self, request):
+        self._find(request.match_info["id"])
+        return web.json_response({
+            "cpu_stats": {"cpu_usage": {"total_usage": 300}, "system_cpu_usage": 2000, "online_cpus": 2},
+            "precpu_stats": {"cpu_usage": {"total_usage": 100}, "system_cpu_usage": 1000},
+            "memory_stats": {"usage": 50 * 1024 * 1024, "limit": 512 * 1024 * 1024},
+        })
+
+    async def logs(self, request):
+        self._find(request.match_info["id"])
+        resp = web.StreamResponse(headers={"Content-Type": "application/vnd.docker.multiplexed-stream"})
+        await resp.prepare(request)
+        # Split a line across frames to exercise reassembly
+        body = "\n".join(self.log_lines).encode() + b"\n"
+        await resp.write(frame(1, body[:4]) + frame(1, body[4:]))
+        if request.query.get("follow") == "1":
+            while (line := await self.follow_queue.get()) is not None:
+                await resp.write(frame(2, line.encode() + b"\n"))
+        await resp.write_eof()
+        return resp
+
+    async def exec_create(self, request):
+        row = self._find(request.match_info["id"])
+        config = await request.json()
+        exec_id = f"exec{len(self.execs)}"
+        self.execs[exec_id] = {"container": row["Id"], **config}
+        return web.json_response({"Id": exec_id}, status=201)
+
+    async def exec_start(self, request):
+        config = self.execs[request.match_info["eid"]]
+        code, out, err = self.exec_reply(config["Cmd"], config.get("WorkingDir"))
+        config["ExitCode"] = code
+        resp = web.StreamResponse(headers={"Content-Type": "application/vnd.docker.multiplexed-stream"})
+        await resp.prepare(request)
+        await resp.write(frame(1, out.encode()))
+        if self.exec_delay:
+            await asyncio.sleep(self.exec_delay)
+        await resp.write(frame(2, err.encode()))
+        await resp.write_eof()
+        return resp
+
+    async def exec_inspect(self, request):
+        config = self.execs[request.match_info["eid"]]
+        return web.json_response({"ExitCode": config.get("ExitCode"), "Running": False})
+
+    async def events(self, request):
+        resp = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await resp.prepare(request)
+        while (event := await self.events_queue.get()) is not None:
+            await resp.write(json.dumps(event).encode() + b"\n")
+        await resp.write_eof()
+        return resp
+
+
+@pytest_asyncio.fixture
+async def engine(monkeypatch):
+    # Short directory: unix socket paths are limited to ~108 bytes
+    with tempfile.TemporaryDirectory(prefix="gencode-dk") as tmp:
+        fake = FakeEngine(str(Path(tmp) / "docker.sock"))
+        await fake.start()
+        monkeypatch.setattr(settings.sandbox, "docker_api_enabled", True)
+        monkeypatch.setattr(settings.sandbox, "docker_socket", fake.socket_path)
+        monkeypatch.setattr(docker_api, "_client", None)
+        yield fake
+        await docker_api.close_docker_api()
+        await fake.stop()
+
+
+@pytest.fixture
+def no_cli(monkeypatch):
+    """Fail the test if anything forks the docker CLI."""
+    calls = []
+
+    async def forbidden(*args, **kwargs):
+        calls.append(args)
+        raise AssertionError(f"docker CLI called: {args}")
+
+    monkeypatch.setattr(health_module, "run_docker", forbidden)
+    monkeypatch.setattr(manager_module, "run_docker", forbidden)
+    monkeypatch.setattr(manager_module, "run_process", forbidden)
+    return calls
+
+
+class TestDockerEngineClient:
+    """Test the client against the fake engine."""
+
+    @pytest.mark.asyncio
+    async def test_list_inspect_and_errors(self, engine):
+        """
+        GIVEN a fake engine with one running container
+        WHEN containers are listed, inspected and a missing one is requested
+        THEN rows and state come back and the 404 raises DockerAPIError
+        """
+        client = DockerEngineClient(engine.socket_path)
+        try:
+            assert await client.ping() is True
+            rows = await client.list_containers(filters={"name": ["proj-1"]})
+            assert [r["Id"] for r in rows] == [BACKEND_ID]
+            assert await client.list_containers(filters={"name": ["proj-2"]}) == []
+            assert (await client.inspect(BACKEND_ID[:12]))["State"]["Status"] == "running"
+            with pytest.raises(DockerAPIError) as missing:
+                await client.inspect("nope")
+            assert missing.value.status == 404 and "No such container" in missing.value.message
+            assert engine.requests[0] == "/v1.41/_ping"
+        finally:
+            await client.close()
+
+    @pytest.mark.asyncio
+    async def test_exec_demultiplexes_output(self, engine):
+        """
+        GIVEN an exec that writes to stdout and stderr and exits 3
+        WHEN it runs through the API
+        THEN the streams are separated and the exit code is read back
+        """
+        engine.exec_reply = lambda cmd, workdir: (3, "out\n", "err\n")
+        client = DockerEngineClient(engine.socket_path)
+        try:
+            code, stdout, stderr = await client.exec(BACKEND_ID, ["pytest", "-q"], workdir="/app", env={"A": "1"})
+        finally:
+            await client.close()
+
+        assert (code, stdout, stderr) == (3, "out\n", "err\n")
+        config = engine.execs["exec0"]
+        assert config["Cmd"] == ["pytest", "-q"] and config["WorkingDir"] == "/app" and config["Env"] == ["A=1"]
+
+    @pytest.mark.asyncio
+    async def test_exec_timeout(self, engine):
+        """
+        GIVEN an exec that stalls after its first output frame
+        WHEN it runs with a short timeout
+        THEN partial stdout is returned with exit code -1
+        """
+        engine.exec_delay = 5
+        client = DockerEngineClient(engine.socket_path)
+        start = time.monotonic()
+        try:
+            code, stdout, stderr = await client.exec(BACKEND_ID, ["sleep", "5"], timeout=0.3)
+        finally:
+            await client.close()
+
+        assert code == -1 and "timed out after 0.3s" in stderr
+        assert stdout.startswith("None$ sleep 5")
+        assert time.monotonic() - start < 2
+
+    @pytest.mark.asyncio
+    async def test_logs_and_events(self, engine):
+        """
+        GIVEN log lines split across frames and a queued event
+        WHEN logs and events are read
+        THEN whole lines and decoded events are yielded
+        """
+        client = DockerEngineClient(engine.socket_path)
+        try:
+            lines = [line async for line in client.logs(BACKEND_ID, tail=10)]
+            await engine.events_queue.put({"Type": "container", "Action": "start", "Actor": {"ID": BACKEND_ID}})
+            await engine.events_queue.put(None)
+            events = [e async for e in client.events(since=0)]
+        finally:
+            await client.close()
+
+        assert lines == ["line one", "line two"]
+        assert [e["Action"] for e in events] == ["start"]
+
+
+class TestApiConsumers:
+    """Test that hot-path callers use the API instead of the CLI."""
+
+    @pytest.mark.asyncio
+    async def test_health_monitor_uses_api(self, engine, no_cli):
+        """
+        GIVEN a running container behind the Engine API
+        WHEN HealthMonitor inspects it and collects detailed health
+        THEN state and resource usage come from the API, with no CLI call
+        """
+        monitor = HealthMonitor()
+        state = await monitor._inspect_container_state(BACKEND_ID)
+        details = await monitor.get_detailed_health("proj-1", {"frontend": {"id": BACKEND_ID}})
+        missing = await monitor._inspect_container_state("nope")
+
+        assert state["Health"]["Status"] == "healthy"
+        assert details["frontend"]["running"] is True
+        assert details["frontend"]["resources"]["cpu_percent"] == 40.0
+        assert missing is None
+        assert no_cli == []
+
+    @pytest.mark.asyncio
+    async def test_manager_exec_and_listing(self, engine, no_cli, monkeypatch):
+        """
+        GIVEN an active sandbox and no live events cache
+        WHEN the manager lists containers and runs a chained command
+        THEN both go over the API and the command runs via sh -c in the container
+        """
+        monkeypatch.setattr(state_module, "_states", ContainerStateCache())
+        manager = SandboxManager()
+
+        containers = await manager._get_project_containers_async("proj-1")
+        manager.active_sandboxes["proj-1"] = {"containers": containers}
+        result = await manager.execute_command("proj-1", "backend", "npm ci && npm test")
+
+        assert containers["backend"]["ports"] == "0.0.0.0:32001->8001/tcp"
+        assert containers["backend"]["short_id"] == BACKEND_ID[:12]
+        assert result["success"] and result["returncode"] == 0
+        assert result["stdout"] == "/app$ sh -c npm ci && npm test\n" and result["stderr"] == "warn\n"
+        assert no_cli == []
+
+    @pytest.mark.asyncio
+    async def test_log_streamer_follows_over_api(self, engine):
+        """
+        GIVEN a container whose logs are followed
+        WHEN new lines arrive and the stream is stopped
+        THEN every line is forwarded and the task is cancelled cleanly
+        """
+        received = []
+
+        async def send(line):
+            received.append(line)
+
+        streamer = LogStreamer()
+        await streamer.start_streaming("s1", BACKEND_ID, send)
+        await engine.follow_queue.put("line three")
+        deadline = time.monotonic() + 2
+        while len(received) < 3:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        await streamer.stop_streaming("s1")
+
+        assert received == ["line one", "line two", "line three"]
+        assert streamer.stream_tasks == {} and streamer.stream_processes == {}
+
+    @pytest.mark.asyncio
+    async def test_state_cache_over_api(self, engine):
+        """
+        GIVEN a default container state cache
+        WHEN it starts and an event arrives
+        THEN the snapshot and events come from the API
+        """
+        cache = ContainerStateCache(max_backoff=0.01)
+        await cache.start()
+        try:
+            assert await cache.wait_for(lambda: cache.live, timeout=2)
+            assert cache.get(BACKEND_ID).ports == "0.0.0.0:32001->8001/tcp"
+            await engine.events_queue.put({"Type": "container", "Action": "health_status: unhealthy",
+                                           "Actor": {"ID": BACKEND_ID, "Attributes": {}}})
+            assert await cache.wait_for(lambda: cache.get(BACKEND_ID).health == "unhealthy", timeout=2)
+        finally:
+            await cache.stop()
+        assert "/v1.41/events" in engine.requests
+
+    @pytest.mark.asyncio
+    async def test_cli_fallback_without_socket(self, monkeypatch):
+        """
+        GIVEN the API enabled but no socket at the configured path
+        WHEN the manager runs a command
+        THEN get_docker_api() is None and the docker CLI is used, with the
+        command run by the container's shell like the API path
+        """
+        monkeypatch.setattr(settings.sandbox, "docker_api_enabled", True)
+        monkeypatch.setattr(settings.sandbox, "docker_socket", "/nonexistent/docker.sock")
+        monkeypatch.setattr(docker_api, "_client", None)
+        commands = []
+
+        class FakeResult:
+            stdout, stderr, returncode, success = "ok", "", 0, True
+
+        async def fake_run_process(cmd, **kwargs):
+            commands.append(cmd)
+            return FakeResult()
+
+        monkeypatch.setattr(manager_module, "run_process", fake_run_process)
+        manager = SandboxManager()
+        manager.active_sandboxes["proj-1"] = {"containers": {"backend": {"short_id": "abc"}}}
+
+        result = await manager.execute_command("proj-1", "backend", "npm ci && npm test > out.txt")
+
+        assert docker_api.get_docker_api() is None
+        assert result["stdout"] == "ok"
+        assert commands == [["docker", "exec", "-w", "/app", "abc", "sh", "-c", "npm ci && npm test > out.txt"]]
@@ -0,0 +1,132 @@
+# tests/test_execution_ledger.py
+"""
+Tests for the ArborMind Execution Ledger write path.
+
+Validates the background batch writer:
+- Events are committed in order, in batches, after flush()
+- SQLite runs in WAL mode
+- Bounded queue honours the drop policy (the default)
+- close() drains the queue; later (or racing) writes fall back to synchronous
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from app.arbormind.observation.execution_ledger import ExecutionLedger, LedgerWriter
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(ExecutionLedger, "DB_PATH", tmp_path / "arbormind.db")
+    store = ExecutionLedger()
+    yield store
+    store.close()
+
+
+class TestLedgerWriter:
+    """Test suite for the batched ledger writer."""
+
+    def test_events_are_batched_and_ordered(self, ledger):
+        """
+        GIVEN many step events recorded back to back
+        WHEN the ledger is flushed
+        THEN all rows exist, in order, written in fewer batches than events
+        """
+        ledger.record_run_start("run-1", "proj")
+        for i in range(200):
+            ledger.record_step_entry("run-1", f"step_{i}")
+
+        assert ledger.flush(timeout=10)
+        rows = ledger._dump_table("step_events", "run-1")
+
+        assert [r["step_name"] for r in rows] == [f"step_{i}" for i in range(200)]
+        stats = ledger.writer.stats()
+        assert stats["written"] == 201
+        assert stats["batches"] < 201
+
+    def test_wal_mode(self, ledger):
+        """
+        GIVEN an initialised ledger
+        WHEN the journal mode is queried
+        THEN SQLite is in WAL mode
+        """
+        conn = sqlite3.connect(str(ledger.DB_PATH))
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+
+    def test_drop_policy_when_queue_full(self, tmp_path, monkeypatch):
+        """
+        GIVEN a writer with a 1-slot queue and the drop policy
+        WHEN the writer thread is stalled and more events arrive
+        THEN extra events are dropped (counted) instead of blocking the caller
+        """
+        monkeypatch.setattr(ExecutionLedger, "DB_PATH", tmp_path / "arbormind.db")
+        ExecutionLedger().close()  # create schema
+
+        gate = threading.Event()
+        writer = LedgerWriter(tmp_path / "arbormind.db", max_queue=1, overflow="drop")
+        original = writer._write_batch
+
+        def stalled(conn, statements):
+            gate.wait(5)
+            original(conn, statements)
+
+        writer._write_batch = stalled
+        sql = "INSERT INTO runs (run_id, project_id, timestamp, status_event) VALUES (?, ?, ?, ?)"
+        results = [writer.submit(sql, (f"r{i}", "p", "t", "STARTED")) for i in range(5)]
+        gate.set()
+        writer.close()
+
+        assert not all(results)
+        assert writer.stats()["dropped"] == results.count(False)
+        assert writer.stats()["written"] == results.count(True)
+
+    def test_close_drains_then_writes_synchronously(self, ledger):
+        """
+        GIVEN queued events
+        WHEN the ledger is closed (shutdown) and another event is recorded
+        THEN nothing is lost
+        """
+        ledger.record_run_start("run-2", "proj")
+        ledger.close()
+        ledger.record_step_entry("run-2", "late")
+
+        rows = ledger._dump_table("step_events", "run-2")
+        assert [r["step_name"] for r in rows] == ["late"]
+        assert ledger._dump_table("runs", "run-2")[0]["status_event"] == "STARTED"
+
+    def test_submits_racing_close_are_never_lost(self, tmp_path, monkeypatch):
+        """
+        GIVEN threads submitting while the writer is being closed
+        WHEN close() returns and the threads finish
+        THEN every submitted event is written and nothing is left pending
+        """
+        monkeypatch.setattr(ExecutionLedger, "DB_PATH", tmp_path / "arbormind.db")
+        ExecutionLedger().close()  # create schema
+
+        writer = LedgerWriter(tmp_path / "arbormind.db", max_queue=100_000)
+        sql = "INSERT INTO runs (run_id, project_id, timestamp, status_event) VALUES (?, ?, ?, ?)"
+        start = threading.Barrier(5)
+
+        def submitter(n):
+            start.wait()
+            for i in range(200):
+                writer.submit(sql, (f"r{n}-{i}", "p", "t", "STARTED"))
+
+        threads = [threading.Thread(target=submitter, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        writer.close()
+        for thread in threads:
+            thread.join()
+
+        conn = sqlite3.connect(str(tmp_path / "arbormind.db"))
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 800
+        finally:
+            conn.close()
+        assert writer._pending == 0
@@ -0,0 +1,90 @@
+# tests/test_hdap_parser.py
+"""
+Tests for the HDAP parser (app/utils/parser.py).
+
+Validates that the incremental stream parser:
+- Emits each file as soon as its END_FILE marker arrives
+- Handles markers split across arbitrary chunk boundaries
+- Ends with exactly the same result as the batch parse_hdap()
+"""
+import pytest
+
+from app.utils.parser import HDAPStreamParser, parse_hdap
+
+
+HDAP_OUTPUT = (
+    "Let me think about the models first...\n"
+    '<<<FILE path="backend/app/models.py">>>\n'
+    "class Task(Document):\n    title: str\n"
+    "<<<END_FILE>>>\n"
+    "Now the router.\n"
+    '<<<FILE path="backend/app/routers/tasks.py" lang="py">>>\n'
+    "router = APIRouter()\n"
+    "<<<END_FILE>>>\n"
+)
+
+
+def _feed_in_chunks(text: str, size: int):
+    parser = HDAPStreamParser()
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return parser, emitted
+
+
+class TestHDAPStreamParser:
+    """Test incremental HDAP parsing of streamed output."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 10_000])
+    def test_stream_matches_batch_parse(self, chunk_size):
+        """
+        GIVEN HDAP output split into chunks of any size
+        WHEN it is fed through HDAPStreamParser
+        THEN the emitted files and final result match parse_hdap()
+        """
+        parser, emitted = _feed_in_chunks(HDAP_OUTPUT, chunk_size)
+
+        expected = parse_hdap(HDAP_OUTPUT)
+        assert emitted == expected["files"]
+        assert parser.close() == expected
+
+    def test_file_emitted_before_stream_ends(self):
+        """
+        GIVEN a stream where the second file is still being generated
+        WHEN the first END_FILE arrives
+        THEN the first file is emitted immediately
+        """
+        parser = HDAPStreamParser()
+        first_end = HDAP_OUTPUT.index("<<<END_FILE>>>") + len("<<<END_FILE>>>")
+
+        emitted = parser.feed(HDAP_OUTPUT[:first_end])
+        assert [f["path"] for f in emitted] == ["backend/app/models.py"]
+
+        assert parser.feed('<<<FILE path="x.py">>>\nhalf a fi') == []
+
+    def test_truncated_file_is_not_emitted(self):
+        """
+        GIVEN output truncated before END_FILE
+        WHEN the stream closes
+        THEN the file is never emitted and close() reports it as incomplete
+        """
+        truncated = '<<<FILE path="a.py">>>\nprint(1)\n<<<FILE path="b.py">>>\ncut off'
+        parser, emitted = _feed_in_chunks(truncated, 5)
+
+        assert emitted == []
+        result = parser.close()
+        assert result["complete"] is False
+        assert result["incomplete_files"] == ["a.py", "b.py"]
+        assert parser.incomplete_files == ["a.py"]
+
+    def test_legacy_colon_markers(self):
+        """
+        GIVEN legacy <<<FILE: path>>> markers
+        WHEN streamed
+        THEN files are still emitted incrementally
+        """
+        legacy = "<<<FILE: backend/app/main.py>>>\napp = FastAPI()\n<<<END_FILE>>>"
+        parser, emitted = _feed_in_chunks(legacy, 4)
+
+        assert emitted == [{"path": "backend/app/main.py", "content": "app = FastAPI()"}]
+        assert parser.close() == parse_hdap(legacy)
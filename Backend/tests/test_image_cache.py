@@ -0,0 +1,181 @@
+# tests/test_image_cache.py
+"""
+Tests for the dependency base image cache.
+
+Validates:
+- Projects with the seed dependency set share one base image per service
+- dependency_fixer additions produce a new backend key (and drop conflicting pins)
+- Projects get Dockerfile.cached + a compose override that only copy source
+- Unused base images are pruned; seed and recently used ones are kept
+"""
+import json
+import time
+
+import pytest
+
+from app.core.process_runner import ProcessResult
+from app.sandbox import sandbox_manager as manager_module
+from app.sandbox.image_cache import (
+    CACHED_DOCKERFILE,
+    COMPOSE_OVERRIDE,
+    BaseImageCache,
+    TEMPLATES_DIR,
+)
+from app.sandbox.sandbox_manager import SandboxManager
+from app.utils.dependency_fixer import add_dependencies_to_requirements
+from tests.conftest import FakeDocker
+
+
+SEED_REQUIREMENTS = (TEMPLATES_DIR / "backend" / "seed" / "requirements.txt").read_text()
+SEED_PACKAGE_JSON = (TEMPLATES_DIR / "frontend" / "seed" / "package.json").read_text()
+
+
+def make_project(root, name, requirements=SEED_REQUIREMENTS):
+    project = root / name
+    (project / "backend").mkdir(parents=True)
+    (project / "frontend").mkdir()
+    (project / "backend" / "requirements.txt").write_text(requirements)
+    # Key order/formatting differences must not matter
+    (project / "frontend" / "package.json").write_text(json.dumps(json.loads(SEED_PACKAGE_JSON)))
+    return project
+
+
+@pytest.fixture
+def docker():
+    return FakeDocker()
+
+
+@pytest.fixture
+def cache(tmp_path, docker):
+    return BaseImageCache(runner=docker, state_path=tmp_path / ".image_cache.json")
+
+
+class TestImageKeys:
+    """Test how base image tags are derived."""
+
+    def test_seed_projects_share_tags(self, cache, tmp_path):
+        """
+        GIVEN two freshly seeded projects
+        WHEN their base image specs are computed
+        THEN both map to the seed tags
+        """
+        seed = cache.seed_specs()
+        for name in ("a", "b"):
+            specs = cache.specs_for_project(make_project(tmp_path, name))
+            assert {k: s.tag for k, s in specs.items()} == {k: s.tag for k, s in seed.items()}
+
+    def test_dependency_fixer_additions_change_backend_key(self, cache, tmp_path):
+        """
+        GIVEN a project whose requirements.txt gained packages via dependency_fixer
+        WHEN its specs are computed
+        THEN only the backend tag changes and the conflicting pytest pin is dropped
+        """
+        project = make_project(tmp_path, "fixed")
+        add_dependencies_to_requirements(project / "backend" / "requirements.txt", {"pytest-mock"})
+        (project / "backend" / "requirements.txt").write_text(
+            (project / "backend" / "requirements.txt").read_text().replace("pytest>=8.0.0", "pytest>=9.0.0")
+        )
+
+        specs = cache.specs_for_project(project)
+        seed = cache.seed_specs()
+
+        assert specs["backend"].tag != seed["backend"].tag
+        assert specs["frontend"].tag == seed["frontend"].tag
+        files = dict(specs["backend"].files)
+        assert b"pytest-mock" in files["requirements.txt"]
+        assert b"pytest==" not in files["requirements.lock"]
+        assert b"fastapi==0.115.6" in files["requirements.lock"]
+
+    def test_base_dockerfile_has_no_source_copy(self, cache):
+        """
+        GIVEN the template Dockerfiles
+        WHEN base Dockerfiles are derived
+        THEN the source copy is removed and the lock is applied as constraints
+        """
+        backend = cache.base_dockerfile("backend")
+        frontend = cache.base_dockerfile("frontend")
+
+        assert "COPY . ." not in backend and "COPY . ." not in frontend
+        assert "-r requirements.txt -c requirements.lock" in backend
+        assert "COPY requirements.txt requirements.lock ./" in backend
+        assert "npm install" in frontend
+
+
+class TestImageCache:
+    """Test building, project wiring and pruning."""
+
+    @pytest.mark.asyncio
+    async def test_prepare_builds_once_and_writes_overrides(self, cache, docker, tmp_path):
+        """
+        GIVEN two seed projects
+        WHEN both are prepared
+        THEN base images are built once and each project only copies source
+        """
+        first = make_project(tmp_path, "a")
+        second = make_project(tmp_path, "b")
+
+        tags = await cache.prepare_project(first, "a")
+        await cache.prepare_project(second, "b")
+
+        assert sorted(docker.builds) == sorted(tags.values())
+        dockerfile = (second / "backend" / CACHED_DOCKERFILE).read_text()
+        assert f"FROM {tags['backend']}" in dockerfile and "COPY . ." in dockerfile
+        override = (second / COMPOSE_OVERRIDE).read_text()
+        assert f"dockerfile: {CACHED_DOCKERFILE}" in override and "frontend:" in override
+
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 2
+        assert stats["tags"][tags["backend"]]["projects"] == ["a", "b"]
+        # Usage survives a restart
+        assert BaseImageCache(runner=docker, state_path=cache.state_path).stats()["images"] == 2
+
+    @pytest.mark.asyncio
+    async def test_prune_keeps_seed_and_recent(self, cache, docker, tmp_path):
+        """
+        GIVEN seed images, a recently used image and an idle one
+        WHEN pruning with a 7 day idle limit
+        THEN only the idle image is removed
+        """
+        await cache.prepare_project(make_project(tmp_path, "seed"), "seed")
+        for name, extra in (("recent", "pytest-mock\n"), ("idle", "pandas\n")):
+            await cache.prepare_project(make_project(tmp_path, name, SEED_REQUIREMENTS + extra), name)
+        idle_tag = cache.specs_for_project(tmp_path / "idle")["backend"].tag
+        cache._state["tags"][idle_tag]["last_used"] = time.time() - 30 * 86400
+        seed_tags = {s.tag for s in cache.seed_specs().values()}
+
+        removed = await cache.prune(max_idle_days=7)
+
+        assert removed == [idle_tag]
+        assert seed_tags <= docker.images
+        assert len(docker.images) == 3
+
+
+class TestSandboxManagerImageCache:
+    """Test that compose builds use the cached base images."""
+
+    @pytest.mark.asyncio
+    async def test_compose_uses_override(self, docker, tmp_path, monkeypatch):
+        """
+        GIVEN the image cache enabled
+        WHEN a project's base images are prepared and compose runs
+        THEN the compose command includes the generated override file
+        """
+        from app.sandbox import image_cache as cache_module
+
+        monkeypatch.setattr(cache_module, "_cache", BaseImageCache(runner=docker, state_path=tmp_path / "state.json"))
+        project = make_project(tmp_path, "proj")
+        (project / "docker-compose.yml").write_text("services: {}\n")
+        commands = []
+
+        async def fake_run(cmd, **kwargs):
+            commands.append(cmd)
+            return ProcessResult(returncode=0, stdout="", stderr="")
+
+        monkeypatch.setattr(manager_module, "run_process", fake_run)
+        manager = SandboxManager()
+        manager._compose_cmd = "docker compose"
+
+        await manager._prepare_base_images("proj", project)
+        await manager._run_compose_command(project, "up -d --build")
+
+        assert f'-f "{project / COMPOSE_OVERRIDE}" up -d --build' in commands[-1]
@@ -0,0 +1,270 @@
+# tests/test_llm_adapter.py
+"""
+Tests for the unified LLM adapter layer (app/llm).
+
+Validates the execution plumbing underneath every agent call:
+- Shared keep-alive transport (one pool per provider)
+- Streaming calls with incremental HDAP parsing
+- Content-addressed response cache (LRU + TTL)
+
+No network access: providers are replaced with in-process fakes.
+"""
+import pytest
+
+from app.core.exceptions import LLMError
+from app.llm.adapter import LLMAdapter
+from app.llm.response_cache import ResponseCache, fingerprint
+from app.llm.transport import LLMTransport
+
+
+class TestLLMTransport:
+    """Test the pooled HTTP transport owned by LLMAdapter."""
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused_per_provider(self):
+        """
+        GIVEN a transport
+        WHEN the same provider asks for a session twice
+        THEN the same pooled session is returned, and providers are isolated
+        """
+        transport = LLMTransport(max_connections=4, provider_limits={"ollama": 1})
+        try:
+            first = transport.session("gemini")
+            second = transport.session("gemini")
+            other = transport.session("ollama")
+
+            assert first is second
+            assert other is not first
+            assert first.connector.limit == 4
+            assert other.connector.limit == 1
+        finally:
+            await transport.close()
+
+        assert first.closed and other.closed
+        assert transport.stats()["pools"] == {}
+
+    @pytest.mark.asyncio
+    async def test_adapter_passes_pooled_session_to_provider(self, monkeypatch):
+        """
+        GIVEN an adapter with a fake provider
+        WHEN call() is invoked
+        THEN the provider receives the adapter's pooled session
+        """
+        from app.llm.providers import gemini
+
+        seen = {}
+
+        async def fake_call(**kwargs):
+            seen["session"] = kwargs.get("session")
+            return {"text": "ok", "usage": {"input": 1, "output": 1}}
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        try:
+            assert await adapter.call("hi", provider="gemini") == "ok"
+            assert seen["session"] is adapter.transport.session("gemini")
+        finally:
+            await adapter.aclose()
+
+
+class TestStreaming:
+    """Test streamed completions through the adapter."""
+
+    @pytest.mark.asyncio
+    async def test_call_streaming_reports_files_as_they_close(self, monkeypatch):
+        """
+        GIVEN a provider that streams two HDAP files in small deltas
+        WHEN call_streaming() runs with an on_file callback
+        THEN each file is reported as soon as it closes, before the stream ends
+        """
+        from app.llm.providers import gemini
+
+        output = (
+            '<<<FILE path="a.py">>>\nA = 1\n<<<END_FILE>>>\n'
+            '<<<FILE path="b.py">>>\nB = 2\n<<<END_FILE>>>'
+        )
+        timeline = []
+
+        async def fake_stream(**kwargs):
+            for i in range(0, len(output), 6):
+                timeline.append("chunk")
+                yield {"text": output[i:i + 6]}
+            yield {"usage": {"input": 10, "output": 20}}
+
+        async def on_file(file):
+            timeline.append(file["path"])
+
+        monkeypatch.setattr(gemini, "stream", fake_stream)
+        adapter = LLMAdapter()
+        try:
+            result = await adapter.call_streaming("hi", provider="gemini", on_file=on_file)
+        finally:
+            await adapter.aclose()
+
+        assert result["text"] == output
+        assert result["usage"] == {"input": 10, "output": 20}
+        assert [f["path"] for f in result["hdap"]["files"]] == ["a.py", "b.py"]
+        # a.py was reported while chunks were still arriving
+        assert timeline.index("a.py") < len(timeline) - 1 - timeline[::-1].index("chunk")
+
+    @pytest.mark.asyncio
+    async def test_stream_errors_become_llm_errors(self, monkeypatch):
+        """
+        GIVEN a provider stream that fails midway
+        WHEN call_streaming() consumes it
+        THEN an LLMError is raised (same contract as call())
+        """
+        from app.llm.providers import gemini
+
+        async def broken_stream(**kwargs):
+            yield {"text": "partial"}
+            raise RuntimeError("connection reset")
+
+        monkeypatch.setattr(gemini, "stream", broken_stream)
+        adapter = LLMAdapter()
+        try:
+            with pytest.raises(LLMError):
+                await adapter.call_streaming("hi", provider="gemini")
+        finally:
+            await adapter.aclose()
+
+
+class TestResponseCache:
+    """Test the content-addressed response cache."""
+
+    def test_fingerprint_covers_every_input(self):
+        """
+        GIVEN two requests differing only deep inside the prompt
+        WHEN fingerprinted
+        THEN the keys differ (no prefix-truncation false hits)
+        """
+        base = dict(provider="gemini", model="m", system_prompt="s", prompt="x" * 1000,
+                    temperature=0.7, max_tokens=100, stop_sequences=[])
+        key = fingerprint(**base)
+
+        assert key == fingerprint(**base)
+        assert key != fingerprint(**{**base, "prompt": "x" * 999 + "y"})
+        assert key != fingerprint(**{**base, "model": "other"})
+        assert key != fingerprint(**{**base, "temperature": 0.0})
+
+    def test_lru_eviction_and_ttl(self, tmp_path, monkeypatch):
+        """
+        GIVEN a cache with a small size budget
+        WHEN entries exceed it, or outlive the TTL
+        THEN least-recently-used entries are evicted and stale ones miss
+        """
+        cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=120, ttl_seconds=60)
+        try:
+            cache.put("a", {"text": "a" * 40})
+            cache.put("b", {"text": "b" * 40})
+            assert cache.get("a") is not None  # a is now most recently used
+            cache.put("c", {"text": "c" * 40})  # over budget -> evict b
+
+            assert cache.get("b") is None
+            assert cache.get("a") is not None
+            assert cache.stats()["evictions"] == 1
+            assert cache.stats()["size_bytes"] <= 120
+
+            import app.llm.response_cache as rc
+            real_time = rc.time.time
+            monkeypatch.setattr(rc.time, "time", lambda: real_time() + 120)
+            assert cache.get("c") is None
+            assert cache.stats()["expired"] == 1
+        finally:
+            cache.close()
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_hit_cache(self, monkeypatch):
+        """
+        GIVEN an adapter with the response cache enabled
+        WHEN the same request is made twice
+        THEN the provider is called once, and the hit reports zero tokens
+        """
+        from app.llm.providers import gemini
+
+        calls = []
+
+        async def fake_call(**kwargs):
+            calls.append(kwargs["prompt"])
+            return {"text": "generated", "usage": {"input": 100, "output": 50}}
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        try:
+            first = await adapter.call("same", provider="gemini", return_usage=True)
+            second = await adapter.call("same", provider="gemini", return_usage=True)
+            forced = await adapter.call("same", provider="gemini", use_cache=False)
+        finally:
+            await adapter.aclose()
+
+        assert first["usage"] == {"input": 100, "output": 50}
+        assert second["text"] == "generated"
+        assert second["usage"]["input"] == 0 and second["usage"]["cache_hit"]
+        assert forced == "generated"
+        assert len(calls) == 2  # the use_cache=False call bypassed the lookup
+
+    @pytest.mark.asyncio
+    async def test_streaming_hit_replays_files(self, monkeypatch):
+        """
+        GIVEN a streamed generation that was cached
+        WHEN the identical request streams again
+        THEN on_file still fires for each file without touching the provider
+        """
+        from app.llm.providers import gemini
+
+        output = '<<<FILE path="a.py">>>\nA = 1\n<<<END_FILE>>>'
+        streams = []
+
+        async def fake_stream(**kwargs):
+            streams.append(1)
+            yield {"text": output}
+            yield {"usage": {"input": 5, "output": 5}}
+
+        monkeypatch.setattr(gemini, "stream", fake_stream)
+        seen = []
+        adapter = LLMAdapter()
+        try:
+            await adapter.call_streaming("p", provider="gemini")
+            result = await adapter.call_streaming("p", provider="gemini", on_file=lambda f: seen.append(f["path"]))
+        finally:
+            await adapter.aclose()
+
+        assert len(streams) == 1
+        assert seen == ["a.py"]
+        assert result["hdap"]["files"][0]["path"] == "a.py"
+
+    @pytest.mark.asyncio
+    async def test_unusable_and_rejected_responses_are_not_replayed(self, monkeypatch):
+        """
+        GIVEN a truncated HDAP reply and a complete one that supervision rejects
+        WHEN the identical requests are repeated
+        THEN neither is served from the cache
+        """
+        from app.llm.providers import gemini
+
+        replies = {
+            "truncated": '<<<FILE path="a.py">>>\nA = ',
+            "rejected": '<<<FILE path="a.py">>>\nA = 1\n<<<END_FILE>>>',
+        }
+        calls = []
+
+        async def fake_call(**kwargs):
+            calls.append(kwargs["prompt"])
+            return {"text": replies[kwargs["prompt"]], "usage": {"input": 1, "output": 1}}
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        try:
+            await adapter.call("truncated", provider="gemini")
+            rejected = await adapter.call("rejected", provider="gemini", return_usage=True)
+            assert await adapter.evict(rejected["cache_key"]) is True
+
+            await adapter.call("truncated", provider="gemini")
+            await adapter.call("rejected", provider="gemini")
+            stats = adapter.cache.stats()
+        finally:
+            await adapter.aclose()
+
+        assert calls == ["truncated", "rejected", "truncated", "rejected"]
+        assert stats["invalidated"] == 1
+        assert stats["entries"] == 1  # Only the second "rejected" generation
@@ -0,0 +1,308 @@
+# tests/test_llm_hedging.py
+"""
+Tests for hedged and failover LLM requests.
+
+Validates:
+- A slow primary is raced against the backup after the deadline; the loser is cancelled
+- Deadlines follow the provider's latency percentile within the configured bounds
+- Failed or invalid (incomplete HDAP) answers fail over immediately
+- The circuit breaker skips a failing provider and retries it after the cooldown
+- The adapter hedges calls and streams when LLM_HEDGING is on
+"""
+import asyncio
+
+import pytest
+
+from app.core.exceptions import LLMError
+from app.llm.adapter import LLMAdapter
+from app.llm.hedging import MIN_SAMPLES, CircuitBreaker, Hedger, valid_response
+from tests.conftest import FakeClock
+
+
+pytestmark = pytest.mark.usefixtures("no_response_cache")
+
+
+def make_hedger(**kwargs):
+    options = dict(secondary=("openai", "gpt"), percentile=95, min_delay=0.05, max_delay=0.05,
+                   error_rate=0.5, min_calls=4, cooldown=30)
+    options.update(kwargs)
+    return Hedger(**options)
+
+
+def fake_provider(behaviour):
+    """fn(provider, model) following behaviour[provider] = (delay, text or exception)."""
+    calls, cancelled = [], []
+
+    async def fn(provider, model):
+        calls.append(provider)
+        delay, outcome = behaviour[provider]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(provider)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"text": outcome, "usage": {"input": 1, "output": 1}}
+
+    return fn, calls, cancelled
+
+
+HDAP = '<<<FILE path="a.py">>>\nx = 1\n<<<END_FILE>>>\n'
+
+
+class TestHedgedCalls:
+    """Test racing, failover and deadlines in Hedger.call."""
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        """
+        GIVEN a primary that takes 1s and a backup that takes 10ms
+        WHEN the call passes the 50ms deadline
+        THEN the backup answers and the primary is cancelled
+        """
+        hedger = make_hedger()
+        fn, calls, cancelled = fake_provider({"gemini": (1.0, "slow"), "openai": (0.01, "fast")})
+
+        result, route = await asyncio.wait_for(hedger.call(("gemini", "flash"), fn), timeout=0.5)
+        await asyncio.sleep(0)
+
+        assert (result["text"], route) == ("fast", ("openai", "gpt"))
+        assert calls == ["gemini", "openai"] and cancelled == ["gemini"]
+        stats = hedger.stats()
+        assert (stats["hedged"], stats["backup_wins"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_sends_one_request(self):
+        """
+        GIVEN a primary that answers before the deadline
+        WHEN the call runs
+        THEN no backup request is sent
+        """
+        hedger = make_hedger()
+        fn, calls, _ = fake_provider({"gemini": (0.0, "quick"), "openai": (0.0, "unused")})
+
+        result, route = await hedger.call(("gemini", "flash"), fn)
+
+        assert (result["text"], route, calls) == ("quick", ("gemini", "flash"), ["gemini"])
+        assert hedger.stats()["hedged"] == 0
+
+    def test_deadline_follows_percentile(self):
+        """
+        GIVEN latencies of 1..20 seconds and bounds of 5..15 seconds
+        WHEN deadlines are computed
+        THEN too few samples use the upper bound, and the p95 (19s) is clamped to it
+        """
+        hedger = make_hedger(min_delay=5, max_delay=15)
+        for seconds in range(1, MIN_SAMPLES):
+            hedger.histogram("gemini").observe(seconds)
+        assert hedger.deadline("gemini") == 15
+
+        hedger.histogram("gemini").observe(MIN_SAMPLES)
+        assert hedger.deadline("gemini") == 15
+
+        hedger.percentile = 50
+        assert hedger.deadline("gemini") == 10
+        assert hedger.stats()["providers"]["gemini"]["latency"]["p95"] == 19
+
+    @pytest.mark.asyncio
+    async def test_failures_and_invalid_answers_fail_over(self):
+        """
+        GIVEN a primary that errors, and one that returns truncated HDAP
+        WHEN each is called
+        THEN the backup is sent at once and its valid answer wins
+        """
+        hedger = make_hedger(max_delay=10)
+        fn, _, _ = fake_provider({"gemini": (0.0, RuntimeError("500")), "openai": (0.0, HDAP)})
+        truncated = HDAP.replace("<<<END_FILE>>>\n", "")
+        fn_invalid, _, _ = fake_provider({"gemini": (0.0, truncated), "openai": (0.0, HDAP)})
+
+        result, route = await asyncio.wait_for(hedger.call(("gemini", "flash"), fn), timeout=1)
+        assert route == ("openai", "gpt")
+        result, route = await asyncio.wait_for(hedger.call(("gemini", "flash"), fn_invalid), timeout=1)
+        assert (result["text"], route) == (HDAP, ("openai", "gpt"))
+        assert hedger.stats()["failovers"] == 2
+        assert not valid_response({"text": truncated}) and valid_response('{"ok": true}')
+
+    @pytest.mark.asyncio
+    async def test_all_failing_raises_first_error(self):
+        """
+        GIVEN a primary and a backup that both fail
+        WHEN the call runs
+        THEN the primary's error is raised
+        """
+        hedger = make_hedger()
+        fn, calls, _ = fake_provider({"gemini": (0.0, RuntimeError("primary down")),
+                                      "openai": (0.0, RuntimeError("backup down"))})
+
+        with pytest.raises(RuntimeError, match="primary down"):
+            await hedger.call(("gemini", "flash"), fn)
+        assert calls == ["gemini", "openai"]
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_then_half_opens(self):
+        """
+        GIVEN a breaker that needs 4 calls at a 50% error rate
+        WHEN 2 of 4 calls fail, the cooldown passes and the trial call succeeds
+        THEN it opens, allows exactly one trial, then closes
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker("gemini", error_rate=0.5, min_calls=4, cooldown=30, clock=clock)
+        for ok in (True, False, True, False):
+            assert breaker.allow()
+            breaker.record(ok)
+
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+        clock.now += 30
+        assert breaker.allow() and not breaker.allow()
+        breaker.record(True)
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    def test_old_errors_expire(self):
+        """
+        GIVEN three failures more than two minutes ago
+        WHEN one more call fails
+        THEN the breaker stays closed
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker("gemini", error_rate=0.5, min_calls=4, cooldown=30, clock=clock)
+        for _ in range(3):
+            breaker.record(False)
+        clock.now += 300
+        breaker.record(False)
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_open_primary_is_skipped(self):
+        """
+        GIVEN a primary whose breaker is open
+        WHEN a call is made
+        THEN it goes straight to the backup
+        """
+        hedger = make_hedger()
+        for _ in range(4):
+            hedger.breaker("gemini").record(False)
+        fn, calls, _ = fake_provider({"gemini": (0.0, "down"), "openai": (0.0, "backup")})
+
+        result, route = await hedger.call(("gemini", "flash"), fn)
+
+        assert calls == ["openai"] and route == ("openai", "gpt")
+        assert hedger.stats()["skipped_open"] == 1
+
+
+class TestAdapterIntegration:
+    """Test hedging through LLMAdapter."""
+
+    @pytest.fixture
+    def providers(self, monkeypatch):
+        """Gemini hangs for a second before answering; OpenAI answers at once."""
+        from app.llm.providers import gemini, openai
+        calls = []
+
+        async def gemini_call(**kwargs):
+            calls.append("gemini")
+            await asyncio.sleep(1)
+            return {"text": "gemini", "usage": {"input": 1, "output": 1}}
+
+        async def openai_call(**kwargs):
+            calls.append("openai:" + kwargs["model"])
+            return {"text": "openai", "usage": {"input": 1, "output": 1}}
+
+        async def gemini_stream(**kwargs):
+            calls.append("gemini")
+            await asyncio.sleep(1)
+            yield {"text": HDAP.replace("a.py", "slow.py")}
+
+        async def openai_stream(**kwargs):
+            calls.append("openai:" + kwargs["model"])
+            yield {"text": HDAP}
+            yield {"usage": {"input": 1, "output": 1}}
+
+        monkeypatch.setattr(gemini, "call", gemini_call)
+        monkeypatch.setattr(gemini, "stream", gemini_stream)
+        monkeypatch.setattr(openai, "call", openai_call)
+        monkeypatch.setattr(openai, "stream", openai_stream)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_call_and_stream_are_hedged(self, providers):
+        """
+        GIVEN an adapter with hedging to openai/gpt
+        WHEN a call and a stream go to a hanging gemini
+        THEN both are answered by openai, and on_file only sees the winning stream
+        """
+        adapter = LLMAdapter()
+        adapter.scheduler = None
+        adapter.hedger = make_hedger()
+        seen = []
+        try:
+            text = await asyncio.wait_for(adapter.call("q", provider="gemini", model="flash"), timeout=0.5)
+            result = await asyncio.wait_for(adapter.call_streaming(
+                "gen", provider="gemini", model="flash", on_file=lambda f: seen.append(f["path"])
+            ), timeout=0.5)
+            unhedged = adapter.call("q2", provider="gemini", model="flash", hedge=False)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(unhedged, timeout=0.2)
+        finally:
+            await adapter.aclose()
+
+        assert text == "openai"
+        assert seen == ["a.py"] and result["hdap"]["files"][0]["path"] == "a.py"
+        assert providers == ["gemini", "openai:gpt"] * 2 + ["gemini"]
+        assert adapter.hedger.stats()["backup_wins"] == 2
+
+    @pytest.mark.asyncio
+    async def test_backup_answers_are_billed_to_backup_and_not_cached(self, providers, tmp_path):
+        """
+        GIVEN the response cache on and a hanging gemini
+        WHEN openai answers a hedged call and stream
+        THEN usage names openai/gpt and nothing is cached under gemini's key
+        """
+        from app.llm.response_cache import ResponseCache
+
+        adapter = LLMAdapter()
+        adapter.scheduler = None
+        adapter.hedger = make_hedger()
+        adapter.cache = ResponseCache(path=tmp_path / "hedged.sqlite")
+        try:
+            called = await asyncio.wait_for(
+                adapter.call("q", provider="gemini", model="flash", return_usage=True), timeout=0.5
+            )
+            streamed = await asyncio.wait_for(
+                adapter.call_streaming("gen", provider="gemini", model="flash"), timeout=0.5
+            )
+            entries = adapter.cache.stats()["entries"]
+        finally:
+            await adapter.aclose()
+
+        for result in (called, streamed):
+            assert result["usage"]["provider"] == "openai"
+            assert result["usage"]["model"] == "gpt"
+        assert entries == 0
+
+    @pytest.mark.asyncio
+    async def test_adapter_errors_are_llm_errors(self, monkeypatch):
+        """
+        GIVEN hedging on and both providers failing
+        WHEN the adapter calls
+        THEN the usual LLMError is raised
+        """
+        from app.llm.providers import gemini, openai
+
+        async def failing(**kwargs):
+            raise RuntimeError("unavailable")
+
+        monkeypatch.setattr(gemini, "call", failing)
+        monkeypatch.setattr(openai, "call", failing)
+        adapter = LLMAdapter()
+        adapter.scheduler = None
+        adapter.hedger = make_hedger()
+        try:
+            with pytest.raises(LLMError):
+                await adapter.call("q", provider="gemini", model="flash")
+        finally:
+            await adapter.aclose()
@@ -0,0 +1,266 @@
+# tests/test_llm_scheduler.py
+"""
+Tests for the priority-aware LLM request scheduler.
+
+Validates:
+- Queued calls are admitted by priority class, round-robin across projects
+- Token buckets pace requests; a 429 lowers the learned rate and it recovers
+- A rate-limited call waits and is retried instead of failing the workflow
+- Retry-After / retryDelay hints are parsed
+- Queue-wait metrics
+"""
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.exceptions import RateLimitError
+from app.llm.adapter import LLMAdapter
+from app.llm.scheduler import LLMScheduler, ProviderLimiter, TokenBucket, llm_context
+from app.llm.transport import ProviderRateLimited, retry_after_seconds
+from tests.conftest import FakeClock
+
+
+pytestmark = pytest.mark.usefixtures("no_response_cache")
+
+
+async def admitted_order(scheduler, provider, requests):
+    """Queue (label, priority, project) requests behind a cooldown; return admission order."""
+    scheduler.limiter(provider).cooldown_until = scheduler.clock() + 0.05
+    order = []
+
+    async def request(label, priority, project):
+        await scheduler.acquire(provider, 10, priority=priority, project_id=project)
+        order.append(label)
+
+    await asyncio.gather(*(request(*r) for r in requests))
+    return order
+
+
+class TestAdmissionOrder:
+    """Test priority classes and per-project fairness."""
+
+    @pytest.mark.asyncio
+    async def test_priority_classes(self):
+        """
+        GIVEN calls of every class queued behind a cooling-down provider
+        WHEN capacity returns
+        THEN interactive is admitted first and background last
+        """
+        scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+
+        order = await admitted_order(scheduler, "gemini", [
+            ("bg", "background", "p1"),
+            ("review", "supervision", "p1"),
+            ("gen", "generation", "p1"),
+            ("refine", "interactive", "p2"),
+        ])
+
+        assert order == ["refine", "gen", "review", "bg"]
+
+    @pytest.mark.asyncio
+    async def test_projects_are_served_round_robin(self):
+        """
+        GIVEN one project with three queued calls and another with one
+        WHEN they are admitted
+        THEN the second project does not wait behind the first one's backlog
+        """
+        scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+
+        order = await admitted_order(scheduler, "gemini", [
+            ("a1", "generation", "proj-a"),
+            ("a2", "generation", "proj-a"),
+            ("a3", "generation", "proj-a"),
+            ("b1", "generation", "proj-b"),
+        ])
+
+        assert order == ["a1", "b1", "a2", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_context_tags_calls(self):
+        """
+        GIVEN a call made inside llm_context("background", project_id=...)
+        WHEN it is admitted
+        THEN its wait is recorded under that class, and unknown classes are rejected
+        """
+        scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+
+        with llm_context("background", project_id="proj-1"):
+            ticket = await scheduler.acquire("openai", 10)
+
+        assert (ticket.priority, ticket.project_id) == ("background", "proj-1")
+        assert scheduler.stats()["providers"]["openai"]["wait"]["background"]["count"] == 1
+        with pytest.raises(ValueError):
+            with llm_context("urgent"):
+                pass
+
+
+class TestRateLimits:
+    """Test token buckets and 429 adaptation."""
+
+    def test_bucket_paces_requests(self):
+        """
+        GIVEN a 60 requests/min bucket that has been used up
+        WHEN time passes
+        THEN a request is available again after one second
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+        for _ in range(60):
+            bucket.take(1)
+
+        assert bucket.wait_time(1) == pytest.approx(1.0)
+        clock.now += 0.5
+        assert bucket.wait_time(1) == pytest.approx(0.5)
+        clock.now += 0.5
+        assert bucket.wait_time(1) == 0.0
+
+    def test_429_lowers_rate_then_recovers(self):
+        """
+        GIVEN an unconfigured provider that served 8 requests in the last minute
+        WHEN it answers 429 with Retry-After: 2, then stays quiet for a minute
+        THEN it pauses for 2s at a learned 6 rpm, and the rate grows back afterwards
+        """
+        clock = FakeClock()
+        limiter = ProviderLimiter("gemini", rpm=None, tpm=None, clock=clock)
+        for _ in range(8):
+            limiter.admit(100)
+
+        assert limiter.on_rate_limited(2.0) == 2.0
+        assert limiter.stats()["rpm_limit"] == 6.0
+        assert limiter.wait_time(100) == pytest.approx(2.0)
+
+        clock.now += 61
+        limiter.on_success(100, 120)
+        assert limiter.stats()["rpm_limit"] == 6.6
+        assert limiter.stats()["rate_limited"] == 1
+
+    def test_tpm_reconciles_estimates(self):
+        """
+        GIVEN a 1000 tokens/min budget and a call estimated at 100 tokens
+        WHEN the provider reports 700 tokens of real usage
+        THEN the difference is charged, so the next large call has to wait
+        """
+        clock = FakeClock()
+        limiter = ProviderLimiter("openai", rpm=None, tpm=1000, clock=clock)
+        limiter.admit(100)
+        limiter.on_success(100, 700)
+
+        assert limiter.wait_time(200) == 0.0
+        assert limiter.wait_time(400) == pytest.approx(6.0)
+
+    def test_retry_after_hints(self):
+        """
+        GIVEN 429 responses with a delay in seconds, an HTTP date or a Gemini retryDelay
+        WHEN the hint is parsed
+        THEN each yields the number of seconds to wait
+        """
+        later = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+        assert retry_after_seconds({"Retry-After": "7"}) == 7.0
+        assert 28 <= retry_after_seconds({"Retry-After": format_datetime(later, usegmt=True)}) <= 30
+        assert retry_after_seconds({}, '{"error": {"details": [{"retryDelay": "12s"}]}}') == 12.0
+        assert retry_after_seconds({}, "quota exceeded") is None
+
+
+class TestAdapterIntegration:
+    """Test that rate-limited provider calls are retried through the scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_call_is_retried(self, monkeypatch):
+        """
+        GIVEN a provider that answers 429 (Retry-After 0.05s) once
+        WHEN the adapter calls it
+        THEN the call succeeds after the pause instead of raising
+        """
+        from app.llm.providers import gemini
+        attempts = []
+
+        async def fake_call(**kwargs):
+            attempts.append(kwargs["prompt"])
+            if len(attempts) == 1:
+                raise ProviderRateLimited("Rate limited (429)", retry_after=0.05)
+            return {"text": "ok", "usage": {"input": 3, "output": 1}}
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        adapter.scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+        try:
+            text = await adapter.call("hello", provider="gemini", model="m")
+        finally:
+            await adapter.aclose()
+
+        assert text == "ok" and len(attempts) == 2
+        stats = adapter.scheduler.stats()
+        assert stats["retries"] == 1
+        assert stats["providers"]["gemini"]["rate_limited"] == 1
+        assert stats["providers"]["gemini"]["wait"]["generation"]["max_seconds"] >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_wait(self, monkeypatch):
+        """
+        GIVEN a provider that keeps asking for a 10s pause and a 1s max wait
+        WHEN the adapter calls it
+        THEN RateLimitError is raised without waiting
+        """
+        from app.llm.providers import gemini
+
+        async def fake_call(**kwargs):
+            raise ProviderRateLimited("Rate limited (429)", retry_after=10)
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        adapter = LLMAdapter()
+        adapter.scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=1)
+        try:
+            with pytest.raises(RateLimitError):
+                await asyncio.wait_for(adapter.call("hello", provider="gemini", model="m"), timeout=2)
+        finally:
+            await adapter.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_retries_before_first_event(self, monkeypatch):
+        """
+        GIVEN a streaming provider that answers 429 before yielding anything
+        WHEN the adapter streams from it
+        THEN the stream is retried and every event arrives once
+        """
+        from app.llm.providers import gemini
+        attempts = []
+
+        async def fake_stream(**kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ProviderRateLimited("Rate limited (429)", retry_after=0.01)
+            yield {"text": "hi"}
+            yield {"usage": {"input": 1, "output": 1}}
+
+        monkeypatch.setattr(gemini, "stream", fake_stream)
+        adapter = LLMAdapter()
+        adapter.scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+        try:
+            events = [e async for e in adapter.stream("hello", provider="gemini", model="m")]
+        finally:
+            await adapter.aclose()
+
+        assert events == [{"text": "hi"}, {"usage": {"input": 1, "output": 1}, "route": ("gemini", "m")}]
+        assert len(attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """
+        GIVEN two calls queued behind a cooldown
+        WHEN the first is cancelled
+        THEN the second is still admitted and the queue is empty afterwards
+        """
+        scheduler = LLMScheduler(rpm={}, tpm={}, max_wait=5)
+        scheduler.limiter("gemini").cooldown_until = scheduler.clock() + 0.05
+        first = asyncio.create_task(scheduler.acquire("gemini", 10, project_id="a"))
+        second = asyncio.create_task(scheduler.acquire("gemini", 10, project_id="b"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        await asyncio.wait_for(second, timeout=1)
+
+        assert first.cancelled()
+        assert scheduler.stats()["providers"]["gemini"]["queue_depth"]["generation"] == 0
@@ -0,0 +1,170 @@
+# tests/test_llm_singleflight.py
+"""
+Tests for coalescing identical in-flight LLM calls.
+
+Validates:
+- Concurrent identical calls send one provider request; joiners are not billed
+- coalesce=False and differing prompts send separate requests
+- A cancelled caller does not cancel the call for the others
+- Errors are shared and nothing stays registered afterwards
+- Streaming joiners get their on_file callbacks from the shared result
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.core.exceptions import LLMError
+from app.llm.adapter import LLMAdapter
+from app.llm.singleflight import SingleFlight
+
+
+# Coalescing must work without the response cache absorbing the duplicates
+pytestmark = pytest.mark.usefixtures("no_response_cache")
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    """Fake gemini provider that takes 50ms and records every request."""
+    from app.llm.providers import gemini
+    calls = []
+
+    async def fake_call(**kwargs):
+        calls.append(kwargs["prompt"])
+        await asyncio.sleep(0.05)
+        if kwargs["prompt"] == "boom":
+            raise RuntimeError("provider exploded")
+        return {"text": f"reply to {kwargs['prompt']}", "usage": {"input": 10, "output": 5}}
+
+    async def fake_stream(**kwargs):
+        calls.append(kwargs["prompt"])
+        await asyncio.sleep(0.05)
+        yield {"text": "<<<FILE path=\"a.py\">>>\nx = 1\n<<<END_FILE>>>\n"}
+        yield {"usage": {"input": 10, "output": 5}}
+
+    monkeypatch.setattr(gemini, "call", fake_call)
+    monkeypatch.setattr(gemini, "stream", fake_stream)
+    return calls
+
+
+@pytest_asyncio.fixture
+async def adapter():
+    instance = LLMAdapter()
+    yield instance
+    await instance.aclose()
+
+
+class TestSingleFlight:
+    """Test coalescing through LLMAdapter and SingleFlight."""
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_request(self, adapter, provider_calls):
+        """
+        GIVEN three concurrent identical calls
+        WHEN they run
+        THEN one request is sent, all get the reply, and only the first is billed
+        """
+        results = await asyncio.gather(*(
+            adapter.call("review", provider="gemini", model="m", return_usage=True) for _ in range(3)
+        ))
+
+        assert provider_calls == ["review"]
+        assert {r["text"] for r in results} == {"reply to review"}
+        assert results[0]["usage"] == {"input": 10, "output": 5}
+        assert all(r["usage"]["coalesced"] and r["usage"]["input"] == 0 for r in results[1:])
+        assert adapter.flights.stats() == {"in_flight": 0, "calls": 1, "coalesced": 2}
+
+    @pytest.mark.asyncio
+    async def test_opt_out_and_different_prompts(self, adapter, provider_calls):
+        """
+        GIVEN concurrent calls that opt out, and calls with different prompts
+        WHEN they run
+        THEN each sends its own request
+        """
+        await asyncio.gather(
+            adapter.call("sample", provider="gemini", model="m", coalesce=False),
+            adapter.call("sample", provider="gemini", model="m", coalesce=False),
+            adapter.call("one", provider="gemini", model="m"),
+            adapter.call("two", provider="gemini", model="m"),
+        )
+
+        assert sorted(provider_calls) == ["one", "sample", "sample", "two"]
+        assert adapter.flights.stats()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self, adapter, provider_calls):
+        """
+        GIVEN two identical calls in flight
+        WHEN the one that started the request is cancelled
+        THEN the other still receives the reply
+        """
+        first = asyncio.create_task(adapter.call("review", provider="gemini", model="m"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(adapter.call("review", provider="gemini", model="m"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "reply to review"
+        assert first.cancelled()
+        assert provider_calls == ["review"]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared(self, adapter, provider_calls):
+        """
+        GIVEN two identical calls to a failing provider
+        WHEN they run
+        THEN both raise LLMError from the single request and nothing stays in flight
+        """
+        results = await asyncio.gather(
+            adapter.call("boom", provider="gemini", model="m"),
+            adapter.call("boom", provider="gemini", model="m"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, LLMError) for r in results)
+        assert provider_calls == ["boom"]
+        assert adapter.flights.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_streaming_joiner_gets_file_callbacks(self, adapter, provider_calls):
+        """
+        GIVEN two identical streaming calls, each with an on_file callback
+        WHEN they run
+        THEN one stream is opened and both callbacks see the file
+        """
+        seen = {"a": [], "b": []}
+
+        results = await asyncio.gather(*(
+            adapter.call_streaming("gen", provider="gemini", model="m", on_file=lambda f, n=name: seen[n].append(f["path"]))
+            for name in ("a", "b")
+        ))
+
+        assert provider_calls == ["gen"]
+        assert seen == {"a": ["a.py"], "b": ["a.py"]}
+        assert [f["path"] for f in results[1]["hdap"]["files"]] == ["a.py"]
+        assert results[1]["usage"]["coalesced"] is True
+
+    @pytest.mark.asyncio
+    async def test_last_waiter_cancelling_stops_the_call(self):
+        """
+        GIVEN a shared call whose only caller is cancelled
+        WHEN the caller goes away
+        THEN the underlying call is cancelled too
+        """
+        flights = SingleFlight()
+        started = asyncio.Event()
+        stopped = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                stopped.set()
+
+        caller = asyncio.create_task(flights.do("k", slow))
+        await started.wait()
+        caller.cancel()
+
+        await asyncio.wait_for(stopped.wait(), timeout=1)
+        assert flights.stats()["in_flight"] == 0
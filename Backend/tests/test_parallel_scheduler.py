@@ -0,0 +1,182 @@
+# tests/test_parallel_scheduler.py
+"""
+Tests for dependency-aware parallel step scheduling.
+
+Validates:
+- TaskGraph file-ownership scopes (ownership + conflicts)
+- Independent steps overlap; dependent / conflicting steps never do
+- The concurrency cap and HALT semantics
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.orchestration.fast_orchestrator import FASTOrchestratorV2
+from app.orchestration.task_graph import TaskGraph
+
+
+class TestFileScopes:
+    """Test TaskGraph ownership scopes."""
+
+    def test_owns_and_conflicts(self):
+        graph = TaskGraph()
+
+        assert graph.owns("frontend_mock", "frontend/src/App.jsx")
+        assert not graph.owns("frontend_mock", "backend/app/models.py")
+        assert graph.owns("backend_models", "entity_plan.json")
+        assert graph.owns("system_integration", "anything/at/all.py")
+
+        assert not graph.scopes_conflict("frontend_mock", "backend_models")
+        assert graph.scopes_conflict("testing_backend", "testing_frontend")  # Shared sandbox
+        assert not graph.owns("testing_backend", "sandbox")
+        assert graph.scopes_conflict("preview_final", "testing_backend")
+
+
+def _scheduler(monkeypatch, max_parallel=2, halt_on=()):
+    """A bare orchestrator whose steps are timed fakes."""
+    monkeypatch.setattr(settings.workflow, "max_parallel_steps", max_parallel)
+    monkeypatch.setattr(
+        "app.orchestration.fast_orchestrator.record_decision_event", lambda **kwargs: None
+    )
+
+    orch = object.__new__(FASTOrchestratorV2)
+    orch.graph = TaskGraph()
+    orch.completed_steps = []
+    orch.failed_steps = []
+    orch.step_results = {}
+    orch.resume_from_checkpoint = False
+    orch.run_id = "run_test"
+    orch.timeline = []
+    orch.active = set()
+    orch.max_active = 0
+
+    async def fake_execute(step, handler, steps, branch):
+        orch.active.add(step)
+        orch.max_active = max(orch.max_active, len(orch.active))
+        orch.timeline.append(("start", step, frozenset(orch.active)))
+        await asyncio.sleep(0.01)
+        orch.active.discard(step)
+        if step in halt_on:
+            orch.failed_steps.append(step)
+            return True
+        orch.completed_steps.append(step)
+        return False
+
+    orch._execute_step = fake_execute
+    return orch
+
+
+class TestParallelScheduler:
+    """Test FASTOrchestratorV2._run_steps_parallel."""
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_overlap(self, monkeypatch):
+        """
+        GIVEN the FAST pipeline
+        WHEN scheduled in parallel mode
+        THEN frontend_mock/backend_models overlap, the two test steps (shared
+        sandbox) do not, dependencies are respected, and preview_final runs alone
+        """
+        orch = _scheduler(monkeypatch)
+        steps = orch.graph.get_steps()
+        handlers = {step: object() for step in steps}
+
+        await orch._run_steps_parallel(steps, handlers, branch_to_execute=None)
+
+        assert sorted(orch.completed_steps) == sorted(steps)
+        started = {step: active for _, step, active in orch.timeline}
+        assert "frontend_mock" in started["backend_models"] or "backend_models" in started["frontend_mock"]
+        assert "testing_backend" not in started["testing_frontend"]
+        assert "testing_frontend" not in started["testing_backend"]
+        assert started["preview_final"] == {"preview_final"}
+        order = [step for _, step, _ in orch.timeline]
+        for step in steps:
+            for dep in orch.graph.required_for(step):
+                assert order.index(dep) < order.index(step)
+
+    @pytest.mark.asyncio
+    async def test_cap_of_one_is_sequential(self, monkeypatch):
+        orch = _scheduler(monkeypatch, max_parallel=1)
+        steps = orch.graph.get_steps()
+
+        await orch._run_steps_parallel(steps, {s: object() for s in steps}, branch_to_execute=None)
+
+        assert orch.max_active == 1
+        assert len(orch.completed_steps) == len(steps)
+
+    @pytest.mark.asyncio
+    async def test_halt_stops_new_launches(self, monkeypatch):
+        """
+        GIVEN backend_models halts the workflow
+        WHEN scheduled in parallel mode
+        THEN the overlapping frontend_mock finishes but nothing new starts
+        """
+        orch = _scheduler(monkeypatch, halt_on={"backend_models"})
+        steps = orch.graph.get_steps()
+
+        await orch._run_steps_parallel(steps, {s: object() for s in steps}, branch_to_execute=None)
+
+        started = [step for _, step, _ in orch.timeline]
+        assert started[0] == "architecture"
+        assert set(started[1:]) == {"frontend_mock", "backend_models"}
+
+    @pytest.mark.asyncio
+    async def test_cancel_cancels_running_steps(self, monkeypatch):
+        """
+        GIVEN two overlapping steps in flight
+        WHEN the scheduler is cancelled (force-stop)
+        THEN both step tasks are cancelled instead of running detached
+        """
+        orch = _scheduler(monkeypatch)
+        orch.completed_steps = ["architecture"]
+        orch.resume_from_checkpoint = True
+        cancelled = []
+
+        async def slow_execute(step, handler, steps, branch):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(step)
+                raise
+            return False
+
+        orch._execute_step = slow_execute
+        steps = orch.graph.get_steps()
+        scheduler = asyncio.create_task(
+            orch._run_steps_parallel(steps, {s: object() for s in steps}, branch_to_execute=None)
+        )
+        await asyncio.sleep(0.01)
+        scheduler.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await scheduler
+
+        assert sorted(cancelled) == ["backend_models", "frontend_mock"]
+
+
+class TestStepBranchIsolation:
+    """Each step runs on its own copy of the branch intent."""
+
+    @pytest.mark.asyncio
+    async def test_execute_step_copies_intent(self, monkeypatch):
+        from app.arbormind.cognition.branch import Branch
+
+        orch = object.__new__(FASTOrchestratorV2)
+        seen = []
+
+        async def fake_body(step, handler, steps, branch):
+            branch.intent["user_request"] = f"RETRY {step}"
+            seen.append(branch)
+            return False
+
+        orch._execute_step_body = fake_body
+        shared = Branch(intent={"user_request": "build a todo app"})
+
+        await asyncio.gather(
+            orch._execute_step("testing_backend", object(), [], shared),
+            orch._execute_step("frontend_mock", object(), [], shared),
+        )
+
+        assert shared.intent["user_request"] == "build a todo app"
+        assert seen[0].intent is not seen[1].intent
+        assert seen[0].id == shared.id
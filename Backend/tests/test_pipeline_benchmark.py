@@ -0,0 +1,165 @@
+# tests/test_pipeline_benchmark.py
+"""
+Tests for the pipeline benchmark building blocks.
+
+Validates:
+- The "replay" provider serves recorded outputs through LLMAdapter
+  (plain + streaming, with usage and without opening an HTTP pool)
+- Phase timings are attributed to the step running in the current context
+- Regression detection compares runs of the same configuration
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.core import profiling
+from app.core.config import settings
+from app.llm.adapter import LLMAdapter
+from benchmarks.pipeline_bench import compare_runs, median_profile
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    path = tmp_path / "recording.json"
+    path.write_text(json.dumps({
+        "responses": [
+            {"name": "review", "match": ["SUPERVISION MODE"], "text": '{"approved": true}', "usage": {"input": 10, "output": 5}},
+            {"name": "models", "match": ["models.py"], "text": '<<<FILE path="backend/app/models.py">>>\nx = 1\n<<<END_FILE>>>\n'},
+        ],
+        "default": {"text": "fallback"},
+    }))
+    monkeypatch.setattr(settings.llm, "replay_path", str(path))
+    monkeypatch.setattr(settings.llm, "replay_latency_ms", 0.0)
+    monkeypatch.setattr(settings.llm, "cache_enabled", False)
+    return path
+
+
+class TestReplayProvider:
+    """Test the deterministic replay provider behind LLMAdapter."""
+
+    @pytest.mark.asyncio
+    async def test_call_returns_first_matching_recording(self, recording):
+        """
+        GIVEN a recording with two matchers and a default
+        WHEN the adapter calls the replay provider
+        THEN the first matching entry (or the default) is returned with usage
+        """
+        adapter = LLMAdapter()
+        try:
+            review = await adapter.call("You are in SUPERVISION MODE", provider="replay", return_usage=True)
+            fallback = await adapter.call("something else", provider="replay")
+        finally:
+            await adapter.aclose()
+
+        assert review["text"] == '{"approved": true}'
+        assert review["usage"]["input"] == 10 and review["usage"]["output"] == 5
+        assert fallback == "fallback"
+        assert adapter.transport.stats()["pools"] == {}
+
+    @pytest.mark.asyncio
+    async def test_streaming_replays_files(self, recording):
+        """
+        GIVEN a recorded HDAP output
+        WHEN it is streamed through call_streaming
+        THEN on_file fires for the recorded file
+        """
+        seen = []
+        adapter = LLMAdapter()
+        try:
+            result = await adapter.call_streaming(
+                "write models.py", provider="replay", on_file=lambda f: seen.append(f["path"])
+            )
+        finally:
+            await adapter.aclose()
+
+        assert seen == ["backend/app/models.py"]
+        assert result["usage"]["output"] > 0
+
+
+class TestProfiling:
+    """Test step-attributed phase timers."""
+
+    def test_phases_are_attributed_per_step(self):
+        """
+        GIVEN profiling enabled and two steps running concurrently
+        WHEN each times a phase (one through asyncio.to_thread)
+        THEN each step gets its own bucket
+        """
+        async def step(name):
+            token = profiling.set_current_step(name)
+            try:
+                with profiling.phase("snapshot"):
+                    await asyncio.to_thread(profiling.record, "file_io", 0.5)
+            finally:
+                profiling.reset_current_step(token)
+
+        async def main():
+            await asyncio.gather(step("frontend_mock"), step("backend_models"))
+
+        profiling.reset_profile()
+        profiling.enable_profiling(True)
+        try:
+            asyncio.run(main())
+            with profiling.phase("outside"):
+                pass
+        finally:
+            profiling.enable_profiling(False)
+        snapshot = profiling.profile_snapshot()
+        profiling.reset_profile()
+
+        for name in ("frontend_mock", "backend_models"):
+            assert snapshot[name]["snapshot"]["count"] == 1
+            assert snapshot[name]["file_io"] == {"seconds": 0.5, "count": 1}
+        assert snapshot[profiling.NO_STEP]["outside"]["count"] == 1
+
+    def test_disabled_records_nothing(self):
+        """
+        GIVEN profiling disabled
+        WHEN phases run
+        THEN nothing is accumulated
+        """
+        profiling.reset_profile()
+        with profiling.phase("snapshot"):
+            profiling.record("ledger", 1.0)
+        assert profiling.profile_snapshot() == {}
+
+
+class TestRegressionTracking:
+    """Test result aggregation and comparison."""
+
+    def test_compare_flags_only_significant_slowdowns(self):
+        """
+        GIVEN a baseline and a new run
+        WHEN one phase is much slower and another only marginally
+        THEN only the significant slowdown (and total) are reported
+        """
+        before = {"total_seconds": 2.0, "steps": {
+            "backend_models": {"snapshot": {"seconds": 0.5, "count": 2}, "ledger": {"seconds": 0.10, "count": 9}},
+        }}
+        after = {"total_seconds": 2.6, "steps": {
+            "backend_models": {"snapshot": {"seconds": 1.0, "count": 2}, "ledger": {"seconds": 0.12, "count": 9}},
+        }}
+
+        regressions = compare_runs(before, after)
+
+        assert [(r["step"], r["phase"]) for r in regressions] == [("total", "total"), ("backend_models", "snapshot")]
+        assert regressions[1]["change"] == 1.0
+
+    def test_median_profile_of_repeats(self):
+        """
+        GIVEN three repeated runs
+        WHEN they are combined
+        THEN totals and phases are medians
+        """
+        runs = [
+            {"total_seconds": t, "completed": ["architecture"], "failed": [],
+             "steps": {"architecture": {"llm": {"seconds": t / 2, "count": 1}}}}
+            for t in (1.0, 3.0, 2.0)
+        ]
+
+        combined = median_profile(runs)
+
+        assert combined["total_seconds"] == 2.0
+        assert combined["steps"]["architecture"]["llm"] == {"seconds": 1.0, "count": 1}
+        assert combined["repeats"] == 3
@@ -0,0 +1,166 @@
+# tests/test_process_runner.py
+"""
+Tests for the async subprocess runner.
+
+Validates:
+- Output is streamed line by line to sync and async callbacks
+- Output beyond the cap is dropped from the front (ring buffer)
+- Timeouts and cancellation kill the whole process group
+- Docker CLI invocations respect the global concurrency limit
+- Force-stop kills the processes a workflow started
+- Loops without subprocess support fall back to a thread
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core import process_runner
+from app.core.config import settings
+from app.core.process_runner import kill_processes, run_process, set_process_owner
+
+
+pytestmark = pytest.mark.skipif(sys.platform != "linux", reason="process groups + /proc")
+
+PY = sys.executable
+
+
+def is_alive(pid: int) -> bool:
+    """True if the process exists and is not a zombie."""
+    stat = Path(f"/proc/{pid}/stat")
+    return stat.exists() and stat.read_text().split(")")[-1].split()[0] != "Z"
+
+
+class TestProcessRunner:
+    """Test run_process."""
+
+    @pytest.mark.asyncio
+    async def test_streams_lines_to_callbacks(self):
+        """
+        GIVEN a command writing lines to stdout and stderr
+        WHEN it runs with a sync stdout and an async stderr callback
+        THEN each line reaches its callback and the full output is returned
+        """
+        out_lines, err_lines = [], []
+
+        async def on_stderr(line):
+            err_lines.append(line)
+
+        result = await run_process(
+            [PY, "-c", "import sys; print('a'); print('b'); sys.stderr.write('oops\\n'); print('c', end='')"],
+            on_stdout=out_lines.append,
+            on_stderr=on_stderr,
+        )
+
+        assert result.success
+        assert out_lines == ["a", "b", "c"] and err_lines == ["oops"]
+        assert result.stdout == "a\nb\nc"
+
+    @pytest.mark.asyncio
+    async def test_output_is_capped(self):
+        """
+        GIVEN a command printing 10,000 bytes
+        WHEN it runs with a 100 byte cap
+        THEN only the last 100 bytes are kept and the drop is reported
+        """
+        result = await run_process(
+            [PY, "-c", "print('x' * 9000 + 'y' * 999)"], max_output=100
+        )
+
+        assert result.stdout_dropped == 9900
+        assert result.stdout.startswith("[... 9900 bytes truncated ...]\n")
+        assert result.stdout.endswith("y" * 99 + "\n")
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_process_group(self):
+        """
+        GIVEN a shell that started a background grandchild
+        WHEN the command times out
+        THEN the shell and the grandchild are both killed
+        """
+        start = time.monotonic()
+        result = await run_process("sleep 30 & echo $!; wait", shell=True, timeout=0.5)
+
+        assert result.timed_out and result.returncode == -1
+        assert "timed out after 0.5s" in result.stderr
+        assert time.monotonic() - start < 10
+        grandchild = int(result.stdout.split()[0])
+        await asyncio.sleep(0.1)
+        assert not is_alive(grandchild)
+
+    @pytest.mark.asyncio
+    async def test_cancel_kills_process(self, tmp_path):
+        """
+        GIVEN a long-running command
+        WHEN the awaiting task is cancelled
+        THEN CancelledError propagates and the process is gone
+        """
+        pid_file = tmp_path / "pid"
+        task = asyncio.create_task(
+            run_process(f"echo $$ > {pid_file}; exec sleep 30", shell=True, timeout=60)
+        )
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.02)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.1)
+        assert not is_alive(int(pid_file.read_text()))
+
+    @pytest.mark.asyncio
+    async def test_docker_limit_serializes(self, monkeypatch):
+        """
+        GIVEN a docker CLI concurrency limit of 1
+        WHEN three limited commands start together
+        THEN they run one after another
+        """
+        monkeypatch.setattr(settings.sandbox, "docker_cli_concurrency", 1)
+        monkeypatch.setattr(process_runner, "_limiters", {})
+        start = time.monotonic()
+
+        results = await asyncio.gather(
+            *(run_process([PY, "-c", "import time; time.sleep(0.2)"], limit="docker") for _ in range(3))
+        )
+
+        assert all(r.success for r in results)
+        assert time.monotonic() - start >= 0.6
+
+    @pytest.mark.asyncio
+    async def test_force_stop_kills_owned_processes(self):
+        """
+        GIVEN a workflow task that started a long command under its project id
+        WHEN the project's processes are killed
+        THEN the command returns early with a signal exit code
+        """
+        async def workflow():
+            set_process_owner("proj-1")
+            return await run_process(["sleep", "30"], timeout=60)
+
+        task = asyncio.create_task(workflow())
+        while not process_runner.running_processes():
+            await asyncio.sleep(0.02)
+
+        assert kill_processes("proj-1") == 1
+        result = await asyncio.wait_for(task, timeout=5)
+        assert result.returncode < 0 and not result.timed_out
+        assert process_runner.running_processes() == {}
+
+    @pytest.mark.asyncio
+    async def test_thread_fallback(self, monkeypatch):
+        """
+        GIVEN an event loop without subprocess support
+        WHEN a command runs
+        THEN it falls back to subprocess.run in a thread with the same result shape
+        """
+        async def unsupported(*args, **kwargs):
+            raise NotImplementedError
+
+        monkeypatch.setattr(asyncio, "create_subprocess_exec", unsupported)
+        lines = []
+
+        result = await run_process([PY, "-c", "print('hi')"], on_stdout=lines.append)
+
+        assert result.success and result.stdout == "hi\n" and lines == ["hi"]
@@ -0,0 +1,84 @@
+# tests/test_project_files.py
+"""
+Tests for the cached, step-scoped project file reader.
+
+Validates what supervised_agent_call relies on:
+- Same result as the legacy full walk + filter_files_for_step
+- Repeated calls do not re-read unchanged files
+- Writes through the file writer invalidate cached contents
+"""
+import asyncio
+
+import pytest
+
+from app.core.file_writer import write_validated_files
+from app.core.project_files import ProjectFileCache, get_project_file_cache, read_project_files
+from app.llm.prompt_management import filter_files_for_step
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "architecture").mkdir()
+    (tmp_path / "architecture" / "backend.md").write_text("# Backend\n")
+    (tmp_path / "architecture" / "frontend.md").write_text("# Frontend\n")
+    (tmp_path / "architecture" / "overview.md").write_text("# Overview\n")
+    (tmp_path / "backend" / "app").mkdir(parents=True)
+    (tmp_path / "backend" / "app" / "main.py").write_text("app = 1\n")
+    return tmp_path
+
+
+class TestProjectFileCache:
+    """Test suite for ProjectFileCache."""
+
+    @pytest.mark.parametrize("step", ["architecture", "frontend_mock", "backend_models", "backend_routers", "testing_backend"])
+    def test_matches_legacy_filtering(self, project, step):
+        """
+        GIVEN a project with architecture docs and workspace code
+        WHEN the cache reads files for a step
+        THEN filtering the result gives the same files as filtering a full walk
+        """
+        legacy = [
+            {"path": p.relative_to(project).as_posix(), "content": p.read_text()}
+            for p in project.rglob("*") if p.is_file()
+        ]
+        cached = ProjectFileCache().read_for_step(project, step)
+
+        assert filter_files_for_step(step, cached) == filter_files_for_step(step, legacy)
+        assert all(f["path"].startswith("architecture/") for f in cached)
+
+    def test_repeated_reads_hit_cache(self, project):
+        """
+        GIVEN a warm cache
+        WHEN the same step reads again without changes
+        THEN no file is re-read; a changed file is re-read alone
+        """
+        cache = ProjectFileCache()
+        cache.read_for_step(project, "architecture")
+        assert cache.stats["reads"] == 3
+
+        cache.read_for_step(project, "architecture")
+        assert cache.stats["reads"] == 3
+        assert cache.stats["hits"] == 3
+
+        (project / "architecture" / "overview.md").write_text("# Overview v2, longer\n")
+        files = cache.read_for_step(project, "architecture")
+        assert cache.stats["reads"] == 4
+        assert {"path": "architecture/overview.md", "content": "# Overview v2, longer\n"} in files
+
+    def test_file_writer_invalidates(self, project):
+        """
+        GIVEN a cached architecture doc
+        WHEN the file writer rewrites it
+        THEN the next read returns the new content
+        """
+        read_project_files(project, "backend_models")
+
+        asyncio.run(write_validated_files(
+            project,
+            [{"path": "architecture/backend.md", "content": "# Backend v2\n"}],
+            "architecture",
+        ))
+
+        files = read_project_files(project, "backend_models")
+        assert files == [{"path": "architecture/backend.md", "content": "# Backend v2\n"}]
+        get_project_file_cache().forget(project)
@@ -0,0 +1,259 @@
+# tests/test_prompt_prefix_cache.py
+"""
+Tests for provider-side prompt prefix caching.
+
+Validates:
+- Each provider marks the static prefix the way its API expects
+- Cached-token counts are extracted from provider usage
+- Gemini cache resources are created once, refreshed before they expire,
+  and not retried right after a failure
+- The adapter passes the prefix through and repeats a call whose cache vanished
+- BudgetManager prices cached input tokens at the cached rate
+"""
+import asyncio
+
+import pytest
+
+from app.llm.adapter import LLMAdapter
+from app.llm.prefix_cache import REFRESH_MARGIN, CachedPrefix, PrefixCache
+from app.llm.providers import anthropic, gemini, openai
+from app.llm.transport import PrefixCacheExpired
+from app.orchestration.budget_manager import BudgetManager
+from tests.conftest import FakeClock
+
+
+PERSONA = "You are Derek. " * 400  # ~6000 chars, above the default minimum
+SYSTEM = PERSONA + "\n\nSTEP-SPECIFIC INSTRUCTIONS: build the routers"
+
+
+pytestmark = pytest.mark.usefixtures("no_response_cache")
+
+
+class FakeGemini:
+    """Stands in for the gemini provider module's cache functions."""
+    PREFIX_CACHE = True
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.deleted = []
+
+    async def create_cached_content(self, model, system_prompt, ttl, session):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise Exception("Cached content is too small")
+        self.created.append((model, system_prompt, ttl))
+        return f"cachedContents/c{len(self.created)}"
+
+    async def delete_cached_content(self, name, session):
+        self.deleted.append(name)
+
+
+class TestProviderPayloads:
+    """Test how each provider marks the cached prefix."""
+
+    def test_anthropic_cache_control_block(self):
+        """
+        GIVEN a cached prefix
+        WHEN the Anthropic payload is built
+        THEN the prefix is its own system block with cache_control and the rest follows
+        """
+        prefix = CachedPrefix(PERSONA, "k1")
+        payload = anthropic._build_payload("task", SYSTEM, "claude", 100, None, prefix)
+
+        assert payload["system"][0] == {"type": "text", "text": PERSONA, "cache_control": {"type": "ephemeral"}}
+        assert payload["system"][1]["text"].endswith("build the routers")
+        assert anthropic._build_payload("task", SYSTEM, "claude", 100, None)["system"] == SYSTEM
+
+        usage = anthropic._extract_usage({
+            "input_tokens": 50, "output_tokens": 20,
+            "cache_read_input_tokens": 1500, "cache_creation_input_tokens": 0,
+        })
+        assert usage == {"input": 1550, "output": 20, "cached": 1500, "cache_write": 0}
+
+    def test_openai_prompt_cache_key(self):
+        """
+        GIVEN a cached prefix
+        WHEN the OpenAI payload is built
+        THEN the system prompt leads unchanged and prompt_cache_key is set
+        """
+        payload = openai._build_payload("task", SYSTEM, "gpt", 0.2, 100, None, CachedPrefix(PERSONA, "k1"))
+
+        assert payload["messages"][0] == {"role": "system", "content": SYSTEM}
+        assert payload["prompt_cache_key"] == "k1"
+        usage = openai._extract_usage({
+            "prompt_tokens": 1600, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 1536},
+        })
+        assert usage == {"input": 1600, "output": 10, "cached": 1536}
+
+    def test_gemini_cached_content(self):
+        """
+        GIVEN a cached prefix backed by a cachedContents resource
+        WHEN the Gemini payload is built
+        THEN it references the cache, drops systemInstruction and leads the user turn with the rest
+        """
+        payload = gemini._build_payload("task", SYSTEM, 100, None, CachedPrefix(PERSONA, "k1", "cachedContents/c1"))
+
+        assert payload["cachedContent"] == "cachedContents/c1"
+        assert "systemInstruction" not in payload
+        assert payload["contents"][0]["parts"][0]["text"] == "STEP-SPECIFIC INSTRUCTIONS: build the routers\n\ntask"
+        assert gemini._extract_usage({"usageMetadata": {"promptTokenCount": 1700, "cachedContentTokenCount": 1500}})["cached"] == 1500
+        with pytest.raises(PrefixCacheExpired):
+            gemini._raise_for_status(403, "CachedContent not found", None, CachedPrefix(PERSONA, "k1", "cachedContents/c1"))
+
+
+class TestPrefixCache:
+    """Test prefix selection and Gemini cache lifetimes."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_create_one_cache(self):
+        """
+        GIVEN five concurrent calls sharing a prefix
+        WHEN they prepare it
+        THEN one cache resource is created and all of them use it
+        """
+        module = FakeGemini()
+        cache = PrefixCache(ttl=3600, min_chars=1000)
+
+        prefixes = await asyncio.gather(*(
+            cache.prepare("gemini", module, "flash", SYSTEM, PERSONA) for _ in range(5)
+        ))
+
+        assert {p.handle for p in prefixes} == {"cachedContents/c1"}
+        assert len(module.created) == 1
+        assert cache.stats()["providers"]["gemini"]["caches_created"] == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_before_expiry(self):
+        """
+        GIVEN a cache resource close to the end of its TTL
+        WHEN the prefix is prepared again
+        THEN a fresh resource is created
+        """
+        clock = FakeClock()
+        module = FakeGemini()
+        cache = PrefixCache(ttl=600, min_chars=1000, clock=clock)
+
+        first = await cache.prepare("gemini", module, "flash", SYSTEM, PERSONA)
+        clock.now += 300
+        same = await cache.prepare("gemini", module, "flash", SYSTEM, PERSONA)
+        clock.now += 300 - REFRESH_MARGIN
+        fresh = await cache.prepare("gemini", module, "flash", SYSTEM, PERSONA)
+
+        assert first.handle == same.handle == "cachedContents/c1"
+        assert fresh.handle == "cachedContents/c2"
+        assert cache.stats()["providers"]["gemini"]["caches_refreshed"] == 1
+
+        await cache.aclose(lambda provider: None)
+        assert module.deleted == ["cachedContents/c2"]
+
+    @pytest.mark.asyncio
+    async def test_failures_and_short_prefixes_go_uncached(self):
+        """
+        GIVEN a provider that rejects cache creation, and a prefix below the minimum
+        WHEN prefixes are prepared
+        THEN both are sent uncached and the failed creation is not retried immediately
+        """
+        module = FakeGemini(fail=True)
+        cache = PrefixCache(ttl=600, min_chars=1000)
+
+        assert await cache.prepare("gemini", module, "flash", SYSTEM, PERSONA) is None
+        assert await cache.prepare("gemini", module, "flash", SYSTEM, PERSONA) is None
+        assert cache.stats()["providers"]["gemini"]["cache_failures"] == 1
+        assert await cache.prepare("anthropic", anthropic, "claude", "short system", "short") is None
+        assert await cache.prepare("anthropic", anthropic, "claude", SYSTEM, "not a prefix" * 200) is None
+        assert (await cache.prepare("anthropic", anthropic, "claude", SYSTEM, PERSONA)).handle is None
+
+
+class TestAdapterIntegration:
+    """Test the adapter's use of the prefix cache."""
+
+    @pytest.mark.asyncio
+    async def test_expired_cache_is_dropped_and_call_repeated(self, monkeypatch):
+        """
+        GIVEN a Gemini cache the provider reports as gone
+        WHEN the adapter calls with cache_prefix
+        THEN the call is repeated uncached and the next call creates a new cache
+        """
+        fake = FakeGemini()
+        calls = []
+
+        async def fake_call(**kwargs):
+            prefix = kwargs.get("cache_prefix")
+            calls.append(prefix.handle if prefix else None)
+            if prefix is not None and prefix.handle == "cachedContents/c1":
+                raise PrefixCacheExpired("gone")
+            return {"text": "ok", "usage": {"input": 1600, "output": 5, "cached": 1500 if prefix else 0}}
+
+        monkeypatch.setattr(gemini, "call", fake_call)
+        monkeypatch.setattr(gemini, "create_cached_content", fake.create_cached_content)
+        monkeypatch.setattr(gemini, "delete_cached_content", fake.delete_cached_content)
+        adapter = LLMAdapter()
+        adapter.scheduler = None
+        adapter.prefix_cache = PrefixCache(ttl=600, min_chars=1000)
+        try:
+            first = await adapter.call("task", SYSTEM, provider="gemini", model="flash", cache_prefix=PERSONA, return_usage=True)
+            second = await adapter.call("task 2", SYSTEM, provider="gemini", model="flash", cache_prefix=PERSONA, return_usage=True)
+        finally:
+            await adapter.aclose()
+
+        assert calls == ["cachedContents/c1", None, "cachedContents/c2"]
+        assert first["usage"]["cached"] == 0 and second["usage"]["cached"] == 1500
+        stats = adapter.prefix_cache.stats()["providers"]["gemini"]
+        assert stats["caches_expired"] == 1 and stats["cached_tokens"] == 1500
+        assert fake.deleted == ["cachedContents/c2"]
+
+    @pytest.mark.asyncio
+    async def test_stream_expiry_after_output_is_an_error(self, monkeypatch):
+        """
+        GIVEN a stream whose cache is reported gone after text was yielded
+        WHEN the adapter streams with cache_prefix
+        THEN it raises LLMError instead of restarting (no duplicated output)
+        """
+        from app.core.exceptions import LLMError
+
+        fake = FakeGemini()
+        attempts = []
+
+        async def fake_stream(**kwargs):
+            attempts.append(kwargs.get("cache_prefix"))
+            yield {"text": "partial"}
+            raise PrefixCacheExpired("gone")
+
+        monkeypatch.setattr(gemini, "stream", fake_stream)
+        monkeypatch.setattr(gemini, "create_cached_content", fake.create_cached_content)
+        monkeypatch.setattr(gemini, "delete_cached_content", fake.delete_cached_content)
+        adapter = LLMAdapter()
+        adapter.scheduler = None
+        adapter.prefix_cache = PrefixCache(ttl=600, min_chars=1000)
+        events = []
+        try:
+            with pytest.raises(LLMError):
+                async for event in adapter.stream("task", SYSTEM, provider="gemini", model="flash", cache_prefix=PERSONA):
+                    events.append(event)
+        finally:
+            await adapter.aclose()
+
+        assert events == [{"text": "partial"}]
+        assert len(attempts) == 1
+        assert adapter.prefix_cache.stats()["providers"]["gemini"]["caches_expired"] == 1
+
+
+class TestBudgetPricing:
+    """Test cached-token accounting."""
+
+    def test_cached_tokens_cost_less(self):
+        """
+        GIVEN two calls with the same token counts, one served mostly from the prompt cache
+        WHEN usage is registered
+        THEN the cached call costs less and cached tokens are reported
+        """
+        fresh, cached = BudgetManager(), BudgetManager()
+        fresh.register_usage(input_tokens=100_000, output_tokens=1000, step="backend_routers")
+        cached.register_usage(input_tokens=100_000, output_tokens=1000, step="backend_routers",
+                              cached_tokens=80_000, model="gemini-2.5-flash")
+
+        assert cached.used_usd < fresh.used_usd
+        summary = cached.get_usage_summary()
+        assert summary["tokens"]["cached"] == 80_000
+        assert summary["by_step"]["backend_routers"]["cached"] == 80_000
@@ -0,0 +1,226 @@
+# tests/test_sandbox_pool.py
+"""
+Tests for the pre-warmed sandbox pool.
+
+Validates:
+- Golden images are built once; slots warm network + mongo only
+- Acquire starts the app containers with only that project's dirs mounted
+- Release resets + returns the slot; worn-out or dead slots are replaced
+- The ready target follows demand; idle surplus is scaled down
+- SandboxManager.start_sandbox / stop_sandbox go through the pool when enabled
+
+Docker is replaced by an in-memory runner (the pool takes a runner callable).
+"""
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.sandbox import pool as pool_module
+from app.sandbox.image_cache import BaseImageCache
+from app.sandbox.pool import SandboxPool
+from app.sandbox.sandbox_manager import SandboxManager
+from tests.conftest import FakeDocker
+
+
+def make_project(root, name="proj-1", extra_requirement=None):
+    project = root / name
+    (project / "backend" / "app").mkdir(parents=True)
+    (project / "frontend").mkdir()
+    requirements = "fastapi>=0.115.0\nbeanie>=1.27.0\n"
+    if extra_requirement:
+        requirements += f"{extra_requirement}\n"
+    (project / "backend" / "requirements.txt").write_text(requirements)
+    (project / "frontend" / "package.json").write_text(json.dumps({"dependencies": {"react": "^18.2.0"}}))
+    (project / "docker-compose.yml").write_text("services: {}\n")
+    return project
+
+
+@pytest.fixture
+def docker():
+    return FakeDocker()
+
+
+@pytest_asyncio.fixture
+async def make_pool(tmp_path, docker):
+    pools = []
+
+    def factory(**kwargs):
+        options = dict(min_size=1, max_size=3, max_uses=5, acquire_wait=2, check_interval=3600)
+        options.update(kwargs)
+        image_cache = BaseImageCache(runner=docker, state_path=tmp_path / ".image_cache.json")
+        pool = SandboxPool(workspaces_root=tmp_path, runner=docker, image_cache=image_cache, **options)
+        pools.append(pool)
+        return pool
+
+    yield factory
+    for pool in pools:
+        await pool.shutdown()
+
+
+class TestSandboxPool:
+    """Test the pre-warmed sandbox pool."""
+
+    @pytest.mark.asyncio
+    async def test_initialize_builds_images_once_and_warms(self, make_pool, docker, tmp_path):
+        """
+        GIVEN no golden images yet
+        WHEN the pool initializes
+        THEN both images are built and a slot warms with mongo only
+        """
+        pool = make_pool()
+
+        assert await pool.initialize() is True
+
+        assert len(docker.commands(["build"])) == 2
+        assert set(pool.images) == {"backend", "frontend"}
+        runs = docker.commands(["run"])
+        assert [c[c.index("--name") + 1].rsplit("-", 1)[-1] for c in runs] == ["mongo"]
+        assert pool.stats()["ready"] == 1
+
+        second = make_pool()
+        await second.initialize()
+        assert len(docker.commands(["build"])) == 2  # Tags exist - no rebuild
+
+    @pytest.mark.asyncio
+    async def test_acquire_hands_off_warm_slot(self, make_pool, docker, tmp_path):
+        """
+        GIVEN a warm pool and a seed-compatible project
+        WHEN the project acquires a sandbox
+        THEN its dev servers start with only the project's dirs mounted and the pool refills
+        """
+        pool = make_pool()
+        await pool.initialize()
+        project = make_project(tmp_path)
+
+        sandbox = await pool.acquire("proj-1", project)
+        await asyncio.sleep(0.05)  # Let the refill run
+
+        backend = sandbox["containers"]["backend"]
+        assert backend["workdir"] == "/app/workspaces/proj-1/backend"
+        assert backend["ports"].startswith("0.0.0.0:") and backend["ports"].endswith("->8001/tcp")
+        runs = {c[c.index("--name") + 1].rsplit("-", 1)[-1]: c for c in docker.commands(["run"])}
+        backend_run, frontend_run = runs["backend"], runs["frontend"]
+        assert f"{project.resolve() / 'backend'}:/app/workspaces/proj-1/backend" in backend_run
+        assert f"{project.resolve() / 'frontend'}:/app/workspaces/proj-1/frontend" in frontend_run
+        assert backend_run[backend_run.index(pool.images["backend"]) + 1] == "uvicorn"
+        assert "/app/node_modules/.bin/vite" in frontend_run
+        mounts = [c[i + 1] for c in (backend_run, frontend_run) for i, arg in enumerate(c) if arg == "-v"]
+        assert not any(m.startswith(f"{tmp_path.resolve()}:") for m in mounts)  # Never the workspaces root
+        stats = pool.stats()
+        assert stats["hits"] == 1 and stats["active"] == 1 and stats["ready"] == 1
+
+    @pytest.mark.asyncio
+    async def test_incompatible_project_starts_cold(self, make_pool, tmp_path):
+        """
+        GIVEN a project needing a package outside the seed requirements
+        WHEN it acquires
+        THEN the pool declines so the caller builds it cold
+        """
+        pool = make_pool()
+        await pool.initialize()
+
+        assert await pool.acquire("proj-1", make_project(tmp_path, extra_requirement="pandas==2.2")) is None
+        assert pool.stats()["incompatible"] == 1
+        assert pool.stats()["ready"] == 1
+
+    @pytest.mark.asyncio
+    async def test_release_resets_then_recycles_worn_slots(self, make_pool, docker, tmp_path):
+        """
+        GIVEN a slot allowed two uses
+        WHEN it is released after each use
+        THEN the first release resets it (DB drop + app containers removed), the second replaces it
+        """
+        pool = make_pool(max_uses=2, max_size=1)
+        await pool.initialize()
+        project = make_project(tmp_path)
+
+        first = await pool.acquire("proj-1", project)
+        assert await pool.release("proj-1") is True
+        assert any("dropDatabase()" in c[-1] for c in docker.commands(["exec"]))
+        assert first["containers"]["backend"]["name"] not in docker.running
+
+        second = await pool.acquire("proj-1", project)
+        assert second["slot_id"] == first["slot_id"]
+        await pool.release("proj-1")
+
+        assert pool.stats()["recycled"] == 1
+        assert not any(second["slot_id"] in name for name in docker.running)
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_slot_is_evicted(self, make_pool, docker):
+        """
+        GIVEN a ready slot whose mongo container died
+        WHEN the health check runs
+        THEN the slot is removed and a replacement starts warming
+        """
+        pool = make_pool()
+        await pool.initialize()
+        dead = pool.ready_pool[0]
+        docker.running[dead.containers["mongo"]] = False
+
+        await pool._evict_unhealthy()
+        await pool._refill_pool()
+        await asyncio.sleep(0.05)
+
+        assert pool.stats()["evicted"] == 1
+        assert [s.slot_id for s in pool.ready_pool] != [dead.slot_id]
+        assert pool.stats()["ready"] == 1
+
+    @pytest.mark.asyncio
+    async def test_target_follows_demand(self, make_pool):
+        """
+        GIVEN a pool with min 1 / max 3
+        WHEN acquisitions burst and then demand falls away
+        THEN the target grows (capped) and idle surplus is scaled down
+        """
+        pool = make_pool(idle_ttl=0)
+        await pool.initialize()
+
+        pool._acquire_times.extend([time.time()] * 5)
+        assert pool.target_ready() == 3
+
+        await pool._refill_pool()
+        await asyncio.sleep(0.05)
+        assert pool.stats()["ready"] == 3
+
+        pool._acquire_times.clear()
+        await pool._scale_down()
+        assert pool.stats()["ready"] == 1
+        assert pool.stats()["scaled_down"] == 2
+
+
+class TestSandboxManagerPool:
+    """Test SandboxManager's use of the pool."""
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop_go_through_pool(self, make_pool, docker, tmp_path, monkeypatch):
+        """
+        GIVEN the pool enabled and warm
+        WHEN a sandbox is started and stopped
+        THEN no compose build runs and the slot goes back to the pool
+        """
+        pool = make_pool()
+        await pool.initialize()
+        monkeypatch.setattr(pool_module, "_pool", pool)
+        monkeypatch.setattr(settings.sandbox, "pool_enabled", True)
+
+        manager = SandboxManager()
+
+        async def no_compose(*args, **kwargs):
+            raise AssertionError("compose must not run for a pooled sandbox")
+
+        monkeypatch.setattr(manager, "_run_compose_command", no_compose)
+        project = make_project(tmp_path)
+        await manager.create_sandbox("proj-1", project)
+
+        started = await manager.start_sandbox("proj-1", wait_healthy=False)
+        assert started["success"] and started["pooled"]
+        assert (await manager.get_status("proj-1"))["status"] == "running"
+
+        assert (await manager.stop_sandbox("proj-1"))["success"]
+        assert pool.stats()["active"] == 0
+        assert pool.stats()["ready"] >= 1
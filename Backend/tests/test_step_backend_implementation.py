@@ -323,3 +323,76 @@ class TestContractCompliance:
         
         # Good model should have Optional for description
         assert "Optional[str]" in good_model or "= None" in good_model
+
+
+class TestRouterFanOut:
+    """Test concurrent per-entity router generation in step_backend_routers."""
+
+    @pytest.mark.asyncio
+    async def test_routers_generated_concurrently_and_merged_in_order(
+        self, temp_workspace, multi_entity_plan, mock_manager, monkeypatch
+    ):
+        """
+        GIVEN two AGGREGATE entities whose reviews finish in reverse order
+        WHEN step_backend_routers runs
+        THEN both LLM round trips overlap, and persistence / results follow
+        generation_order (deterministic), with token usage summed
+        """
+        import asyncio
+        from app.arbormind.cognition.branch import Branch
+        from app.handlers import backend_routers
+
+        (temp_workspace / "backend" / "app" / "models.py").write_text("# models\n", encoding="utf-8")
+        multi_entity_plan.relationships = []  # Routers only need the entities
+        multi_entity_plan.save(temp_workspace / "entity_plan.json")
+
+        in_flight = {"now": 0, "max": 0}
+        delays = {"Project": 0.05, "Task": 0.01}
+
+        async def fake_supervised_agent_call(**kwargs):
+            entity = kwargs["base_instructions"].split()[-1]
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(delays[entity])
+            in_flight["now"] -= 1
+            plural = "projects" if entity == "Project" else "tasks"
+            return {
+                "approved": True,
+                "token_usage": {"input": 10, "output": 5},
+                "output": {"files": [{"path": f"{plural}.py", "content": "router = APIRouter()\n"}]},
+            }
+
+        persisted = []
+
+        async def fake_persist(manager, project_id, project_path, validated, step):
+            persisted.append([f["path"] for f in validated["files"]] if isinstance(validated, dict) else validated)
+            return 1
+
+        async def no_cache(project_id):
+            return {"backend": "Standard CRUD"}
+
+        monkeypatch.setattr(backend_routers, "supervised_agent_call", fake_supervised_agent_call)
+        monkeypatch.setattr(backend_routers, "persist_agent_output", fake_persist)
+        monkeypatch.setattr(backend_routers, "validate_file_output", lambda parsed, step, max_files=5: parsed)
+        monkeypatch.setattr(backend_routers, "broadcast_status", AsyncMock())
+        monkeypatch.setattr(backend_routers, "broadcast_agent_log", AsyncMock())
+        monkeypatch.setattr(backend_routers.WorkflowStateManager, "get_architecture_cache", no_cache)
+        monkeypatch.setattr(backend_routers, "_build_single_router_prompt", lambda entity, arch: f"ENTITY {entity.name}")
+
+        branch = Branch(
+            parent_id=None, depth=0, assumptions={},
+            intent={
+                "project_id": "test_project_123",
+                "user_request": "tasks app",
+                "manager": mock_manager,
+                "project_path": temp_workspace,
+            },
+            strategy={}, agent_roles={},
+        )
+
+        result = await backend_routers.step_backend_routers.__wrapped__(branch)
+
+        assert in_flight["max"] == 2
+        assert result.data["routers"] == ["projects", "tasks"]
+        assert persisted == [["backend/app/routers/projects.py"], ["backend/app/routers/tasks.py"]]
+        assert result.token_usage == {"input": 20, "output": 10}
@@ -0,0 +1,264 @@
+# tests/test_test_worker.py
+"""
+Tests for persistent sandbox test workers.
+
+Validates:
+- The first pass starts one worker via compose; repeat passes only docker exec
+- Backend sharding uses xdist when present, otherwise splits test files
+- Playwright passes shard with --workers
+- Idle, timed-out and vanished workers are removed / recreated
+- SandboxManager runs tests through the worker and falls back to compose run
+
+Docker is replaced by an in-memory runner (the manager takes a runner callable).
+"""
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.sandbox import test_worker as worker_module
+from app.sandbox.image_cache import COMPOSE_OVERRIDE
+from app.sandbox.sandbox_manager import SandboxManager
+from app.sandbox.test_worker import TestWorkerManager, shard_files, worker_name
+from tests.conftest import FakeDocker
+
+
+def make_project(root, name="proj-1", test_files=("test_a.py", "test_b.py", "test_c.py")):
+    project = root / name
+    (project / "backend" / "tests").mkdir(parents=True)
+    (project / "frontend").mkdir()
+    for test_file in test_files:
+        (project / "backend" / "tests" / test_file).write_text("def test_ok():\n    assert True\n")
+    (project / "docker-compose.yml").write_text("services: {}\n")
+    return project
+
+
+@pytest.fixture
+def docker():
+    return FakeDocker()
+
+
+@pytest_asyncio.fixture
+async def make_workers(docker):
+    managers = []
+
+    def factory(**kwargs):
+        options = dict(idle_ttl=600, shards=1, runner=docker)
+        options.update(kwargs)
+        manager = TestWorkerManager(**options)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        await manager.shutdown()
+
+
+class TestWorkerLifecycle:
+    """Test worker creation, reuse and teardown."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_passes_reuse_worker(self, make_workers, docker, tmp_path):
+        """
+        GIVEN a project with a compose override from the image cache
+        WHEN backend tests run twice
+        THEN one worker is started via compose run and both passes docker exec into it
+        """
+        project = make_project(tmp_path)
+        (project / COMPOSE_OVERRIDE).write_text("services: {}\n")
+        workers = make_workers()
+
+        first = await workers.run_tests("proj-1", project, "backend")
+        start = time.monotonic()
+        second = await workers.run_tests("proj-1", project, "backend")
+
+        assert time.monotonic() - start < 1
+        assert first["returncode"] == second["returncode"] == 0
+        (run,) = docker.commands(["compose"])
+        assert str(project / COMPOSE_OVERRIDE) in run
+        assert run[run.index("run"):] == [
+            "run", "-d", "--name", worker_name("proj-1", "backend"),
+            "--label", worker_module.WORKER_LABEL, "backend", "sleep", "infinity",
+        ]
+        assert all(c[-2:] == ["pytest", "-v"] for c in docker.test_execs())
+        stats = workers.stats()
+        assert stats["starts"] == 1 and stats["reuses"] == 1 and stats["runs"] == 2
+
+    @pytest.mark.asyncio
+    async def test_idle_worker_is_reaped(self, make_workers, docker, tmp_path):
+        """
+        GIVEN a worker with a zero idle timeout
+        WHEN the reaper runs after a pass
+        THEN the container is removed and the next pass starts a new one
+        """
+        project = make_project(tmp_path)
+        workers = make_workers(idle_ttl=0)
+        await workers.run_tests("proj-1", project, "backend")
+
+        assert await workers.reap_idle() == 1
+        assert not docker.running
+
+        await workers.run_tests("proj-1", project, "backend")
+        assert workers.stats()["starts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_vanished_worker_is_recreated(self, make_workers, docker, tmp_path):
+        """
+        GIVEN a worker whose container was removed behind our back
+        WHEN the next pass runs
+        THEN the worker is recreated once and the pass succeeds
+        """
+        project = make_project(tmp_path)
+        workers = make_workers()
+        await workers.run_tests("proj-1", project, "backend")
+        docker.running.clear()
+
+        result = await workers.run_tests("proj-1", project, "backend")
+
+        assert result["returncode"] == 0
+        assert workers.stats()["restarts"] == 1 and workers.stats()["starts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_timed_out_pass_removes_worker(self, make_workers, docker, tmp_path):
+        """
+        GIVEN a pass that exceeds its timeout
+        WHEN it returns
+        THEN the worker (still running the tests) is removed
+        """
+        project = make_project(tmp_path)
+        workers = make_workers()
+        docker.exec_result = (-1, "", "docker exec timed out after 5s")
+
+        result = await workers.run_tests("proj-1", project, "backend", timeout=5)
+
+        assert result["returncode"] == -1
+        assert workers.stats()["timeouts"] == 1 and not workers.workers
+        assert not docker.running
+
+
+class TestWorkerSharding:
+    """Test sharded test passes."""
+
+    def test_shard_files_round_robin(self):
+        """
+        GIVEN five files and three shards (or more shards than files)
+        WHEN they are split
+        THEN groups are round-robin and never empty
+        """
+        assert shard_files(list("abcde"), 3) == [["a", "d"], ["b", "e"], ["c"]]
+        assert shard_files(["a"], 4) == [["a"]]
+
+    @pytest.mark.asyncio
+    async def test_backend_uses_xdist_when_available(self, make_workers, tmp_path):
+        """
+        GIVEN a backend image with pytest-xdist
+        WHEN tests run with 4 shards
+        THEN a single pytest -n 4 exec runs
+        """
+        docker = FakeDocker(xdist=True)
+        workers = make_workers(runner=docker, shards=4)
+
+        result = await workers.run_tests("proj-1", make_project(tmp_path), "backend")
+
+        assert [c[-4:] for c in docker.test_execs()] == [["pytest", "-v", "-n", "4"]]
+        assert result["shards"] == 4
+
+    @pytest.mark.asyncio
+    async def test_backend_splits_files_without_xdist(self, make_workers, docker, tmp_path):
+        """
+        GIVEN no pytest-xdist and one failing shard
+        WHEN tests run with 2 shards
+        THEN the files are split over two execs and the merged pass fails
+        """
+        workers = make_workers(shards=2)
+        results = iter([(0, "2 passed", ""), (1, "1 failed", "")])
+        original = docker.__call__
+
+        async def runner(args, timeout):
+            if args[0] == "exec" and "pytest" in args:
+                return next(results)
+            return await original(args, timeout)
+
+        workers._docker = runner
+        result = await workers.run_tests("proj-1", make_project(tmp_path), "backend")
+
+        assert result["returncode"] == 1 and result["shards"] == 2
+        assert "===== shard 2/2 =====\n1 failed" in result["stdout"]
+
+    @pytest.mark.asyncio
+    async def test_frontend_shards_playwright_workers(self, make_workers, docker, tmp_path):
+        """
+        GIVEN 3 shards
+        WHEN frontend tests run
+        THEN Playwright is run with --workers=3 in the frontend worker
+        """
+        workers = make_workers(shards=3)
+
+        await workers.run_tests("proj-1", make_project(tmp_path), "frontend")
+
+        (run,) = docker.commands(["compose"])
+        assert run[-3:] == ["frontend", "sleep", "infinity"]
+        (test_exec,) = docker.test_execs()
+        assert test_exec[-4:] == ["npx", "playwright", "test", "--workers=3"]
+
+
+class TestSandboxManagerTestWorker:
+    """Test SandboxManager's use of test workers."""
+
+    @pytest.mark.asyncio
+    async def test_backend_tests_run_in_worker(self, make_workers, docker, tmp_path, monkeypatch):
+        """
+        GIVEN test workers enabled
+        WHEN backend tests run twice and the sandbox stops
+        THEN no compose run --rm happens and the worker is removed on stop
+        """
+        workers = make_workers()
+        monkeypatch.setattr(worker_module, "_workers", workers)
+        monkeypatch.setattr(settings.sandbox, "test_worker_enabled", True)
+        manager = SandboxManager()
+        compose_commands = []
+
+        async def fake_compose(project_path, command, timeout=60):
+            compose_commands.append(command)
+            return {"returncode": 0, "stdout": "", "stderr": ""}
+
+        monkeypatch.setattr(manager, "_run_compose_command", fake_compose)
+        monkeypatch.setattr(manager, "_validate_project_structure", lambda path: {"valid": True})
+        project = make_project(tmp_path)
+        await manager.create_sandbox("proj-1", project)
+
+        for _ in range(2):
+            result = await manager.run_backend_tests("proj-1")
+            assert result["success"] and result["stdout"] == "passed"
+        assert not any("run --rm" in c for c in compose_commands)
+
+        await manager.stop_sandbox("proj-1")
+        assert compose_commands == ["down"]
+        assert not docker.running
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_compose_run(self, make_workers, tmp_path, monkeypatch):
+        """
+        GIVEN a worker that cannot start
+        WHEN backend tests run
+        THEN the one-off compose run --rm container is used
+        """
+        async def broken(args, timeout):
+            return 1, "", "compose failed"
+
+        monkeypatch.setattr(worker_module, "_workers", make_workers(runner=broken))
+        monkeypatch.setattr(settings.sandbox, "test_worker_enabled", True)
+        manager = SandboxManager()
+        compose_commands = []
+
+        async def fake_compose(project_path, command, timeout=60):
+            compose_commands.append(command)
+            return {"returncode": 0, "stdout": "ok", "stderr": ""}
+
+        monkeypatch.setattr(manager, "_run_compose_command", fake_compose)
+        monkeypatch.setattr(manager, "_validate_project_structure", lambda path: {"valid": True})
+        await manager.create_sandbox("proj-1", make_project(tmp_path))
+
+        assert (await manager.run_backend_tests("proj-1"))["success"]
+        assert compose_commands == ["run --rm backend pytest -v"]
@@ -0,0 +1,157 @@
+# tests/test_validation_pool.py
+"""
+Tests for process-pool pre-flight validation.
+
+Validates:
+- Pooled validation returns exactly what the in-loop preflight_check does
+- Tiny batches stay in-process; a missing pool falls back to threads
+- Per-file timeouts reject the file and recycle the pool
+- Files pre-validated while streaming are not validated again
+- The event loop keeps ticking while a large batch is validated
+"""
+import pytest
+
+from app.validation import ast_cache, pool as pool_module, preflight_check
+from app.validation.ast_cache import AnalysisCache
+from app.validation.pool import ValidationService
+from benchmarks.validation_lag_bench import measure_loop_lag, synthetic_batch
+
+
+FILES = [
+    {"path": "backend/app/models.py", "content": "from beanie import Document\n\n\nclass Task(Document):\n    title: str\n"},
+    {"path": "backend/app/routers/tasks.py", "content": "def broken(:\n    pass\n"},
+    {"path": "backend/app/utils.py", "content": "# café helpers\nVALUE = 1\n"},
+    {"path": "frontend/src/pages/Home.jsx", "content": "export default function Home() {\n  return <main data-testid=\"home\">Hi</main>;\n}\n"},
+    {"path": "README.md", "content": "# Tasks\n"},
+]
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = AnalysisCache(max_entries=64)
+    monkeypatch.setattr(ast_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def service():
+    svc = ValidationService(enabled=True, max_workers=2, inline_max_bytes=0, file_timeout=30)
+    yield svc
+    svc.shutdown()
+
+
+class TestValidationService:
+    """Test the async validation service."""
+
+    @pytest.mark.asyncio
+    async def test_pooled_results_match_inline(self, service, fresh_cache):
+        """
+        GIVEN valid, broken and Unicode-bearing files
+        WHEN they are validated in worker processes
+        THEN cleaned output and rejections equal the in-loop preflight_check
+        AND the workers' Python analyses are seeded into the parent cache
+        """
+        expected = preflight_check({"files": FILES, "thinking": "x"})
+        fresh_cache.clear()
+
+        result = await service.preflight_check({"files": FILES, "thinking": "x"})
+
+        assert result == expected
+        assert service.stats["pooled_files"] == len(FILES)
+        assert len(fresh_cache) == 2  # models.py + normalized utils.py
+
+    @pytest.mark.asyncio
+    async def test_tiny_batch_stays_in_process(self):
+        """
+        GIVEN a batch below the inline threshold
+        WHEN it is validated
+        THEN no worker pool is started
+        """
+        svc = ValidationService(enabled=True, inline_max_bytes=1_000_000)
+
+        valid, invalid = await svc.validate_files(FILES)
+
+        assert [f["path"] for f in invalid] == ["backend/app/routers/tasks.py"]
+        assert len(valid) == 4
+        assert svc.stats["inline_batches"] == 1
+        assert svc._pool is None
+
+    @pytest.mark.asyncio
+    async def test_unavailable_pool_falls_back_to_threads(self, monkeypatch):
+        """
+        GIVEN a platform where worker processes cannot start
+        WHEN a large batch is validated
+        THEN files are validated in-process with the same verdicts
+        """
+        def no_processes(*args, **kwargs):
+            raise OSError("no semaphores")
+
+        monkeypatch.setattr(pool_module, "ProcessPoolExecutor", no_processes)
+        svc = ValidationService(enabled=True, inline_max_bytes=0)
+
+        _, reasons = await svc.preflight_check({"files": FILES})
+
+        assert len(reasons) == 1 and reasons[0].startswith("backend/app/routers/tasks.py")
+        assert svc.stats["fallbacks"] == len(FILES)
+        assert svc.enabled is False
+
+    @pytest.mark.asyncio
+    async def test_timeout_rejects_file_and_recycles_pool(self):
+        """
+        GIVEN a per-file timeout no worker can meet
+        WHEN a file is validated
+        THEN it is rejected with a timeout error and the pool is replaced
+        """
+        svc = ValidationService(enabled=True, max_workers=1, inline_max_bytes=0, file_timeout=1e-6)
+        try:
+            _, invalid = await svc.validate_files(FILES[:1])
+        finally:
+            svc.shutdown()
+
+        assert invalid[0]["validation_errors"] == ["Validation timed out after 1e-06s"]
+        assert svc.stats["timeouts"] == 1
+        assert svc.stats["recycles"] == 1
+        assert svc._pool is None
+
+    @pytest.mark.asyncio
+    async def test_prevalidated_files_are_reused(self, service):
+        """
+        GIVEN files pre-validated one by one as they streamed in
+        WHEN the full batch reaches pre-flight
+        THEN their early results are reused and the verdicts are unchanged
+        """
+        expected = preflight_check({"files": FILES})
+        for file in FILES[:3]:
+            service.prevalidate(file)
+
+        result = await service.preflight_check({"files": FILES})
+
+        assert result == expected
+        assert service.stats["early_files"] == 3
+        assert service.stats["early_hits"] == 3
+        assert service.stats["pooled_files"] == len(FILES)  # 3 early + 2 in the batch
+        assert not service._early
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_ticking(self, service, fresh_cache):
+        """
+        GIVEN a large synthetic HDAP batch
+        WHEN it is validated in-loop and through the pool
+        THEN the ticker gets far more wake-ups while the pool does the work
+        (lag figures: benchmarks/validation_lag_bench.py)
+        """
+        batch = {"files": synthetic_batch(10, 150)}
+        await service.preflight_check({"files": batch["files"][:1]})  # Warm up workers
+
+        async def inline():
+            preflight_check(batch)
+
+        async def pooled():
+            await service.preflight_check(batch)
+
+        inline_lag = await measure_loop_lag(inline)
+        fresh_cache.clear()
+        pooled_lag = await measure_loop_lag(pooled)
+
+        assert inline_lag["ticks"] <= 2
+        assert pooled_lag["ticks"] > inline_lag["ticks"] * 5
@@ -0,0 +1,149 @@
+# tests/test_websocket_fanout.py
+"""
+Tests for the backpressure-aware WebSocket fan-out.
+
+Validates:
+- Broadcasting returns immediately even when a client is stalled
+- Healthy clients keep receiving while another one is slow
+- Full queues drop the oldest AGENT_LOG and tell the client
+- Clients that cannot keep up are disconnected as slow consumers
+- Queue-depth metrics
+"""
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.lib.websocket import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+from tests.conftest import FakeWebSocket
+
+
+def agent_log(n):
+    return {"type": "AGENT_LOG", "projectId": "proj-1", "message": f"log {n}"}
+
+
+@pytest_asyncio.fixture
+async def managers():
+    """ConnectionManager factory; writer tasks are stopped after the test."""
+    created = []
+
+    def make(**options):
+        created.append(ConnectionManager(**options))
+        return created[-1]
+
+    yield make
+    for manager in created:
+        await manager.close_all()
+
+
+async def connected(manager, *sockets):
+    for ws in sockets:
+        await manager.connect(ws, "proj-1")
+    return sockets
+
+
+class TestWebSocketFanout:
+    """Test per-connection send queues."""
+
+    @pytest.mark.asyncio
+    async def test_stalled_client_does_not_block(self, managers):
+        """
+        GIVEN one stalled client and one healthy client
+        WHEN 50 messages are broadcast
+        THEN broadcasting returns at once and the healthy client gets all of them
+        """
+        manager = managers(max_queue=100, send_timeout=10)
+        stalled, healthy = await connected(manager, FakeWebSocket(stalled=True), FakeWebSocket())
+
+        start = time.monotonic()
+        for n in range(50):
+            await manager.broadcast("proj-1", {"type": "WORKFLOW_UPDATE", "n": n})
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.05)
+
+        assert elapsed < 0.1
+        assert [m["n"] for m in healthy.messages] == list(range(50))
+        assert stalled.messages == []
+        stalled.gate.set()
+        assert await manager.drain(timeout=2)
+        assert len(stalled.messages) == 50
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_oldest_agent_log(self, managers):
+        """
+        GIVEN a stalled client with a 4-message queue holding a workflow update and logs
+        WHEN more logs arrive and the client recovers
+        THEN the oldest logs were dropped, the update kept, and the client is told what it missed
+        """
+        manager = managers(max_queue=4, send_timeout=10)
+        (ws,) = await connected(manager, FakeWebSocket(stalled=True))
+        await manager.broadcast("proj-1", agent_log(0))
+        await asyncio.sleep(0.01)  # Writer takes log 0 and blocks sending it
+        await manager.broadcast("proj-1", {"type": "WORKFLOW_UPDATE"})
+        for n in range(1, 7):
+            await manager.broadcast("proj-1", agent_log(n))
+
+        assert manager.stats()["dropped"] == 3
+        ws.gate.set()
+        assert await manager.drain(timeout=2)
+
+        received = [m.get("message", m["type"]) for m in ws.messages]
+        assert received[0] == "log 0"
+        assert "3 log message(s) skipped" in received[1]
+        assert received[2:] == ["WORKFLOW_UPDATE", "log 4", "log 5", "log 6"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_of_critical_messages_disconnects(self, managers):
+        """
+        GIVEN a stalled client whose queue is full of non-droppable messages
+        WHEN another one arrives
+        THEN the client is disconnected as a slow consumer and others are unaffected
+        """
+        manager = managers(max_queue=2, send_timeout=10)
+        stalled, healthy = await connected(manager, FakeWebSocket(stalled=True), FakeWebSocket())
+
+        for n in range(4):
+            await manager.broadcast("proj-1", {"type": "WORKFLOW_UPDATE", "n": n})
+            await asyncio.sleep(0.01)
+
+        assert stalled.close_code == SLOW_CONSUMER_CLOSE_CODE
+        assert manager.active_connections["proj-1"] == [healthy]
+        assert len(healthy.messages) == 4
+        assert manager.stats()["slow_disconnects"] == 1
+
+    @pytest.mark.asyncio
+    async def test_blocked_send_times_out(self, managers):
+        """
+        GIVEN a client whose socket never completes a send
+        WHEN the send timeout expires
+        THEN the client is disconnected
+        """
+        manager = managers(max_queue=10, send_timeout=0.1)
+        (ws,) = await connected(manager, FakeWebSocket(stalled=True))
+
+        await manager.broadcast("proj-1", {"type": "WORKFLOW_UPDATE"})
+        await asyncio.sleep(0.3)
+
+        assert ws.close_code == SLOW_CONSUMER_CLOSE_CODE
+        assert manager.active_connections == {}
+
+    @pytest.mark.asyncio
+    async def test_queue_depth_metrics(self, managers):
+        """
+        GIVEN a stalled client with queued messages
+        WHEN stats are read
+        THEN depth, max depth and per-project numbers are reported
+        """
+        manager = managers(max_queue=10, send_timeout=10)
+        (ws,) = await connected(manager, FakeWebSocket(stalled=True))
+        for n in range(3):
+            await manager.broadcast("proj-1", agent_log(n))
+        await asyncio.sleep(0.01)
+
+        stats = manager.stats()
+        assert stats["connections"] == 1 and stats["queue_depth"] == 3 and stats["queue_limit"] == 10
+        assert stats["projects"]["proj-1"][0]["max_depth"] == 3
+
+        await manager.disconnect(ws, "proj-1")
+        assert manager.stats()["connections"] == 0
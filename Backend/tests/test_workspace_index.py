@@ -0,0 +1,102 @@
+# tests/test_workspace_index.py
+"""
+Tests for the incremental workspace change tracker.
+
+Validates what the orchestrator relies on to attribute files to a step:
+- Precise created / modified / deleted sets between refreshes
+- Ignored directories are pruned, never indexed
+- The inotify path and the rescan fallback agree
+- State persists across WorkspaceIndex instances (resume)
+"""
+import os
+import sys
+
+import pytest
+
+from app.orchestration.workspace_index import WorkspaceIndex
+
+
+MODES = [False]
+if sys.platform.startswith("linux"):
+    MODES.append(True)
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "backend" / "app").mkdir(parents=True)
+    (tmp_path / "backend" / "app" / "main.py").write_text("app = 1\n")
+    (tmp_path / "frontend" / "node_modules" / "react").mkdir(parents=True)
+    (tmp_path / "frontend" / "node_modules" / "react" / "index.js").write_text("x")
+    (tmp_path / "contracts.md").write_text("# API\n")
+    return tmp_path
+
+
+class TestWorkspaceIndex:
+    """Test suite for WorkspaceIndex."""
+
+    @pytest.mark.parametrize("use_inotify", MODES)
+    def test_reports_exact_step_changes(self, project, use_inotify):
+        """
+        GIVEN an indexed project
+        WHEN a step creates, modifies and deletes files (incl. a new directory)
+        THEN refresh() reports exactly those paths
+        """
+        index = WorkspaceIndex(project, use_inotify=use_inotify)
+        try:
+            baseline = index.refresh()
+            assert baseline.created == {
+                os.path.join("backend", "app", "main.py"),
+                "contracts.md",
+            }
+            assert index.watching == use_inotify
+
+            (project / "backend" / "app" / "main.py").write_text("app = 2  # changed\n")
+            (project / "backend" / "app" / "routers").mkdir()
+            (project / "backend" / "app" / "routers" / "tasks.py").write_text("router = 1\n")
+            (project / "contracts.md").unlink()
+            (project / "frontend" / "node_modules" / "react" / "new.js").write_text("ignored")
+
+            delta = index.refresh()
+        finally:
+            index.close()
+
+        assert delta.created == {os.path.join("backend", "app", "routers", "tasks.py")}
+        assert delta.modified == {os.path.join("backend", "app", "main.py")}
+        assert delta.deleted == {"contracts.md"}
+        assert delta.changed == sorted(delta.created | delta.modified)
+
+    @pytest.mark.parametrize("use_inotify", MODES)
+    def test_no_changes_is_empty(self, project, use_inotify):
+        """
+        GIVEN an indexed project
+        WHEN nothing is touched
+        THEN the next refresh is empty (and does not rescan under inotify)
+        """
+        index = WorkspaceIndex(project, use_inotify=use_inotify)
+        try:
+            index.refresh()
+            delta = index.refresh()
+        finally:
+            index.close()
+
+        assert not delta
+        assert index.stats["rescans"] == (1 if use_inotify else 2)
+
+    def test_state_persists_between_instances(self, project):
+        """
+        GIVEN an index that was refreshed and closed
+        WHEN a new index is opened after an out-of-band edit
+        THEN its first refresh reports only that edit
+        """
+        first = WorkspaceIndex(project, use_inotify=False)
+        first.refresh()
+        first.close()
+
+        (project / "README.md").write_text("hello\n")
+
+        second = WorkspaceIndex(project, use_inotify=False)
+        delta = second.refresh()
+        second.close()
+
+        assert delta.created == {"README.md"}
+        assert not delta.modified and not delta.deleted